@@ -3,23 +3,28 @@
 from .tracecontext import TraceContext
 from .retrycontext import RetryContext
 from .context import Context
+from .datumdef import TriggerMetadata
 from .meta import check_input_type_annotation
 from .meta import check_output_type_annotation
 from .meta import has_implicit_output
 from .meta import is_trigger_binding, load_binding_registry
 from .meta import from_incoming_proto, to_outgoing_proto, \
     to_outgoing_param_binding, check_deferred_bindings_enabled, \
-    get_deferred_raw_bindings
+    get_deferred_raw_bindings, warmup_binding_registry
+from .meta import get_incoming_proto_decoder, get_outgoing_proto_encoder, \
+    get_outgoing_param_binding_encoder
 from .out import Out
 
 
 __all__ = (
-    'Out', 'Context',
+    'Out', 'Context', 'TriggerMetadata',
     'is_trigger_binding',
     'load_binding_registry',
     'check_input_type_annotation', 'check_output_type_annotation',
     'has_implicit_output',
     'from_incoming_proto', 'to_outgoing_proto', 'TraceContext', 'RetryContext',
     'to_outgoing_param_binding', 'check_deferred_bindings_enabled',
-    'get_deferred_raw_bindings'
+    'get_deferred_raw_bindings', 'warmup_binding_registry',
+    'get_incoming_proto_decoder', 'get_outgoing_proto_encoder',
+    'get_outgoing_param_binding_encoder'
 )
@@ -1,7 +1,7 @@
 # Copyright (c) Microsoft Corporation. All rights reserved.
 # Licensed under the MIT License.
 import threading
-from typing import Type
+from typing import Optional, Type
 
 from . import TraceContext
 from . import RetryContext
@@ -15,13 +15,15 @@ class Context:
                  invocation_id: str,
                  thread_local_storage: Type[threading.local],
                  trace_context: TraceContext,
-                 retry_context: RetryContext) -> None:
+                 retry_context: RetryContext,
+                 cancel_event: Optional[threading.Event] = None) -> None:
         self.__func_name = func_name
         self.__func_dir = func_dir
         self.__invocation_id = invocation_id
         self.__thread_local_storage = thread_local_storage
         self.__trace_context = trace_context
         self.__retry_context = retry_context
+        self.__cancel_event = cancel_event or threading.Event()
 
     @property
     def invocation_id(self) -> str:
@@ -46,3 +48,13 @@ class Context:
     @property
     def retry_context(self) -> RetryContext:
         return self.__retry_context
+
+    @property
+    def cancellation_event(self) -> threading.Event:
+        """Set when the host cancels the invocation. Long running sync
+        functions can poll it or wait on it to stop early."""
+        return self.__cancel_event
+
+    @property
+    def is_cancelled(self) -> bool:
+        return self.__cancel_event.is_set()
@@ -1,7 +1,8 @@
 # Copyright (c) Microsoft Corporation. All rights reserved.
 # Licensed under the MIT License.
 import logging
-from typing import Any, Optional
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, Optional
 import json
 from .. import protos
 from ..logging import logger
@@ -125,7 +126,7 @@ class Datum:
         ret_val = None
 
         if data_type == protos.RpcDataType.bytes:
-            val = shmem_mgr.get_bytes(mem_map_name, offset, count)
+            val = shmem_mgr.get_input_bytes(mem_map_name, offset, count)
             if val is not None:
                 ret_val = cls(val, 'bytes')
         elif data_type == protos.RpcDataType.string:
@@ -152,7 +153,12 @@ class Datum:
         """
         if datum.type == 'bytes':
             value = datum.value
-            shared_mem_meta = shmem_mgr.put_bytes(value)
+            if isinstance(value, bytes):
+                shared_mem_meta = shmem_mgr.put_bytes(value)
+            else:
+                # Seekable file-like or buffer-protocol outputs, written as
+                # they are read
+                shared_mem_meta = shmem_mgr.put_stream(value)
             data_type = protos.RpcDataType.bytes
         elif datum.type == 'string':
             value = datum.value
@@ -170,7 +176,7 @@ class Datum:
 
         shmem = protos.RpcSharedMemory(
             name=shared_mem_meta.mem_map_name,
-            offset=0,
+            offset=shared_mem_meta.offset,
             count=shared_mem_meta.count_bytes,
             type=data_type)
 
@@ -181,10 +187,50 @@ class Datum:
         return shmem
 
 
+class TriggerMetadata(Mapping):
+    """
+    Read-only view of the trigger metadata of an invocation, converting an
+    entry to a Datum the first time it is read. Bindings typically read a
+    few entries, while batch triggers send large per-message arrays.
+    One instance is shared by the trigger bindings of an invocation.
+    """
+
+    __slots__ = ('_typed_data', '_datums')
+
+    def __init__(self, typed_data: Mapping) -> None:
+        self._typed_data = typed_data
+        self._datums: Dict[str, Optional[Datum]] = {}
+
+    def __getitem__(self, key: str) -> Optional[Datum]:
+        try:
+            return self._datums[key]
+        except KeyError:
+            pass
+        # Indexing a protobuf map with a missing key would add the key
+        if key not in self._typed_data:
+            raise KeyError(key)
+        datum = self._datums[key] = Datum.from_typed_data(
+            self._typed_data[key])
+        return datum
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._typed_data)
+
+    def __len__(self) -> int:
+        return len(self._typed_data)
+
+    def __repr__(self) -> str:
+        return f'<TriggerMetadata keys={list(self._typed_data)}>'
+
+
 def datum_as_proto(datum: Datum) -> protos.TypedData:
     if datum.type == 'string':
         return protos.TypedData(string=datum.value)
     elif datum.type == 'bytes':
+        if not isinstance(datum.value, bytes):
+            # Buffer-protocol outputs packed into shared memory which could
+            # not be written (see SharedMemoryManager.pack_outputs)
+            return protos.TypedData(bytes=bytes(datum.value))
         return protos.TypedData(bytes=datum.value)
     elif datum.type == 'json':
         return protos.TypedData(json=datum.value)
@@ -1,5 +1,7 @@
 # Copyright (c) Microsoft Corporation. All rights reserved.
 # Licensed under the MIT License.
+import functools
+import io
 import os
 import sys
 import typing
@@ -154,15 +156,43 @@ def from_incoming_proto(
         binding: str,
         pb: protos.ParameterBinding, *,
         pytype: typing.Optional[type],
-        trigger_metadata: typing.Optional[typing.Dict[str, protos.TypedData]],
+        trigger_metadata: typing.Optional[
+            typing.Mapping[str, protos.TypedData]],
         shmem_mgr: SharedMemoryManager,
         is_deferred_binding: typing.Optional[bool] = False) -> typing.Any:
-    binding = get_binding(binding, is_deferred_binding)
-    if trigger_metadata:
-        metadata = {
-            k: datumdef.Datum.from_typed_data(v)
-            for k, v in trigger_metadata.items()
-        }
+    return _decode_incoming_proto(
+        get_binding(binding, is_deferred_binding), pb, pytype=pytype,
+        trigger_metadata=trigger_metadata, shmem_mgr=shmem_mgr,
+        is_deferred_binding=is_deferred_binding)
+
+
+def get_incoming_proto_decoder(
+        binding: str, *,
+        pytype: typing.Optional[type],
+        is_deferred_binding: typing.Optional[bool] = False) \
+        -> typing.Callable[..., typing.Any]:
+    """
+    Resolves the binding once and returns from_incoming_proto bound to it.
+    The decoder takes the remaining pb, trigger_metadata and shmem_mgr
+    arguments.
+    """
+    return functools.partial(
+        _decode_incoming_proto, get_binding(binding, is_deferred_binding),
+        pytype=pytype, is_deferred_binding=is_deferred_binding)
+
+
+def _decode_incoming_proto(
+        binding: typing.Any,
+        pb: protos.ParameterBinding, *,
+        pytype: typing.Optional[type],
+        trigger_metadata: typing.Optional[
+            typing.Mapping[str, protos.TypedData]],
+        shmem_mgr: SharedMemoryManager,
+        is_deferred_binding: typing.Optional[bool] = False) -> typing.Any:
+    if isinstance(trigger_metadata, datumdef.TriggerMetadata):
+        metadata = trigger_metadata
+    elif trigger_metadata:
+        metadata = datumdef.TriggerMetadata(trigger_metadata)
     else:
         metadata = {}
 
@@ -200,7 +230,11 @@ def get_datum(binding: str, obj: typing.Any,
     """
     Convert an object to a datum with the specified type.
     """
-    binding = get_binding(binding)
+    return _encode_datum(get_binding(binding), obj, pytype)
+
+
+def _encode_datum(binding: typing.Any, obj: typing.Any,
+                  pytype: typing.Optional[type]) -> datumdef.Datum:
     try:
         datum = binding.encode(obj, expected_type=pytype)
     except NotImplementedError:
@@ -247,7 +281,23 @@ def _can_transfer_over_shmem(shmem_mgr: SharedMemoryManager,
 
 def to_outgoing_proto(binding: str, obj: typing.Any, *,
                       pytype: typing.Optional[type]) -> protos.TypedData:
-    datum = get_datum(binding, obj, pytype)
+    return _encode_outgoing_proto(get_binding(binding), obj, pytype=pytype)
+
+
+def get_outgoing_proto_encoder(binding: str, *,
+                               pytype: typing.Optional[type]) \
+        -> typing.Callable[[typing.Any], protos.TypedData]:
+    """
+    Resolves the binding once and returns to_outgoing_proto bound to it.
+    The encoder takes the object to encode.
+    """
+    return functools.partial(_encode_outgoing_proto, get_binding(binding),
+                             pytype=pytype)
+
+
+def _encode_outgoing_proto(binding: typing.Any, obj: typing.Any, *,
+                           pytype: typing.Optional[type]) -> protos.TypedData:
+    datum = _encode_datum(binding, obj, pytype)
     return datumdef.datum_as_proto(datum)
 
 
@@ -257,13 +307,74 @@ def to_outgoing_param_binding(binding: str, obj: typing.Any, *,
                               shmem_mgr: SharedMemoryManager,
                               is_function_data_cache_enabled: bool) \
         -> protos.ParameterBinding:
-    datum = get_datum(binding, obj, pytype)
+    return _encode_outgoing_param_binding(
+        get_binding(binding), obj, pytype=pytype, out_name=out_name,
+        shmem_mgr=shmem_mgr,
+        is_function_data_cache_enabled=is_function_data_cache_enabled)
+
+
+def get_outgoing_param_binding_encoder(binding: str, *,
+                                       pytype: typing.Optional[type],
+                                       out_name: str) \
+        -> typing.Callable[..., protos.ParameterBinding]:
+    """
+    Resolves the binding once and returns to_outgoing_param_binding bound to
+    it. The encoder takes the object to encode along with the shmem_mgr and
+    is_function_data_cache_enabled arguments.
+    """
+    return functools.partial(_encode_outgoing_param_binding,
+                             get_binding(binding), pytype=pytype,
+                             out_name=out_name)
+
+
+def _can_stream_over_shmem(shmem_mgr: SharedMemoryManager,
+                           binding: typing.Any, obj: typing.Any) -> bool:
+    """
+    Whether the given output can be written into shared memory as it is read
+    (see SharedMemoryManager.put_stream) instead of being encoded by the
+    binding, which copies it into bytes first. This is the case of seekable
+    binary file-like objects and buffer-protocol objects other than bytes,
+    given to the blob or the generic binding, whose outputs are their bytes.
+    Their content can be read again, to be encoded by the binding, if it
+    cannot be written into shared memory.
+    """
+    if not shmem_mgr.is_enabled():
+        return False
+    if binding is not generic.GenericBinding and (
+            BINDING_REGISTRY is None
+            or binding is not BINDING_REGISTRY.get('blob')):
+        return False
+    if isinstance(obj, (bytes, str, io.TextIOBase)):
+        return False
+    return shmem_mgr.is_supported(datumdef.Datum(obj, 'bytes'))
+
+
+def _encode_outgoing_param_binding(binding: typing.Any, obj: typing.Any, *,
+                                   pytype: typing.Optional[type],
+                                   out_name: str,
+                                   shmem_mgr: SharedMemoryManager,
+                                   is_function_data_cache_enabled: bool) \
+        -> protos.ParameterBinding:
+    if _can_stream_over_shmem(shmem_mgr, binding, obj):
+        # If this fails, the output was rewound and is encoded by the binding
+        datum = datumdef.Datum(obj, 'bytes')
+        shared_mem_value = datumdef.Datum.to_rpc_shared_memory(
+            datum, shmem_mgr)
+        if shared_mem_value is not None:
+            shmem_mgr.keep_packed_datum(out_name, shared_mem_value.name,
+                                        datum)
+            return protos.ParameterBinding(
+                name=out_name,
+                rpc_shared_memory=shared_mem_value)
+    datum = _encode_datum(binding, obj, pytype)
     shared_mem_value = None
     if _can_transfer_over_shmem(shmem_mgr, is_function_data_cache_enabled,
                                 datum):
         shared_mem_value = datumdef.Datum.to_rpc_shared_memory(datum, shmem_mgr)
     # Check if data was written into shared memory
     if shared_mem_value is not None:
+        # Sent over RPC instead if it is packed and the packing fails
+        shmem_mgr.keep_packed_datum(out_name, shared_mem_value.name, datum)
         # If it was, then use the rpc_shared_memory field in response message
         return protos.ParameterBinding(
             name=out_name,
@@ -333,3 +444,38 @@ def get_deferred_raw_bindings(indexed_function, input_types):
     raw_bindings, bindings_logs = DEFERRED_BINDING_REGISTRY.get_raw_bindings(
         indexed_function, input_types)
     return raw_bindings, bindings_logs
+
+
+def warmup_binding_registry(shmem_mgr: SharedMemoryManager) -> typing.List[str]:
+    """
+    Runs a synthetic decode and encode through every registered binding, so
+    that the converters and the modules they import lazily are loaded before
+    the first invocation. Most bindings reject the synthetic payload, which
+    is expected; only the code paths leading up to it are of interest.
+
+    Returns the names of the bindings that were exercised.
+    """
+    if BINDING_REGISTRY is None:
+        return []
+
+    pb = protos.ParameterBinding(name='warmup',
+                                 data=protos.TypedData(string=''))
+    # The registry of azure-functions has no public way to list its
+    # bindings. Its keys are the binding names, besides a True key that
+    # some of its converters register.
+    bind_names = [bind_name
+                  for bind_name in getattr(BINDING_REGISTRY, '_bindings', {})
+                  if isinstance(bind_name, str)]
+    for bind_name in bind_names:
+        try:
+            from_incoming_proto(bind_name, pb, pytype=None,
+                                trigger_metadata=None, shmem_mgr=shmem_mgr)
+        except Exception as ex:
+            logger.debug('Warmup decode of binding %s failed: %s',
+                         bind_name, ex)
+        try:
+            to_outgoing_proto(bind_name, '', pytype=str)
+        except Exception as ex:
+            logger.debug('Warmup encode of binding %s failed: %s',
+                         bind_name, ex)
+    return bind_names
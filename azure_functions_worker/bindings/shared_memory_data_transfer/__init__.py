@@ -14,12 +14,15 @@ https://github.com/Azure/azure-functions-host/issues/6791
 
 from .file_accessor_factory import FileAccessorFactory
 from .file_accessor import FileAccessor
+from .shared_memory_arena import SharedMemoryArena
 from .shared_memory_constants import SharedMemoryConstants
 from .shared_memory_exception import SharedMemoryException
+from .shared_memory_input_stream import SharedMemoryInputStream
 from .shared_memory_map import SharedMemoryMap
 from .shared_memory_manager import SharedMemoryManager
 
 __all__ = (
-    'FileAccessorFactory', 'FileAccessor', 'SharedMemoryConstants',
-    'SharedMemoryException', 'SharedMemoryMap', 'SharedMemoryManager'
+    'FileAccessorFactory', 'FileAccessor', 'SharedMemoryArena',
+    'SharedMemoryConstants', 'SharedMemoryException',
+    'SharedMemoryInputStream', 'SharedMemoryMap', 'SharedMemoryManager'
 )
@@ -23,9 +23,11 @@ class FileAccessor(metaclass=ABCMeta):
             self,
             mem_map_name: str,
             mem_map_size: int,
-            access: int = mmap.ACCESS_READ) -> Optional[mmap.mmap]:
+            access: int = mmap.ACCESS_READ,
+            offset: int = 0) -> Optional[mmap.mmap]:
         """
-        Opens an existing memory map.
+        Opens an existing memory map, from the given offset which must be a
+        multiple of mmap.ALLOCATIONGRANULARITY.
         Returns the opened mmap if successful, None otherwise.
         """
         raise NotImplementedError
@@ -50,6 +52,38 @@ class FileAccessor(metaclass=ABCMeta):
         """
         raise NotImplementedError
 
+    def is_rename_supported(self) -> bool:
+        """
+        Whether existing memory maps can be given a new name with
+        rename_mem_map.
+        """
+        return False
+
+    def rename_mem_map(self, mem_map_name: str, new_mem_map_name: str) \
+            -> bool:
+        """
+        Gives a new name to an existing memory map, which stays mapped.
+        Returns True if the memory map was renamed, False otherwise (e.g. if
+        is_rename_supported() is False).
+        """
+        return False
+
+    def is_resize_supported(self) -> bool:
+        """
+        Whether existing memory maps can be grown with resize_mem_map.
+        """
+        return False
+
+    def resize_mem_map(self, mem_map_name: str, mem_map: mmap.mmap,
+                       mem_map_size: int) -> bool:
+        """
+        Resizes the given memory map, along with its backing resources, to the
+        given size, keeping its content.
+        Returns True if the memory map was resized, False otherwise (e.g. if
+        is_resize_supported() is False).
+        """
+        return False
+
     def _is_mem_map_initialized(self, mem_map: mmap.mmap) -> bool:
         """
         Checks if the dirty bit of the memory map has been set or not.
@@ -86,7 +120,8 @@ class FileAccessor(metaclass=ABCMeta):
 
 class DummyFileAccessor(FileAccessor):
     def open_mem_map(self, mem_map_name: str, mem_map_size: int,
-                     access: int = mmap.ACCESS_READ) -> Optional[mmap.mmap]:
+                     access: int = mmap.ACCESS_READ,
+                     offset: int = 0) -> Optional[mmap.mmap]:
         pass
 
     def create_mem_map(self, mem_map_name: str,
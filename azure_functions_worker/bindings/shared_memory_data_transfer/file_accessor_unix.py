@@ -4,6 +4,7 @@
 from azure_functions_worker import constants
 import os
 import mmap
+import sys
 from typing import Optional, List
 from io import BufferedRandom
 from .shared_memory_constants import SharedMemoryConstants as consts
@@ -31,9 +32,10 @@ class FileAccessorUnix(FileAccessor):
             self,
             mem_map_name: str,
             mem_map_size: int,
-            access: int = mmap.ACCESS_READ) -> Optional[mmap.mmap]:
+            access: int = mmap.ACCESS_READ,
+            offset: int = 0) -> Optional[mmap.mmap]:
         """
-        Note: mem_map_size = 0 means open the entire mmap.
+        Note: mem_map_size = 0 means open the entire mmap (from the offset).
         """
         if mem_map_name is None or mem_map_name == '':
             raise SharedMemoryException(
@@ -45,7 +47,8 @@ class FileAccessorUnix(FileAccessor):
         if fd is None:
             logger.warning('Cannot open file: %s', mem_map_name)
             return None
-        mem_map = mmap.mmap(fd.fileno(), mem_map_size, access=access)
+        mem_map = mmap.mmap(fd.fileno(), mem_map_size, access=access,
+                            offset=offset)
         return mem_map
 
     def create_mem_map(self, mem_map_name: str, mem_map_size: int) \
@@ -86,6 +89,63 @@ class FileAccessorUnix(FileAccessor):
         mem_map.close()
         return True
 
+    def is_rename_supported(self) -> bool:
+        return True
+
+    def rename_mem_map(self, mem_map_name: str, new_mem_map_name: str) \
+            -> bool:
+        """
+        Note: The file is renamed in the directory it is in, so its pages and
+              the existing mappings of it are kept.
+        """
+        if new_mem_map_name is None or new_mem_map_name == '':
+            raise SharedMemoryException(
+                f'Cannot rename memory map. Invalid name {new_mem_map_name}')
+        for temp_dir in self.valid_dirs:
+            file_path = os.path.join(temp_dir, mem_map_name)
+            if not os.path.exists(file_path):
+                continue
+            new_file_path = os.path.join(temp_dir, new_mem_map_name)
+            if os.path.exists(new_file_path):
+                raise SharedMemoryException(
+                    f'File {new_file_path} for memory map {new_mem_map_name} '
+                    f'already exists')
+            try:
+                os.rename(file_path, new_file_path)
+            except Exception as e:
+                logger.error('Cannot rename memory map %s to %s - %s',
+                             mem_map_name, new_mem_map_name, e, exc_info=True)
+                return False
+            return True
+        logger.error(
+            'Cannot rename memory map %s, it is not in any of the following '
+            'directories: %s',
+            mem_map_name, self.valid_dirs)
+        return False
+
+    def is_resize_supported(self) -> bool:
+        # mmap.resize needs mremap, which only Linux has
+        return sys.platform.startswith('linux')
+
+    def resize_mem_map(self, mem_map_name: str, mem_map: mmap.mmap,
+                       mem_map_size: int) -> bool:
+        """
+        Note: mmap.resize also truncates the file of the memory map to the new
+              size, and fails while there are views of the memory map.
+        """
+        if mem_map_size <= 0:
+            raise SharedMemoryException(
+                f'Cannot resize memory map. Invalid size {mem_map_size}')
+        if not self.is_resize_supported():
+            return False
+        try:
+            mem_map.resize(mem_map_size)
+        except Exception as e:
+            logger.error('Cannot resize memory map %s to %s - %s',
+                         mem_map_name, mem_map_size, e, exc_info=True)
+            return False
+        return True
+
     def _get_allowed_mem_map_dirs(self) -> List[str]:
         """
         Get the list of directories where memory maps can be created.
@@ -17,9 +17,10 @@ class FileAccessorWindows(FileAccessor):
             self,
             mem_map_name: str,
             mem_map_size: int,
-            access: int = mmap.ACCESS_READ) -> Optional[mmap.mmap]:
+            access: int = mmap.ACCESS_READ,
+            offset: int = 0) -> Optional[mmap.mmap]:
         """
-        Note: mem_map_size = 0 means open the entire mmap.
+        Note: mem_map_size = 0 means open the entire mmap (from the offset).
         Note: On Windows, an mmap is created if one does not exist even when
               attempting to open it.
         """
@@ -30,7 +31,8 @@ class FileAccessorWindows(FileAccessor):
             raise SharedMemoryException(
                 f'Cannot open memory map. Invalid size {mem_map_size}')
         try:
-            mem_map = mmap.mmap(-1, mem_map_size, mem_map_name, access=access)
+            mem_map = mmap.mmap(-1, mem_map_size, mem_map_name, access=access,
+                                offset=offset)
             return mem_map
         except Exception as e:
             logger.warning(
@@ -0,0 +1,124 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import time
+from typing import Dict, List, Optional, Tuple
+from .shared_memory_constants import SharedMemoryConstants as consts
+from .file_accessor import FileAccessor
+from .shared_memory_map import SharedMemoryMap
+
+
+class SharedMemoryArena:
+    """
+    Pool of the memory maps of function outputs which the functions host has
+    read, to write later outputs into instead of creating (and later deleting)
+    a new memory map for every output.
+    Memory maps are created with a content capacity which is a power of two,
+    and are reused for outputs of the same size class. A reused memory map is
+    renamed to the new name given to the output, so the functions host never
+    sees the same name twice and cannot read an output it has closed.
+    The pool holds up to max_size bytes of memory maps; the ones that have not
+    been reused for idle_timeout seconds are deleted, so that the memory is
+    returned once the outputs get fewer or smaller.
+    """
+    def __init__(self, file_accessor: FileAccessor, max_size: int,
+                 idle_timeout: float):
+        self._file_accessor = file_accessor
+        self._max_size = max_size
+        self._idle_timeout = idle_timeout
+        # The most recently released memory maps, whose pages are most likely
+        # to be resident, are at the end of each list and reused first.
+        # key: content capacity, val: list of (release time, SharedMemoryMap)
+        self._idle_mem_maps: \
+            Dict[int, List[Tuple[float, SharedMemoryMap]]] = {}
+        # Total size in bytes of the idle memory maps
+        self._size = 0
+
+    @property
+    def size(self) -> int:
+        """
+        Total size in bytes of the memory maps in the pool.
+        """
+        return self._size
+
+    @staticmethod
+    def get_capacity(content_length: int) -> int:
+        """
+        Content capacity of the memory maps which content of the given length
+        is written into: the next power of two, of at least
+        MIN_BYTES_FOR_SHARED_MEM_TRANSFER bytes.
+        """
+        content_length = max(content_length,
+                             consts.MIN_BYTES_FOR_SHARED_MEM_TRANSFER)
+        return 1 << (content_length - 1).bit_length()
+
+    def acquire(self, mem_map_name: str, content_length: int) \
+            -> Optional[SharedMemoryMap]:
+        """
+        Takes a memory map which can hold content of the given length out of
+        the pool and renames it to the given name.
+        Returns the SharedMemoryMap if there was one, None otherwise.
+        """
+        self.trim()
+        idle_mem_maps = self._idle_mem_maps.get(
+            self.get_capacity(content_length))
+        if not idle_mem_maps:
+            return None
+        _, shared_mem_map = idle_mem_maps.pop()
+        self._size -= len(shared_mem_map.mem_map)
+        if not self._file_accessor.rename_mem_map(shared_mem_map.mem_map_name,
+                                                  mem_map_name):
+            shared_mem_map.dispose()
+            return None
+        shared_mem_map.mem_map_name = mem_map_name
+        return shared_mem_map
+
+    def release(self, shared_mem_map: SharedMemoryMap) -> bool:
+        """
+        Puts a memory map which the functions host has read into the pool.
+        Returns True if it was put into the pool, False otherwise (i.e. the
+        pool is full or the memory map was not created with a size class
+        capacity), in which case the caller still owns it.
+        """
+        mem_map_size = len(shared_mem_map.mem_map)
+        capacity = mem_map_size - consts.CONTENT_HEADER_TOTAL_BYTES
+        if capacity != self.get_capacity(capacity) or \
+                self._size + mem_map_size > self._max_size:
+            return False
+        self._idle_mem_maps.setdefault(capacity, []).append(
+            (time.monotonic(), shared_mem_map))
+        self._size += mem_map_size
+        self.trim()
+        return True
+
+    def trim(self) -> int:
+        """
+        Deletes the memory maps which have not been reused for idle_timeout
+        seconds.
+        Returns the number of memory maps that were deleted.
+        """
+        deadline = time.monotonic() - self._idle_timeout
+        num_deleted = 0
+        for capacity, idle_mem_maps in list(self._idle_mem_maps.items()):
+            while idle_mem_maps and idle_mem_maps[0][0] <= deadline:
+                _, shared_mem_map = idle_mem_maps.pop(0)
+                self._size -= len(shared_mem_map.mem_map)
+                shared_mem_map.dispose()
+                num_deleted += 1
+            if not idle_mem_maps:
+                del self._idle_mem_maps[capacity]
+        return num_deleted
+
+    def clear(self) -> int:
+        """
+        Deletes all the memory maps in the pool.
+        Returns the number of memory maps that were deleted.
+        """
+        num_deleted = 0
+        for idle_mem_maps in self._idle_mem_maps.values():
+            for _, shared_mem_map in idle_mem_maps:
+                shared_mem_map.dispose()
+                num_deleted += 1
+        self._idle_mem_maps.clear()
+        self._size = 0
+        return num_deleted
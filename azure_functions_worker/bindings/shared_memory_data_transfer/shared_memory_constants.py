@@ -65,6 +65,13 @@ class SharedMemoryConstants:
     Corresponding logic in the host can be found in SharedMemoryManager.cs
     """
 
+    STREAM_CHUNK_SIZE = 1024 * 1024  # 1 MB
+    """
+    Size of the chunks in which content streamed into shared memory is read
+    (or encoded, for strings) when it cannot be read into the memory map
+    directly.
+    """
+
     UNIX_TEMP_DIRS = ["/dev/shm"]
     """
     Default directories in Unix where the memory maps can be found.
@@ -0,0 +1,72 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import io
+import os
+
+
+class SharedMemoryInputStream(io.RawIOBase):
+    """
+    Read-only, seekable file-like object over the content of a shared memory
+    map, which is read in place instead of being copied out of the map first.
+    Like the view it reads from, it can only be read until the invocation it
+    is an input of completes.
+    """
+    def __init__(self, view: memoryview):
+        self._view = view
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        self._check_not_closed()
+        return self._position
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        self._check_not_closed()
+        if whence == os.SEEK_SET:
+            position = offset
+        elif whence == os.SEEK_CUR:
+            position = self._position + offset
+        elif whence == os.SEEK_END:
+            position = len(self._view) + offset
+        else:
+            raise ValueError(f'Invalid whence ({whence})')
+        if position < 0:
+            raise ValueError(f'Negative seek position {position}')
+        self._position = position
+        return position
+
+    def read(self, size: int = -1) -> bytes:
+        self._check_not_closed()
+        start = min(self._position, len(self._view))
+        end = len(self._view) if size is None or size < 0 \
+            else min(start + size, len(self._view))
+        self._position = end
+        return self._view[start:end].tobytes()
+
+    def readall(self) -> bytes:
+        return self.read()
+
+    def readinto(self, buffer) -> int:
+        self._check_not_closed()
+        with memoryview(buffer) as target:
+            content = self._view[self._position:self._position + len(target)]
+            target[:len(content)] = content
+        self._position += len(content)
+        return len(content)
+
+    def getbuffer(self) -> memoryview:
+        """
+        Read-only view of the whole content, as io.BytesIO.getbuffer().
+        """
+        self._check_not_closed()
+        return self._view
+
+    def _check_not_closed(self) -> None:
+        if self.closed:
+            raise ValueError('I/O operation on closed file.')
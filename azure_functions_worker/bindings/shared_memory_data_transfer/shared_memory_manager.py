@@ -1,16 +1,30 @@
 # Copyright (c) Microsoft Corporation. All rights reserved.
 # Licensed under the MIT License.
 
+import contextlib
+import io
+import mmap
 import uuid
-from typing import Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple, Union
 from .shared_memory_constants import SharedMemoryConstants as consts
+from .shared_memory_exception import SharedMemoryException
+from .shared_memory_arena import SharedMemoryArena
 from .file_accessor_factory import FileAccessorFactory
+from .shared_memory_input_stream import SharedMemoryInputStream
 from .shared_memory_metadata import SharedMemoryMetadata
 from .shared_memory_map import SharedMemoryMap
 from ..datumdef import Datum
 from ...logging import logger
-from ...utils.common import is_envvar_true
-from ...constants import FUNCTIONS_WORKER_SHARED_MEMORY_DATA_TRANSFER_ENABLED
+from ...utils.common import get_app_setting, is_envvar_true
+from ...constants import (FUNCTIONS_WORKER_SHARED_MEMORY_DATA_TRANSFER_ENABLED,
+                          PYTHON_SHARED_MEMORY_INPUT_TYPE,
+                          PYTHON_SHARED_MEMORY_INPUT_TYPES,
+                          PYTHON_SHARED_MEMORY_INPUT_TYPE_DEFAULT,
+                          PYTHON_SHARED_MEMORY_ARENA_SIZE,
+                          PYTHON_SHARED_MEMORY_ARENA_SIZE_DEFAULT,
+                          PYTHON_SHARED_MEMORY_ARENA_IDLE_TIMEOUT,
+                          PYTHON_SHARED_MEMORY_ARENA_IDLE_TIMEOUT_DEFAULT,
+                          PYTHON_SHARED_MEMORY_PACK_OUTPUTS)
 
 
 class SharedMemoryManager:
@@ -29,11 +43,33 @@ class SharedMemoryManager:
         # close a given memory map by its name, after it has been used.
         # key: mem_map_name, val: SharedMemoryMap
         self._allocated_mem_maps: Dict[str, SharedMemoryMap] = {}
+        # Total size in bytes of the allocated memory maps, kept up to date on
+        # allocation and free so that reading it does not walk the maps.
+        self._allocated_mem_maps_size = 0
+        # The memory maps of the inputs which are read in place stay open
+        # until the invocation they are inputs of completes. Concurrent
+        # invocations may be given inputs from the same memory map.
+        # key: mem_map_name, val: list of (SharedMemoryMap, view of the input)
+        self._input_mem_maps: \
+            Dict[str, List[Tuple[SharedMemoryMap, memoryview]]] = {}
         self._file_accessor = FileAccessorFactory.create_file_accessor()
+        # The memory maps of outputs that the functions host has read are
+        # reused for later outputs if PYTHON_SHARED_MEMORY_ARENA_SIZE is set.
+        self._arena = self._create_arena()
+        # Within pack_outputs, the contents put into shared memory, which are
+        # written into the memory map of the given name once all are known.
+        self._packed_contents: Optional[List[bytes]] = None
+        self._packed_mem_map_name: Optional[str] = None
+        self._packed_size = 0
+        # Within pack_outputs, the Datum of each packed output by its name,
+        # to send it over RPC instead if the memory map cannot be written.
+        self._packed_datums: Optional[Dict[str, Datum]] = None
 
     def __del__(self):
+        del self._arena
         del self._file_accessor
         del self._allocated_mem_maps
+        del self._input_mem_maps
 
     @property
     def allocated_mem_maps(self):
@@ -42,6 +78,27 @@ class SharedMemoryManager:
         """
         return self._allocated_mem_maps
 
+    @property
+    def allocated_mem_maps_size(self) -> int:
+        """
+        Total size in bytes of the allocated shared memory maps.
+        """
+        return self._allocated_mem_maps_size
+
+    @property
+    def arena(self) -> Optional[SharedMemoryArena]:
+        """
+        Pool of the memory maps to write outputs into, None if disabled.
+        """
+        return self._arena
+
+    @property
+    def input_mem_maps(self):
+        """
+        Memory maps of the inputs which are read in place.
+        """
+        return self._input_mem_maps
+
     @property
     def file_accessor(self):
         """
@@ -57,6 +114,23 @@ class SharedMemoryManager:
         return is_envvar_true(
             FUNCTIONS_WORKER_SHARED_MEMORY_DATA_TRANSFER_ENABLED)
 
+    def get_input_type(self) -> str:
+        """
+        How bytes inputs are read from shared memory, one of
+        PYTHON_SHARED_MEMORY_INPUT_TYPES.
+        """
+        return get_app_setting(
+            PYTHON_SHARED_MEMORY_INPUT_TYPE,
+            PYTHON_SHARED_MEMORY_INPUT_TYPE_DEFAULT,
+            lambda value: value in PYTHON_SHARED_MEMORY_INPUT_TYPES)
+
+    def is_packing_enabled(self) -> bool:
+        """
+        Whether the outputs of an invocation should be packed into a single
+        memory map with pack_outputs.
+        """
+        return is_envvar_true(PYTHON_SHARED_MEMORY_PACK_OUTPUTS)
+
     def is_supported(self, datum: Datum) -> bool:
         """
         Whether the given Datum object can be transferred to the functions host
@@ -65,7 +139,14 @@ class SharedMemoryManager:
         SharedMemoryManager.cs
         """
         if datum.type == 'bytes':
-            num_bytes = len(datum.value)
+            if isinstance(datum.value, bytes):
+                num_bytes = len(datum.value)
+            else:
+                # Streamed with put_stream, which can only fall back to
+                # another transfer if the content can be read again
+                num_bytes = self.get_stream_length(datum.value)
+                if num_bytes is None:
+                    return False
             if num_bytes >= consts.MIN_BYTES_FOR_SHARED_MEM_TRANSFER and \
                     num_bytes <= consts.MAX_BYTES_FOR_SHARED_MEM_TRANSFER:
                 return True
@@ -84,26 +165,15 @@ class SharedMemoryManager:
         """
         if content is None:
             return None
-        mem_map_name = str(uuid.uuid4())
         content_length = len(content)
-        shared_mem_map = self._create(mem_map_name, content_length)
-        if shared_mem_map is None:
-            return None
-        try:
-            num_bytes_written = shared_mem_map.put_bytes(content)
-        except Exception as e:
-            logger.warning('Cannot write %s bytes into shared memory %s - %s',
-                           content_length, mem_map_name, e)
-            shared_mem_map.dispose()
-            return None
-        if num_bytes_written != content_length:
-            logger.error(
-                'Cannot write data into shared memory %s (%s != %s)',
-                mem_map_name, num_bytes_written, content_length)
-            shared_mem_map.dispose()
-            return None
-        self.allocated_mem_maps[mem_map_name] = shared_mem_map
-        return SharedMemoryMetadata(mem_map_name, content_length)
+        if self._packed_contents is not None:
+            # Written when pack_outputs exits
+            offset = self._packed_size
+            self._packed_contents.append(content)
+            self._packed_size += content_length
+            return SharedMemoryMetadata(self._packed_mem_map_name,
+                                        content_length, offset)
+        return self._put_unpacked_bytes(content)
 
     def put_string(self, content: str) -> Optional[SharedMemoryMetadata]:
         """
@@ -115,8 +185,162 @@ class SharedMemoryManager:
         """
         if content is None:
             return None
-        content_bytes = content.encode('utf-8')
-        return self.put_bytes(content_bytes)
+        if self._packed_contents is not None or not (
+                content.isascii() or self.file_accessor.is_resize_supported()):
+            # Packed contents are staged until pack_outputs exits, and the
+            # UTF-8 length of non-ASCII strings is only known once encoded
+            return self.put_bytes(content.encode('utf-8'))
+        # Encoded chunk by chunk into the memory map instead of as a whole
+        # first. It is at least as long as the string, and the memory map is
+        # grown if it is longer.
+        chunk_size = consts.STREAM_CHUNK_SIZE
+        chunks = (content[i:i + chunk_size].encode('utf-8')
+                  for i in range(0, len(content), chunk_size))
+        return self.put_stream(chunks, len(content))
+
+    @staticmethod
+    def get_stream_length(source: Any) -> Optional[int]:
+        """
+        Length of the content put_stream would write from the given source, if
+        it is known before reading it: the size of a buffer-protocol object or
+        what is left to read of a seekable file-like object.
+        Returns None otherwise.
+        """
+        try:
+            with memoryview(source) as content_view:
+                return content_view.nbytes
+        except TypeError:
+            pass
+        seekable = getattr(source, 'seekable', None)
+        try:
+            if not callable(seekable) or not seekable():
+                return None
+            position = source.tell()
+            end = source.seek(0, io.SEEK_END)
+            source.seek(position)
+        except (OSError, ValueError):
+            # e.g. closed files
+            return None
+        return max(end - position, 0)
+
+    def put_stream(self, source: Any, content_length: Optional[int] = None) \
+            -> Optional[SharedMemoryMetadata]:
+        """
+        Writes the content of the given source into shared memory as it is
+        read, without building it as bytes first (e.g. for large outputs which
+        would otherwise be copied into bytes before being written):
+        - a buffer-protocol object (e.g. bytearray, memoryview, mmap) is
+          written from its buffer with put_bytes, also packed within
+          pack_outputs.
+        - a binary file-like object is read up to its end, straight into the
+          memory map if it has readinto.
+        - any other iterable gives the content in bytes-like chunks.
+        content_length is the expected length of the content, by default
+        get_stream_length(source). The memory map is created to hold it, and
+        grown as more content is read where memory maps can be resized.
+        Elsewhere, content of unknown length is read whole first.
+        Other content is written into a memory map of its own, also within
+        pack_outputs.
+        Returns metadata about the shared memory region to which the content
+        was written if successful, None otherwise. A seekable source is then
+        rewound to where it was, so that its content can still be read
+        otherwise (e.g. sent over RPC), which other iterables cannot be.
+        """
+        if source is None:
+            return None
+        try:
+            content = memoryview(source).cast('B')
+        except TypeError:
+            content = None
+        if content is not None:
+            return self.put_bytes(content)
+        if content_length is None:
+            content_length = self.get_stream_length(source)
+        if content_length is None and \
+                not self.file_accessor.is_resize_supported():
+            if callable(getattr(source, 'read', None)):
+                return self._put_unpacked_bytes(source.read())
+            return self._put_unpacked_bytes(b''.join(source))
+        mem_map_name = str(uuid.uuid4())
+        shared_mem_map = self._allocate(
+            mem_map_name,
+            consts.MIN_BYTES_FOR_SHARED_MEM_TRANSFER if content_length is None
+            else content_length)
+        if shared_mem_map is None:
+            return None
+        # Where a seekable source is rewound to if it cannot be written
+        position = source.tell() \
+            if self.get_stream_length(source) is not None else None
+        try:
+            num_bytes_written = shared_mem_map.put_stream(source)
+            if num_bytes_written is None:
+                raise SharedMemoryException('Memory map cannot be grown')
+            if num_bytes_written > consts.MAX_BYTES_FOR_SHARED_MEM_TRANSFER:
+                raise SharedMemoryException(
+                    f'Content of {num_bytes_written} bytes is larger than '
+                    f'{consts.MAX_BYTES_FOR_SHARED_MEM_TRANSFER} bytes')
+        except Exception as e:
+            logger.warning('Cannot write stream into shared memory %s - %s',
+                           mem_map_name, e)
+            shared_mem_map.dispose()
+            if position is not None:
+                source.seek(position)
+            return None
+        self.allocated_mem_maps[mem_map_name] = shared_mem_map
+        self._allocated_mem_maps_size += len(shared_mem_map.mem_map)
+        return SharedMemoryMetadata(mem_map_name, num_bytes_written)
+
+    @contextlib.contextmanager
+    def pack_outputs(self):
+        """
+        Packs the contents put into shared memory within this context into a
+        single memory map, one after the other, instead of one memory map
+        each. The metadata returned by put_bytes and put_string give the
+        offset of each content, and the memory map is written once the
+        context exits without an exception.
+        Nothing else may be put into shared memory within the context, which
+        holds for the outputs of an invocation as they are encoded on the
+        event loop without awaiting.
+        Yields a dict of the Datum of each output packed within the context
+        by its name (see keep_packed_datum). It is emptied once the memory
+        map is written. If the memory map cannot be written, the Datum
+        objects are left in it so that these outputs, whose metadata refer
+        to the memory map, are sent over RPC instead.
+        """
+        packed_contents: List[bytes] = []
+        packed_datums: Dict[str, Datum] = {}
+        mem_map_name = str(uuid.uuid4())
+        self._packed_contents = packed_contents
+        self._packed_mem_map_name = mem_map_name
+        self._packed_size = 0
+        self._packed_datums = packed_datums
+        try:
+            yield packed_datums
+        finally:
+            content_length = self._packed_size
+            self._packed_contents = None
+            self._packed_mem_map_name = None
+            self._packed_size = 0
+            self._packed_datums = None
+        if not packed_contents or self._put_packed_bytes(
+                mem_map_name, packed_contents, content_length):
+            packed_datums.clear()
+        else:
+            logger.warning('Cannot write %s packed outputs into shared memory '
+                           '%s, sending them over RPC instead',
+                           len(packed_contents), mem_map_name)
+
+    def keep_packed_datum(self, name: str, mem_map_name: str,
+                          datum: Datum):
+        """
+        Keeps the Datum of the output of the given name, which was written
+        into the memory map of the given name, until pack_outputs exits.
+        If it was not packed (e.g. outside of pack_outputs, or streamed into
+        a memory map of its own), then no action is performed.
+        """
+        if self._packed_datums is not None and \
+                mem_map_name == self._packed_mem_map_name:
+            self._packed_datums[name] = datum
 
     def get_bytes(self, mem_map_name: str, offset: int, count: int) \
             -> Optional[bytes]:
@@ -126,16 +350,11 @@ class SharedMemoryManager:
         Returns the data read from shared memory as bytes if successful, None
         otherwise.
         """
-        if offset != 0:
-            logger.error(
-                'Cannot read bytes. Non-zero offset (%s) not supported.',
-                offset)
-            return None
-        shared_mem_map = self._open(mem_map_name, count)
+        shared_mem_map = self._open(mem_map_name, count, offset)
         if shared_mem_map is None:
             return None
         try:
-            content = shared_mem_map.get_bytes(content_offset=0,
+            content = shared_mem_map.get_bytes(content_offset=offset,
                                                bytes_to_read=count)
         finally:
             shared_mem_map.dispose(is_delete_file=False)
@@ -151,17 +370,84 @@ class SharedMemoryManager:
         Note: The encoding used here must be consistent with what is used by the
               host in SharedMemoryManager.cs (GetStringAsync/PutStringAsync).
         """
-        content_bytes = self.get_bytes(mem_map_name, offset, count)
-        if content_bytes is None:
+        shared_mem_map = self._open(mem_map_name, count, offset)
+        if shared_mem_map is None:
             return None
-        content_str = content_bytes.decode('utf-8')
+        try:
+            # Decoded in place, without copying the bytes out first
+            content_view = shared_mem_map.get_view(content_offset=offset,
+                                                   bytes_to_read=count)
+            if content_view is None:
+                return None
+            with content_view:
+                content_str = str(content_view, 'utf-8')
+        finally:
+            shared_mem_map.dispose(is_delete_file=False)
         return content_str
 
+    def get_input_bytes(self, mem_map_name: str, offset: int, count: int) \
+            -> Optional[Union[bytes, memoryview, SharedMemoryInputStream]]:
+        """
+        Reads a bytes input of a function from the given memory map with the
+        provided name, starting at the provided offset and reading a total of
+        count bytes, as the input type of get_input_type() asks:
+        - bytes: the data is copied out of shared memory, as get_bytes does.
+        - memoryview: a read-only view of the data in shared memory.
+        - stream: a SharedMemoryInputStream reading the data in shared memory.
+        The memory map of a view or stream stays open until
+        close_input_mem_map is called with its name, once the invocation
+        completes.
+        Returns the input if successful, None otherwise.
+        """
+        input_type = self.get_input_type()
+        if input_type == 'bytes':
+            return self.get_bytes(mem_map_name, offset, count)
+        shared_mem_map = self._open(mem_map_name, count, offset)
+        if shared_mem_map is None:
+            return None
+        content_view = shared_mem_map.get_view(content_offset=offset,
+                                               bytes_to_read=count)
+        if content_view is None:
+            shared_mem_map.dispose(is_delete_file=False)
+            return None
+        self._input_mem_maps.setdefault(mem_map_name, []).append(
+            (shared_mem_map, content_view))
+        if input_type == 'stream':
+            return SharedMemoryInputStream(content_view)
+        return content_view
+
+    def close_input_mem_map(self, mem_map_name: str) -> bool:
+        """
+        Releases the view of an input which was read in place from the memory
+        map with the given name and closes the memory map. The backing
+        resources are left to the functions host, which owns them.
+        If no input is read in place from it, then no action is performed.
+        Returns True if the memory map was closed, False otherwise (e.g. when
+        the function kept views of its own of the input, in which case the
+        memory map is closed once these are garbage collected).
+        """
+        inputs = self._input_mem_maps.get(mem_map_name)
+        if not inputs:
+            return False
+        shared_mem_map, content_view = inputs.pop()
+        if not inputs:
+            del self._input_mem_maps[mem_map_name]
+        try:
+            content_view.release()
+            shared_mem_map.dispose(is_delete_file=False)
+        except BufferError:
+            logger.warning('Cannot close memory map %s, the function still '
+                           'holds views of its input', mem_map_name)
+            return False
+        return True
+
     def free_mem_map(self, mem_map_name: str,
                      to_delete_backing_resources: bool = True) -> bool:
         """
         Frees the memory map and, if specified, any backing resources (e.g.
         file in the case of Unix) associated with it.
+        If the arena is enabled, the memory map is put into it instead of
+        deleting its backing resources, if there is room for it.
         If there is no memory map with the given name being tracked, then no
         action is performed.
         Returns True if the memory map was freed successfully, False otherwise.
@@ -172,9 +458,122 @@ class SharedMemoryManager:
                 mem_map_name)
             return False
         shared_mem_map = self.allocated_mem_maps[mem_map_name]
-        success = shared_mem_map.dispose(to_delete_backing_resources)
+        self._allocated_mem_maps_size -= len(shared_mem_map.mem_map)
         del self.allocated_mem_maps[mem_map_name]
-        return success
+        if to_delete_backing_resources and self._arena is not None and \
+                self._arena.release(shared_mem_map):
+            return True
+        return shared_mem_map.dispose(to_delete_backing_resources)
+
+    def free_all_mem_maps(self) -> int:
+        """
+        Frees all the tracked memory maps along with their backing resources,
+        e.g. when the worker is shutting down and the functions host will not
+        read them anymore.
+        Returns the number of memory maps that were freed successfully.
+        """
+        num_freed = 0
+        for mem_map_name in list(self.allocated_mem_maps):
+            if self.free_mem_map(mem_map_name):
+                num_freed += 1
+        if self._arena is not None:
+            self._arena.clear()
+        return num_freed
+
+    def _create_arena(self) -> Optional[SharedMemoryArena]:
+        """
+        Creates the SharedMemoryArena with the size and idle timeout of the
+        App Settings.
+        Returns None if it is disabled or memory maps cannot be renamed on
+        this platform.
+        """
+        max_size = int(get_app_setting(
+            setting=PYTHON_SHARED_MEMORY_ARENA_SIZE,
+            default_value=f'{PYTHON_SHARED_MEMORY_ARENA_SIZE_DEFAULT}',
+            validator=lambda value: value.isdigit()))
+        if max_size == 0:
+            return None
+        if not self._file_accessor.is_rename_supported():
+            logger.warning('%s is not supported on this platform',
+                           PYTHON_SHARED_MEMORY_ARENA_SIZE)
+            return None
+        idle_timeout = int(get_app_setting(
+            setting=PYTHON_SHARED_MEMORY_ARENA_IDLE_TIMEOUT,
+            default_value=f'{PYTHON_SHARED_MEMORY_ARENA_IDLE_TIMEOUT_DEFAULT}',
+            validator=lambda value: value.isdigit() and int(value) > 0))
+        return SharedMemoryArena(self._file_accessor, max_size, idle_timeout)
+
+    def _allocate(self, mem_map_name: str, content_length: int) \
+            -> Optional[SharedMemoryMap]:
+        """
+        Takes a SharedMemoryMap which can hold content of the given length out
+        of the arena, if enabled, or creates a new one.
+        Returns the SharedMemoryMap object if successful, None otherwise.
+        """
+        if self._arena is None:
+            return self._create(mem_map_name, content_length)
+        shared_mem_map = self._arena.acquire(mem_map_name, content_length)
+        if shared_mem_map is None:
+            shared_mem_map = self._create(
+                mem_map_name, self._arena.get_capacity(content_length))
+        return shared_mem_map
+
+    def _put_unpacked_bytes(self, content: bytes) \
+            -> Optional[SharedMemoryMetadata]:
+        """
+        Writes the given bytes into a new memory map of their own, also within
+        pack_outputs.
+        Returns metadata about the shared memory region to which the content
+        was written if successful, None otherwise.
+        """
+        content_length = len(content)
+        mem_map_name = str(uuid.uuid4())
+        shared_mem_map = self._allocate(mem_map_name, content_length)
+        if shared_mem_map is None:
+            return None
+        try:
+            num_bytes_written = shared_mem_map.put_bytes(content)
+        except Exception as e:
+            logger.warning('Cannot write %s bytes into shared memory %s - %s',
+                           content_length, mem_map_name, e)
+            shared_mem_map.dispose()
+            return None
+        if num_bytes_written != content_length:
+            logger.error(
+                'Cannot write data into shared memory %s (%s != %s)',
+                mem_map_name, num_bytes_written, content_length)
+            shared_mem_map.dispose()
+            return None
+        self.allocated_mem_maps[mem_map_name] = shared_mem_map
+        self._allocated_mem_maps_size += len(shared_mem_map.mem_map)
+        return SharedMemoryMetadata(mem_map_name, content_length)
+
+    def _put_packed_bytes(self, mem_map_name: str, contents: List[bytes],
+                          content_length: int) -> bool:
+        """
+        Writes the given contents, packed, into a new memory map with the
+        given name.
+        Returns True if successful, False otherwise.
+        """
+        shared_mem_map = self._allocate(mem_map_name, content_length)
+        if shared_mem_map is None:
+            return False
+        try:
+            num_bytes_written = shared_mem_map.put_packed_bytes(contents)
+        except Exception as e:
+            logger.warning('Cannot write %s bytes into shared memory %s - %s',
+                           content_length, mem_map_name, e)
+            shared_mem_map.dispose()
+            return False
+        if num_bytes_written != content_length:
+            logger.error(
+                'Cannot write data into shared memory %s (%s != %s)',
+                mem_map_name, num_bytes_written, content_length)
+            shared_mem_map.dispose()
+            return False
+        self.allocated_mem_maps[mem_map_name] = shared_mem_map
+        self._allocated_mem_maps_size += len(shared_mem_map.mem_map)
+        return True
 
     def _create(self, mem_map_name: str, content_length: int) \
             -> Optional[SharedMemoryMap]:
@@ -188,15 +587,26 @@ class SharedMemoryManager:
             return None
         return SharedMemoryMap(self.file_accessor, mem_map_name, mem_map)
 
-    def _open(self, mem_map_name: str, content_length: int) \
-            -> Optional[SharedMemoryMap]:
+    def _open(self, mem_map_name: str, content_length: int,
+              content_offset: int = 0) -> Optional[SharedMemoryMap]:
         """
-        Opens an existing SharedMemoryMap with the given name and content
-        length.
+        Opens an existing SharedMemoryMap with the given name, to read content
+        of the given length at the given offset.
+        Only the window of the memory map from the page the content starts in
+        to its end is mapped.
         Returns the SharedMemoryMap object if successful, None otherwise.
         """
-        mem_map_size = consts.CONTENT_HEADER_TOTAL_BYTES + content_length
-        mem_map = self.file_accessor.open_mem_map(mem_map_name, mem_map_size)
+        if content_offset < 0:
+            logger.error('Cannot read memory map %s. Negative offset (%s).',
+                         mem_map_name, content_offset)
+            return None
+        content_start = consts.CONTENT_HEADER_TOTAL_BYTES + content_offset
+        mem_map_offset = \
+            content_start - content_start % mmap.ALLOCATIONGRANULARITY
+        mem_map_size = content_start + content_length - mem_map_offset
+        mem_map = self.file_accessor.open_mem_map(
+            mem_map_name, mem_map_size, offset=mem_map_offset)
         if mem_map is None:
             return None
-        return SharedMemoryMap(self.file_accessor, mem_map_name, mem_map)
+        return SharedMemoryMap(self.file_accessor, mem_map_name, mem_map,
+                               mem_map_offset)
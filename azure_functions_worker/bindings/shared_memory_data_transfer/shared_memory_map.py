@@ -2,10 +2,9 @@
 # Licensed under the MIT License.
 
 import mmap
-import os
 import struct
 import sys
-from typing import Optional
+from typing import Any, List, Optional
 from .shared_memory_constants import SharedMemoryConstants as consts
 from .shared_memory_exception import SharedMemoryException
 from .file_accessor import FileAccessor
@@ -20,7 +19,13 @@ class SharedMemoryMap:
             self,
             file_accessor: FileAccessor,
             mem_map_name: str,
-            mem_map: mmap.mmap):
+            mem_map: mmap.mmap,
+            mem_map_offset: int = 0):
+        """
+        mem_map_offset is the offset in the memory map at which mem_map starts,
+        when only a window of the memory map is mapped (e.g. to read a value
+        at a large content offset). Such a window cannot be written into.
+        """
         if mem_map is None:
             raise SharedMemoryException(
                 'Cannot initialize SharedMemoryMap. Invalid memory map '
@@ -32,6 +37,7 @@ class SharedMemoryMap:
         self.file_accessor = file_accessor
         self.mem_map_name = mem_map_name
         self.mem_map = mem_map
+        self.mem_map_offset = mem_map_offset
 
     def put_bytes(self, content: bytes) -> Optional[int]:
         """
@@ -62,6 +68,78 @@ class SharedMemoryMap:
         self.mem_map.flush()
         return num_content_bytes_written
 
+    def put_packed_bytes(self, contents: List[bytes]) -> Optional[int]:
+        """
+        Writes the given contents one after the other into this
+        SharedMemoryMap, as a single content whose length is the sum of
+        theirs. Each can be read back from the offset at which it starts,
+        which is the sum of the lengths of the ones before it.
+        The total number of bytes written must be less than or equal to the
+        size of the SharedMemoryMap.
+        Returns the number of bytes of content written.
+        """
+        if contents is None:
+            return None
+        content_length = sum(len(content) for content in contents)
+        self.mem_map.seek(consts.MEM_MAP_INITIALIZED_FLAG_NUM_BYTES)
+        self.mem_map.write(content_length.to_bytes(
+            consts.CONTENT_LENGTH_NUM_BYTES, byteorder=sys.byteorder))
+        num_content_bytes_written = 0
+        for content in contents:
+            num_content_bytes_written += self.mem_map.write(content)
+        self.mem_map.flush()
+        return num_content_bytes_written
+
+    def put_stream(self, source: Any) -> Optional[int]:
+        """
+        Writes the content of the given source into this SharedMemoryMap as
+        it is read, without building it as bytes first:
+        - a binary file-like object is read up to its end, straight into the
+          memory map if it has readinto.
+        - any other iterable gives the content in bytes-like chunks.
+        The memory map is grown (see FileAccessor.resize_mem_map) when the
+        content does not fit in it.
+        Returns the number of bytes of content written, None if the content
+        does not fit and the memory map cannot be grown.
+        """
+        if source is None:
+            return None
+        readinto = getattr(source, 'readinto', None)
+        if callable(getattr(source, 'read', None)):
+            chunks = iter(lambda: source.read(consts.STREAM_CHUNK_SIZE), b'')
+        else:
+            chunks = iter(source)
+        position = consts.CONTENT_HEADER_TOTAL_BYTES
+        while True:
+            if readinto is not None and position < len(self.mem_map):
+                with memoryview(self.mem_map) as mem_map_view, \
+                        mem_map_view[position:] as free_view:
+                    num_bytes_read = readinto(free_view)
+                if not num_bytes_read:
+                    break
+                position += num_bytes_read
+                continue
+            # Once the memory map is full, it is only grown if there is more
+            # content to read
+            chunk = next(chunks, None)
+            if chunk is None:
+                break
+            with memoryview(chunk) as chunk_view, \
+                    chunk_view.cast('B') as chunk_bytes:
+                end = position + chunk_bytes.nbytes
+                if end > len(self.mem_map) and not self._grow(end):
+                    logger.error('Cannot grow memory map %s to %s bytes',
+                                 self.mem_map_name, end)
+                    return None
+                self.mem_map[position:end] = chunk_bytes
+            position = end
+        content_length = position - consts.CONTENT_HEADER_TOTAL_BYTES
+        self.mem_map.seek(consts.MEM_MAP_INITIALIZED_FLAG_NUM_BYTES)
+        self.mem_map.write(content_length.to_bytes(
+            consts.CONTENT_LENGTH_NUM_BYTES, byteorder=sys.byteorder))
+        self.mem_map.flush()
+        return content_length
+
     def get_bytes(self, content_offset: int = 0, bytes_to_read: int = 0) \
             -> Optional[bytes]:
         """
@@ -71,13 +149,12 @@ class SharedMemoryMap:
         bytes_to_read = 0 means read the entire content.
         Returns the content as bytes if successful, None otherwise.
         """
-        content_length = self._get_content_length()
-        if content_length is None:
-            return None
+        if self.mem_map_offset == 0:
+            content_length = self._get_content_length()
+            if content_length is None:
+                return None
         # Seek past the header and get to the content
-        self.mem_map.seek(consts.CONTENT_HEADER_TOTAL_BYTES)
-        if content_offset > 0:
-            self.mem_map.seek(content_offset, os.SEEK_CUR)
+        self.mem_map.seek(self._get_content_position(content_offset))
         if bytes_to_read > 0:
             # Read up to the specified number of bytes to read
             content = self.mem_map.read(bytes_to_read)
@@ -86,6 +163,27 @@ class SharedMemoryMap:
             content = self.mem_map.read()
         return content
 
+    def get_view(self, content_offset: int = 0, bytes_to_read: int = 0) \
+            -> Optional[memoryview]:
+        """
+        View of the content of this SharedMemoryMap starting at the given
+        offset, which reads the memory map in place instead of copying it.
+        content_offset = 0 means the view starts at the beginning of the
+        content.
+        bytes_to_read = 0 means the view spans the entire content.
+        The memory map cannot be closed until the view is released.
+        Returns the view if successful, None otherwise.
+        """
+        if self.mem_map_offset == 0:
+            content_length = self._get_content_length()
+            if content_length is None:
+                return None
+        start = self._get_content_position(content_offset)
+        end = start + bytes_to_read if bytes_to_read > 0 else None
+        with memoryview(self.mem_map) as mem_map_view:
+            # The slice keeps the memory map exported on its own
+            return mem_map_view[start:end]
+
     def dispose(self, is_delete_file: bool = True) -> bool:
         """
         Close the underlying memory map.
@@ -98,6 +196,19 @@ class SharedMemoryMap:
         self.mem_map.close()
         return success
 
+    def _grow(self, min_mem_map_size: int) -> bool:
+        """
+        Grows the memory map to at least the given size, doubling the
+        capacity for content so that content read in chunks only grows it a
+        few times.
+        Returns True if the memory map was grown, False otherwise.
+        """
+        capacity = len(self.mem_map) - consts.CONTENT_HEADER_TOTAL_BYTES
+        mem_map_size = max(consts.CONTENT_HEADER_TOTAL_BYTES + 2 * capacity,
+                           min_mem_map_size)
+        return self.file_accessor.resize_mem_map(self.mem_map_name,
+                                                 self.mem_map, mem_map_size)
+
     def _bytes_to_long(self, input_bytes) -> int:
         """
         Decode a set of bytes representing a long.
@@ -105,10 +216,24 @@ class SharedMemoryMap:
         """
         return struct.unpack("<q", input_bytes)[0]
 
+    def _get_content_position(self, content_offset: int) -> int:
+        """
+        Position in mem_map of the content at the given offset.
+        """
+        position = consts.CONTENT_HEADER_TOTAL_BYTES + content_offset - \
+            self.mem_map_offset
+        if position < 0:
+            raise SharedMemoryException(
+                f'Content offset {content_offset} is before the mapped window '
+                f'of memory map {self.mem_map_name}')
+        return position
+
     def _get_content_length(self) -> Optional[int]:
         """
         Read the header of the memory map to determine the length of content
         contained in that memory map.
+        This can only be read when mem_map starts at the beginning of the
+        memory map, where the header is.
         Returns the content length as a non-negative integer if successful,
         None otherwise.
         """
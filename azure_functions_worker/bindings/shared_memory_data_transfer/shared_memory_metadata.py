@@ -6,8 +6,11 @@ class SharedMemoryMetadata:
     """
     Information about a shared memory region.
     """
-    def __init__(self, mem_map_name, count_bytes):
+    def __init__(self, mem_map_name, count_bytes, offset=0):
         # Name of the memory map
         self.mem_map_name = mem_map_name
         # Number of bytes of content in the memory map
         self.count_bytes = count_bytes
+        # Offset of the content in the content of the memory map, which is
+        # non-zero when several contents are packed into it
+        self.offset = offset
@@ -0,0 +1,133 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+"""Admission control for invocations.
+
+Invocations are admitted when both the worker wide limit and the limit of
+their function allow it. Other invocations wait, in arrival order, in a
+bounded queue. Everything runs on the dispatcher's event loop, so no locking
+is needed.
+"""
+
+import asyncio
+import collections
+from typing import Deque, Dict, Optional, Tuple
+
+
+class InvocationQueueFullError(RuntimeError):
+
+    def __init__(self, queue_size: int) -> None:
+        super().__init__(
+            f'the invocation queue is full ({queue_size} invocations are '
+            f'waiting for a concurrency slot)')
+
+
+class ConcurrencyLimiter:
+
+    def __init__(self, max_concurrency: Optional[int],
+                 max_function_concurrency: Optional[int],
+                 queue_size: int,
+                 function_limits: Optional[Dict[str, int]] = None) -> None:
+        # Worker wide limit, None means unlimited
+        self._max_concurrency = max_concurrency
+        # Default limit of a function without its own limit
+        self._max_function_concurrency = max_function_concurrency
+        # key: function name, val: its own limit
+        self._function_limits = function_limits or {}
+        self._queue_size = queue_size
+
+        self._running = 0
+        # key: function_id, val: number of running invocations
+        self._running_by_function: Dict[str, int] = collections.Counter()
+        self._waiters: Deque[Tuple[str, Optional[int], asyncio.Future]] = \
+            collections.deque()
+        # Totals reported with the worker load
+        self.overflows = 0
+        self.waits = 0
+        self.wait_time = 0.0
+
+    @property
+    def running(self) -> int:
+        return self._running
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def get_function_limit(self, function_name: str) -> Optional[int]:
+        """The own limit of a function, to pass to is_limited() and
+        acquire(), None to use the default one.
+        """
+        return self._function_limits.get(function_name)
+
+    def is_limited(self, max_function_concurrency: Optional[int]) -> bool:
+        return bool(self._max_concurrency or max_function_concurrency
+                    or self._max_function_concurrency)
+
+    async def acquire(self, function_id: str,
+                      max_function_concurrency: Optional[int]) -> float:
+        """Waits for a concurrency slot for an invocation of the function and
+        returns how many seconds it waited. Raises InvocationQueueFullError
+        when the wait queue is full.
+        """
+        limit = max_function_concurrency or self._max_function_concurrency
+        # Waiters are admitted as soon as a slot frees up, so the ones left
+        # are blocked by a limit this invocation would hit as well, unless it
+        # has a slot.
+        if self._has_slot(function_id, limit):
+            self._take_slot(function_id)
+            return 0.0
+
+        if len(self._waiters) >= self._queue_size:
+            self.overflows += 1
+            raise InvocationQueueFullError(self._queue_size)
+
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        waiter = (function_id, limit, fut)
+        self._waiters.append(waiter)
+        start = loop.time()
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                # The slot was granted right before the cancellation
+                self.release(function_id)
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            raise
+        waited = loop.time() - start
+        self.waits += 1
+        self.wait_time += waited
+        return waited
+
+    def release(self, function_id: str) -> None:
+        self._running -= 1
+        self._running_by_function[function_id] -= 1
+        if not self._running_by_function[function_id]:
+            del self._running_by_function[function_id]
+        self._wake_up_waiters()
+
+    def _has_slot(self, function_id: str, limit: Optional[int]) -> bool:
+        if self._max_concurrency and self._running >= self._max_concurrency:
+            return False
+        return not limit or self._running_by_function[function_id] < limit
+
+    def _take_slot(self, function_id: str) -> None:
+        self._running += 1
+        self._running_by_function[function_id] += 1
+
+    def _wake_up_waiters(self) -> None:
+        # Admit waiters in arrival order, skipping those whose function is
+        # still at its limit so that one hot function does not block others.
+        for waiter in list(self._waiters):
+            if self._max_concurrency \
+                    and self._running >= self._max_concurrency:
+                return
+            function_id, limit, fut = waiter
+            if fut.done():
+                # Cancelled, its invocation is about to remove it
+                self._waiters.remove(waiter)
+            elif self._has_slot(function_id, limit):
+                self._waiters.remove(waiter)
+                self._take_slot(function_id)
+                fut.set_result(None)
@@ -11,6 +11,7 @@ WORKER_STATUS = "WorkerStatus"
 SHARED_MEMORY_DATA_TRANSFER = "SharedMemoryDataTransfer"
 FUNCTION_DATA_CACHE = "FunctionDataCache"
 HTTP_URI = "HttpUri"
+SUPPORTS_LOAD_RESPONSE_COLLECTION = "SupportsLoadResponseCollection"
 
 # When this capability is enabled, logs are not piped back to the
 # host from the worker. Logs will directly go to where the user has
@@ -83,3 +84,94 @@ BASE_EXT_SUPPORTED_PY_MINOR_VERSION = 8
 
 PYTHON_ENABLE_OPENTELEMETRY = "PYTHON_ENABLE_OPENTELEMETRY"
 PYTHON_ENABLE_OPENTELEMETRY_DEFAULT = True
+
+# Use grpc.aio so the event stream is read and written on the dispatcher's
+# event loop instead of a dedicated gRPC thread.
+PYTHON_ENABLE_GRPC_AIO = "PYTHON_ENABLE_GRPC_AIO"
+
+# Report the worker's load counters with every WorkerStatusResponse
+PYTHON_ENABLE_WORKER_LOAD_STATUS = "PYTHON_ENABLE_WORKER_LOAD_STATUS"
+
+# Concurrency limits for invocations, unlimited unless set. Invocations over
+# a limit wait in a queue of at most PYTHON_INVOCATION_QUEUE_SIZE entries.
+PYTHON_MAX_CONCURRENT_INVOCATIONS = "PYTHON_MAX_CONCURRENT_INVOCATIONS"
+PYTHON_MAX_CONCURRENT_INVOCATIONS_PER_FUNCTION = \
+    "PYTHON_MAX_CONCURRENT_INVOCATIONS_PER_FUNCTION"
+# Limits of single functions, overriding the per function one, e.g.
+# "get_orders=2;daily_report=1"
+PYTHON_MAX_CONCURRENT_INVOCATIONS_BY_FUNCTION = \
+    "PYTHON_MAX_CONCURRENT_INVOCATIONS_BY_FUNCTION"
+PYTHON_INVOCATION_QUEUE_SIZE = "PYTHON_INVOCATION_QUEUE_SIZE"
+PYTHON_INVOCATION_QUEUE_SIZE_DEFAULT = 1000
+
+# Dedicated sync thread pools (bulkheads) for groups of sync functions, e.g.
+# "sql:2=get_orders,get_users;reports:1=daily_report". Functions that are not
+# listed keep using the shared thread pool.
+PYTHON_THREADPOOL_BULKHEADS = "PYTHON_THREADPOOL_BULKHEADS"
+
+# Size the sync thread pool to the load, between the min and max bounds, in
+# place of the static PYTHON_THREADPOOL_THREAD_COUNT.
+PYTHON_ENABLE_ADAPTIVE_THREADPOOL = "PYTHON_ENABLE_ADAPTIVE_THREADPOOL"
+PYTHON_ADAPTIVE_THREADPOOL_MIN_WORKERS = \
+    "PYTHON_ADAPTIVE_THREADPOOL_MIN_WORKERS"
+PYTHON_ADAPTIVE_THREADPOOL_MAX_WORKERS = \
+    "PYTHON_ADAPTIVE_THREADPOOL_MAX_WORKERS"
+PYTHON_ADAPTIVE_THREADPOOL_MIN_WORKERS_DEFAULT = 1
+PYTHON_ADAPTIVE_THREADPOOL_MAX_WORKERS_DEFAULT = 32
+
+# Comma separated names of sync functions which run in a pool of worker
+# processes instead of the sync thread pool, with
+# PYTHON_PROCESSPOOL_WORKER_COUNT processes (the CPU count by default).
+# They skip the invocation hooks of worker extensions and the OpenTelemetry
+# context of the invocation.
+PYTHON_PROCESSPOOL_FUNCTIONS = "PYTHON_PROCESSPOOL_FUNCTIONS"
+PYTHON_PROCESSPOOL_WORKER_COUNT = "PYTHON_PROCESSPOOL_WORKER_COUNT"
+
+# Share of invocations logging "Received FunctionInvocationRequest", between
+# 0 and 1, and comma separated names of functions which never log it.
+PYTHON_INVOCATION_LOG_SAMPLE_RATE = "PYTHON_INVOCATION_LOG_SAMPLE_RATE"
+PYTHON_INVOCATION_LOG_SAMPLE_RATE_DEFAULT = 1.0
+PYTHON_INVOCATION_LOG_DISABLED_FUNCTIONS = \
+    "PYTHON_INVOCATION_LOG_DISABLED_FUNCTIONS"
+
+# Send what functions print to stdout and stderr to the host as logs of
+# their invocation, buffered, instead of writing it to the console.
+PYTHON_ENABLE_STDIO_CAPTURE = "PYTHON_ENABLE_STDIO_CAPTURE"
+
+# Record latency histograms of the phases of every invocation, sent to the
+# host every PYTHON_LATENCY_HISTOGRAMS_INTERVAL seconds.
+PYTHON_ENABLE_LATENCY_HISTOGRAMS = "PYTHON_ENABLE_LATENCY_HISTOGRAMS"
+PYTHON_LATENCY_HISTOGRAMS_INTERVAL = "PYTHON_LATENCY_HISTOGRAMS_INTERVAL"
+PYTHON_LATENCY_HISTOGRAMS_INTERVAL_DEFAULT = 60
+
+# Record every message received from the host, payloads included, to this
+# file so that the traffic can be replayed against a worker.
+PYTHON_GRPC_RECORDING_FILE = "PYTHON_GRPC_RECORDING_FILE"
+
+# Run the worker on a uvloop event loop, when uvloop is installed.
+PYTHON_ENABLE_UVLOOP = "PYTHON_ENABLE_UVLOOP"
+
+# How functions get the bytes inputs which the host passed in shared memory:
+# "bytes" copies them out of shared memory (the default), "memoryview" gives
+# a read-only view of the shared memory and "stream" a seekable file-like
+# object reading it. Views and streams are valid until the invocation
+# completes.
+PYTHON_SHARED_MEMORY_INPUT_TYPE = "PYTHON_SHARED_MEMORY_INPUT_TYPE"
+PYTHON_SHARED_MEMORY_INPUT_TYPES = ('bytes', 'memoryview', 'stream')
+PYTHON_SHARED_MEMORY_INPUT_TYPE_DEFAULT = 'bytes'
+
+# Keep up to this many bytes of the memory maps of function outputs, once the
+# host has read them, to write later outputs into instead of creating new
+# memory maps. The ones not reused for PYTHON_SHARED_MEMORY_ARENA_IDLE_TIMEOUT
+# seconds are deleted. 0 (the default) deletes them as soon as the host has
+# read them.
+PYTHON_SHARED_MEMORY_ARENA_SIZE = "PYTHON_SHARED_MEMORY_ARENA_SIZE"
+PYTHON_SHARED_MEMORY_ARENA_SIZE_DEFAULT = 0
+PYTHON_SHARED_MEMORY_ARENA_IDLE_TIMEOUT = \
+    "PYTHON_SHARED_MEMORY_ARENA_IDLE_TIMEOUT"
+PYTHON_SHARED_MEMORY_ARENA_IDLE_TIMEOUT_DEFAULT = 60
+
+# Write the outputs of an invocation which are transferred over shared memory
+# into a single memory map, at different offsets, instead of one memory map
+# each. The host must read outputs at their offset.
+PYTHON_SHARED_MEMORY_PACK_OUTPUTS = "PYTHON_SHARED_MEMORY_PACK_OUTPUTS"
@@ -7,19 +7,24 @@ Implements loading and execution of Python workers.
 
 import asyncio
 import concurrent.futures
+import contextlib
+import json
 import logging
 import os
 import platform
 import queue
 import sys
 import threading
+import time
 from asyncio import BaseEventLoop
 from datetime import datetime
 from logging import LogRecord
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Set, Tuple
 
 import grpc
-from . import bindings, constants, functions, loader, protos
+from . import bindings, constants, functions, latency, loader, protos, \
+    stdio_capture
+from .bindings import datumdef
 from .bindings.shared_memory_data_transfer import SharedMemoryManager
 from .constants import (PYTHON_ROLLBACK_CWD_PATH,
                         PYTHON_THREADPOOL_THREAD_COUNT,
@@ -32,13 +37,42 @@ from .constants import (PYTHON_ROLLBACK_CWD_PATH,
                         PYTHON_LANGUAGE_RUNTIME, PYTHON_ENABLE_INIT_INDEXING,
                         METADATA_PROPERTIES_WORKER_INDEXED,
                         PYTHON_ENABLE_OPENTELEMETRY,
-                        PYTHON_ENABLE_OPENTELEMETRY_DEFAULT)
+                        PYTHON_ENABLE_OPENTELEMETRY_DEFAULT,
+                        PYTHON_ENABLE_GRPC_AIO,
+                        PYTHON_ENABLE_WORKER_LOAD_STATUS,
+                        PYTHON_MAX_CONCURRENT_INVOCATIONS,
+                        PYTHON_MAX_CONCURRENT_INVOCATIONS_PER_FUNCTION,
+                        PYTHON_MAX_CONCURRENT_INVOCATIONS_BY_FUNCTION,
+                        PYTHON_INVOCATION_QUEUE_SIZE,
+                        PYTHON_INVOCATION_QUEUE_SIZE_DEFAULT,
+                        PYTHON_THREADPOOL_BULKHEADS,
+                        PYTHON_ENABLE_ADAPTIVE_THREADPOOL,
+                        PYTHON_ADAPTIVE_THREADPOOL_MIN_WORKERS,
+                        PYTHON_ADAPTIVE_THREADPOOL_MIN_WORKERS_DEFAULT,
+                        PYTHON_ADAPTIVE_THREADPOOL_MAX_WORKERS,
+                        PYTHON_ADAPTIVE_THREADPOOL_MAX_WORKERS_DEFAULT,
+                        PYTHON_PROCESSPOOL_FUNCTIONS,
+                        PYTHON_PROCESSPOOL_WORKER_COUNT,
+                        PYTHON_INVOCATION_LOG_SAMPLE_RATE,
+                        PYTHON_INVOCATION_LOG_SAMPLE_RATE_DEFAULT,
+                        PYTHON_INVOCATION_LOG_DISABLED_FUNCTIONS,
+                        PYTHON_ENABLE_STDIO_CAPTURE,
+                        PYTHON_ENABLE_LATENCY_HISTOGRAMS,
+                        PYTHON_LATENCY_HISTOGRAMS_INTERVAL,
+                        PYTHON_LATENCY_HISTOGRAMS_INTERVAL_DEFAULT,
+                        PYTHON_GRPC_RECORDING_FILE)
+from .concurrency import ConcurrencyLimiter, InvocationQueueFullError
 from .extension import ExtensionManager
+from .latency import FunctionLatency, LatencyRecorder
 from .http_v2 import http_coordinator, initialize_http_server, HttpV2Registry, \
     sync_http_request, HttpServerInitError
 from .logging import disable_console_logging, enable_console_logging
 from .logging import (logger, error_logger, is_system_log_category,
-                      CONSOLE_LOG_PREFIX, format_exception)
+                      CONSOLE_LOG_PREFIX, format_exception,
+                      InvocationLogSampler)
+from .process_pool import ProcessPool
+from .recording import MessageRecorder
+from .threadpool import AdaptiveThreadPoolExecutor, FixedThreadPoolExecutor
 from .utils.app_setting_manager import get_python_appsetting_state
 from .utils.common import (get_app_setting, is_envvar_true,
                            validate_script_file_name)
@@ -50,6 +84,16 @@ from .version import VERSION
 _TRUE = "true"
 _TRACEPARENT = "traceparent"
 _TRACESTATE = "tracestate"
+# Seconds a warmup task keeps its sync thread pool thread busy
+_WARMUP_TP_TASK_DURATION = 0.01
+# Seconds between two event loop lag probes
+_EVENT_LOOP_LAG_PROBE_INTERVAL = 0.5
+# Minimum seconds given to flush the logs on WorkerTerminate
+_TERMINATE_LOG_FLUSH_TIMEOUT = 1.0
+_INVOCATION_LOG_FORMAT = ('Received FunctionInvocationRequest, '
+                          'request ID: %s, function ID: %s, '
+                          'function name: %s, invocation ID: %s, '
+                          'function type: %s, timestamp (UTC): %s')
 
 
 class DispatcherMeta(type):
@@ -80,6 +124,37 @@ class Dispatcher(metaclass=DispatcherMeta):
         self._shmem_mgr = SharedMemoryManager()
         self._old_task_factory = None
 
+        # Invocations which have not sent their response yet, so they can be
+        # cancelled by an InvocationCancel message.
+        # key: invocation_id, val: _InFlightInvocation
+        self._inflight_invocations: Dict[str, _InFlightInvocation] = {}
+
+        # Set by WorkerTerminate, after which invocations are rejected
+        self._terminating = False
+        self._dispatch_forever_fut: Optional[asyncio.Future] = None
+
+        # Load counters reported with the WorkerStatusResponse. They are
+        # updated as invocations start and finish so that reading them is
+        # O(1). The sync counters are updated from the sync threadpool
+        # threads; key: bulkhead name (None for the shared thread pool),
+        # val: busy threads.
+        self._async_invocations_running = 0
+        self._sync_invocations_running: Dict[Optional[str], int] = {}
+        self._sync_invocations_lock = threading.Lock()
+        self._event_loop_lag = 0.0
+        self._event_loop_lag_handle: Optional[asyncio.TimerHandle] = None
+        # Flushes the output captured with PYTHON_ENABLE_STDIO_CAPTURE
+        self._stdio_flush_handle: Optional[asyncio.TimerHandle] = None
+
+        # Latency histograms of the invocation phases, recorded with
+        # PYTHON_ENABLE_LATENCY_HISTOGRAMS.
+        self._latency_recorder: Optional[LatencyRecorder] = None
+        self._latency_emit_handle: Optional[asyncio.TimerHandle] = None
+        # Responses not handed over to gRPC yet; key: invocation_id,
+        # val: the invocation, holding the time its response was enqueued
+        self._pending_sends: Dict[str, _InFlightInvocation] = {}
+        self._update_latency_histograms()
+
         # Used to store metadata returns
         self._function_metadata_result = None
         self._function_metadata_exception = None
@@ -94,17 +169,58 @@ class Dispatcher(metaclass=DispatcherMeta):
         #   For 3.[6|7|8] The default value is 1.
         #   For 3.9, we don't set this value by default but we honor incoming
         #     the app setting.
+        # With PYTHON_ENABLE_ADAPTIVE_THREADPOOL the thread pool sizes itself
+        # between the PYTHON_ADAPTIVE_THREADPOOL_*_WORKERS bounds instead.
         self._sync_call_tp: concurrent.futures.Executor = (
-            self._create_sync_call_tp(self._get_sync_tp_max_workers())
+            self._create_shared_sync_call_tp()
         )
 
+        # Sync functions listed in PYTHON_THREADPOOL_BULKHEADS run in a
+        # thread pool of their group (bulkhead) instead of _sync_call_tp, so
+        # that slow functions cannot take every thread.
+        # key: bulkhead name, val: thread pool
+        self._bulkhead_tps: Dict[str, concurrent.futures.Executor] = {}
+        # key: function name, val: bulkhead name
+        self._bulkhead_by_function: Dict[str, str] = {}
+        self._create_bulkhead_tps()
+
+        # Sync functions listed in PYTHON_PROCESSPOOL_FUNCTIONS run in a pool
+        # of worker processes, so that CPU bound ones are not serialised by
+        # the GIL.
+        self._process_pool: Optional[ProcessPool] = None
+        self._process_pool_functions: Set[str] = set()
+        self._create_process_pool()
+
+        # Invocations over the PYTHON_MAX_CONCURRENT_INVOCATIONS* limits wait
+        # for a slot before they start.
+        self._concurrency_limiter = self._create_concurrency_limiter()
+
+        # Logs "Received FunctionInvocationRequest" for a sample of the
+        # invocations
+        self._invocation_log_sampler = self._create_invocation_log_sampler()
+
         self._grpc_connect_timeout: float = grpc_connect_timeout
         # This is set to -1 by default to remove the limitation on msg size
         self._grpc_max_msg_len: int = grpc_max_msg_len
-        self._grpc_resp_queue: queue.Queue = queue.Queue()
         self._grpc_connected_fut = loop.create_future()
-        self._grpc_thread: threading.Thread = threading.Thread(
-            name='grpc-thread', target=self.__poll_grpc)
+
+        # With PYTHON_ENABLE_GRPC_AIO the event stream is driven by a task on
+        # the dispatcher's event loop. Otherwise a dedicated grpc-thread polls
+        # the stream and hands messages over to the loop.
+        self._grpc_aio_enabled: bool = is_envvar_true(PYTHON_ENABLE_GRPC_AIO)
+        self._grpc_task: Optional[asyncio.Task] = None
+        self._grpc_thread: Optional[threading.Thread] = None
+        if self._grpc_aio_enabled:
+            self._grpc_resp_queue = _AsyncResponseQueue(loop)
+        else:
+            self._grpc_resp_queue = queue.Queue()
+            self._grpc_thread = threading.Thread(
+                name='grpc-thread', target=self.__poll_grpc)
+
+        # Messages received from the host are recorded to
+        # PYTHON_GRPC_RECORDING_FILE, to be replayed later
+        self._grpc_recorder: Optional[MessageRecorder] = \
+            self._create_grpc_recorder()
 
     @staticmethod
     def get_worker_metadata():
@@ -130,7 +246,10 @@ class Dispatcher(metaclass=DispatcherMeta):
                       request_id: str, connect_timeout: float):
         loop = asyncio.events.get_event_loop()
         disp = cls(loop, host, port, worker_id, request_id, connect_timeout)
-        disp._grpc_thread.start()
+        if disp._grpc_aio_enabled:
+            disp._grpc_task = loop.create_task(disp.__poll_grpc_aio())
+        else:
+            disp._grpc_thread.start()
         await disp._grpc_connected_fut
         logger.info('Successfully opened gRPC channel to %s:%s ', host, port)
         return disp
@@ -146,7 +265,7 @@ class Dispatcher(metaclass=DispatcherMeta):
 
         DispatcherMeta.__current_dispatcher__ = self
         try:
-            forever = self._loop.create_future()
+            forever = self._dispatch_forever_fut = self._loop.create_future()
 
             self._grpc_resp_queue.put_nowait(
                 protos.StreamingMessage(
@@ -154,8 +273,11 @@ class Dispatcher(metaclass=DispatcherMeta):
                     start_stream=protos.StartStream(
                         worker_id=self.worker_id)))
 
+            # Loops pass the context (and, with uvloop, eager_start) of the
+            # task as keyword arguments
             self._loop.set_task_factory(
-                lambda loop, coro: ContextEnabledTask(coro, loop=loop))
+                lambda loop, coro, **kwargs: ContextEnabledTask(
+                    coro, loop=loop, **kwargs))
 
             # Detach console logging before enabling GRPC channel logging
             logger.info('Detaching console logging.')
@@ -173,10 +295,12 @@ class Dispatcher(metaclass=DispatcherMeta):
             root_logger.addHandler(logging_handler)
             logger.info('Switched to gRPC logging.')
             logging_handler.flush()
+            self._update_stdio_capture()
 
             try:
                 await forever
             finally:
+                self._stop_stdio_capture()
                 logger.warning('Detaching gRPC logging due to exception.')
                 logging_handler.flush()
                 root_logger.removeHandler(logging_handler)
@@ -190,6 +314,7 @@ class Dispatcher(metaclass=DispatcherMeta):
             loader.uninstall()
 
             self._loop.set_task_factory(self._old_task_factory)
+            await self._stop_grpc_task()
             self.stop()
 
     def stop(self) -> None:
@@ -198,7 +323,39 @@ class Dispatcher(metaclass=DispatcherMeta):
             self._grpc_thread.join()
             self._grpc_thread = None
 
+        if self._grpc_task is not None:
+            # Only left when dispatch_forever() did not run, the task closes
+            # its channel once the event loop runs it again
+            self._grpc_resp_queue.put_nowait(self._GRPC_STOP_RESPONSE)
+            self._grpc_task.cancel()
+            self._grpc_task = None
+
+        if self._grpc_recorder is not None:
+            self._grpc_recorder.close()
+            self._grpc_recorder = None
+
+        if self._event_loop_lag_handle is not None:
+            self._event_loop_lag_handle.cancel()
+            self._event_loop_lag_handle = None
+
+        self._stop_stdio_capture()
+        self._stop_latency_histograms()
+
         self._stop_sync_call_tp()
+        self._stop_bulkhead_tps()
+        self._stop_process_pool()
+
+    async def _stop_grpc_task(self) -> None:
+        """Ends the event stream of the grpc.aio transport and waits for the
+        task to close its channel.
+        """
+        grpc_task, self._grpc_task = self._grpc_task, None
+        if grpc_task is None:
+            return
+
+        self._grpc_resp_queue.put_nowait(self._GRPC_STOP_RESPONSE)
+        grpc_task.cancel()
+        await asyncio.wait([grpc_task])
 
     def on_logging(self, record: logging.LogRecord,
                    formatted_msg: str) -> None:
@@ -236,6 +393,130 @@ class Dispatcher(metaclass=DispatcherMeta):
                 request_id=self.request_id,
                 rpc_log=protos.RpcLog(**log)))
 
+    def _on_captured_output(self, invocation_id: Optional[str],
+                            stream_name: str, text: str) -> None:
+        log = dict(
+            level=(protos.RpcLog.Information if stream_name == 'stdout'
+                   else protos.RpcLog.Error),
+            message=text,
+            category=stream_name,
+            log_category=protos.RpcLog.RpcLogCategory.Value('User')
+        )
+        if invocation_id is not None:
+            log['invocation_id'] = invocation_id
+
+        self._grpc_resp_queue.put_nowait(
+            protos.StreamingMessage(
+                request_id=self.request_id,
+                rpc_log=protos.RpcLog(**log)))
+
+    def _update_stdio_capture(self) -> None:
+        """Starts or stops capturing stdout and stderr as
+        PYTHON_ENABLE_STDIO_CAPTURE says.
+        """
+        if not is_envvar_true(PYTHON_ENABLE_STDIO_CAPTURE):
+            self._stop_stdio_capture()
+            return
+        if stdio_capture.is_installed():
+            return
+
+        stdio_capture.install(self._on_captured_output,
+                              get_current_invocation_id)
+        self._flush_captured_stdio()
+        logger.info('Capturing stdout and stderr as invocation logs.')
+
+    def _flush_captured_stdio(self) -> None:
+        stdio_capture.flush()
+        self._stdio_flush_handle = self._loop.call_later(
+            stdio_capture.FLUSH_INTERVAL, self._flush_captured_stdio)
+
+    def _stop_stdio_capture(self) -> None:
+        if self._stdio_flush_handle is not None:
+            self._stdio_flush_handle.cancel()
+            self._stdio_flush_handle = None
+        stdio_capture.uninstall()
+
+    def get_latency_histograms(self) -> Dict[str, Dict[str, Any]]:
+        """Latency histograms of every phase of the invocations of every
+        function since they were last sent to the host, empty unless
+        PYTHON_ENABLE_LATENCY_HISTOGRAMS is set.
+        """
+        if self._latency_recorder is None:
+            return {}
+        return self._latency_recorder.snapshot()
+
+    def _update_latency_histograms(self) -> None:
+        """Starts or stops recording latency histograms as
+        PYTHON_ENABLE_LATENCY_HISTOGRAMS says.
+        """
+        def interval_validator(value: str) -> bool:
+            try:
+                int_value = int(value)
+            except ValueError:
+                logger.warning('%s must be an integer',
+                               PYTHON_LATENCY_HISTOGRAMS_INTERVAL)
+                return False
+
+            if int_value < 1:
+                logger.warning('%s must be set to a value greater than 0. '
+                               'Reverting to default value',
+                               PYTHON_LATENCY_HISTOGRAMS_INTERVAL)
+                return False
+            return True
+
+        if not is_envvar_true(PYTHON_ENABLE_LATENCY_HISTOGRAMS):
+            self._stop_latency_histograms()
+            return
+
+        interval = int(get_app_setting(
+            setting=PYTHON_LATENCY_HISTOGRAMS_INTERVAL,
+            default_value=f'{PYTHON_LATENCY_HISTOGRAMS_INTERVAL_DEFAULT}',
+            validator=interval_validator))
+        if self._latency_recorder is None:
+            self._latency_recorder = LatencyRecorder()
+        if self._latency_emit_handle is not None:
+            self._latency_emit_handle.cancel()
+        self._latency_emit_handle = self._loop.call_later(
+            interval, self._emit_latency_histograms, interval)
+
+    def _emit_latency_histograms(self, interval: int) -> None:
+        histograms = self._latency_recorder.snapshot(reset=True)
+        if histograms:
+            self._grpc_resp_queue.put_nowait(
+                protos.StreamingMessage(
+                    request_id=self.request_id,
+                    rpc_log=protos.RpcLog(
+                        level=protos.RpcLog.Information,
+                        category=logger.name,
+                        message='InvocationLatency',
+                        properties=json.dumps({
+                            'interval_seconds': interval,
+                            'phases': latency.PHASES,
+                            'bucket_bounds_ms': latency.BUCKET_BOUNDS_MS,
+                            'functions': histograms}),
+                        log_category=(
+                            protos.RpcLog.RpcLogCategory.CustomMetric))))
+        self._latency_emit_handle = self._loop.call_later(
+            interval, self._emit_latency_histograms, interval)
+
+    def _stop_latency_histograms(self) -> None:
+        if self._latency_emit_handle is not None:
+            self._latency_emit_handle.cancel()
+            self._latency_emit_handle = None
+        self._latency_recorder = None
+        self._pending_sends.clear()
+
+    def _record_send(self, msg: protos.StreamingMessage) -> None:
+        # Called by the gRPC transport as it sends a message
+        if msg.WhichOneof('content') != 'invocation_response':
+            return
+        invocation = self._pending_sends.pop(
+            msg.invocation_response.invocation_id, None)
+        if invocation is not None and self._latency_recorder is not None:
+            invocation.function_latency.record(
+                latency.SEND,
+                time.perf_counter() - invocation.response_enqueued_at)
+
     @property
     def request_id(self) -> str:
         return self._request_id
@@ -260,7 +541,8 @@ class Dispatcher(metaclass=DispatcherMeta):
 
         return protos.RpcException(message=message, stack_trace=stack_trace)
 
-    async def _dispatch_grpc_request(self, request):
+    async def _dispatch_grpc_request(self, request,
+                                     received_at: Optional[float] = None):
         content_type = request.WhichOneof('content')
         request_handler = getattr(self, f'_handle__{content_type}', None)
         if request_handler is None:
@@ -271,8 +553,13 @@ class Dispatcher(metaclass=DispatcherMeta):
                          content_type)
             return
 
-        resp = await request_handler(request)
-        self._grpc_resp_queue.put_nowait(resp)
+        if received_at is not None and content_type == 'invocation_request':
+            resp = await request_handler(request, received_at=received_at)
+        else:
+            resp = await request_handler(request)
+        # Some messages (e.g. InvocationCancel) do not expect a response
+        if resp is not None:
+            self._grpc_resp_queue.put_nowait(resp)
 
     def update_opentelemetry_status(self):
         """Check for OpenTelemetry library availability and
@@ -318,6 +605,7 @@ class Dispatcher(metaclass=DispatcherMeta):
             constants.WORKER_STATUS: _TRUE,
             constants.RPC_HTTP_TRIGGER_METADATA_REMOVED: _TRUE,
             constants.SHARED_MEMORY_DATA_TRANSFER: _TRUE,
+            constants.SUPPORTS_LOAD_RESPONSE_COLLECTION: _TRUE,
         }
 
         if get_app_setting(setting=PYTHON_ENABLE_OPENTELEMETRY,
@@ -364,10 +652,138 @@ class Dispatcher(metaclass=DispatcherMeta):
         # Logging is not necessary in this request since the response is used
         # for host to judge scale decisions of out-of-proc languages.
         # Having log here will reduce the responsiveness of the worker.
+        if is_envvar_true(PYTHON_ENABLE_WORKER_LOAD_STATUS):
+            # WorkerStatusResponse has no fields, the load counters are sent
+            # as the properties of a metric log right before it.
+            self._grpc_resp_queue.put_nowait(
+                protos.StreamingMessage(
+                    request_id=request.request_id,
+                    rpc_log=protos.RpcLog(
+                        level=protos.RpcLog.Information,
+                        category=logger.name,
+                        message='WorkerStatus',
+                        properties=json.dumps(self.get_worker_load()),
+                        log_category=(
+                            protos.RpcLog.RpcLogCategory.CustomMetric))))
+            if self._event_loop_lag_handle is None:
+                self._probe_event_loop_lag(self._loop.time())
+
         return protos.StreamingMessage(
             request_id=request.request_id,
             worker_status_response=protos.WorkerStatusResponse())
 
+    def get_worker_load(self) -> Dict[str, Any]:
+        """Counters describing how busy the worker is, with the counters of
+        every bulkhead under 'bulkheads'. Every counter is read in constant
+        time.
+        """
+        sync_call_tp = self._sync_call_tp
+        return {
+            'async_invocations_running': self._async_invocations_running,
+            'sync_threadpool_busy_threads': (
+                self._sync_invocations_running.get(None, 0)),
+            'sync_threadpool_max_workers': (
+                sync_call_tp._max_workers if sync_call_tp else 0),
+            'sync_threadpool_queue_depth': (
+                sync_call_tp.queue_depth if sync_call_tp else 0),
+            'event_loop_lag_ms': self._event_loop_lag * 1000,
+            'response_queue_depth': self._grpc_resp_queue.qsize(),
+            'shared_memory_bytes': self._shmem_mgr.allocated_mem_maps_size,
+            'invocation_queue_depth': self._concurrency_limiter.waiting,
+            'invocation_queue_overflows': self._concurrency_limiter.overflows,
+            'invocation_queue_waits': self._concurrency_limiter.waits,
+            'invocation_queue_wait_ms': (
+                self._concurrency_limiter.wait_time * 1000),
+            'bulkheads': {
+                name: {
+                    'busy_threads': self._sync_invocations_running.get(name, 0),
+                    'max_workers': tp.max_workers,
+                    'queue_depth': tp.queue_depth
+                } for name, tp in self._bulkhead_tps.items()}
+        }
+
+    def _probe_event_loop_lag(self, scheduled_at: float):
+        # The lag is how late the loop ran this callback compared to when it
+        # was scheduled. The probe keeps running once the first status request
+        # with PYTHON_ENABLE_WORKER_LOAD_STATUS arrived.
+        now = self._loop.time()
+        self._event_loop_lag = max(now - scheduled_at, 0.0)
+        next_at = now + _EVENT_LOOP_LAG_PROBE_INTERVAL
+        self._event_loop_lag_handle = self._loop.call_at(
+            next_at, self._probe_event_loop_lag, next_at)
+
+    async def _handle__worker_warmup_request(self, request):
+        """Does the work that the first invocation after specialization would
+        otherwise pay for: starting the synchronous thread pool threads,
+        loading the binding converters and probing the shared memory
+        directories. Warmup is best effort, a failing step is reported in the
+        response logs along with the duration of every step.
+        """
+        logger.info('Received WorkerWarmupRequest, request ID %s, '
+                    'worker directory: %s',
+                    self.request_id,
+                    request.worker_warmup_request.worker_directory)
+
+        step_logs = []
+        for step, warmup in (('sync_call_tp', self._warmup_sync_call_tp),
+                             ('bindings', self._warmup_bindings),
+                             ('shared_memory', self._warmup_shared_memory)):
+            start = time.perf_counter()
+            try:
+                detail = await warmup()
+                level = protos.RpcLog.Information
+            except Exception as ex:
+                detail = format_exception(ex)
+                level = protos.RpcLog.Warning
+                logger.warning('Warmup step %s failed: %s', step, detail)
+            duration_ms = (time.perf_counter() - start) * 1000
+
+            step_logs.append(protos.RpcLog(
+                level=level,
+                category=logger.name,
+                message=f'Warmup step {step} took {duration_ms:.2f}ms: '
+                        f'{detail}',
+                properties=json.dumps({'step': step,
+                                       'duration_ms': duration_ms}),
+                log_category=protos.RpcLog.RpcLogCategory.System))
+
+        logger.info('Successfully processed WorkerWarmupRequest, '
+                    'request ID: %s', self.request_id)
+        return protos.StreamingMessage(
+            request_id=self.request_id,
+            worker_warmup_response=protos.WorkerWarmupResponse(
+                result=protos.StatusResult(
+                    status=protos.StatusResult.Success,
+                    logs=step_logs)))
+
+    async def _warmup_sync_call_tp(self) -> str:
+        # The pools start their threads while the tasks are submitted. Every
+        # task sleeps briefly so that it is not done before the next one is
+        # submitted, which would then reuse its thread. The tasks are not
+        # waited for.
+        threads = 0
+        for sync_tp in (self._sync_call_tp, *self._bulkhead_tps.values()):
+            for _ in range(sync_tp.min_workers):
+                sync_tp.submit(time.sleep, _WARMUP_TP_TASK_DURATION)
+            threads += sync_tp.min_workers
+        return f'submitted {threads} tasks to start the threads'
+
+    async def _warmup_bindings(self) -> str:
+        bind_names = bindings.warmup_binding_registry(self._shmem_mgr)
+        return f'exercised {len(bind_names)} bindings'
+
+    async def _warmup_shared_memory(self) -> str:
+        metadata = self._shmem_mgr.put_bytes(b'warmup')
+        if metadata is None:
+            raise RuntimeError('cannot create a memory map in the shared '
+                               'memory directories')
+        try:
+            self._shmem_mgr.get_bytes(metadata.mem_map_name, 0,
+                                      metadata.count_bytes)
+        finally:
+            self._shmem_mgr.free_mem_map(metadata.mem_map_name)
+        return 'created, read and freed a memory map'
+
     def load_function_metadata(self, function_app_directory, caller_info):
         """
         This method is called to index the functions in the function app
@@ -438,16 +854,68 @@ class Dispatcher(metaclass=DispatcherMeta):
 
     async def _handle__function_load_request(self, request):
         func_request = request.function_load_request
-        function_id = func_request.function_id
         function_metadata = func_request.metadata
-        function_name = function_metadata.name
-        function_app_directory = function_metadata.directory
 
         logger.info(
             'Received WorkerLoadRequest, request ID %s, function_id: %s,'
             'function_name: %s, function_app_directory : %s',
-            self.request_id, function_id, function_name,
-            function_app_directory)
+            self.request_id, func_request.function_id,
+            function_metadata.name, function_metadata.directory)
+
+        return protos.StreamingMessage(
+            request_id=self.request_id,
+            function_load_response=self._load_function(func_request))
+
+    async def _handle__function_load_request_collection(self, request):
+        """Loads all functions of the app in a single round trip.
+
+        For worker indexed functions the function app is indexed once for the
+        whole collection rather than once per function. Legacy functions
+        sharing a script file share its module import.
+        """
+        func_requests = request.function_load_request_collection \
+            .function_load_requests
+
+        logger.info('Received FunctionLoadRequestCollection, request ID %s, '
+                    'number of functions: %s',
+                    self.request_id, len(func_requests))
+
+        unindexed_requests = [
+            func_request for func_request in func_requests
+            if not self._functions.get_function(func_request.function_id)
+            and func_request.metadata.properties.get(
+                METADATA_PROPERTIES_WORKER_INDEXED, False)]
+        if unindexed_requests:
+            try:
+                self.load_function_metadata(
+                    unindexed_requests[0].metadata.directory,
+                    caller_info="function_load_request_collection")
+            except Exception as ex:
+                self._function_metadata_exception = ex
+
+        load_responses = [
+            self._load_function(func_request, index_function_app=False)
+            for func_request in func_requests]
+
+        failed = sum(1 for r in load_responses
+                     if r.result.status != protos.StatusResult.Success)
+        logger.info('Successfully processed FunctionLoadRequestCollection, '
+                    'request ID: %s, loaded: %s, failed: %s',
+                    self.request_id, len(load_responses) - failed, failed)
+
+        return protos.StreamingMessage(
+            request_id=self.request_id,
+            function_load_response_collection=(
+                protos.FunctionLoadResponseCollection(
+                    function_load_responses=load_responses)))
+
+    def _load_function(self, func_request: protos.FunctionLoadRequest,
+                       index_function_app: bool = True) \
+            -> protos.FunctionLoadResponse:
+        function_id = func_request.function_id
+        function_metadata = func_request.metadata
+        function_name = function_metadata.name
+        function_app_directory = function_metadata.directory
 
         programming_model = "V2"
         try:
@@ -460,12 +928,13 @@ class Dispatcher(metaclass=DispatcherMeta):
                     # calling the metadata request. In this case we index the
                     # function and update the workers registry
 
-                    try:
-                        self.load_function_metadata(
-                            function_app_directory,
-                            caller_info="functions_load_request")
-                    except Exception as ex:
-                        self._function_metadata_exception = ex
+                    if index_function_app:
+                        try:
+                            self.load_function_metadata(
+                                function_app_directory,
+                                caller_info="functions_load_request")
+                        except Exception as ex:
+                            self._function_metadata_exception = ex
 
                     # For the second worker, if there was an exception in
                     # indexing, we raise it here
@@ -504,24 +973,24 @@ class Dispatcher(metaclass=DispatcherMeta):
                         function_name,
                         programming_model)
 
-            return protos.StreamingMessage(
-                request_id=self.request_id,
-                function_load_response=protos.FunctionLoadResponse(
-                    function_id=function_id,
-                    result=protos.StatusResult(
-                        status=protos.StatusResult.Success)))
+            return protos.FunctionLoadResponse(
+                function_id=function_id,
+                result=protos.StatusResult(
+                    status=protos.StatusResult.Success))
 
         except Exception as ex:
-            return protos.StreamingMessage(
-                request_id=self.request_id,
-                function_load_response=protos.FunctionLoadResponse(
-                    function_id=function_id,
-                    result=protos.StatusResult(
-                        status=protos.StatusResult.Failure,
-                        exception=self._serialize_exception(ex))))
+            return protos.FunctionLoadResponse(
+                function_id=function_id,
+                result=protos.StatusResult(
+                    status=protos.StatusResult.Failure,
+                    exception=self._serialize_exception(ex)))
 
-    async def _handle__invocation_request(self, request):
+    async def _handle__invocation_request(
+            self, request, received_at: Optional[float] = None):
         invocation_time = datetime.utcnow()
+        latency_recorder = self._latency_recorder
+        if latency_recorder is not None:
+            started_at = time.perf_counter()
         invoc_request = request.invocation_request
         invocation_id = invoc_request.invocation_id
         function_id = invoc_request.function_id
@@ -532,57 +1001,101 @@ class Dispatcher(metaclass=DispatcherMeta):
         assert isinstance(current_task, ContextEnabledTask)
         current_task.set_azure_invocation_id(invocation_id)
 
+        invocation = _InFlightInvocation(current_task)
+        self._inflight_invocations[invocation_id] = invocation
+
+        http_v2_enabled = False
+        concurrency_limiter = None
+        shmem_input_names: List[str] = []
         try:
+            if self._terminating:
+                raise RuntimeError(
+                    f'invocation {invocation_id} was rejected, the worker is '
+                    f'terminating')
+
             fi: functions.FunctionInfo = self._functions.get_function(
                 function_id)
             assert fi is not None
-
-            function_invocation_logs: List[str] = [
-                'Received FunctionInvocationRequest',
-                f'request ID: {self.request_id}',
-                f'function ID: {function_id}',
-                f'function name: {fi.name}',
-                f'invocation ID: {invocation_id}',
-                f'function type: {"async" if fi.is_async else "sync"}',
-                f'timestamp (UTC): {invocation_time}'
-            ]
-            if not fi.is_async:
-                function_invocation_logs.append(
-                    f'sync threadpool max workers: '
-                    f'{self.get_sync_tp_workers_set()}'
-                )
-            logger.info(', '.join(function_invocation_logs))
-
+            # Recorded into the histograms of the function, looked up once
+            function_latency = None
+            if latency_recorder is not None:
+                function_latency = latency_recorder.get(fi.name)
+                if received_at is not None:
+                    function_latency.record(latency.RECEIVE,
+                                            started_at - received_at)
+
+            queue_wait_time = None
+            max_function_concurrency = \
+                self._concurrency_limiter.get_function_limit(fi.name)
+            if self._concurrency_limiter.is_limited(max_function_concurrency):
+                try:
+                    queue_wait_time = await self._concurrency_limiter.acquire(
+                        function_id, max_function_concurrency)
+                except InvocationQueueFullError:
+                    logger.warning('Invocation queue overflow, rejecting '
+                                   'invocation %s of function %s',
+                                   invocation_id, fi.name)
+                    raise
+                # Release to the limiter the slot was taken from, even if an
+                # environment reload replaces it in the meantime
+                concurrency_limiter = self._concurrency_limiter
+
+            bulkhead = self._bulkhead_by_function.get(fi.name)
+            # Streamed HTTP requests cannot be handed over to another process
+            in_process_pool = not fi.is_async \
+                and fi.name in self._process_pool_functions \
+                and fi.invocation_plan.http_v2_param_name is None
+            if logger.isEnabledFor(logging.INFO) \
+                    and self._invocation_log_sampler.should_log(fi.name):
+                self._log_invocation_request(
+                    fi, invocation_id, invocation_time, queue_wait_time,
+                    bulkhead, in_process_pool)
+
+            # Bindings were resolved when the function was loaded
+            plan = fi.invocation_plan
             args = {}
+            # Converted entry by entry as bindings read them, once for all
+            # the trigger bindings of the invocation
+            trigger_metadata = bindings.TriggerMetadata(
+                invoc_request.trigger_metadata)
 
+            if function_latency is not None:
+                decode_time = shmem_read_time = 0.0
             for pb in invoc_request.input_data:
-                pb_type_info = fi.input_types[pb.name]
-                if bindings.is_trigger_binding(pb_type_info.binding_name):
-                    trigger_metadata = invoc_request.trigger_metadata
-                else:
-                    trigger_metadata = None
-
-                args[pb.name] = bindings.from_incoming_proto(
-                    pb_type_info.binding_name,
+                decoder, is_trigger = plan.inputs[pb.name]
+                is_shmem_input = pb.HasField('rpc_shared_memory')
+                if is_shmem_input:
+                    shmem_input_names.append(pb.rpc_shared_memory.name)
+                if function_latency is not None:
+                    decode_started_at = time.perf_counter()
+                args[pb.name] = decoder(
                     pb,
-                    trigger_metadata=trigger_metadata,
-                    pytype=pb_type_info.pytype,
-                    shmem_mgr=self._shmem_mgr,
-                    is_deferred_binding=pb_type_info.deferred_bindings_enabled)
-
-            http_v2_enabled = self._functions.get_function(function_id) \
-                                  .is_http_func and \
-                HttpV2Registry.http_v2_enabled()
+                    trigger_metadata=trigger_metadata if is_trigger else None,
+                    shmem_mgr=self._shmem_mgr)
+                if function_latency is not None:
+                    if is_shmem_input:
+                        shmem_read_time += \
+                            time.perf_counter() - decode_started_at
+                    else:
+                        decode_time += time.perf_counter() - decode_started_at
+            if function_latency is not None:
+                function_latency.record(latency.DECODE, decode_time)
+                if shmem_read_time:
+                    function_latency.record(latency.SHMEM_READ,
+                                            shmem_read_time)
+
+            http_v2_enabled = plan.http_v2_param_name is not None
 
             if http_v2_enabled:
                 http_request = await http_coordinator.get_http_request_async(
                     invocation_id)
 
                 await sync_http_request(http_request, invoc_request)
-                args[fi.trigger_metadata.get('param_name')] = http_request
+                args[plan.http_v2_param_name] = http_request
 
             fi_context = self._get_context(invoc_request, fi.name,
-                                           fi.directory)
+                                           fi.directory,
+                                           invocation.cancel_event)
 
             # Use local thread storage to store the invocation ID
             # for a customer's threads
@@ -590,21 +1103,56 @@ class Dispatcher(metaclass=DispatcherMeta):
             if fi.requires_context:
                 args['context'] = fi_context
 
-            if fi.output_types:
-                for name in fi.output_types:
-                    args[name] = bindings.Out()
+            for name, _ in plan.outputs:
+                args[name] = bindings.Out()
 
             if fi.is_async:
                 if self._otel_libs_available:
                     self.configure_opentelemetry(fi_context)
 
-                call_result = \
-                    await self._run_async_func(fi_context, fi.func, args)
+                self._async_invocations_running += 1
+                if function_latency is not None:
+                    call_started_at = time.perf_counter()
+                try:
+                    call_result = \
+                        await self._run_async_func(fi_context, fi.func, args)
+                finally:
+                    self._async_invocations_running -= 1
+                    if function_latency is not None:
+                        function_latency.record(
+                            latency.USER_CODE,
+                            time.perf_counter() - call_started_at)
             else:
-                call_result = await self._loop.run_in_executor(
-                    self._sync_call_tp,
-                    self._run_sync_func,
-                    invocation_id, fi_context, fi.func, args)
+                if invocation.is_cancelled:
+                    raise asyncio.CancelledError()
+
+                # Keep the concurrent future so that a cancelled invocation
+                # which has not started yet is dropped from the pool queue.
+                if in_process_pool:
+                    if function_latency is not None:
+                        call_started_at = time.perf_counter()
+                    invocation.sync_future = self._process_pool.submit(
+                        fi.func, fi_context if fi.requires_context else None,
+                        args)
+                    call_result = await self._process_pool.wait(
+                        invocation.sync_future, self._loop, args)
+                    if function_latency is not None:
+                        # Including the wait for a worker process
+                        function_latency.record(
+                            latency.USER_CODE,
+                            time.perf_counter() - call_started_at)
+                else:
+                    sync_tp = self._bulkhead_tps[bulkhead] \
+                        if bulkhead is not None else self._sync_call_tp
+                    invocation.sync_future = sync_tp.submit(
+                        self._run_sync_func,
+                        invocation_id, fi_context, fi.func, args, bulkhead,
+                        function_latency, time.perf_counter())
+                    call_result = await asyncio.wrap_future(
+                        invocation.sync_future, loop=self._loop)
+
+            if invocation.is_cancelled:
+                raise asyncio.CancelledError()
 
             if call_result is not None and not fi.has_return:
                 raise RuntimeError(
@@ -614,43 +1162,91 @@ class Dispatcher(metaclass=DispatcherMeta):
             if http_v2_enabled:
                 http_coordinator.set_http_response(invocation_id, call_result)
 
+            if function_latency is not None:
+                encode_started_at = time.perf_counter()
+                shmem_write_time = 0.0
             output_data = []
             cache_enabled = self._function_data_cache_enabled
-            if fi.output_types:
-                for out_name, out_type_info in fi.output_types.items():
+            # The host caches the outputs by memory map, so those are not
+            # packed when the cache is enabled
+            pack_outputs = len(plan.outputs) > 1 and not cache_enabled \
+                and self._shmem_mgr.is_packing_enabled()
+            with self._shmem_mgr.pack_outputs() if pack_outputs \
+                    else contextlib.nullcontext({}) as unpacked_datums:
+                for out_name, encoder in plan.outputs:
                     val = args[out_name].get()
                     if val is None:
                         # TODO: is the "Out" parameter optional?
                         # Can "None" be marshaled into protos.TypedData?
                         continue
 
-                    param_binding = bindings.to_outgoing_param_binding(
-                        out_type_info.binding_name, val,
-                        pytype=out_type_info.pytype,
-                        out_name=out_name, shmem_mgr=self._shmem_mgr,
-                        is_function_data_cache_enabled=cache_enabled)
-                    output_data.append(param_binding)
+                    if function_latency is not None:
+                        output_started_at = time.perf_counter()
+                    output_data.append(encoder(
+                        val, shmem_mgr=self._shmem_mgr,
+                        is_function_data_cache_enabled=cache_enabled))
+                    if function_latency is not None \
+                            and output_data[-1].HasField('rpc_shared_memory'):
+                        shmem_write_time += \
+                            time.perf_counter() - output_started_at
+            if unpacked_datums:
+                # The memory map the outputs were packed into could not be
+                # written, so these are sent over RPC
+                output_data = [
+                    protos.ParameterBinding(
+                        name=binding.name,
+                        data=datumdef.datum_as_proto(
+                            unpacked_datums[binding.name]))
+                    if binding.name in unpacked_datums else binding
+                    for binding in output_data]
 
             return_value = None
-            if fi.return_type is not None and not http_v2_enabled:
-                return_value = bindings.to_outgoing_proto(
-                    fi.return_type.binding_name,
-                    call_result,
-                    pytype=fi.return_type.pytype,
-                )
-
-            # Actively flush customer print() function to console
-            sys.stdout.flush()
+            if plan.return_encoder is not None:
+                return_value = plan.return_encoder(call_result)
+            if function_latency is not None:
+                function_latency.record(
+                    latency.ENCODE,
+                    time.perf_counter() - encode_started_at
+                    - shmem_write_time)
+                if shmem_write_time:
+                    function_latency.record(latency.SHMEM_WRITE,
+                                            shmem_write_time)
+                invocation.function_latency = function_latency
+                invocation.response_enqueued_at = time.perf_counter()
+                self._pending_sends[invocation_id] = invocation
+
+            # Actively flush customer print() function to console, captured
+            # output is sent when the invocation completes
+            if not stdio_capture.is_installed():
+                sys.stdout.flush()
 
             return protos.StreamingMessage(
                 request_id=self.request_id,
                 invocation_response=protos.InvocationResponse(
                     invocation_id=invocation_id,
                     return_value=return_value,
-                    result=protos.StatusResult(
-                        status=protos.StatusResult.Success),
+                    result=plan.success_result,
                     output_data=output_data))
 
+        except asyncio.CancelledError:
+            if not invocation.is_cancelled:
+                # The dispatcher itself is shutting down
+                raise
+
+            logger.info('Invocation %s of function %s was cancelled',
+                        invocation_id, function_id)
+            if http_v2_enabled:
+                http_coordinator.set_http_response(
+                    invocation_id,
+                    RuntimeError(f'invocation {invocation_id} was cancelled'))
+
+            return protos.StreamingMessage(
+                request_id=self.request_id,
+                invocation_response=protos.InvocationResponse(
+                    invocation_id=invocation_id,
+                    result=protos.StatusResult(
+                        status=protos.StatusResult.Cancelled)))
+
         except Exception as ex:
             if http_v2_enabled:
                 http_coordinator.set_http_response(invocation_id, ex)
@@ -663,6 +1259,101 @@ class Dispatcher(metaclass=DispatcherMeta):
                         status=protos.StatusResult.Failure,
                         exception=self._serialize_exception(ex))))
 
+        finally:
+            # Ahead of the response, so the host still attributes it
+            stdio_capture.flush_invocation(invocation_id)
+            if concurrency_limiter is not None:
+                concurrency_limiter.release(function_id)
+            # Inputs read in place from shared memory are only valid during
+            # the invocation
+            for mem_map_name in shmem_input_names:
+                self._shmem_mgr.close_input_mem_map(mem_map_name)
+            invocation.dispose()
+            self._inflight_invocations.pop(invocation_id, None)
+
+    async def _handle__invocation_cancel(self, request):
+        """Cooperatively cancels an in-flight invocation.
+
+        The context of the invocation is flagged as cancelled right away. A
+        sync invocation still waiting in the thread pool queue is removed
+        from it, while a running one can only observe the flag. Any other
+        invocation has its task cancelled once the grace period has elapsed.
+        """
+        invocation_cancel = request.invocation_cancel
+        invocation_id = invocation_cancel.invocation_id
+        grace_period = invocation_cancel.grace_period.ToTimedelta()
+
+        logger.info('Received InvocationCancel, request ID %s, '
+                    'invocation ID: %s, grace period: %s',
+                    self.request_id, invocation_id, grace_period)
+
+        invocation = self._inflight_invocations.get(invocation_id)
+        if invocation is None:
+            logger.info('Invocation %s is not in flight, nothing to cancel',
+                        invocation_id)
+            return None
+
+        invocation.cancel(self._loop, grace_period.total_seconds())
+        return None
+
+    async def _handle__worker_terminate(self, request):
+        """Drains the worker before the host terminates it.
+
+        New invocations are rejected right away and in-flight ones get up to
+        the grace period to finish. Invocations still running after that are
+        cancelled and reported as abandoned. The tracked shared memory maps
+        are then freed, the sync thread pool is shut down and the pending
+        logs are flushed before the worker stops.
+        """
+        grace_period = request.worker_terminate.grace_period.ToTimedelta()
+        deadline = self._loop.time() + grace_period.total_seconds()
+        self._terminating = True
+
+        logger.info('Received WorkerTerminate, request ID %s, '
+                    'grace period: %s, in-flight invocations: %s',
+                    self.request_id, grace_period,
+                    len(self._inflight_invocations))
+
+        inflight_tasks = [invocation.task for invocation
+                          in self._inflight_invocations.values()]
+        pending = set()
+        if inflight_tasks:
+            _, pending = await asyncio.wait(
+                inflight_tasks,
+                timeout=max(deadline - self._loop.time(), 0))
+
+        abandoned = [invocation_id for invocation_id, invocation
+                     in self._inflight_invocations.items()
+                     if invocation.task in pending]
+        for invocation_id in abandoned:
+            self._inflight_invocations[invocation_id].cancel(self._loop, 0)
+
+        num_freed = self._shmem_mgr.free_all_mem_maps()
+        # A sync function which outlived the grace period cannot be stopped,
+        # do not wait for it.
+        self._stop_sync_call_tp(wait=False)
+        self._stop_bulkhead_tps(wait=False)
+        self._stop_process_pool(wait=False)
+
+        logger.info('Drained worker, request ID %s, completed invocations: '
+                    '%s, abandoned invocations: %s (%s), '
+                    'freed shared memory maps: %s',
+                    self.request_id, len(inflight_tasks) - len(abandoned),
+                    len(abandoned), ', '.join(abandoned), num_freed)
+
+        await self._flush_resp_queue(
+            max(deadline - self._loop.time(), _TERMINATE_LOG_FLUSH_TIMEOUT))
+
+        if self._dispatch_forever_fut is not None \
+                and not self._dispatch_forever_fut.done():
+            self._dispatch_forever_fut.set_result(None)
+        return None
+
+    async def _flush_resp_queue(self, timeout: float):
+        deadline = self._loop.time() + timeout
+        while self._grpc_resp_queue.qsize() and self._loop.time() < deadline:
+            await asyncio.sleep(0.01)
+
     async def _handle__function_environment_reload_request(self, request):
         """Only runs on Linux Consumption placeholder specialization.
         This is called only when placeholder mode is true. On worker restarts
@@ -694,11 +1385,42 @@ class Dispatcher(metaclass=DispatcherMeta):
             for var in env_vars:
                 os.environ[var] = env_vars[var]
 
-            # Apply PYTHON_THREADPOOL_THREAD_COUNT
-            self._stop_sync_call_tp()
-            self._sync_call_tp = (
-                self._create_sync_call_tp(self._get_sync_tp_max_workers())
-            )
+            # Apply PYTHON_THREADPOOL_THREAD_COUNT. Keep the thread pool when
+            # its size does not change, so that threads started by a
+            # WorkerWarmupRequest survive specialization.
+            max_workers = self._get_sync_tp_max_workers()
+            if is_envvar_true(PYTHON_ENABLE_ADAPTIVE_THREADPOOL) \
+                    or isinstance(self._sync_call_tp,
+                                  AdaptiveThreadPoolExecutor) \
+                    or max_workers is None \
+                    or max_workers != self.get_sync_tp_workers_set():
+                self._stop_sync_call_tp()
+                self._sync_call_tp = self._create_shared_sync_call_tp()
+
+            # Apply PYTHON_THREADPOOL_BULKHEADS
+            self._stop_bulkhead_tps()
+            self._create_bulkhead_tps()
+
+            # Apply PYTHON_PROCESSPOOL_FUNCTIONS
+            self._stop_process_pool()
+            self._create_process_pool()
+
+            # Apply PYTHON_MAX_CONCURRENT_INVOCATIONS*
+            self._concurrency_limiter = self._create_concurrency_limiter()
+
+            # Apply PYTHON_INVOCATION_LOG_*
+            self._invocation_log_sampler = \
+                self._create_invocation_log_sampler()
+
+            # Apply PYTHON_ENABLE_LATENCY_HISTOGRAMS
+            self._update_latency_histograms()
+
+            # Apply PYTHON_GRPC_RECORDING_FILE
+            self._update_grpc_recorder()
+
+            # Apply PYTHON_ENABLE_STDIO_CAPTURE once gRPC logging is set up
+            if DispatcherMeta.__current_dispatcher__ is self:
+                self._update_stdio_capture()
 
             if is_envvar_true(PYTHON_ENABLE_DEBUG_LOGGING):
                 root_logger = logging.getLogger()
@@ -776,9 +1498,9 @@ class Dispatcher(metaclass=DispatcherMeta):
                     function_dir))
 
             indexed_function_logs: List[str] = []
-            indexed_function_bindings_logs = []
             for func in indexed_functions:
                 func_binding_logs = fx_bindings_logs.get(func)
+                indexed_function_bindings_logs = []
                 for binding in func.get_bindings():
                     deferred_binding_info = func_binding_logs.get(
                         binding.name)\
@@ -818,7 +1540,8 @@ class Dispatcher(metaclass=DispatcherMeta):
         results = {mem_map_name: False for mem_map_name in map_names}
 
         try:
-            for map_name in map_names:
+            # Packed outputs share a memory map, which is freed once
+            for map_name in list(results):
                 try:
                     to_delete_resources = not self._function_data_cache_enabled
                     success = self._shmem_mgr.free_mem_map(map_name,
@@ -842,7 +1565,9 @@ class Dispatcher(metaclass=DispatcherMeta):
 
     @staticmethod
     def _get_context(invoc_request: protos.InvocationRequest, name: str,
-                     directory: str) -> bindings.Context:
+                     directory: str,
+                     cancel_event: Optional[threading.Event] = None) \
+            -> bindings.Context:
         """ For more information refer:
         https://aka.ms/azfunc-invocation-context
         """
@@ -858,7 +1583,8 @@ class Dispatcher(metaclass=DispatcherMeta):
 
         return bindings.Context(
             name, directory, invoc_request.invocation_id,
-            _invocation_id_local, trace_context, retry_context)
+            _invocation_id_local, trace_context, retry_context,
+            cancel_event)
 
     @disable_feature_by(PYTHON_ROLLBACK_CWD_PATH)
     def _change_cwd(self, new_cwd: str):
@@ -868,13 +1594,14 @@ class Dispatcher(metaclass=DispatcherMeta):
         else:
             logger.warning('Directory %s is not found when reloading', new_cwd)
 
-    def _stop_sync_call_tp(self):
+    def _stop_sync_call_tp(self, wait: bool = True):
         """Deallocate the current synchronous thread pool and assign
         self._sync_call_tp to None. If the thread pool does not exist,
-        this will be a no op.
+        this will be a no op. With wait=False running functions are not
+        waited for.
         """
         if getattr(self, '_sync_call_tp', None):
-            self._sync_call_tp.shutdown()
+            self._sync_call_tp.shutdown(wait=wait)
             self._sync_call_tp = None
 
     @staticmethod
@@ -915,18 +1642,286 @@ class Dispatcher(metaclass=DispatcherMeta):
     def _create_sync_call_tp(
             self, max_worker: Optional[int]) -> concurrent.futures.Executor:
         """Create a thread pool executor with max_worker. This is a wrapper
-        over ThreadPoolExecutor constructor. Consider calling this method after
+        over FixedThreadPoolExecutor constructor. Consider calling this method after
         _stop_sync_call_tp() to ensure only 1 synchronous thread pool is
         running.
         """
-        return concurrent.futures.ThreadPoolExecutor(
+        return FixedThreadPoolExecutor(
             max_workers=max_worker
         )
 
-    def _run_sync_func(self, invocation_id, context, func, params):
+    def _create_shared_sync_call_tp(self) -> concurrent.futures.Executor:
+        """Create the thread pool shared by sync functions outside of a
+        bulkhead, an adaptive one with PYTHON_ENABLE_ADAPTIVE_THREADPOOL.
+        """
+        if not is_envvar_true(PYTHON_ENABLE_ADAPTIVE_THREADPOOL):
+            return self._create_sync_call_tp(self._get_sync_tp_max_workers())
+
+        min_workers, max_workers = self._get_adaptive_sync_tp_bounds()
+        logger.info('Creating adaptive sync threadpool with %s to %s workers',
+                    min_workers, max_workers)
+        return AdaptiveThreadPoolExecutor(min_workers, max_workers)
+
+    @staticmethod
+    def _get_adaptive_sync_tp_bounds() -> Tuple[int, int]:
+        def bound_validator(setting: str, value: str) -> bool:
+            try:
+                int_value = int(value)
+            except ValueError:
+                logger.warning('%s must be an integer', setting)
+                return False
+
+            if int_value < PYTHON_THREADPOOL_THREAD_COUNT_MIN:
+                logger.warning('%s must be set to a value greater than 0. '
+                               'Reverting to default value', setting)
+                return False
+            return True
+
+        def get_bound(setting: str, default_value: int) -> int:
+            return int(get_app_setting(
+                setting=setting,
+                default_value=f'{default_value}',
+                validator=lambda value: bound_validator(setting, value)))
+
+        min_workers = get_bound(
+            PYTHON_ADAPTIVE_THREADPOOL_MIN_WORKERS,
+            PYTHON_ADAPTIVE_THREADPOOL_MIN_WORKERS_DEFAULT)
+        max_workers = get_bound(
+            PYTHON_ADAPTIVE_THREADPOOL_MAX_WORKERS,
+            PYTHON_ADAPTIVE_THREADPOOL_MAX_WORKERS_DEFAULT)
+        if max_workers < min_workers:
+            logger.warning('%s must not be lower than %s. Using %s for both',
+                           PYTHON_ADAPTIVE_THREADPOOL_MAX_WORKERS,
+                           PYTHON_ADAPTIVE_THREADPOOL_MIN_WORKERS, min_workers)
+            max_workers = min_workers
+        return min_workers, max_workers
+
+    @staticmethod
+    def _get_bulkheads() -> Dict[str, Tuple[int, List[str]]]:
+        """Parses PYTHON_THREADPOOL_BULKHEADS, a semicolon separated list of
+        <bulkhead name>:<max workers>=<function name>[,<function name>...]
+        entries, e.g. 'sql:2=get_orders,get_users;reports:1=daily_report'.
+        Invalid entries are skipped.
+        """
+        bulkheads: Dict[str, Tuple[int, List[str]]] = {}
+        setting = get_app_setting(setting=PYTHON_THREADPOOL_BULKHEADS)
+        if not setting:
+            return bulkheads
+
+        for entry in filter(None, map(str.strip, setting.split(';'))):
+            try:
+                pool, function_names = entry.split('=', 1)
+                name, max_workers = pool.split(':', 1)
+                max_workers = int(max_workers)
+                if max_workers < PYTHON_THREADPOOL_THREAD_COUNT_MIN:
+                    raise ValueError(max_workers)
+            except ValueError:
+                logger.warning('Ignoring invalid %s entry %r. Expected '
+                               '<bulkhead name>:<max workers>='
+                               '<function name>[,<function name>...]',
+                               PYTHON_THREADPOOL_BULKHEADS, entry)
+                continue
+
+            bulkheads[name.strip()] = (
+                max_workers,
+                [f.strip() for f in function_names.split(',') if f.strip()])
+        return bulkheads
+
+    def _create_bulkhead_tps(self):
+        """Create a thread pool for every bulkhead. Consider calling this
+        method after _stop_bulkhead_tps().
+        """
+        for name, (max_workers, function_names) in \
+                self._get_bulkheads().items():
+            self._bulkhead_tps[name] = self._create_sync_call_tp(max_workers)
+            for function_name in function_names:
+                self._bulkhead_by_function[function_name] = name
+            logger.info('Created bulkhead %s with %s sync threadpool workers '
+                        'for functions: %s',
+                        name, max_workers, ', '.join(function_names))
+
+    def _stop_bulkhead_tps(self, wait: bool = True):
+        for sync_tp in self._bulkhead_tps.values():
+            sync_tp.shutdown(wait=wait)
+        self._bulkhead_tps = {}
+        self._bulkhead_by_function = {}
+
+    def _create_process_pool(self):
+        """Create and warm up the process pool when
+        PYTHON_PROCESSPOOL_FUNCTIONS lists functions. Consider calling this
+        method after _stop_process_pool().
+        """
+        def worker_count_validator(value: str) -> bool:
+            try:
+                int_value = int(value)
+            except ValueError:
+                logger.warning('%s must be an integer',
+                               PYTHON_PROCESSPOOL_WORKER_COUNT)
+                return False
+
+            if int_value < 1:
+                logger.warning('%s must be set to a value greater than 0. '
+                               'Reverting to default value',
+                               PYTHON_PROCESSPOOL_WORKER_COUNT)
+                return False
+            return True
+
+        setting = get_app_setting(setting=PYTHON_PROCESSPOOL_FUNCTIONS)
+        function_names = {f.strip() for f in (setting or '').split(',')
+                          if f.strip()}
+        if not function_names:
+            return
+
+        max_workers = int(get_app_setting(
+            setting=PYTHON_PROCESSPOOL_WORKER_COUNT,
+            default_value=f'{os.cpu_count() or 1}',
+            validator=worker_count_validator))
+        self._process_pool = ProcessPool(max_workers)
+        self._process_pool.warm()
+        self._process_pool_functions = function_names
+        logger.info('Created process pool with %s workers for functions: %s',
+                    max_workers, ', '.join(sorted(function_names)))
+        logger.warning('Functions in %s run without the invocation hooks of '
+                       'worker extensions and without the OpenTelemetry '
+                       'context of their invocation: %s',
+                       PYTHON_PROCESSPOOL_FUNCTIONS,
+                       ', '.join(sorted(function_names)))
+
+    def _stop_process_pool(self, wait: bool = True):
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=wait)
+            self._process_pool = None
+        self._process_pool_functions = set()
+
+    @staticmethod
+    def _create_concurrency_limiter() -> ConcurrencyLimiter:
+        def limit_validator(setting: str, value: str) -> bool:
+            try:
+                int_value = int(value)
+            except ValueError:
+                logger.warning('%s must be an integer', setting)
+                return False
+
+            if int_value < 1:
+                logger.warning('%s must be set to a value greater than 0. '
+                               'Reverting to default value', setting)
+                return False
+            return True
+
+        def get_limit(setting: str, default_value: Optional[int] = None) \
+                -> Optional[int]:
+            value = get_app_setting(
+                setting=setting,
+                default_value=(f'{default_value}'
+                               if default_value is not None else None),
+                validator=lambda value: limit_validator(setting, value))
+            return int(value) if value else None
+
+        return ConcurrencyLimiter(
+            max_concurrency=get_limit(PYTHON_MAX_CONCURRENT_INVOCATIONS),
+            max_function_concurrency=get_limit(
+                PYTHON_MAX_CONCURRENT_INVOCATIONS_PER_FUNCTION),
+            queue_size=get_limit(PYTHON_INVOCATION_QUEUE_SIZE,
+                                 PYTHON_INVOCATION_QUEUE_SIZE_DEFAULT),
+            function_limits=Dispatcher._get_function_concurrency_limits())
+
+    @staticmethod
+    def _get_function_concurrency_limits() -> Dict[str, int]:
+        """Parses PYTHON_MAX_CONCURRENT_INVOCATIONS_BY_FUNCTION, a semicolon
+        separated list of <function name>=<max concurrent invocations>
+        entries, e.g. 'get_orders=2;daily_report=1'. Invalid entries are
+        skipped.
+        """
+        limits: Dict[str, int] = {}
+        setting = get_app_setting(
+            setting=PYTHON_MAX_CONCURRENT_INVOCATIONS_BY_FUNCTION)
+        if not setting:
+            return limits
+
+        for entry in filter(None, map(str.strip, setting.split(';'))):
+            try:
+                function_name, limit = entry.split('=', 1)
+                limit = int(limit)
+                if not function_name.strip() or limit < 1:
+                    raise ValueError(limit)
+            except ValueError:
+                logger.warning('Ignoring invalid %s entry %r. Expected '
+                               '<function name>=<max concurrent invocations> '
+                               'with at least 1 invocation',
+                               PYTHON_MAX_CONCURRENT_INVOCATIONS_BY_FUNCTION,
+                               entry)
+                continue
+
+            limits[function_name.strip()] = limit
+        return limits
+
+    @staticmethod
+    def _create_invocation_log_sampler() -> InvocationLogSampler:
+        def sample_rate_validator(value: str) -> bool:
+            try:
+                float_value = float(value)
+            except ValueError:
+                logger.warning('%s must be a number',
+                               PYTHON_INVOCATION_LOG_SAMPLE_RATE)
+                return False
+
+            if not 0 <= float_value <= 1:
+                logger.warning('%s must be set to a value between 0 and 1. '
+                               'Reverting to default value',
+                               PYTHON_INVOCATION_LOG_SAMPLE_RATE)
+                return False
+            return True
+
+        sample_rate = float(get_app_setting(
+            setting=PYTHON_INVOCATION_LOG_SAMPLE_RATE,
+            default_value=f'{PYTHON_INVOCATION_LOG_SAMPLE_RATE_DEFAULT}',
+            validator=sample_rate_validator))
+        setting = get_app_setting(
+            setting=PYTHON_INVOCATION_LOG_DISABLED_FUNCTIONS)
+        disabled_functions = frozenset(
+            f.strip() for f in (setting or '').split(',') if f.strip())
+        return InvocationLogSampler(sample_rate, disabled_functions)
+
+    def _log_invocation_request(self, fi: functions.FunctionInfo,
+                                invocation_id: str,
+                                invocation_time: datetime,
+                                queue_wait_time: Optional[float],
+                                bulkhead: Optional[str],
+                                in_process_pool: bool) -> None:
+        # The arguments are kept apart from the format so that the message
+        # is only formatted by the handlers which emit it
+        log_format = _INVOCATION_LOG_FORMAT
+        log_args: List = [self.request_id, fi.function_id, fi.name,
+                          invocation_id, 'async' if fi.is_async else 'sync',
+                          invocation_time]
+        if queue_wait_time is not None:
+            log_format += ', queue wait time: %.2fms'
+            log_args.append(queue_wait_time * 1000)
+        if in_process_pool:
+            log_format += ', process pool max workers: %s'
+            log_args.append(self._process_pool.max_workers)
+        elif not fi.is_async and bulkhead is not None:
+            log_format += ', bulkhead: %s, sync threadpool max workers: %s'
+            log_args += [bulkhead, self._bulkhead_tps[bulkhead]._max_workers]
+        elif not fi.is_async:
+            log_format += ', sync threadpool max workers: %s'
+            log_args.append(self.get_sync_tp_workers_set())
+        logger.info(log_format, *log_args)
+
+    def _run_sync_func(self, invocation_id, context, func, params,
+                       bulkhead: Optional[str] = None,
+                       function_latency: Optional[FunctionLatency] = None,
+                       submitted_at: float = 0.0):
         # This helper exists because we need to access the current
         # invocation_id from ThreadPoolExecutor's threads.
         context.thread_local_storage.invocation_id = invocation_id
+        with self._sync_invocations_lock:
+            self._sync_invocations_running[bulkhead] = \
+                self._sync_invocations_running.get(bulkhead, 0) + 1
+        if function_latency is not None:
+            started_at = time.perf_counter()
+            function_latency.record(latency.THREADPOOL_WAIT,
+                                    started_at - submitted_at)
         try:
             if self._otel_libs_available:
                 self.configure_opentelemetry(context)
@@ -934,22 +1929,57 @@ class Dispatcher(metaclass=DispatcherMeta):
                                                                 func)(params)
         finally:
             context.thread_local_storage.invocation_id = None
+            with self._sync_invocations_lock:
+                self._sync_invocations_running[bulkhead] -= 1
+            if function_latency is not None:
+                function_latency.record(latency.USER_CODE,
+                                        time.perf_counter() - started_at)
 
     async def _run_async_func(self, context, func, params):
         return await ExtensionManager.get_async_invocation_wrapper(
             context, func, params
         )
 
-    def __poll_grpc(self):
+    @staticmethod
+    def _create_grpc_recorder() -> Optional[MessageRecorder]:
+        path = get_app_setting(setting=PYTHON_GRPC_RECORDING_FILE)
+        if not path:
+            return None
+
+        try:
+            recorder = MessageRecorder(path)
+        except OSError as ex:
+            logger.warning('Cannot record the messages from the host to %s: '
+                           '%s', path, ex)
+            return None
+        logger.info('Recording the messages from the host to %s', path)
+        return recorder
+
+    def _update_grpc_recorder(self) -> None:
+        """Starts, stops or moves the recording of the messages from the host
+        as PYTHON_GRPC_RECORDING_FILE says, keeps it going when unchanged.
+        """
+        recorder = self._grpc_recorder
+        path = get_app_setting(setting=PYTHON_GRPC_RECORDING_FILE)
+        if recorder is not None and recorder.path == path:
+            return
+
+        self._grpc_recorder = self._create_grpc_recorder()
+        if recorder is not None:
+            recorder.close()
+
+    def _get_grpc_channel_options(self) -> List[tuple]:
         options = []
         if self._grpc_max_msg_len:
             options.append(('grpc.max_receive_message_length',
                             self._grpc_max_msg_len))
             options.append(('grpc.max_send_message_length',
                             self._grpc_max_msg_len))
+        return options
 
+    def __poll_grpc(self):
         channel = grpc.insecure_channel(
-            f'{self._host}:{self._port}', options)
+            f'{self._host}:{self._port}', self._get_grpc_channel_options())
 
         try:
             grpc.channel_ready_future(channel).result(
@@ -970,13 +2000,20 @@ class Dispatcher(metaclass=DispatcherMeta):
                 if msg is self._GRPC_STOP_RESPONSE:
                     grpc_req_stream.cancel()
                     return
+                if self._pending_sends:
+                    self._record_send(msg)
                 yield msg
 
         grpc_req_stream = stub.EventStream(gen(self._grpc_resp_queue))
         try:
             for req in grpc_req_stream:
+                # Replaced on environment reload
+                recorder = self._grpc_recorder
+                if recorder is not None:
+                    recorder.record(req)
                 self._loop.call_soon_threadsafe(
-                    self._loop.create_task, self._dispatch_grpc_request(req))
+                    self._loop.create_task,
+                    self._dispatch_grpc_request(req, time.perf_counter()))
         except Exception as ex:
             if ex is grpc_req_stream:
                 # Yes, this is how grpc_req_stream iterator exits.
@@ -986,6 +2023,121 @@ class Dispatcher(metaclass=DispatcherMeta):
                     format_exception(ex)))
             raise
 
+    async def __poll_grpc_aio(self):
+        """Drives the event stream with grpc.aio on the dispatcher's event
+        loop. Incoming messages are dispatched without a thread hop and
+        outgoing messages are awaited from an asyncio queue.
+        """
+        channel = grpc.aio.insecure_channel(
+            f'{self._host}:{self._port}', self._get_grpc_channel_options())
+
+        try:
+            await asyncio.wait_for(channel.channel_ready(),
+                                   timeout=self._grpc_connect_timeout)
+        except Exception as ex:
+            self._grpc_connected_fut.set_exception(ex)
+            await channel.close()
+            return
+        else:
+            self._grpc_connected_fut.set_result(True)
+
+        stub = protos.FunctionRpcStub(channel)
+
+        async def gen(resp_queue):
+            while True:
+                msg = await resp_queue.get()
+                if msg is self._GRPC_STOP_RESPONSE:
+                    return
+                if self._pending_sends:
+                    self._record_send(msg)
+                yield msg
+
+        grpc_req_stream = stub.EventStream(gen(self._grpc_resp_queue))
+        try:
+            async for req in grpc_req_stream:
+                # Replaced on environment reload
+                recorder = self._grpc_recorder
+                if recorder is not None:
+                    recorder.record(req)
+                self._loop.create_task(
+                    self._dispatch_grpc_request(req, time.perf_counter()))
+        except asyncio.CancelledError:
+            pass
+        except Exception as ex:
+            error_logger.exception(
+                'unhandled error in gRPC task. Exception: {0}'.format(
+                    format_exception(ex)))
+            raise
+        finally:
+            grpc_req_stream.cancel()
+            await channel.close()
+
+
+class _InFlightInvocation:
+    """Tracks an invocation until its response is sent."""
+
+    def __init__(self, task: asyncio.Task) -> None:
+        self.task = task
+        # Shared with the invocation context, so that functions (and sync
+        # functions in particular) can observe the cancellation.
+        self.cancel_event = threading.Event()
+        self.sync_future: Optional[concurrent.futures.Future] = None
+        # Set with PYTHON_ENABLE_LATENCY_HISTOGRAMS once the response is
+        # enqueued, to record the send
+        self.function_latency: Optional[FunctionLatency] = None
+        self.response_enqueued_at = 0.0
+        self._cancel_handle: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def is_cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def cancel(self, loop: BaseEventLoop, grace_period: float) -> None:
+        if self.is_cancelled:
+            return
+
+        self.cancel_event.set()
+        if self.sync_future is not None:
+            # Only succeeds if the function has not started running yet
+            self.sync_future.cancel()
+        else:
+            self._cancel_handle = loop.call_later(
+                max(grace_period, 0), self.task.cancel)
+
+    def dispose(self) -> None:
+        if self._cancel_handle is not None:
+            self._cancel_handle.cancel()
+            self._cancel_handle = None
+
+
+class _AsyncResponseQueue:
+    """Outgoing message queue used by the grpc.aio transport.
+
+    put_nowait() keeps the contract of queue.Queue and may be called from
+    any thread (e.g. logging from the sync thread pool); messages put from
+    outside of the event loop are handed over with call_soon_threadsafe.
+    """
+
+    def __init__(self, loop: BaseEventLoop) -> None:
+        self._loop = loop
+        self._queue: asyncio.Queue = asyncio.Queue()
+
+    def put_nowait(self, msg) -> None:
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is self._loop:
+            self._queue.put_nowait(msg)
+        else:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, msg)
+
+    async def get(self):
+        return await self._queue.get()
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
 
 class AsyncLoggingHandler(logging.Handler):
     def emit(self, record: LogRecord) -> None:
@@ -1011,8 +2163,8 @@ class AsyncLoggingHandler(logging.Handler):
 class ContextEnabledTask(asyncio.Task):
     AZURE_INVOCATION_ID = '__azure_function_invocation_id__'
 
-    def __init__(self, coro, loop):
-        super().__init__(coro, loop=loop)
+    def __init__(self, coro, loop, **kwargs):
+        super().__init__(coro, loop=loop, **kwargs)
 
         current_task = asyncio.current_task(loop)
         if current_task is not None:
@@ -0,0 +1,64 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+"""Event loop the worker runs on.
+
+With PYTHON_ENABLE_UVLOOP the worker runs on a uvloop loop when uvloop can
+be imported, which makes task creation, futures and callbacks from the gRPC
+thread cheaper than on the default loop. Without uvloop (e.g. on Windows),
+the worker falls back to the default loop.
+"""
+
+import asyncio
+import sys
+from typing import Any, Callable, Coroutine, Optional
+
+from .constants import PYTHON_ENABLE_UVLOOP
+from .logging import logger
+from .utils.common import is_envvar_true
+
+LoopFactory = Callable[[], asyncio.AbstractEventLoop]
+
+
+def get_loop_factory() -> Optional[LoopFactory]:
+    """Factory of the loops to run the worker on, None for the default."""
+    if not is_envvar_true(PYTHON_ENABLE_UVLOOP):
+        return None
+
+    try:
+        import uvloop
+    except ImportError:
+        logger.warning('%s is set but uvloop cannot be imported, using the '
+                       'default event loop.', PYTHON_ENABLE_UVLOOP)
+        return None
+
+    logger.info('Using uvloop %s event loop.', uvloop.__version__)
+    return uvloop.new_event_loop
+
+
+def run(main: Coroutine[Any, Any, Any],
+        loop_factory: Optional[LoopFactory] = None) -> Any:
+    """asyncio.run on a loop of loop_factory."""
+    if loop_factory is None:
+        return asyncio.run(main)
+
+    if sys.version_info >= (3, 11):
+        with asyncio.Runner(loop_factory=loop_factory) as runner:
+            return runner.run(main)
+
+    # Before Python 3.11, asyncio.run creates the loop of the policy
+    old_policy = asyncio.get_event_loop_policy()
+    asyncio.set_event_loop_policy(_LoopFactoryPolicy(loop_factory))
+    try:
+        return asyncio.run(main)
+    finally:
+        asyncio.set_event_loop_policy(old_policy)
+
+
+class _LoopFactoryPolicy(asyncio.DefaultEventLoopPolicy):
+
+    def __init__(self, loop_factory: LoopFactory) -> None:
+        super().__init__()
+        self._loop_factory = loop_factory
+
+    def new_event_loop(self) -> asyncio.AbstractEventLoop:
+        return self._loop_factory()
@@ -9,6 +9,7 @@ import uuid
 from .constants import HTTP_TRIGGER
 from . import bindings as bindings_utils
 from . import protos
+from .http_v2 import HttpV2Registry
 from ._thirdparty import typing_inspect
 from .protos import BindingInfo
 
@@ -37,6 +38,58 @@ class FunctionInfo(typing.NamedTuple):
 
     trigger_metadata: typing.Optional[typing.Dict[str, typing.Any]]
 
+    invocation_plan: typing.Optional['InvocationPlan'] = None
+
+
+class InvocationPlan(typing.NamedTuple):
+    """What invoking a function takes, resolved when the function is
+    loaded instead of on every invocation.
+    """
+    # key: input binding name, val: (decoder, is a trigger binding)
+    inputs: typing.Mapping[str, typing.Tuple[typing.Callable, bool]]
+    # (name, encoder) of every output binding
+    outputs: typing.Tuple[typing.Tuple[str, typing.Callable], ...]
+    # None when the return value is not sent back in the response
+    return_encoder: typing.Optional[typing.Callable]
+    # Parameter receiving the request of an HTTP streaming function
+    http_v2_param_name: typing.Optional[str]
+    success_result: protos.StatusResult
+
+
+def build_invocation_plan(function_info: FunctionInfo) -> InvocationPlan:
+    inputs = {
+        name: (bindings_utils.get_incoming_proto_decoder(
+            type_info.binding_name,
+            pytype=type_info.pytype,
+            is_deferred_binding=type_info.deferred_bindings_enabled),
+            bindings_utils.is_trigger_binding(type_info.binding_name))
+        for name, type_info in function_info.input_types.items()
+    }
+    outputs = tuple(
+        (name, bindings_utils.get_outgoing_param_binding_encoder(
+            type_info.binding_name, pytype=type_info.pytype,
+            out_name=name))
+        for name, type_info in function_info.output_types.items()
+    )
+
+    http_v2_param_name = None
+    if function_info.is_http_func and HttpV2Registry.http_v2_enabled():
+        http_v2_param_name = function_info.trigger_metadata.get('param_name')
+
+    return_encoder = None
+    if function_info.return_type is not None and http_v2_param_name is None:
+        return_encoder = bindings_utils.get_outgoing_proto_encoder(
+            function_info.return_type.binding_name,
+            pytype=function_info.return_type.pytype)
+
+    return InvocationPlan(
+        inputs=inputs,
+        outputs=outputs,
+        return_encoder=return_encoder,
+        http_v2_param_name=http_v2_param_name,
+        success_result=protos.StatusResult(
+            status=protos.StatusResult.Success))
+
 
 class FunctionLoadError(RuntimeError):
 
@@ -341,6 +394,8 @@ class Registry:
             output_types=output_types,
             return_type=return_type,
             trigger_metadata=trigger_metadata)
+        function_info = function_info._replace(
+            invocation_plan=build_invocation_plan(function_info))
 
         self._functions[function_id] = function_info
 
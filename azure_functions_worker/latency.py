@@ -0,0 +1,130 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+"""Latency histograms of the phases of an invocation, per function.
+
+Every histogram has the same fixed buckets, so recording a duration only
+increments counters of lists allocated when the function is first seen. The
+invocations look the histograms of their function up once and record into
+them directly.
+"""
+
+import bisect
+import threading
+from typing import Any, Dict, List
+
+# Phases of an invocation, in order
+PHASES = (
+    'receive',          # gRPC message received -> invocation task started
+    'decode',           # input bindings decoded
+    'shmem_read',       # input bindings read from shared memory
+    'threadpool_wait',  # sync function queued in its thread pool
+    'user_code',        # function ran
+    'encode',           # output bindings and return value encoded
+    'shmem_write',      # output bindings written to shared memory
+    'send',             # response enqueued -> handed over to gRPC
+)
+(RECEIVE, DECODE, SHMEM_READ, THREADPOOL_WAIT, USER_CODE, ENCODE, SHMEM_WRITE,
+ SEND) = range(len(PHASES))
+
+# Upper bounds of the buckets in milliseconds, the last bucket is unbounded
+BUCKET_BOUNDS_MS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50,
+                    100, 250, 500, 1000, 2500, 5000, 10000)
+_BUCKET_BOUNDS = tuple(bound / 1000 for bound in BUCKET_BOUNDS_MS)
+_BUCKET_LABELS = tuple(f'{bound:g}' for bound in BUCKET_BOUNDS_MS) + ('+Inf',)
+
+
+class LatencyHistogram:
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(_BUCKET_BOUNDS) + 1)
+        self.reset()
+
+    def reset(self) -> None:
+        self.counts[:] = [0] * len(self.counts)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(_BUCKET_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'sum_ms': self.total * 1000,
+            'max_ms': self.max * 1000,
+            # Upper bound in ms -> count, empty buckets are left out
+            'buckets': {label: count
+                        for label, count in zip(_BUCKET_LABELS, self.counts)
+                        if count}
+        }
+
+
+class FunctionLatency:
+    """Histograms of every phase of a function, recorded under the lock of
+    its LatencyRecorder. Invocations look it up once and record into it.
+    """
+    __slots__ = ('histograms', '_lock')
+
+    def __init__(self, lock: threading.Lock) -> None:
+        self.histograms: List[LatencyHistogram] = [
+            LatencyHistogram() for _ in PHASES]
+        self._lock = lock
+
+    def record(self, phase: int, seconds: float) -> None:
+        with self._lock:
+            # LatencyHistogram.record() inlined, this is on the hot path
+            histogram = self.histograms[phase]
+            histogram.counts[bisect.bisect_left(_BUCKET_BOUNDS, seconds)] += 1
+            histogram.count += 1
+            histogram.total += seconds
+            if seconds > histogram.max:
+                histogram.max = seconds
+
+
+class LatencyRecorder:
+    """Histograms of every phase for every function. Thread safe, durations
+    of sync functions are recorded from their thread pool threads.
+    """
+
+    def __init__(self) -> None:
+        # key: function name, val: its histograms
+        self._functions: Dict[str, FunctionLatency] = {}
+        self._lock = threading.Lock()
+
+    def get(self, function_name: str) -> FunctionLatency:
+        """The histograms of a function, allocated when it is first seen."""
+        function_latency = self._functions.get(function_name)
+        if function_latency is None:
+            with self._lock:
+                function_latency = self._functions.setdefault(
+                    function_name, FunctionLatency(self._lock))
+        return function_latency
+
+    def record(self, function_name: str, phase: int, seconds: float) -> None:
+        self.get(function_name).record(phase, seconds)
+
+    def snapshot(self, reset: bool = False) -> Dict[str, Dict[str, Any]]:
+        """Function name -> phase -> histogram, leaving out what was not
+        recorded. With reset the histograms start over.
+        """
+        with self._lock:
+            snapshot = {
+                function_name: {
+                    phase: histogram.to_dict()
+                    for phase, histogram in zip(
+                        PHASES, function_latency.histograms)
+                    if histogram.count}
+                for function_name, function_latency in self._functions.items()
+                if any(histogram.count
+                       for histogram in function_latency.histograms)}
+            if reset:
+                for function_latency in self._functions.values():
+                    for histogram in function_latency.histograms:
+                        histogram.reset()
+        return snapshot
@@ -31,11 +31,16 @@ _submodule_dirs = []
 
 def register_function_dir(path: PathLike) -> None:
     try:
-        _submodule_dirs.append(fspath(path))
+        function_dir = fspath(path)
     except TypeError as e:
         raise RuntimeError(f'Path ({path}) is incompatible with fspath. '
                            f'It is of type {type(path)}.', e)
 
+    # Every function of an app registers the same parent directory. Keep the
+    # __app__ search locations unique so that imports do not rescan them.
+    if function_dir not in _submodule_dirs:
+        _submodule_dirs.append(function_dir)
+
 
 def install() -> None:
     if _AZURE_NAMESPACE not in sys.modules:
@@ -5,7 +5,7 @@ import logging
 import logging.handlers
 import sys
 import traceback
-from typing import Optional
+from typing import FrozenSet, Optional
 
 # Logging Prefixes
 CONSOLE_LOG_PREFIX = "LanguageWorkerConsoleLog"
@@ -22,6 +22,32 @@ handler: Optional[logging.Handler] = None
 error_handler: Optional[logging.Handler] = None
 
 
+class InvocationLogSampler:
+    """Decides which invocations log "Received FunctionInvocationRequest".
+
+    One in every 1 / sample_rate invocations is logged, spread evenly rather
+    than at random so the logged share is exact. Functions listed in
+    disabled_functions are never logged. Only used from the event loop.
+    """
+
+    def __init__(self, sample_rate: float = 1.0,
+                 disabled_functions: FrozenSet[str] = frozenset()) -> None:
+        self.sample_rate = sample_rate
+        self.disabled_functions = disabled_functions
+        self._credit = 0.0
+
+    def should_log(self, function_name: str) -> bool:
+        if function_name in self.disabled_functions:
+            return False
+        if self.sample_rate >= 1:
+            return True
+        self._credit += self.sample_rate
+        if self._credit < 1:
+            return False
+        self._credit -= 1
+        return True
+
+
 def format_exception(exception: Exception) -> str:
     msg = str(exception) + "\n"
     if (sys.version_info.major, sys.version_info.minor) < (3, 10):
@@ -45,8 +45,7 @@ def main():
     DependencyManager.initialize()
     DependencyManager.use_worker_dependencies()
 
-    import asyncio
-    from . import logging
+    from . import event_loop, logging
     from .logging import error_logger, logger, format_exception
 
     args = parse_args()
@@ -57,8 +56,10 @@ def main():
                 args.worker_id, args.request_id, args.host, args.port)
 
     try:
-        return asyncio.run(start_async(
-            args.host, args.port, args.worker_id, args.request_id))
+        return event_loop.run(
+            start_async(args.host, args.port, args.worker_id,
+                        args.request_id),
+            event_loop.get_loop_factory())
     except Exception as ex:
         error_logger.exception(
             'unhandled error in functions worker: {0}'.format(
@@ -0,0 +1,372 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+"""Runs sync functions in a pool of worker processes.
+
+Sync functions listed in PYTHON_PROCESSPOOL_FUNCTIONS run in processes which
+are started and warmed up ahead of their first invocation, so CPU bound
+functions are not serialised by the GIL. The processes are spawned rather
+than forked, as forking next to the gRPC threads is not safe.
+
+Arguments and return values are pickled. Bytes payloads (including HTTP
+bodies) of MIN_BYTES_FOR_SHARED_MEM_TRANSFER bytes or more are passed
+through shared memory instead. Log records of the function are sent back
+with its result and logged again in the context of the invocation.
+
+The functions are called as they are: the pre and post invocation hooks of
+worker extensions and the OpenTelemetry context of the invocation, which
+live in the host process, are not applied to them.
+"""
+
+import asyncio
+import concurrent.futures
+import functools
+import importlib
+import io
+import logging
+import multiprocessing
+import sys
+import threading
+from asyncio import AbstractEventLoop
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from . import bindings, loader
+from .bindings.rpcexception import RpcException
+from .bindings.shared_memory_data_transfer import SharedMemoryConstants \
+    as consts
+from .bindings.shared_memory_data_transfer import SharedMemoryInputStream
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    # Python 3.7, payloads are always pickled
+    shared_memory = None
+
+# Attribute of an exception raised by a function holding its log records
+_LOGS_ATTR = '_azure_functions_process_logs'
+
+
+class ProcessFunctionRef(NamedTuple):
+    """Tells a worker process how to find a function."""
+    module: str
+    qualname: str
+    # Import state of the host process, which changes once the function app
+    # is loaded, long after the worker processes were started.
+    sys_path: Tuple[str, ...]
+    app_dirs: Tuple[str, ...]
+    log_level: int
+
+
+class ProcessCallResult(NamedTuple):
+    value: Any
+    # key: output binding name, val: value set on its Out parameter
+    outputs: Dict[str, Any]
+    # (logger name, level, message) of every record logged by the function
+    logs: List[Tuple[str, int, str]]
+
+
+class _SharedBytes(NamedTuple):
+    name: str
+    size: int
+
+
+class _PackedHttpRequest(NamedTuple):
+    method: str
+    url: str
+    headers: Dict[str, str]
+    params: Dict[str, str]
+    route_params: Dict[str, str]
+    body: Any
+
+
+class _PackedHttpResponse(NamedTuple):
+    body: Any
+    status_code: int
+    headers: Dict[str, str]
+    mimetype: Optional[str]
+    charset: Optional[str]
+
+
+class ProcessPool:
+
+    def __init__(self, max_workers: int) -> None:
+        self._max_workers = max_workers
+        self._executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context('spawn'))
+
+    @property
+    def max_workers(self) -> int:
+        return self._max_workers
+
+    def warm(self) -> List[concurrent.futures.Future]:
+        """Starts every worker process and imports the worker in it."""
+        return [self._executor.submit(_warm)
+                for _ in range(self._max_workers)]
+
+    def submit(self, func: Callable, context: Optional[bindings.Context],
+               params: Dict[str, Any]) -> concurrent.futures.Future:
+        ref = ProcessFunctionRef(
+            module=func.__module__,
+            qualname=func.__qualname__,
+            sys_path=tuple(sys.path),
+            app_dirs=tuple(loader._submodule_dirs),
+            log_level=logging.getLogger().getEffectiveLevel())
+        context_args = None if context is None else _pack_context(context)
+
+        segments: List[Any] = []
+        packed = {name: _pack(value, segments)
+                  for name, value in params.items() if name != 'context'}
+        call_future = self._executor.submit(_call, ref, context_args, packed)
+        if segments:
+            call_future.add_done_callback(lambda _: _unlink(segments))
+
+        # The results are unpacked as soon as the call completes, so the
+        # segments of the worker process are unlinked even if the future is
+        # cancelled or never awaited.
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        future.add_done_callback(
+            lambda f: f.cancelled() and call_future.cancel())
+        call_future.add_done_callback(
+            functools.partial(_complete, future))
+        return future
+
+    @staticmethod
+    async def wait(future: concurrent.futures.Future,
+                   loop: AbstractEventLoop, params: Dict[str, Any]) -> Any:
+        """Waits for the result of submit(), logs the records of the
+        function and sets its output bindings on params. Must be awaited
+        from the invocation's task for the logs to carry its invocation id.
+        """
+        try:
+            result: ProcessCallResult = await asyncio.wrap_future(
+                future, loop=loop)
+        except Exception as exc:
+            _log_records(getattr(exc, _LOGS_ATTR, ()))
+            raise
+
+        _log_records(result.logs)
+        for name, value in result.outputs.items():
+            params[name].set(value)
+        return result.value
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+
+
+def _complete(future: concurrent.futures.Future,
+              call_future: concurrent.futures.Future) -> None:
+    if call_future.cancelled():
+        future.cancel()
+        return
+    exc = call_future.exception()
+    if exc is not None:
+        if future.set_running_or_notify_cancel():
+            future.set_exception(exc)
+        return
+
+    result: ProcessCallResult = call_future.result()
+    try:
+        result = result._replace(
+            value=_unpack(result.value, unlink=True),
+            outputs={name: _unpack(value, unlink=True)
+                     for name, value in result.outputs.items()})
+    except BaseException as exc:
+        if future.set_running_or_notify_cancel():
+            future.set_exception(exc)
+        return
+    if future.set_running_or_notify_cancel():
+        future.set_result(result)
+
+
+def _pack_context(context: bindings.Context) -> tuple:
+    # The contexts hold protobuf messages, which cannot be pickled
+    trace_context = context.trace_context
+    retry_context = context.retry_context
+    rpc_exception = retry_context.rpc_exception
+    return (context.function_name, context.function_directory,
+            context.invocation_id,
+            bindings.TraceContext(trace_context.trace_parent,
+                                  trace_context.trace_state,
+                                  dict(trace_context.attributes)),
+            bindings.RetryContext(
+                retry_context.retry_count, retry_context.max_retry_count,
+                RpcException(rpc_exception.source, rpc_exception.stack_trace,
+                             rpc_exception.message)))
+
+
+def _log_records(records) -> None:
+    for name, level, message in records:
+        logging.getLogger(name).log(level, '%s', message)
+
+
+def _pack(value: Any, segments: Optional[List[Any]]) -> Any:
+    import azure.functions as func
+
+    if isinstance(value, SharedMemoryInputStream):
+        # Inputs read in place from the memory maps of the functions host
+        # (see PYTHON_SHARED_MEMORY_INPUT_TYPE) are copied for the worker
+        # processes, which do not open these
+        return io.BytesIO(value.getbuffer())
+    if isinstance(value, (bytes, bytearray, memoryview)) \
+            and shared_memory is not None \
+            and len(value) >= consts.MIN_BYTES_FOR_SHARED_MEM_TRANSFER:
+        shm = shared_memory.SharedMemory(create=True, size=len(value))
+        shm.buf[:len(value)] = value
+        if segments is None:
+            # Created by a worker process, the host process unlinks it
+            shm.close()
+        else:
+            segments.append(shm)
+        return _SharedBytes(shm.name, len(value))
+    if isinstance(value, memoryview):
+        return value.tobytes()
+
+    if isinstance(value, func.HttpRequest):
+        return _PackedHttpRequest(
+            value.method, value.url, dict(value.headers), dict(value.params),
+            dict(value.route_params), _pack(value.get_body(), segments))
+    if isinstance(value, func.HttpResponse):
+        return _PackedHttpResponse(
+            _pack(value.get_body(), segments), value.status_code,
+            dict(value.headers), value.mimetype, value.charset)
+    return value
+
+
+def _unpack(value: Any, unlink: bool = False) -> Any:
+    import azure.functions as func
+
+    if isinstance(value, _SharedBytes):
+        shm = shared_memory.SharedMemory(name=value.name) if unlink \
+            else _attach(value.name)
+        try:
+            with shm.buf[:value.size] as view:
+                return bytes(view)
+        finally:
+            shm.close()
+            if unlink:
+                shm.unlink()
+
+    if isinstance(value, _PackedHttpRequest):
+        return func.HttpRequest(
+            value.method, value.url, headers=value.headers,
+            params=value.params, route_params=value.route_params,
+            body=_unpack(value.body, unlink))
+    if isinstance(value, _PackedHttpResponse):
+        return func.HttpResponse(
+            _unpack(value.body, unlink), status_code=value.status_code,
+            headers=value.headers, mimetype=value.mimetype,
+            charset=value.charset)
+    return value
+
+
+_attach_lock = threading.Lock()
+
+
+def _attach(name: str) -> Any:
+    """Opens a segment which another process unlinks, without tracking it.
+
+    The worker processes share the resource tracker of the host process,
+    which tracks every segment once until the process unlinking it
+    unregisters it. Unregistering an opened segment would untrack it for
+    its creator too, so the registration is skipped instead.
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+
+    from multiprocessing import resource_tracker
+    with _attach_lock:
+        register = resource_tracker.register
+        resource_tracker.register = lambda name, rtype: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+
+def _unlink(segments: List[Any]) -> None:
+    for shm in segments:
+        shm.close()
+        shm.unlink()
+
+
+# Everything below runs in the worker processes
+
+# key: (module, qualname), val: function
+_functions: Dict[Tuple[str, str], Callable] = {}
+
+
+class _LogCollector(logging.Handler):
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.records: List[Tuple[str, int, str]] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.records.append((record.name, record.levelno, self.format(record)))
+
+
+def _warm() -> None:
+    import azure.functions  # NoQA
+
+
+def _resolve(ref: ProcessFunctionRef) -> Callable:
+    key = (ref.module, ref.qualname)
+    func = _functions.get(key)
+    if func is not None:
+        return func
+
+    sys.path[:] = ref.sys_path
+    loader.install()
+    for app_dir in ref.app_dirs:
+        loader.register_function_dir(app_dir)
+
+    module = importlib.import_module(ref.module)
+    func = module
+    for name in ref.qualname.split('.'):
+        func = getattr(func, name)
+    if getattr(func, '__qualname__', None) != ref.qualname:
+        # The decorators of a V2 function app replace the function with
+        # its builder, find the function through the app instead.
+        for indexed_function in loader.index_function_app(module.__file__):
+            user_function = indexed_function.get_user_function()
+            if (user_function.__module__, user_function.__qualname__) \
+                    == key:
+                func = user_function
+                break
+        else:
+            raise RuntimeError(f'cannot find function {ref.qualname} in '
+                               f'module {ref.module}')
+
+    _functions[key] = func
+    return func
+
+
+def _call(ref: ProcessFunctionRef, context_args: Optional[tuple],
+          params: Dict[str, Any]) -> ProcessCallResult:
+    collector = _LogCollector()
+    root_logger = logging.getLogger()
+    root_logger.setLevel(ref.log_level)
+    root_logger.addHandler(collector)
+    try:
+        func = _resolve(ref)
+        params = {name: _unpack(value) for name, value in params.items()}
+        if context_args is not None:
+            name, directory, invocation_id, trace_context, retry_context = \
+                context_args
+            thread_local_storage = threading.local()
+            thread_local_storage.invocation_id = invocation_id
+            params['context'] = bindings.Context(
+                name, directory, invocation_id, thread_local_storage,
+                trace_context, retry_context)
+
+        value = func(**params)
+        outputs = {name: _pack(param.get(), None)
+                   for name, param in params.items()
+                   if isinstance(param, bindings.Out)}
+        return ProcessCallResult(_pack(value, None), outputs,
+                                 collector.records)
+    except BaseException as exc:
+        setattr(exc, _LOGS_ATTR, collector.records)
+        raise
+    finally:
+        root_logger.removeHandler(collector)
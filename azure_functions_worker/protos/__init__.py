@@ -11,13 +11,19 @@ from .FunctionRpc_pb2 import (  # NoQA
     RpcFunctionMetadata,
     FunctionLoadRequest,
     FunctionLoadResponse,
+    FunctionLoadRequestCollection,
+    FunctionLoadResponseCollection,
     FunctionEnvironmentReloadRequest,
     FunctionEnvironmentReloadResponse,
     InvocationRequest,
     InvocationResponse,
+    InvocationCancel,
     WorkerHeartbeat,
     WorkerStatusRequest,
     WorkerStatusResponse,
+    WorkerTerminate,
+    WorkerWarmupRequest,
+    WorkerWarmupResponse,
     BindingInfo,
     StatusResult,
     RpcException,
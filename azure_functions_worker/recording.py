@@ -0,0 +1,85 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+"""Records the StreamingMessages a host sends to the worker.
+
+With PYTHON_GRPC_RECORDING_FILE every message the worker receives is
+appended to the file along with when it was received, so that the traffic
+can be replayed against a worker later (see tests/utils/replay.py).
+
+The file starts with MAGIC, followed by one record per message: the seconds
+since the recording started as a little-endian double, the length of the
+message as a little-endian uint32 and the serialized message. Files with a
+.gz suffix are gzip compressed.
+"""
+
+import gzip
+import struct
+import threading
+import time
+from typing import BinaryIO, Iterator, NamedTuple
+
+from . import protos
+
+MAGIC = b'AFWREC1\n'
+_RECORD_HEADER = struct.Struct('<dI')
+
+
+class RecordedMessage(NamedTuple):
+    # Seconds since the recording started
+    offset: float
+    message: protos.StreamingMessage
+
+
+class MessageRecorder:
+
+    def __init__(self, path: str) -> None:
+        self._path = path
+        self._file = _open(path, 'wb')
+        self._file.write(MAGIC)
+        self._start = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def record(self, message: protos.StreamingMessage) -> None:
+        data = message.SerializeToString()
+        offset = time.monotonic() - self._start
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(_RECORD_HEADER.pack(offset, len(data)))
+            self._file.write(data)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def read_recording(path: str) -> Iterator[RecordedMessage]:
+    with _open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f'{path} is not a recording of StreamingMessages')
+
+        while True:
+            header = f.read(_RECORD_HEADER.size)
+            if not header:
+                return
+            if len(header) < _RECORD_HEADER.size:
+                raise ValueError(f'{path} is truncated')
+
+            offset, size = _RECORD_HEADER.unpack(header)
+            data = f.read(size)
+            if len(data) < size:
+                raise ValueError(f'{path} is truncated')
+            yield RecordedMessage(offset,
+                                  protos.StreamingMessage.FromString(data))
+
+
+def _open(path: str, mode: str) -> BinaryIO:
+    if path.endswith('.gz'):
+        return gzip.open(path, mode)
+    return open(path, mode)
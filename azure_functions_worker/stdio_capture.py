@@ -0,0 +1,154 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+"""Captures what functions write to sys.stdout and sys.stderr.
+
+With PYTHON_ENABLE_STDIO_CAPTURE the streams are replaced by buffers which
+group the output by the invocation writing it, so that it reaches the host
+as RpcLogs carrying the invocation id instead of console lines without one.
+
+Nothing is written to the console. The output of an invocation is handed to
+the sink when the invocation completes, and everything buffered when
+FLUSH_SIZE characters are pending, when FLUSH_INTERVAL seconds have passed
+since the last flush or when flush() is called.
+"""
+
+import io
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Characters buffered across invocations before they are flushed
+FLUSH_SIZE = 64 * 1024
+# Seconds buffered output waits at most before it is flushed
+FLUSH_INTERVAL = 1.0
+
+# (invocation id, stream name, text)
+OutputSink = Callable[[Optional[str], str, str], None]
+
+_streams: Optional[Tuple['InvocationOutputStream', ...]] = None
+_original_streams: Optional[Tuple[io.TextIOBase, io.TextIOBase]] = None
+
+
+class InvocationOutputStream(io.TextIOBase):
+
+    def __init__(self, name: str, original: io.TextIOBase, sink: OutputSink,
+                 get_invocation_id: Callable[[], Optional[str]]) -> None:
+        super().__init__()
+        self._name = name
+        self._original = original
+        self._sink = sink
+        self._get_invocation_id = get_invocation_id
+
+        # key: invocation id (None outside of invocations), val: pending text
+        self._buffers: Dict[Optional[str], List[str]] = {}
+        self._buffered = 0
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def name(self) -> str:
+        return f'<{self._name}>'
+
+    @property
+    def encoding(self) -> str:
+        return getattr(self._original, 'encoding', 'utf-8')
+
+    def writable(self) -> bool:
+        return True
+
+    def isatty(self) -> bool:
+        return False
+
+    def fileno(self) -> int:
+        # For libraries writing to the file descriptor directly
+        return self._original.fileno()
+
+    def write(self, s: str) -> int:
+        if not isinstance(s, str):
+            raise TypeError(
+                f'write() argument must be str, not {type(s).__name__}')
+        if not s:
+            return 0
+
+        invocation_id = self._get_invocation_id()
+        with self._lock:
+            self._buffers.setdefault(invocation_id, []).append(s)
+            self._buffered += len(s)
+            if self._buffered < FLUSH_SIZE and \
+                    time.monotonic() - self._last_flush < FLUSH_INTERVAL:
+                return len(s)
+            pending = self._take_all()
+        self._send(pending)
+        return len(s)
+
+    def flush(self) -> None:
+        with self._lock:
+            pending = self._take_all()
+        self._send(pending)
+
+    def flush_invocation(self, invocation_id: str) -> None:
+        with self._lock:
+            if invocation_id not in self._buffers:
+                return
+            chunks = self._buffers.pop(invocation_id)
+            self._buffered -= sum(map(len, chunks))
+        self._send([(invocation_id, chunks)])
+
+    def _take_all(self) -> List[Tuple[Optional[str], List[str]]]:
+        # Called with the lock held
+        pending = list(self._buffers.items())
+        self._buffers.clear()
+        self._buffered = 0
+        self._last_flush = time.monotonic()
+        return pending
+
+    def _send(self, pending: List[Tuple[Optional[str], List[str]]]) -> None:
+        for invocation_id, chunks in pending:
+            # The host logs every message on its own line
+            text = ''.join(chunks)
+            if text.endswith('\n'):
+                text = text[:-1]
+            self._sink(invocation_id, self._name, text)
+
+
+def install(sink: OutputSink,
+            get_invocation_id: Callable[[], Optional[str]]) -> None:
+    global _streams, _original_streams
+    if _streams is not None:
+        return
+
+    _original_streams = (sys.stdout, sys.stderr)
+    _streams = (
+        InvocationOutputStream('stdout', sys.stdout, sink, get_invocation_id),
+        InvocationOutputStream('stderr', sys.stderr, sink, get_invocation_id))
+    sys.stdout, sys.stderr = _streams
+
+
+def uninstall() -> None:
+    """Flushes the captured output and restores the original streams."""
+    global _streams, _original_streams
+    if _streams is None:
+        return
+
+    streams = _streams
+    sys.stdout, sys.stderr = _original_streams
+    _streams = _original_streams = None
+    for stream in streams:
+        stream.flush()
+
+
+def is_installed() -> bool:
+    return _streams is not None
+
+
+def flush() -> None:
+    if _streams is not None:
+        for stream in _streams:
+            stream.flush()
+
+
+def flush_invocation(invocation_id: str) -> None:
+    if _streams is not None:
+        for stream in _streams:
+            stream.flush_invocation(invocation_id)
@@ -0,0 +1,266 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+"""Thread pools running the sync invocations.
+
+FixedThreadPoolExecutor is a ThreadPoolExecutor exposing its size,
+AdaptiveThreadPoolExecutor sizes itself to the sync invocations it runs.
+
+The adaptive pool keeps a limit between min_workers and max_workers and starts threads
+up to that limit on demand. Every interval it looks at how long work waited
+in the queue and how many calls completed:
+
+* While work waits longer than wait_threshold, the limit grows by half its
+  size, as long as the previous growth improved throughput. I/O bound functions
+  keep benefiting from more threads, CPU bound ones do not because of the GIL.
+* A growth which did not improve throughput is rolled back and growth pauses
+  for a few intervals.
+* Threads which sit idle for idle_timeout seconds exit and take the limit
+  down with them, never below min_workers.
+
+The checks run when work is submitted or completed, so an idle pool costs
+nothing. Every resize is logged.
+"""
+
+import itertools
+import queue
+import threading
+import time
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from typing import Optional, Set
+
+from .logging import logger
+
+# Minimum relative throughput gain for a growth to be kept
+_MIN_THROUGHPUT_GAIN = 0.05
+# Intervals to wait before growing again after a rolled back growth
+_HOLD_INTERVALS = 3
+
+
+class FixedThreadPoolExecutor(ThreadPoolExecutor):
+    """ThreadPoolExecutor with the size accessors of
+    AdaptiveThreadPoolExecutor. It keeps every thread it starts, up to
+    max_workers, so both of its bounds are max_workers.
+    """
+
+    @property
+    def min_workers(self) -> int:
+        return self._max_workers
+
+    @property
+    def max_workers(self) -> int:
+        return self._max_workers
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of work items not taken by a thread yet."""
+        return self._work_queue.qsize()
+
+
+class AdaptiveThreadPoolExecutor(Executor):
+
+    _counter = itertools.count()
+
+    def __init__(self, min_workers: int, max_workers: int, *,
+                 interval: float = 1.0,
+                 wait_threshold: float = 0.01,
+                 idle_timeout: float = 30.0,
+                 thread_name_prefix: str = '') -> None:
+        if min_workers < 1 or max_workers < min_workers:
+            raise ValueError(
+                f'invalid thread pool bounds: min {min_workers}, '
+                f'max {max_workers}')
+        self._min_workers = min_workers
+        self._max_workers_bound = max_workers
+        # Current limit, named after ThreadPoolExecutor's attribute since
+        # the dispatcher reports it the same way
+        self._max_workers = min_workers
+        self._interval = interval
+        self._wait_threshold = wait_threshold
+        self._idle_timeout = idle_timeout
+        self._thread_name_prefix = thread_name_prefix or \
+            f'AdaptiveThreadPoolExecutor-{next(self._counter)}'
+
+        self._work_queue: queue.SimpleQueue = queue.SimpleQueue()
+        # Work items not taken by a thread yet, unlike the queue size it is
+        # only changed with the lock held, along with _idle_threads
+        self._queued = 0
+        self._threads: Set[threading.Thread] = set()
+        self._idle_threads = 0
+        self._lock = threading.Lock()
+        self._shutdown = False
+
+        # Statistics of the current interval
+        self._interval_start = time.monotonic()
+        self._completed = 0
+        self._started = 0
+        self._wait_time = 0.0
+        # Hill climbing state
+        self._throughput_before_growth: Optional[float] = None
+        self._growth = 0
+        self._hold_intervals = 0
+
+        self.resizes = 0
+
+    @property
+    def min_workers(self) -> int:
+        return self._min_workers
+
+    @property
+    def max_workers(self) -> int:
+        return self._max_workers_bound
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of work items not taken by a thread yet, without the
+        shutdown sentinels of the work queue.
+        """
+        return self._queued
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError(
+                    'cannot schedule new futures after shutdown')
+            future: Future = Future()
+            now = time.monotonic()
+            self._work_queue.put((future, fn, args, kwargs, now))
+            self._queued += 1
+            self._maybe_adjust(now)
+            self._start_threads()
+        return future
+
+    def shutdown(self, wait: bool = True, *,
+                 cancel_futures: bool = False) -> None:
+        with self._lock:
+            self._shutdown = True
+            if cancel_futures:
+                while True:
+                    try:
+                        item = self._work_queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is not None:
+                        self._queued -= 1
+                        item[0].cancel()
+            threads = list(self._threads)
+            for _ in threads:
+                self._work_queue.put(None)
+        if wait:
+            for t in threads:
+                t.join()
+
+    def _start_threads(self) -> None:
+        # Called with the lock held
+        if self._shutdown:
+            return
+        pending = self._queued - self._idle_threads
+        while pending > 0 and len(self._threads) < self._max_workers:
+            t = threading.Thread(
+                target=self._worker, daemon=True,
+                name=f'{self._thread_name_prefix}_{len(self._threads)}')
+            self._threads.add(t)
+            self._idle_threads += 1
+            t.start()
+            pending -= 1
+
+    def _resize(self, new_limit: int, reason: str) -> None:
+        # Called with the lock held
+        old_limit = self._max_workers
+        self._max_workers = new_limit
+        self.resizes += 1
+        logger.info('Resized sync threadpool from %s to %s workers '
+                    '(min: %s, max: %s): %s', old_limit, new_limit,
+                    self._min_workers, self._max_workers_bound, reason)
+
+    def _maybe_adjust(self, now: float) -> None:
+        # Called with the lock held
+        elapsed = now - self._interval_start
+        if elapsed < self._interval or self._shutdown:
+            return
+
+        throughput = self._completed / elapsed
+        avg_wait = self._wait_time / self._started if self._started else 0.0
+        backlog = self._queued
+        self._interval_start = now
+        self._completed = self._started = 0
+        self._wait_time = 0.0
+
+        if self._throughput_before_growth is not None:
+            before = self._throughput_before_growth
+            self._throughput_before_growth = None
+            if throughput <= before * (1 + _MIN_THROUGHPUT_GAIN):
+                self._hold_intervals = _HOLD_INTERVALS
+                self._resize(
+                    self._max_workers - self._growth,
+                    f'throughput did not improve ({before:.1f}/s before, '
+                    f'{throughput:.1f}/s after growing)')
+                return
+
+        if self._hold_intervals:
+            self._hold_intervals -= 1
+            return
+
+        waiting = avg_wait > self._wait_threshold or (
+            backlog and not self._idle_threads)
+        if waiting and self._max_workers < self._max_workers_bound:
+            self._throughput_before_growth = throughput
+            self._growth = min(max(self._max_workers // 2, 1),
+                               self._max_workers_bound - self._max_workers)
+            self._resize(
+                self._max_workers + self._growth,
+                f'average queue wait time {avg_wait * 1000:.2f}ms, '
+                f'{backlog} queued, throughput {throughput:.1f}/s')
+            self._start_threads()
+
+    def _retire(self, reason: Optional[str]) -> None:
+        # Called with the lock held
+        self._threads.discard(threading.current_thread())
+        new_limit = max(len(self._threads), self._min_workers)
+        if reason and new_limit < self._max_workers:
+            self._resize(new_limit, reason)
+
+    def _worker(self) -> None:
+        while True:
+            try:
+                item = self._work_queue.get(timeout=self._idle_timeout)
+            except queue.Empty:
+                with self._lock:
+                    if len(self._threads) > self._min_workers:
+                        self._idle_threads -= 1
+                        self._retire(f'thread idle for {self._idle_timeout}s')
+                        # Work queued right after the timeout needs a thread
+                        self._start_threads()
+                        return
+                continue
+
+            with self._lock:
+                self._idle_threads -= 1
+                if item is None:
+                    self._retire(None)
+                    return
+                self._queued -= 1
+                future, fn, args, kwargs, enqueued_at = item
+                if not future.set_running_or_notify_cancel():
+                    self._idle_threads += 1
+                    continue
+                self._started += 1
+                self._wait_time += time.monotonic() - enqueued_at
+
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException as exc:
+                future.set_exception(exc)
+            else:
+                future.set_result(result)
+                result = None
+            del item, future, fn, args, kwargs
+
+            with self._lock:
+                self._completed += 1
+                self._maybe_adjust(time.monotonic())
+                if len(self._threads) > self._max_workers \
+                        and not self._shutdown:
+                    # The limit was lowered below the running threads
+                    self._retire(None)
+                    return
+                self._idle_threads += 1
@@ -11,7 +11,30 @@ from ..constants import (PYTHON_ROLLBACK_CWD_PATH,
                          PYTHON_ENABLE_WORKER_EXTENSIONS_DEFAULT_39,
                          PYTHON_ENABLE_DEBUG_LOGGING,
                          FUNCTIONS_WORKER_SHARED_MEMORY_DATA_TRANSFER_ENABLED,
-                         PYTHON_SCRIPT_FILE_NAME, PYTHON_ENABLE_INIT_INDEXING)
+                         PYTHON_SCRIPT_FILE_NAME, PYTHON_ENABLE_INIT_INDEXING,
+                         PYTHON_ENABLE_GRPC_AIO,
+                         PYTHON_ENABLE_WORKER_LOAD_STATUS,
+                         PYTHON_MAX_CONCURRENT_INVOCATIONS,
+                         PYTHON_MAX_CONCURRENT_INVOCATIONS_PER_FUNCTION,
+                         PYTHON_MAX_CONCURRENT_INVOCATIONS_BY_FUNCTION,
+                         PYTHON_INVOCATION_QUEUE_SIZE,
+                         PYTHON_THREADPOOL_BULKHEADS,
+                         PYTHON_ENABLE_ADAPTIVE_THREADPOOL,
+                         PYTHON_ADAPTIVE_THREADPOOL_MIN_WORKERS,
+                         PYTHON_ADAPTIVE_THREADPOOL_MAX_WORKERS,
+                         PYTHON_PROCESSPOOL_FUNCTIONS,
+                         PYTHON_PROCESSPOOL_WORKER_COUNT,
+                         PYTHON_INVOCATION_LOG_SAMPLE_RATE,
+                         PYTHON_INVOCATION_LOG_DISABLED_FUNCTIONS,
+                         PYTHON_ENABLE_STDIO_CAPTURE,
+                         PYTHON_ENABLE_LATENCY_HISTOGRAMS,
+                         PYTHON_LATENCY_HISTOGRAMS_INTERVAL,
+                         PYTHON_GRPC_RECORDING_FILE,
+                         PYTHON_ENABLE_UVLOOP,
+                         PYTHON_SHARED_MEMORY_INPUT_TYPE,
+                         PYTHON_SHARED_MEMORY_ARENA_SIZE,
+                         PYTHON_SHARED_MEMORY_ARENA_IDLE_TIMEOUT,
+                         PYTHON_SHARED_MEMORY_PACK_OUTPUTS)
 
 
 def get_python_appsetting_state():
@@ -24,7 +47,30 @@ def get_python_appsetting_state():
          PYTHON_ENABLE_WORKER_EXTENSIONS,
          FUNCTIONS_WORKER_SHARED_MEMORY_DATA_TRANSFER_ENABLED,
          PYTHON_SCRIPT_FILE_NAME,
-         PYTHON_ENABLE_INIT_INDEXING]
+         PYTHON_ENABLE_INIT_INDEXING,
+         PYTHON_ENABLE_GRPC_AIO,
+         PYTHON_ENABLE_WORKER_LOAD_STATUS,
+         PYTHON_MAX_CONCURRENT_INVOCATIONS,
+         PYTHON_MAX_CONCURRENT_INVOCATIONS_PER_FUNCTION,
+         PYTHON_MAX_CONCURRENT_INVOCATIONS_BY_FUNCTION,
+         PYTHON_INVOCATION_QUEUE_SIZE,
+         PYTHON_THREADPOOL_BULKHEADS,
+         PYTHON_ENABLE_ADAPTIVE_THREADPOOL,
+         PYTHON_ADAPTIVE_THREADPOOL_MIN_WORKERS,
+         PYTHON_ADAPTIVE_THREADPOOL_MAX_WORKERS,
+         PYTHON_PROCESSPOOL_FUNCTIONS,
+         PYTHON_PROCESSPOOL_WORKER_COUNT,
+         PYTHON_INVOCATION_LOG_SAMPLE_RATE,
+         PYTHON_INVOCATION_LOG_DISABLED_FUNCTIONS,
+         PYTHON_ENABLE_STDIO_CAPTURE,
+         PYTHON_ENABLE_LATENCY_HISTOGRAMS,
+         PYTHON_LATENCY_HISTOGRAMS_INTERVAL,
+         PYTHON_GRPC_RECORDING_FILE,
+         PYTHON_ENABLE_UVLOOP,
+         PYTHON_SHARED_MEMORY_INPUT_TYPE,
+         PYTHON_SHARED_MEMORY_ARENA_SIZE,
+         PYTHON_SHARED_MEMORY_ARENA_IDLE_TIMEOUT,
+         PYTHON_SHARED_MEMORY_PACK_OUTPUTS]
 
     app_setting_states = "".join(
         f"{app_setting}: {current_vars[app_setting]} | "
@@ -109,7 +109,8 @@ EXTRA_REQUIRES = {
         "opencv-python",
         "pandas",
         "numpy",
-        "pre-commit"
+        "pre-commit",
+        "uvloop; platform_system != 'Windows'"  # PYTHON_ENABLE_UVLOOP
     ],
     "test-http-v2": [
         "azurefunctions-extensions-http-fastapi",
@@ -0,0 +1,7 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+"""Performance benchmarks.
+
+Benchmarks are not collected by the unit test runner. Each module can be run
+on its own, e.g. ``python -m tests.benchmarks.bench_grpc_transport``.
+"""
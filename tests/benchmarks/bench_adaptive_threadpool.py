@@ -0,0 +1,85 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+"""Throughput of the adaptive sync thread pool against static ones, and how
+its size converges, for I/O bound and CPU bound sync functions.
+
+    python -m tests.benchmarks.bench_adaptive_threadpool --seconds 10
+"""
+
+import argparse
+import concurrent.futures
+import threading
+import time
+from typing import List, Tuple
+
+from azure_functions_worker.threadpool import AdaptiveThreadPoolExecutor
+from tests.benchmarks.benchutils import print_table
+
+
+def io_bound():
+    time.sleep(0.01)
+
+
+def cpu_bound():
+    sum(i * i for i in range(20000))
+
+
+def _run(executor: concurrent.futures.Executor, func, seconds: float,
+         concurrency: int) -> Tuple[float, List[int]]:
+    """Keeps `concurrency` calls in flight for `seconds` and returns the
+    throughput along with the thread pool size sampled every second.
+    """
+    slots = threading.Semaphore(concurrency)
+    completed = 0
+    lock = threading.Lock()
+
+    def done(_):
+        nonlocal completed
+        with lock:
+            completed += 1
+        slots.release()
+
+    sizes = []
+    start = time.perf_counter()
+    next_sample = start + 1
+    while time.perf_counter() - start < seconds:
+        if slots.acquire(timeout=0.1):
+            executor.submit(func).add_done_callback(done)
+        if time.perf_counter() >= next_sample:
+            sizes.append(executor._max_workers)
+            next_sample += 1
+    elapsed = time.perf_counter() - start
+    executor.shutdown(wait=True)
+    return completed / elapsed, sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--max-workers', type=int, default=32)
+    args = parser.parse_args()
+
+    rows = []
+    for workload, func in (('I/O bound', io_bound),
+                           ('CPU bound', cpu_bound)):
+        executors = (
+            ('static 1', concurrent.futures.ThreadPoolExecutor(1)),
+            (f'static {args.max_workers}',
+             concurrent.futures.ThreadPoolExecutor(args.max_workers)),
+            (f'adaptive 1-{args.max_workers}',
+             AdaptiveThreadPoolExecutor(1, args.max_workers,
+                                        interval=0.5)))
+        for name, executor in executors:
+            throughput, sizes = _run(executor, func, args.seconds,
+                                     args.concurrency)
+            rows.append((workload, name, throughput,
+                         ' '.join(map(str, sizes))))
+
+    print_table('Sync thread pool throughput',
+                ('workload', 'thread pool', 'calls/s', 'size per second'),
+                rows)
+
+
+if __name__ == '__main__':
+    main()
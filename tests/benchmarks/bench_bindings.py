@@ -0,0 +1,239 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+"""Per-operation time and allocations of the binding and Datum conversions
+every invocation goes through.
+
+Covers payloads from 100 B to 100 MB, header-heavy HTTP requests,
+cookie-heavy HTTP responses and large collections. The time is the best of
+--repeat rounds of at least --min-time seconds each. The allocations of a
+single call are traced separately with tracemalloc: the peak size of the
+memory it allocated and the number of blocks still held by its result.
+tracemalloc only sees the Python allocators, so the copies made inside the
+protobuf C extension do not show up there.
+
+--output writes the results as JSON, along with the Python and protobuf
+versions, so that runs can be compared over time:
+
+    python -m tests.benchmarks.bench_bindings --output bindings.json
+    python -m tests.benchmarks.bench_bindings --sizes 100,1000000 \
+        --filter from_typed_data
+"""
+
+import argparse
+import gc
+import json
+import platform
+import time
+import tracemalloc
+import typing
+
+import azure.functions as func
+from google.protobuf import __version__ as protobuf_version
+
+from azure_functions_worker import protos
+from azure_functions_worker.bindings import datumdef, generic, meta
+from azure_functions_worker.bindings.shared_memory_data_transfer import \
+    SharedMemoryManager
+from tests.benchmarks.benchutils import eventhub_batch_invocation, print_table
+
+DEFAULT_SIZES = (100, 10 * 1024, 1024 * 1024, 100 * 1024 * 1024)
+
+
+class _Case(typing.NamedTuple):
+    operation: str
+    input: str
+    # Bytes of payload per call, to report the throughput
+    size: typing.Optional[int]
+    call: typing.Callable[[], typing.Any]
+
+
+def _format_size(size: int) -> str:
+    for unit, scale in (('MB', 1024 * 1024), ('KB', 1024)):
+        if size >= scale:
+            return f'{size / scale:g} {unit}'
+    return f'{size} B'
+
+
+def _http_request(headers: int, body: bytes) -> protos.TypedData:
+    return protos.TypedData(http=protos.RpcHttp(
+        method='POST',
+        url='https://contoso.azurewebsites.net/api/bench?code=abc',
+        headers={f'x-header-{i}': 'v' * 32 for i in range(headers)},
+        query={f'q{i}': str(i) for i in range(10)},
+        body=protos.TypedData(bytes=body)))
+
+
+def _http_response(cookies: int) -> func.HttpResponse:
+    response = func.HttpResponse(b'{}', mimetype='application/json')
+    for i in range(cookies):
+        response.headers.add(
+            'Set-Cookie',
+            f'cookie{i}=value{i}; Domain=example.com; '
+            f'Expires=Thu, 12-Jan-2017 13:55:08 GMT; Path=/; '
+            f'Max-Age=10000000; Secure; HttpOnly; SameSite=Lax')
+    return response
+
+
+def _cases(sizes: typing.Sequence[int], headers: int, cookies: int,
+           items: int) -> typing.List[_Case]:
+    shmem_mgr = SharedMemoryManager()
+    cases = []
+
+    for size in sizes:
+        label = _format_size(size)
+        payload = b'\x01' * size
+        text = 'x' * size
+        bytes_data = protos.TypedData(bytes=payload)
+        string_data = protos.TypedData(string=text)
+        bytes_datum = datumdef.Datum(payload, 'bytes')
+        bytes_binding = protos.ParameterBinding(name='file', data=bytes_data)
+        cases += [
+            _Case('Datum.from_typed_data', f'bytes {label}', size,
+                  lambda td=bytes_data: datumdef.Datum.from_typed_data(td)),
+            _Case('Datum.from_typed_data', f'string {label}', size,
+                  lambda td=string_data: datumdef.Datum.from_typed_data(td)),
+            _Case('datum_as_proto', f'bytes {label}', size,
+                  lambda d=bytes_datum: datumdef.datum_as_proto(d)),
+            _Case('GenericBinding.encode', f'bytes {label}', size,
+                  lambda p=payload: generic.GenericBinding.encode(
+                      p, expected_type=bytes)),
+            _Case('GenericBinding.decode', f'bytes {label}', size,
+                  lambda d=bytes_datum: generic.GenericBinding.decode(
+                      d, trigger_metadata=None)),
+            _Case('meta.from_incoming_proto', f'blob bytes {label}', size,
+                  lambda pb=bytes_binding: meta.from_incoming_proto(
+                      'blob', pb, pytype=bytes, trigger_metadata=None,
+                      shmem_mgr=shmem_mgr)),
+            _Case('meta.to_outgoing_param_binding', f'blob bytes {label}',
+                  size,
+                  lambda p=payload: meta.to_outgoing_param_binding(
+                      'blob', p, pytype=bytes, out_name='file',
+                      shmem_mgr=shmem_mgr,
+                      is_function_data_cache_enabled=False)),
+        ]
+
+    http_data = _http_request(headers, b'{}')
+    http_binding = protos.ParameterBinding(name='req', data=http_data)
+    response = _http_response(cookies)
+    response_datum = meta.get_datum('http', response, func.HttpResponse)
+    cookie_list = response_datum.value['cookies']
+    collection = protos.TypedData(collection_string={
+        'string': [f'item-{i}' for i in range(items)]})
+    batch = eventhub_batch_invocation(items)
+    cases += [
+        _Case('Datum.from_typed_data', f'http {headers} headers', None,
+              lambda: datumdef.Datum.from_typed_data(http_data)),
+        _Case('meta.from_incoming_proto', f'http {headers} headers', None,
+              lambda: meta.from_incoming_proto(
+                  'httpTrigger', http_binding, pytype=func.HttpRequest,
+                  trigger_metadata=None, shmem_mgr=shmem_mgr)),
+        _Case('parse_to_rpc_http_cookie_list', f'{cookies} cookies', None,
+              lambda: datumdef.parse_to_rpc_http_cookie_list(cookie_list)),
+        _Case('datum_as_proto', f'http {cookies} cookies', None,
+              lambda: datumdef.datum_as_proto(response_datum)),
+        # Encoding takes the cookies out of the response's headers, so every
+        # call needs a new one
+        _Case('meta.to_outgoing_param_binding',
+              f'new HttpResponse, {cookies} cookies', None,
+              lambda: meta.to_outgoing_param_binding(
+                  'http', _http_response(cookies), pytype=func.HttpResponse,
+                  out_name='$return', shmem_mgr=shmem_mgr,
+                  is_function_data_cache_enabled=False)),
+        _Case('Datum.from_typed_data', f'collection_string {items}', None,
+              lambda: datumdef.Datum.from_typed_data(collection).python_value),
+        _Case('meta.from_incoming_proto', f'eventhub batch {items}', None,
+              lambda: meta.from_incoming_proto(
+                  'eventHubTrigger', batch.input_data[0],
+                  pytype=typing.List[func.EventHubEvent],
+                  trigger_metadata=batch.trigger_metadata,
+                  shmem_mgr=shmem_mgr)),
+    ]
+    return cases
+
+
+def _time(call, min_time: float, repeat: int) -> float:
+    """Best seconds per call of repeat rounds."""
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            call()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        number *= 2
+
+    best = elapsed / number
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            call()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def _allocations(call) -> typing.Tuple[int, int]:
+    """Peak bytes allocated by a call, and blocks held by its result."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = call()
+        peak = tracemalloc.get_traced_memory()[1]
+        # Everything traced was allocated by the call
+        blocks = sum(stat.count for stat in
+                     tracemalloc.take_snapshot().statistics('filename'))
+    finally:
+        tracemalloc.stop()
+    del result
+    return peak, blocks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=lambda s: [int(v) for v in s.split(',')],
+                        default=list(DEFAULT_SIZES),
+                        help='payload sizes in bytes, comma separated')
+    parser.add_argument('--headers', type=int, default=100)
+    parser.add_argument('--cookies', type=int, default=50)
+    parser.add_argument('--items', type=int, default=10000,
+                        help='items of the collections')
+    parser.add_argument('--min-time', type=float, default=0.1)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--filter', default='',
+                        help='only run the operations containing this')
+    parser.add_argument('--output', help='write the results as JSON here')
+    args = parser.parse_args()
+
+    meta.load_binding_registry()
+    results = []
+    for case in _cases(args.sizes, args.headers, args.cookies, args.items):
+        if args.filter not in case.operation:
+            continue
+        seconds = _time(case.call, args.min_time, args.repeat)
+        peak, blocks = _allocations(case.call)
+        results.append({
+            'operation': case.operation,
+            'input': case.input,
+            'us_per_op': seconds * 1e6,
+            'mb_per_s': case.size / seconds / 2 ** 20 if case.size else None,
+            'peak_kib': peak / 1024,
+            'blocks': blocks,
+        })
+
+    print_table('Binding and Datum conversions',
+                ('operation', 'input', 'us/op', 'MB/s', 'peak KiB',
+                 'blocks held'),
+                [(r['operation'], r['input'], r['us_per_op'],
+                  '' if r['mb_per_s'] is None else r['mb_per_s'],
+                  r['peak_kib'], r['blocks']) for r in results])
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'python': platform.python_version(),
+                       'protobuf': protobuf_version,
+                       'results': results}, f, indent=2)
+            f.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+"""Cold start of a worker process, phase by phase, for synthetic apps of
+--functions functions in every programming model.
+
+Every round starts a new worker process against the mock host and times:
+
+    interpreter       process spawned -> worker module imported
+    main.main         -> event stream connected to the host
+    worker init       WorkerInitRequest
+    metadata          FunctionsMetadataRequest, which indexes V2 apps
+    load              FunctionLoadRequestCollection of every function
+    first invocation  InvocationRequest of the first function
+
+The median of --rounds rounds is reported. The models are legacy V1 apps,
+V2 apps, V2 apps split into --blueprints blueprints and V2 apps with a
+deferred binding on every function but the first.
+
+    python -m tests.benchmarks.bench_cold_start --functions 10,100,1000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import pathlib
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import typing
+
+from azure_functions_worker import protos
+from tests.benchmarks.benchutils import http_get_binding, print_table
+from tests.benchmarks.synthetic_app import generate_v1_app, generate_v2_app
+from tests.utils import testutils
+from tests.utils.constants import PROJECT_ROOT
+
+PHASES = ('interpreter', 'main.main', 'worker init', 'metadata', 'load',
+          'first invocation')
+
+MODELS = ('v1', 'v2', 'v2 blueprints', 'v2 deferred bindings')
+
+# Seconds a phase may take before the worker is considered stuck
+_TIMEOUT = 60
+
+# Runs main.main like worker.py does, after writing down when the process
+# started and when the worker was imported
+_BOOTSTRAP = """\
+import json, sys, time
+started = time.time()
+from azure_functions_worker import main
+imported = time.time()
+with open(sys.argv.pop(1), 'w') as f:
+    json.dump({'started': started, 'imported': imported}, f)
+main.main()
+"""
+
+
+def _generate_app(app_dir: pathlib.Path, model: str, functions: int,
+                  blueprints: int) -> pathlib.Path:
+    if model == 'v1':
+        return generate_v1_app(app_dir, functions)
+    return generate_v2_app(
+        app_dir, functions,
+        blueprints=blueprints if model == 'v2 blueprints' else 0,
+        deferred_bindings=model == 'v2 deferred bindings')
+
+
+def _check(*responses) -> None:
+    for response in responses:
+        if response.result.status != protos.StatusResult.Success:
+            raise RuntimeError(f'{type(response).__name__} failed: '
+                               f'{response.result.exception.message}')
+
+
+async def _cold_start(app_dir: pathlib.Path, times_path: str) \
+        -> typing.Dict[str, float]:
+    loop = asyncio.get_running_loop()
+    host = testutils._MockWebHost(loop, app_dir)
+    await host.start()
+    env = dict(os.environ, AzureWebJobsScriptRoot=str(app_dir),
+               PYTHONPATH=os.pathsep.join([str(PROJECT_ROOT), str(app_dir)]))
+
+    spawned = time.time()
+    worker = subprocess.Popen(
+        [sys.executable, '-c', _BOOTSTRAP, times_path,
+         '--host', testutils.LOCALHOST, '--port', str(host._port),
+         '--workerId', host.worker_id, '--requestId', host.request_id],
+        env=env, cwd=str(app_dir),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        await asyncio.wait_for(host._connected_fut, _TIMEOUT)
+        connected = time.time()
+        with open(times_path) as f:
+            times = json.load(f)
+        phases = {'interpreter': times['imported'] - spawned,
+                  'main.main': connected - times['imported']}
+
+        async def phase(name, message, wait_for):
+            start = time.perf_counter()
+            r = await asyncio.wait_for(
+                host.communicate(message, wait_for=wait_for), _TIMEOUT)
+            phases[name] = time.perf_counter() - start
+            return r.response
+
+        init = await phase('worker init', protos.StreamingMessage(
+            worker_init_request=protos.WorkerInitRequest(
+                host_version='4.28.0',
+                function_app_directory=str(app_dir))),
+            'worker_init_response')
+        metadata = await phase('metadata', protos.StreamingMessage(
+            functions_metadata_request=protos.FunctionsMetadataRequest(
+                function_app_directory=str(app_dir))),
+            'function_metadata_response')
+        _check(init, metadata)
+
+        if metadata.use_default_metadata_indexing:
+            # V1, the host reads the function.json files
+            load_requests = [host._build_function_load_request(name)[1]
+                             for name in sorted(host._available_functions)]
+        else:
+            load_requests = [
+                protos.FunctionLoadRequest(function_id=m.function_id,
+                                           metadata=m)
+                for m in metadata.function_metadata_results]
+        load_requests.sort(key=lambda r: r.metadata.name)
+        load = await phase('load', protos.StreamingMessage(
+            function_load_request_collection=(
+                protos.FunctionLoadRequestCollection(
+                    function_load_requests=load_requests))),
+            'function_load_response_collection')
+        _check(*load.function_load_responses)
+
+        invocation = await phase('first invocation', protos.StreamingMessage(
+            invocation_request=protos.InvocationRequest(
+                invocation_id=host.make_id(),
+                function_id=load_requests[0].function_id,
+                input_data=[http_get_binding()])),
+            'invocation_response')
+        _check(invocation)
+        return phases
+    finally:
+        worker.kill()
+        worker.wait()
+        await host.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--functions',
+                        type=lambda s: [int(v) for v in s.split(',')],
+                        default=[10, 100, 1000],
+                        help='numbers of functions, comma separated')
+    parser.add_argument('--models', type=lambda s: s.split(','),
+                        default=list(MODELS),
+                        help='comma separated, all by default')
+    parser.add_argument('--blueprints', type=int, default=10)
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    unknown = set(args.models) - set(MODELS)
+    if unknown:
+        parser.error(f'unknown models: {", ".join(sorted(unknown))}')
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        times_path = os.path.join(tmp, 'times.json')
+        for model in args.models:
+            for functions in args.functions:
+                app_dir = _generate_app(
+                    pathlib.Path(tmp) / f'{model}_{functions}'.replace(
+                        ' ', '_'),
+                    model, functions, args.blueprints)
+                rounds = [asyncio.run(_cold_start(app_dir, times_path))
+                          for _ in range(args.rounds)]
+                medians = [statistics.median(r[phase] for r in rounds) * 1000
+                           for phase in PHASES]
+                rows.append((model, functions, *medians, sum(medians)))
+
+    print_table('Cold start of a worker process, median ms',
+                ('model', 'functions', *PHASES, 'total'),
+                rows)
+
+
+if __name__ == '__main__':
+    main()
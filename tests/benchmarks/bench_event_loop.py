@@ -0,0 +1,180 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+"""The default asyncio event loop against uvloop (PYTHON_ENABLE_UVLOOP),
+for the loop operations the worker relies on and for async workloads.
+
+The operations, timed per call as the best of --repeat rounds:
+
+    create_task            a task created and awaited, as for every message
+                           the gRPC thread hands to the dispatcher
+    call_soon_threadsafe   a future resolved from another thread, as the
+                           gRPC thread does for every message
+    run_in_executor        a call in the default thread pool, as for every
+                           sync function
+    event                  an asyncio.Event set by one task for another, as
+                           HTTP v2 functions wait for their request
+
+The workloads are the http_async and eventhub_batch scenarios of
+bench_load, run on each loop.
+
+    python -m tests.benchmarks.bench_event_loop --invocations 2000
+"""
+
+import argparse
+import asyncio
+import pathlib
+import tempfile
+import threading
+import time
+import typing
+
+from azure_functions_worker.bindings.shared_memory_data_transfer import \
+    SharedMemoryConstants as consts
+from tests.benchmarks import bench_load
+from tests.benchmarks.benchutils import print_table
+from tests.benchmarks.synthetic_app import generate_load_app
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+LOOPS = {'asyncio': asyncio.new_event_loop}
+if uvloop is not None:
+    LOOPS['uvloop'] = uvloop.new_event_loop
+
+
+async def _create_task(number):
+    async def noop():
+        pass
+
+    loop = asyncio.get_running_loop()
+    for _ in range(number):
+        await loop.create_task(noop())
+
+
+async def _call_soon_threadsafe(number):
+    loop = asyncio.get_running_loop()
+    requests = []
+    ready = threading.Semaphore(0)
+
+    def resolve():
+        for _ in range(number):
+            ready.acquire()
+            loop.call_soon_threadsafe(requests.pop().set_result, None)
+
+    thread = threading.Thread(target=resolve)
+    thread.start()
+    for _ in range(number):
+        fut = loop.create_future()
+        requests.append(fut)
+        ready.release()
+        await fut
+    thread.join()
+
+
+async def _run_in_executor(number):
+    loop = asyncio.get_running_loop()
+    for _ in range(number):
+        await loop.run_in_executor(None, int)
+
+
+async def _event(number):
+    request, response = asyncio.Event(), asyncio.Event()
+
+    async def responder():
+        for _ in range(number):
+            await request.wait()
+            request.clear()
+            response.set()
+
+    task = asyncio.get_running_loop().create_task(responder())
+    for _ in range(number):
+        request.set()
+        await response.wait()
+        response.clear()
+    await task
+
+
+OPERATIONS = {
+    'create_task': _create_task,
+    'call_soon_threadsafe': _call_soon_threadsafe,
+    'run_in_executor': _run_in_executor,
+    'event': _event,
+}
+
+
+def _time_operation(loop_factory, operation, number: int,
+                    repeat: int) -> float:
+    """Best microseconds per call of repeat rounds."""
+    best = float('inf')
+    for _ in range(repeat):
+        loop = loop_factory()
+        try:
+            start = time.perf_counter()
+            loop.run_until_complete(operation(number))
+            best = min(best, time.perf_counter() - start)
+        finally:
+            loop.close()
+    return best / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--number', type=int, default=10000,
+                        help='calls of an operation per round')
+    parser.add_argument('--scenarios', type=lambda s: s.split(','),
+                        default=['http_async', 'eventhub_batch'],
+                        help='comma separated bench_load scenarios')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--invocations', type=int, default=1000,
+                        help='per scenario and round')
+    parser.add_argument('--warmup', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='rounds, the best is reported')
+    parser.add_argument('--blob-size', type=int,
+                        default=2 * consts.MIN_BYTES_FOR_SHARED_MEM_TRANSFER)
+    parser.add_argument('--events', type=int, default=100)
+    parser.add_argument('--log-lines', type=int, default=20)
+    args = parser.parse_args()
+
+    unknown = set(args.scenarios) - set(bench_load.SCENARIOS)
+    if unknown:
+        parser.error(f'unknown scenarios: {", ".join(sorted(unknown))}')
+    if uvloop is None:
+        print('uvloop is not installed, only the default loop is measured\n')
+
+    print_table(f'Loop operations, us per call, best of {args.repeat}',
+                ('operation', *LOOPS),
+                [(name, *(_time_operation(factory, operation, args.number,
+                                          args.repeat)
+                          for factory in LOOPS.values()))
+                 for name, operation in OPERATIONS.items()])
+
+    scenarios = bench_load._scenarios(args)
+    rows: typing.List[tuple] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        app_dir = generate_load_app(pathlib.Path(tmp) / 'load_app')
+        for loop_name, factory in LOOPS.items():
+            loop = factory()
+            try:
+                results = loop.run_until_complete(
+                    bench_load._run(app_dir, scenarios, args))
+            finally:
+                loop.close()
+            for name, result in results.items():
+                metrics = result.metrics()
+                rows.append((name, loop_name, result.failures,
+                             metrics['rps'], metrics['p50_ms'],
+                             metrics['p99_ms'], metrics['cpu_ms']))
+
+    rows.sort(key=lambda row: row[:2])
+    print_table(f'Load with {args.concurrency} concurrent streams, '
+                f'{args.invocations} invocations per scenario',
+                ('scenario', 'loop', 'failures', 'rps', 'p50 ms', 'p99 ms',
+                 'cpu ms/invocation'),
+                rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+"""Cold start cost of loading a large legacy (V1) app.
+
+Generates a synthetic app and loads all of its functions through the mock
+host, once with one FunctionLoadRequest per function and once with a single
+FunctionLoadRequestCollection.
+
+    python -m tests.benchmarks.bench_function_load --functions 500
+"""
+
+import argparse
+import asyncio
+import pathlib
+import tempfile
+import time
+
+from azure_functions_worker import protos
+from tests.benchmarks.benchutils import print_table
+from tests.benchmarks.synthetic_app import generate_v1_app
+from tests.utils import testutils
+
+
+async def _load_one_by_one(app_dir: pathlib.Path) -> float:
+    async with testutils.start_mockhost(script_root=app_dir) as host:
+        await host.init_worker()
+        names = sorted(host._available_functions)
+
+        start = time.perf_counter()
+        for name in names:
+            _, r = await host.load_function(name)
+            assert r.response.result.status == protos.StatusResult.Success
+        return time.perf_counter() - start
+
+
+async def _load_collection(app_dir: pathlib.Path) -> float:
+    async with testutils.start_mockhost(script_root=app_dir) as host:
+        await host.init_worker()
+        names = sorted(host._available_functions)
+
+        start = time.perf_counter()
+        _, r = await host.load_functions(names)
+        elapsed = time.perf_counter() - start
+        assert all(resp.result.status == protos.StatusResult.Success
+                   for resp in r.response.function_load_responses)
+        return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--functions', type=int, default=500)
+    args = parser.parse_args()
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        baseline = None
+        for mode, load in (('FunctionLoadRequest x N', _load_one_by_one),
+                           ('FunctionLoadRequestCollection', _load_collection)):
+            # A separate app per mode, so that module imports are not shared
+            app_dir = generate_v1_app(
+                pathlib.Path(tmp) / load.__name__.strip('_'),
+                args.functions, prefix=load.__name__.strip('_'))
+            elapsed = asyncio.run(load(app_dir))
+            baseline = baseline or elapsed
+            rows.append((mode, args.functions, elapsed * 1e3,
+                         elapsed / args.functions * 1e3,
+                         f'{baseline / elapsed:.2f}x'))
+
+    print_table('Function load time',
+                ('mode', 'functions', 'total ms', 'ms/function', 'speedup'),
+                rows)
+
+
+if __name__ == '__main__':
+    main()
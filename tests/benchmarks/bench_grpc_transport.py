@@ -0,0 +1,70 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+"""Throughput of the dispatcher's gRPC transports.
+
+Drives invocations through the mock host with the default grpc-thread +
+queue.Queue transport and with the grpc.aio transport
+(PYTHON_ENABLE_GRPC_AIO), and reports invocations per second for each.
+
+    python -m tests.benchmarks.bench_grpc_transport --invocations 2000
+"""
+
+import argparse
+import asyncio
+import time
+
+from azure_functions_worker import protos
+from azure_functions_worker.constants import PYTHON_ENABLE_GRPC_AIO
+from tests.benchmarks.benchutils import app_settings, http_get_binding, \
+    print_table
+from tests.utils import testutils
+
+DISPATCHER_FUNCTIONS_DIR = testutils.UNIT_TESTS_FOLDER / 'dispatcher_functions'
+FUNCTIONS = ('show_context', 'show_context_async')
+TRANSPORTS = (('grpc-thread', 'false'), ('grpc.aio', 'true'))
+
+
+async def _run(function_name: str, invocations: int) -> float:
+    async with testutils.start_mockhost(
+            script_root=DISPATCHER_FUNCTIONS_DIR) as host:
+        await host.init_worker()
+        _, r = await host.load_function(function_name)
+        assert r.response.result.status == protos.StatusResult.Success
+
+        # Warm up the invocation path before measuring
+        for _ in range(min(invocations, 50)):
+            await host.invoke_function(function_name, [http_get_binding()])
+
+        start = time.perf_counter()
+        for _ in range(invocations):
+            _, r = await host.invoke_function(function_name,
+                                              [http_get_binding()])
+            assert r.response.result.status == protos.StatusResult.Success
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--invocations', type=int, default=1000)
+    args = parser.parse_args()
+
+    rows = []
+    for function_name in FUNCTIONS:
+        baseline = None
+        for transport, enabled in TRANSPORTS:
+            with app_settings({PYTHON_ENABLE_GRPC_AIO: enabled}):
+                elapsed = asyncio.run(_run(function_name, args.invocations))
+            rps = args.invocations / elapsed
+            baseline = baseline or rps
+            rows.append((function_name, transport, rps,
+                         elapsed / args.invocations * 1e6,
+                         f'{rps / baseline:.2f}x'))
+
+    print_table('gRPC transport throughput',
+                ('function', 'transport', 'invocations/s', 'us/invocation',
+                 'speedup'),
+                rows)
+
+
+if __name__ == '__main__':
+    main()
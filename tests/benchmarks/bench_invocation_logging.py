@@ -0,0 +1,102 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+"""CPU time and host log volume of the "Received FunctionInvocationRequest"
+log, formatted eagerly as before and lazily with sampling.
+
+The records go through the AsyncLoggingHandler of the worker into RpcLog
+messages on the gRPC queue, as they do once the channel is connected.
+
+    python -m tests.benchmarks.bench_invocation_logging --invocations 50000
+"""
+
+import argparse
+import asyncio
+import logging
+import queue
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+from azure_functions_worker.dispatcher import AsyncLoggingHandler, \
+    Dispatcher, DispatcherMeta
+from azure_functions_worker.logging import InvocationLogSampler, logger
+from tests.benchmarks.benchutils import print_table
+
+
+def _eager(dispatcher, fi, invocation_id):
+    # What _handle__invocation_request did before the sampler
+    function_invocation_logs = [
+        'Received FunctionInvocationRequest',
+        f'request ID: {dispatcher.request_id}',
+        f'function ID: {fi.function_id}',
+        f'function name: {fi.name}',
+        f'invocation ID: {invocation_id}',
+        f'function type: {"async" if fi.is_async else "sync"}',
+        f'timestamp (UTC): {datetime.utcnow()}',
+        f'sync threadpool max workers: '
+        f'{dispatcher.get_sync_tp_workers_set()}'
+    ]
+    logger.info(', '.join(function_invocation_logs))
+
+
+def _sampled(dispatcher, fi, invocation_id):
+    invocation_time = datetime.utcnow()
+    if logger.isEnabledFor(logging.INFO) \
+            and dispatcher._invocation_log_sampler.should_log(fi.name):
+        dispatcher._log_invocation_request(
+            fi, invocation_id, invocation_time, None, None, False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--invocations', type=int, default=50000)
+    args = parser.parse_args()
+
+    loop = asyncio.new_event_loop()
+    dispatcher = Dispatcher(loop, '127.0.0.1', 0, 'bench', 'bench', 1.0)
+    dispatcher._grpc_resp_queue = queue.SimpleQueue()
+    DispatcherMeta.__current_dispatcher__ = dispatcher
+    handler = AsyncLoggingHandler()
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    fi = SimpleNamespace(function_id='0f9c3c0e-bench', name='http_trigger',
+                         is_async=False)
+
+    modes = (
+        ('eager', _eager, None),
+        ('eager, log level WARNING', _eager, None),
+        ('lazy, sample rate 1', _sampled, InvocationLogSampler(1.0)),
+        ('lazy, sample rate 0.1', _sampled, InvocationLogSampler(0.1)),
+        ('lazy, sample rate 0.01', _sampled, InvocationLogSampler(0.01)),
+        ('function opted out', _sampled,
+         InvocationLogSampler(1.0, frozenset({'http_trigger'}))),
+        ('lazy, log level WARNING', _sampled, InvocationLogSampler(1.0)))
+
+    rows = []
+    try:
+        for mode, log, sampler in modes:
+            dispatcher._invocation_log_sampler = sampler
+            logger.setLevel(logging.WARNING if 'WARNING' in mode
+                            else logging.INFO)
+            dispatcher._grpc_resp_queue = queue.SimpleQueue()
+            start = time.perf_counter()
+            for i in range(args.invocations):
+                log(dispatcher, fi, f'invocation-{i}')
+            elapsed = time.perf_counter() - start
+            messages = dispatcher._grpc_resp_queue.qsize()
+            rows.append((mode, elapsed / args.invocations * 1e6,
+                         messages * 1000 / args.invocations))
+    finally:
+        logger.removeHandler(handler)
+        DispatcherMeta.__current_dispatcher__ = None
+        dispatcher._stop_sync_call_tp()
+        loop.close()
+
+    print_table('Invocation request log',
+                ('mode', 'us/invocation', 'RpcLogs per 1000 invocations'),
+                rows)
+
+
+if __name__ == '__main__':
+    main()
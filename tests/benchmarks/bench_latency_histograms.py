@@ -0,0 +1,112 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+"""Overhead of recording invocation latency histograms, running the
+dispatcher's invocation handler for an async and a sync HTTP function with
+PYTHON_ENABLE_LATENCY_HISTOGRAMS off and on. The best of --repeat rounds is
+reported.
+
+    python -m tests.benchmarks.bench_latency_histograms --invocations 5000
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from unittest.mock import Mock
+
+from azure_functions_worker import loader, protos
+from azure_functions_worker.constants import PYTHON_ENABLE_LATENCY_HISTOGRAMS
+from azure_functions_worker.dispatcher import ContextEnabledTask, Dispatcher
+from tests.benchmarks.benchutils import print_table
+from tests.utils.testutils import UNIT_TESTS_ROOT
+
+
+async def _load_function(dispatcher, function_name):
+    script = UNIT_TESTS_ROOT / 'dispatcher_functions' / function_name \
+        / '__init__.py'
+    await dispatcher._handle__function_load_request(
+        protos.StreamingMessage(
+            function_load_request=protos.FunctionLoadRequest(
+                function_id=function_name,
+                metadata=protos.RpcFunctionMetadata(
+                    name=function_name,
+                    directory=str(script.parent),
+                    script_file=str(script),
+                    bindings={
+                        'req': protos.BindingInfo(
+                            type='httpTrigger',
+                            direction=getattr(protos.BindingInfo, 'in')),
+                        '$return': protos.BindingInfo(
+                            type='http',
+                            direction=protos.BindingInfo.out)
+                    }))))
+
+
+async def _run(dispatcher, function_name, query, invocations):
+    request = protos.StreamingMessage(
+        invocation_request=protos.InvocationRequest(
+            invocation_id='bench',
+            function_id=function_name,
+            input_data=[protos.ParameterBinding(
+                name='req',
+                data=protos.TypedData(
+                    http=protos.RpcHttp(method='GET', query=query)))]))
+    for _ in range(min(invocations, 500)):
+        await dispatcher._dispatch_grpc_request(request, time.perf_counter())
+    start = time.perf_counter()
+    for _ in range(invocations):
+        await dispatcher._dispatch_grpc_request(request, time.perf_counter())
+        if dispatcher._pending_sends:
+            dispatcher._record_send(
+                dispatcher._grpc_resp_queue.put_nowait.call_args[0][0])
+    return (time.perf_counter() - start) / invocations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--invocations', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    loop = asyncio.new_event_loop()
+    loop.set_task_factory(
+        lambda loop, coro: ContextEnabledTask(coro, loop=loop))
+    dispatcher = Dispatcher(loop, '127.0.0.1', 0, 'bench', 'bench', 1.0)
+    dispatcher._grpc_resp_queue = Mock()
+    loader.install()
+
+    functions = (('async', 'cancellable_async', {'seconds': '0'}),
+                 ('sync', 'cpu_bound_sync', {'rounds': '1'}))
+    rows = []
+    try:
+        for _, function_name, _ in functions:
+            loop.run_until_complete(
+                _load_function(dispatcher, function_name))
+        for kind, function_name, query in functions:
+            # Alternate the modes and keep the best round of each
+            best = [float('inf'), float('inf')]
+            for _ in range(args.repeat):
+                for enabled in (False, True):
+                    if enabled:
+                        os.environ[PYTHON_ENABLE_LATENCY_HISTOGRAMS] = 'true'
+                    else:
+                        os.environ.pop(PYTHON_ENABLE_LATENCY_HISTOGRAMS, None)
+                    dispatcher._update_latency_histograms()
+                    best[enabled] = min(best[enabled], loop.run_until_complete(
+                        loop.create_task(_run(dispatcher, function_name,
+                                              query, args.invocations))))
+            rows.append((kind, best[0] * 1e6, best[1] * 1e6,
+                         (best[1] - best[0]) * 1e6))
+    finally:
+        dispatcher._stop_latency_histograms()
+        dispatcher._stop_sync_call_tp()
+        loop.close()
+
+    print_table('Invocation handler time with latency histograms',
+                ('function', 'off us/invocation', 'on us/invocation',
+                 'overhead us'),
+                rows)
+
+
+if __name__ == '__main__':
+    main()
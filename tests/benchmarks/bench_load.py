@@ -0,0 +1,344 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+"""End-to-end load of a worker driven by the mock host: requests per
+second, latency percentiles, CPU time and RSS of concurrent invocation
+streams, compared against a stored baseline.
+
+Every scenario invokes one function of a synthetic app (see
+synthetic_app.LOAD_FUNCTIONS) from --concurrency streams, each sending the
+next invocation when the response to its previous one arrives. The best of
+--repeat rounds is reported.
+
+    http_sync       sync HTTP function
+    http_async      async HTTP function
+    blob_shmem      input and output blobs of --blob-size bytes in shared
+                    memory
+    eventhub_batch  Event Hub batch of --events events
+    log_heavy       HTTP function logging --log-lines lines
+
+The mock host runs in the same process and on the same event loop as the
+worker, so the CPU time and RSS include its share, which is small next to
+the worker's.
+
+Results are compared against --baseline when it exists, and the command
+fails when a metric regressed by more than --tolerance. Update the stored
+baseline with --save-baseline along with changes that move the numbers, so
+that the difference shows up in review:
+
+    python -m tests.benchmarks.bench_load --concurrency 8
+    python -m tests.benchmarks.bench_load --save-baseline
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import pathlib
+import sys
+import tempfile
+import time
+import typing
+import uuid
+
+from azure_functions_worker import protos
+from azure_functions_worker.bindings.shared_memory_data_transfer import (
+    FileAccessorFactory, SharedMemoryMap)
+from azure_functions_worker.bindings.shared_memory_data_transfer import \
+    SharedMemoryConstants as consts
+from azure_functions_worker.constants import \
+    FUNCTIONS_WORKER_SHARED_MEMORY_DATA_TRANSFER_ENABLED
+from tests.benchmarks.benchutils import (app_settings,
+                                         eventhub_batch_invocation,
+                                         http_get_binding, print_table)
+from tests.benchmarks.synthetic_app import LOAD_FUNCTIONS, generate_load_app
+from tests.utils import testutils
+
+BASELINE_PATH = pathlib.Path(__file__).parent / 'baselines' / 'bench_load.json'
+
+SCENARIOS = ('http_sync', 'http_async', 'blob_shmem', 'eventhub_batch',
+             'log_heavy')
+
+# key: metric, val: whether higher is better
+METRICS = {
+    'rps': True,
+    'p50_ms': False,
+    'p95_ms': False,
+    'p99_ms': False,
+    'cpu_ms': False,
+    'rss_mb': False,
+}
+
+
+class _ScenarioResult(typing.NamedTuple):
+    invocations: int
+    failures: int
+    duration: float
+    cpu_time: float
+    latencies: typing.List[float]
+    rss_mb: float
+
+    def percentile(self, percent: float) -> float:
+        latencies = sorted(self.latencies)
+        index = min(int(len(latencies) * percent / 100), len(latencies) - 1)
+        return latencies[index]
+
+    def metrics(self) -> typing.Dict[str, float]:
+        return {
+            'rps': self.invocations / self.duration,
+            'p50_ms': self.percentile(50) * 1000,
+            'p95_ms': self.percentile(95) * 1000,
+            'p99_ms': self.percentile(99) * 1000,
+            # CPU time of the process per invocation
+            'cpu_ms': self.cpu_time / self.invocations * 1000,
+            'rss_mb': self.rss_mb,
+        }
+
+
+def _rss_mb() -> float:
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+    except OSError:
+        # Not on Linux
+        return float('nan')
+    return pages * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+
+
+async def _invoke(host, name, input_data, metadata=None) -> bool:
+    _, r = await host.invoke_function(name, input_data, metadata)
+    return r.response.result.status == protos.StatusResult.Success
+
+
+def _http_invoker(name, query=None):
+    input_data = [protos.ParameterBinding(
+        name='req',
+        data=protos.TypedData(http=protos.RpcHttp(method='GET', query=query)))]
+
+    async def invoke(host):
+        return await _invoke(host, name, input_data)
+
+    return invoke
+
+
+def _blob_invoker(blob_size):
+    content = b'\x01' * blob_size
+    file_accessor = None
+
+    async def invoke(host):
+        nonlocal file_accessor
+        if file_accessor is None:
+            # Once shared memory is enabled by the scenario's app settings
+            file_accessor = FileAccessorFactory.create_file_accessor()
+
+        # What the host does for a blob input in shared memory
+        mem_map_name = str(uuid.uuid4())
+        mem_map = file_accessor.create_mem_map(
+            mem_map_name, consts.CONTENT_HEADER_TOTAL_BYTES + blob_size)
+        shared_mem_map = SharedMemoryMap(file_accessor, mem_map_name,
+                                         mem_map)
+        try:
+            shared_mem_map.put_bytes(content)
+            _, r = await host.invoke_function('blob_shmem', [
+                http_get_binding(),
+                protos.ParameterBinding(
+                    name='file',
+                    rpc_shared_memory=protos.RpcSharedMemory(
+                        name=mem_map_name, offset=0, count=blob_size,
+                        type=protos.RpcDataType.bytes))])
+        finally:
+            shared_mem_map.dispose()
+
+        output_maps = [binding.rpc_shared_memory.name
+                       for binding in r.response.output_data
+                       if binding.HasField('rpc_shared_memory')]
+        if output_maps:
+            await host.close_shared_memory_resources(output_maps)
+        return r.response.result.status == protos.StatusResult.Success \
+            and len(output_maps) == 1
+
+    return invoke
+
+
+def _eventhub_invoker(events):
+    request = eventhub_batch_invocation(events)
+
+    async def invoke(host):
+        return await _invoke(host, 'eventhub_batch', request.input_data,
+                             request.trigger_metadata)
+
+    return invoke
+
+
+def _scenarios(args) -> typing.Dict[str, typing.Tuple[
+        typing.Callable, typing.Dict[str, str]]]:
+    """Scenario name -> (invoker, app settings)"""
+    return {
+        'http_sync': (_http_invoker('http_sync'), {}),
+        'http_async': (_http_invoker('http_async'), {}),
+        'blob_shmem': (
+            _blob_invoker(args.blob_size),
+            {FUNCTIONS_WORKER_SHARED_MEMORY_DATA_TRANSFER_ENABLED: '1'}),
+        'eventhub_batch': (_eventhub_invoker(args.events), {}),
+        'log_heavy': (
+            _http_invoker('log_heavy', {'lines': str(args.log_lines)}), {}),
+    }
+
+
+async def _run_scenario(host, invoke, concurrency, invocations,
+                        warmup) -> _ScenarioResult:
+    for _ in range(warmup):
+        await invoke(host)
+
+    remaining = invocations
+    latencies: typing.List[float] = []
+    failures = 0
+
+    async def stream():
+        nonlocal remaining, failures
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            if not await invoke(host):
+                failures += 1
+            latencies.append(time.perf_counter() - start)
+
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    await asyncio.gather(*(stream() for _ in range(concurrency)))
+    duration = time.perf_counter() - start
+    cpu_time = time.process_time() - cpu_start
+    return _ScenarioResult(invocations=len(latencies), failures=failures,
+                           duration=duration, cpu_time=cpu_time,
+                           latencies=latencies, rss_mb=_rss_mb())
+
+
+async def _run(app_dir, scenarios, args):
+    results = {}
+    async with testutils.start_mockhost(script_root=app_dir,
+                                        concurrent=True) as host:
+        await host.init_worker()
+        _, r = await host.load_functions(sorted(LOAD_FUNCTIONS))
+        assert all(resp.result.status == protos.StatusResult.Success
+                   for resp in r.response.function_load_responses), r
+
+        for name in args.scenarios:
+            invoke, settings = scenarios[name]
+            with app_settings(settings):
+                # Keep the round with the most requests per second
+                rounds = [await _run_scenario(host, invoke, args.concurrency,
+                                              args.invocations, args.warmup)
+                          for _ in range(args.repeat)]
+            results[name] = min(rounds, key=lambda r: r.duration)
+    return results
+
+
+def _create_shared_memory_directories():
+    created = []
+    if sys.platform == 'linux':
+        for temp_dir in consts.UNIX_TEMP_DIRS:
+            path = os.path.join(temp_dir, consts.UNIX_TEMP_DIR_SUFFIX)
+            if not os.path.exists(path):
+                os.makedirs(path)
+                created.append(path)
+    return created
+
+
+def _compare(baseline, current, tolerance):
+    """Rows of the metrics of every scenario in both runs, and whether any
+    of them regressed by more than tolerance.
+    """
+    rows = []
+    regressed = False
+    for name, metrics in current.items():
+        if name not in baseline:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            old, new = baseline[name].get(metric), metrics[metric]
+            if not old or new != new:
+                # Not in the baseline, or not measured on this platform
+                continue
+            change = (new - old) / old
+            worse = -change if higher_is_better else change
+            status = 'REGRESSION' if worse > tolerance else ''
+            regressed = regressed or bool(status)
+            rows.append((name, metric, old, new, f'{change:+.1%}', status))
+    return rows, regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scenarios', type=lambda s: s.split(','),
+                        default=list(SCENARIOS),
+                        help='comma separated, all by default')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--invocations', type=int, default=1000,
+                        help='per scenario and round')
+    parser.add_argument('--warmup', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='rounds per scenario, the best is reported')
+    parser.add_argument('--blob-size', type=int,
+                        default=2 * consts.MIN_BYTES_FOR_SHARED_MEM_TRANSFER)
+    parser.add_argument('--events', type=int, default=100)
+    parser.add_argument('--log-lines', type=int, default=20)
+    parser.add_argument('--baseline', type=pathlib.Path, default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='store the results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='relative change of a metric which fails the '
+                             'comparison with the baseline')
+    args = parser.parse_args()
+
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f'unknown scenarios: {", ".join(sorted(unknown))}')
+    scenarios = _scenarios(args)
+
+    created_dirs = _create_shared_memory_directories()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            app_dir = generate_load_app(pathlib.Path(tmp) / 'load_app')
+            results = asyncio.run(_run(app_dir, scenarios, args))
+    finally:
+        for path in created_dirs:
+            os.rmdir(path)
+
+    current = {name: result.metrics() for name, result in results.items()}
+    print_table(
+        f'Load with {args.concurrency} concurrent streams, '
+        f'{args.invocations} invocations per scenario',
+        ('scenario', 'failures', 'rps', 'p50 ms', 'p95 ms', 'p99 ms',
+         'cpu ms/invocation', 'rss MB'),
+        [(name, results[name].failures, *metrics.values())
+         for name, metrics in current.items()])
+
+    config = {'concurrency': args.concurrency,
+              'invocations': args.invocations,
+              'repeat': args.repeat,
+              'blob_size': args.blob_size,
+              'events': args.events,
+              'log_lines': args.log_lines}
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(
+            {'config': config, 'scenarios': current}, indent=2) + '\n')
+        print(f'Saved the baseline to {args.baseline}')
+    elif args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text())
+        if baseline['config'] != config:
+            print(f'The baseline was measured with {baseline["config"]}, '
+                  f'the numbers may not be comparable\n')
+        rows, regressed = _compare(baseline['scenarios'], current,
+                                   args.tolerance)
+        print_table(f'Compared with {args.baseline}',
+                    ('scenario', 'metric', 'baseline', 'current', 'change',
+                     ''),
+                    rows)
+        if regressed:
+            sys.exit(f'Regressed by more than {args.tolerance:.0%}')
+
+    if any(result.failures for result in results.values()):
+        sys.exit('Some invocations failed')
+
+
+if __name__ == '__main__':
+    main()
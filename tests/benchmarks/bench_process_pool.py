@@ -0,0 +1,79 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+"""Throughput of a CPU bound sync function in the sync thread pool and in
+process pools (PYTHON_PROCESSPOOL_FUNCTIONS) of growing size.
+
+    python -m tests.benchmarks.bench_process_pool --calls 200
+"""
+
+import argparse
+import concurrent.futures
+import hashlib
+import os
+import time
+
+from azure_functions_worker.process_pool import ProcessPool
+from tests.benchmarks.benchutils import print_table
+
+
+def cpu_bound(rounds: int) -> str:
+    digest = b''
+    for _ in range(rounds):
+        digest = hashlib.sha256(digest).digest()
+    # Pure Python work holds the GIL, unlike hashlib on large buffers
+    return str(sum(i * i for i in range(rounds)))
+
+
+def _run_threads(workers: int, calls: int, rounds: int) -> float:
+    with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+        start = time.perf_counter()
+        futures = [executor.submit(cpu_bound, rounds) for _ in range(calls)]
+        for f in futures:
+            f.result()
+        return time.perf_counter() - start
+
+
+def _run_processes(workers: int, calls: int, rounds: int) -> float:
+    pool = ProcessPool(workers)
+    try:
+        concurrent.futures.wait(pool.warm())
+        # Resolves the function in every process
+        concurrent.futures.wait([pool.submit(cpu_bound, None, {'rounds': 1})
+                                 for _ in range(workers * 2)])
+
+        start = time.perf_counter()
+        futures = [pool.submit(cpu_bound, None, {'rounds': rounds})
+                   for _ in range(calls)]
+        for f in futures:
+            f.result()
+        return time.perf_counter() - start
+    finally:
+        pool.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls', type=int, default=200)
+    parser.add_argument('--rounds', type=int, default=200000)
+    args = parser.parse_args()
+
+    cpus = os.cpu_count() or 1
+    rows = []
+    elapsed = _run_threads(cpus, args.calls, args.rounds)
+    rows.append((f'thread pool, {cpus} threads', args.calls / elapsed))
+
+    workers = 1
+    while True:
+        elapsed = _run_processes(workers, args.calls, args.rounds)
+        rows.append((f'process pool, {workers} processes',
+                     args.calls / elapsed))
+        if workers >= cpus:
+            break
+        workers = min(workers * 2, cpus)
+
+    print_table(f'CPU bound sync function, {cpus} CPUs',
+                ('mode', 'calls/s'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+"""Throughput and latency of replaying a recording of host messages (see
+PYTHON_GRPC_RECORDING_FILE) against a worker in this process.
+
+    python -m tests.benchmarks.bench_replay recording.bin.gz --speed 0 \
+        --map /home/site/wwwroot=/path/to/app
+"""
+
+import argparse
+import asyncio
+
+from tests.benchmarks.benchutils import print_table
+from tests.utils.replay import replay
+
+
+def _path_mapping(value):
+    old, sep, new = value.partition('=')
+    if not sep:
+        raise argparse.ArgumentTypeError(f'{value} is not OLD=NEW')
+    return old, new
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('recording')
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help='pace relative to the recording, '
+                             '0 replays as fast as possible')
+    parser.add_argument('--max-inflight', type=int, default=None)
+    parser.add_argument('--map', type=_path_mapping, action='append',
+                        default=[], metavar='OLD=NEW',
+                        help='replace a prefix of the function app paths')
+    parser.add_argument('--timeout', type=float, default=60.0)
+    args = parser.parse_args()
+
+    result = asyncio.run(replay(args.recording,
+                                speed=args.speed or None,
+                                path_map=dict(args.map),
+                                max_inflight=args.max_inflight,
+                                timeout=args.timeout))
+
+    print_table(f'Replay of {args.recording}',
+                ('invocations', 'failures', 'duration s', 'invocations/s',
+                 'p50 ms', 'p90 ms', 'p99 ms'),
+                [(result.invocations, result.failures, result.duration,
+                  result.throughput, result.percentile(50) * 1000,
+                  result.percentile(90) * 1000,
+                  result.percentile(99) * 1000)])
+
+
+if __name__ == '__main__':
+    main()
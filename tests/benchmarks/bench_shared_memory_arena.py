@@ -0,0 +1,147 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+"""Memory maps created and deleted, and the latency of writing function
+outputs into shared memory, without and with PYTHON_SHARED_MEMORY_ARENA_SIZE.
+
+Each output is written with SharedMemoryManager.put_bytes, then read by the
+"host" (opened by name and copied out, as the host does) and freed with
+free_mem_map as when the host sends CloseSharedMemoryResourcesRequest. Up
+to --in-flight outputs are written before the oldest is read and freed.
+
+The latencies are those of put_bytes (write) and free_mem_map (free), the
+reading is not timed.
+
+    python -m tests.benchmarks.bench_shared_memory_arena --outputs 2000
+"""
+
+import argparse
+import collections
+import os
+import statistics
+import time
+import typing
+
+from azure_functions_worker.bindings.shared_memory_data_transfer import \
+    SharedMemoryManager
+from azure_functions_worker.bindings.shared_memory_data_transfer import \
+    SharedMemoryConstants as consts
+from azure_functions_worker.constants import PYTHON_SHARED_MEMORY_ARENA_SIZE
+from tests.benchmarks.bench_load import _create_shared_memory_directories
+from tests.benchmarks.benchutils import print_table
+
+_COUNTED_CALLS = ('create_mem_map', 'delete_mem_map', 'rename_mem_map')
+
+
+def _counted(call, name: str, counts: collections.Counter):
+    def counted(*args, **kwargs):
+        counts[name] += 1
+        return call(*args, **kwargs)
+    return counted
+
+
+def _count_calls(file_accessor, counts: collections.Counter):
+    for name in _COUNTED_CALLS:
+        setattr(file_accessor, name,
+                _counted(getattr(file_accessor, name), name, counts))
+
+
+def _create_manager(arena_size: int) -> SharedMemoryManager:
+    previous = os.environ.get(PYTHON_SHARED_MEMORY_ARENA_SIZE)
+    os.environ[PYTHON_SHARED_MEMORY_ARENA_SIZE] = str(arena_size)
+    try:
+        return SharedMemoryManager()
+    finally:
+        if previous is None:
+            del os.environ[PYTHON_SHARED_MEMORY_ARENA_SIZE]
+        else:
+            os.environ[PYTHON_SHARED_MEMORY_ARENA_SIZE] = previous
+
+
+def _host_read(shmem_mgr: SharedMemoryManager, mem_map_name: str,
+               count: int):
+    mem_map = shmem_mgr.file_accessor.open_mem_map(
+        mem_map_name, consts.CONTENT_HEADER_TOTAL_BYTES + count)
+    try:
+        return mem_map[consts.CONTENT_HEADER_TOTAL_BYTES:]
+    finally:
+        mem_map.close()
+
+
+def _run(sizes: typing.List[int], outputs: int, in_flight: int,
+         arena_size: int) -> dict:
+    shmem_mgr = _create_manager(arena_size)
+    counts: collections.Counter = collections.Counter()
+    _count_calls(shmem_mgr.file_accessor, counts)
+    contents = [b'x' * size for size in sizes]
+    pending = collections.deque()
+    write_times, free_times = [], []
+
+    def free_oldest():
+        metadata = pending.popleft()
+        _host_read(shmem_mgr, metadata.mem_map_name, metadata.count_bytes)
+        start = time.perf_counter()
+        shmem_mgr.free_mem_map(metadata.mem_map_name)
+        free_times.append(time.perf_counter() - start)
+
+    for i in range(outputs):
+        start = time.perf_counter()
+        metadata = shmem_mgr.put_bytes(contents[i % len(contents)])
+        write_times.append(time.perf_counter() - start)
+        pending.append(metadata)
+        if len(pending) >= in_flight:
+            free_oldest()
+    while pending:
+        free_oldest()
+    arena_mb = shmem_mgr.arena.size / 2 ** 20 if shmem_mgr.arena else 0
+    shmem_mgr.free_all_mem_maps()
+
+    def percentile(times, q):
+        return statistics.quantiles(times, n=100)[q - 1] * 1000
+
+    return {'created': counts['create_mem_map'],
+            'deleted': counts['delete_mem_map'],
+            'renamed': counts['rename_mem_map'],
+            'write_p50_ms': percentile(write_times, 50),
+            'write_p99_ms': percentile(write_times, 99),
+            'free_p50_ms': percentile(free_times, 50),
+            'arena_mb': arena_mb}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=lambda s: [int(v) for v in s.split(',')],
+                        default=[2 ** 20, 3 * 2 ** 20, 10 * 2 ** 20],
+                        help='output sizes in bytes, comma separated, '
+                             'written in turn')
+    parser.add_argument('--outputs', type=int, default=1000)
+    parser.add_argument('--in-flight', type=int, default=4,
+                        help='outputs written and not yet freed')
+    parser.add_argument('--arena-size', type=int, default=256 * 2 ** 20,
+                        help='PYTHON_SHARED_MEMORY_ARENA_SIZE of the arena run')
+    args = parser.parse_args()
+
+    rows = []
+    created_dirs = _create_shared_memory_directories()
+    try:
+        for arena_size in (0, args.arena_size):
+            result = _run(args.sizes, args.outputs, args.in_flight,
+                          arena_size)
+            rows.append((f'{arena_size / 2 ** 20:g} MB' if arena_size
+                         else 'disabled', result['created'],
+                         result['deleted'], result['renamed'],
+                         result['write_p50_ms'], result['write_p99_ms'],
+                         result['free_p50_ms'], result['arena_mb']))
+    finally:
+        for path in created_dirs:
+            os.rmdir(path)
+
+    print_table(f'{args.outputs} outputs of '
+                f'{", ".join(f"{s / 2 ** 20:g}" for s in args.sizes)} MB, '
+                f'{args.in_flight} in flight',
+                ('arena', 'created', 'deleted', 'renamed', 'write p50 ms',
+                 'write p99 ms', 'free p50 ms', 'arena MB at end'),
+                rows)
+
+
+if __name__ == '__main__':
+    main()
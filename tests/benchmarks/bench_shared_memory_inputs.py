@@ -0,0 +1,184 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+"""Peak memory and time of reading function inputs from shared memory, for
+every PYTHON_SHARED_MEMORY_INPUT_TYPE.
+
+This process writes each input into shared memory, as the host does, and a
+new process per measurement reads it with Datum.from_rpc_shared_memory and
+consumes it as a function would:
+
+    hash         the function computes the MD5 digest of a bytes input, in
+                 1 MB reads for the stream input type
+    InputStream  the blob binding decodes a bytes input into an InputStream,
+                 which the function reads in 1 MB reads (not available for
+                 the stream input type)
+    string       the function counts the lines of a string input, which is
+                 decoded the same way for every input type
+
+The peak RSS is the growth of the process' peak RSS (VmHWM, so Linux only),
+which includes the pages of the shared memory that were read. The peak heap
+is the peak size of the Python allocations, traced with tracemalloc in a
+second read.
+
+    python -m tests.benchmarks.bench_shared_memory_inputs --sizes 500000000
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+import typing
+import uuid
+
+from azure_functions_worker import protos
+from azure_functions_worker.bindings.datumdef import Datum
+from azure_functions_worker.bindings.shared_memory_data_transfer import (
+    FileAccessorFactory, SharedMemoryManager, SharedMemoryMap)
+from azure_functions_worker.bindings.shared_memory_data_transfer import \
+    SharedMemoryConstants as consts
+from azure_functions_worker.constants import (
+    PYTHON_SHARED_MEMORY_INPUT_TYPE, PYTHON_SHARED_MEMORY_INPUT_TYPES)
+from tests.benchmarks.bench_load import _create_shared_memory_directories
+from tests.benchmarks.benchutils import print_table
+
+CONSUMERS = ('hash', 'InputStream', 'string')
+
+_CHUNK_SIZE = 1024 * 1024
+
+
+def _consume(consumer: str, value) -> str:
+    if consumer == 'string':
+        return str(value.count('\n'))
+
+    if consumer == 'InputStream':
+        import azure.functions as func
+        value = func.blob.BlobConverter.decode(Datum(value, 'bytes'),
+                                               trigger_metadata=None)
+    elif not hasattr(value, 'read'):
+        return hashlib.md5(value).hexdigest()
+
+    digest = hashlib.md5()
+    for chunk in iter(lambda: value.read(_CHUNK_SIZE), b''):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _peak_rss_mb() -> float:
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) / 1024
+    raise RuntimeError('VmHWM is not in /proc/self/status')
+
+
+def _read(shmem_mgr: SharedMemoryManager, shmem: protos.RpcSharedMemory,
+          consumer: str) -> str:
+    try:
+        datum = Datum.from_rpc_shared_memory(shmem, shmem_mgr)
+        return _consume(consumer, datum.value)
+    finally:
+        # As the dispatcher does once the invocation completes
+        shmem_mgr.close_input_mem_map(shmem.name)
+
+
+def _measure(mem_map_name: str, count: int, consumer: str) -> dict:
+    """Runs in a new process, with the input type in the environment."""
+    shmem_mgr = SharedMemoryManager()
+    shmem = protos.RpcSharedMemory(
+        name=mem_map_name, offset=0, count=count,
+        type=protos.RpcDataType.string if consumer == 'string'
+        else protos.RpcDataType.bytes)
+    rss_before = _peak_rss_mb()
+
+    start = time.perf_counter()
+    digest = _read(shmem_mgr, shmem, consumer)
+    duration = time.perf_counter() - start
+    peak_rss = _peak_rss_mb()
+
+    tracemalloc.start()
+    _read(shmem_mgr, shmem, consumer)
+    peak_heap = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {'digest': digest, 'ms': duration * 1000,
+            'peak_rss_mb': peak_rss - rss_before,
+            'peak_heap_mb': peak_heap / 2 ** 20}
+
+
+def _run_measurement(mem_map_name: str, count: int, consumer: str,
+                     input_type: str) -> dict:
+    env = dict(os.environ, **{PYTHON_SHARED_MEMORY_INPUT_TYPE: input_type})
+    output = subprocess.run(
+        [sys.executable, '-m', __spec__.name, '--measure',
+         json.dumps([mem_map_name, count, consumer])],
+        env=env, check=True, stdout=subprocess.PIPE).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def _write_input(file_accessor, content: bytes) -> SharedMemoryMap:
+    mem_map_name = str(uuid.uuid4())
+    mem_map = file_accessor.create_mem_map(
+        mem_map_name, consts.CONTENT_HEADER_TOTAL_BYTES + len(content))
+    shared_mem_map = SharedMemoryMap(file_accessor, mem_map_name, mem_map)
+    shared_mem_map.put_bytes(content)
+    return shared_mem_map
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=lambda s: [int(v) for v in s.split(',')],
+                        default=[100 * 2 ** 20, 500 * 2 ** 20],
+                        help='input sizes in bytes, comma separated')
+    parser.add_argument('--consumers', type=lambda s: s.split(','),
+                        default=list(CONSUMERS),
+                        help='comma separated, all by default')
+    parser.add_argument('--measure', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(_measure(*json.loads(args.measure))))
+        return
+
+    unknown = set(args.consumers) - set(CONSUMERS)
+    if unknown:
+        parser.error(f'unknown consumers: {", ".join(sorted(unknown))}')
+
+    rows: typing.List[tuple] = []
+    created_dirs = _create_shared_memory_directories()
+    try:
+        file_accessor = FileAccessorFactory.create_file_accessor()
+        for size in args.sizes:
+            shared_mem_map = _write_input(file_accessor, b'x' * size)
+            try:
+                for consumer in args.consumers:
+                    for input_type in PYTHON_SHARED_MEMORY_INPUT_TYPES:
+                        if consumer == 'InputStream' and input_type == 'stream':
+                            continue
+                        if consumer == 'string' and input_type != 'bytes':
+                            continue
+                        result = _run_measurement(
+                            shared_mem_map.mem_map_name, size, consumer,
+                            input_type)
+                        rows.append((f'{size / 2 ** 20:g} MB', consumer,
+                                     '' if consumer == 'string'
+                                     else input_type, result['ms'],
+                                     result['peak_rss_mb'],
+                                     result['peak_heap_mb']))
+            finally:
+                shared_mem_map.dispose()
+    finally:
+        for path in created_dirs:
+            os.rmdir(path)
+
+    print_table('Inputs read from shared memory',
+                ('size', 'consumer', 'input type', 'ms', 'peak RSS MB',
+                 'peak heap MB'),
+                rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+"""Cost of the shared memory outputs of multi-output invocations, written
+into one memory map each or packed into one memory map per invocation
+(PYTHON_SHARED_MEMORY_PACK_OUTPUTS).
+
+For every invocation, its outputs are written with put_bytes (within
+pack_outputs when packed), each read back with get_bytes at its offset as a
+function reading them as inputs would, and their memory maps freed as when
+the host sends CloseSharedMemoryResourcesRequest. Times are per invocation,
+as the best of --repeat rounds.
+
+    python -m tests.benchmarks.bench_shared_memory_packing --outputs 2,8
+"""
+
+import argparse
+import collections
+import contextlib
+import os
+import time
+
+from azure_functions_worker.bindings.shared_memory_data_transfer import \
+    SharedMemoryManager
+from tests.benchmarks.bench_load import _create_shared_memory_directories
+from tests.benchmarks.bench_shared_memory_arena import _count_calls
+from tests.benchmarks.benchutils import print_table
+
+
+def _invoke(shmem_mgr: SharedMemoryManager, contents, packed: bool):
+    """Times of writing, reading and freeing the outputs of an invocation."""
+    start = time.perf_counter()
+    with shmem_mgr.pack_outputs() if packed else contextlib.nullcontext():
+        metas = [shmem_mgr.put_bytes(content) for content in contents]
+    written = time.perf_counter()
+    for meta in metas:
+        shmem_mgr.get_bytes(meta.mem_map_name, meta.offset, meta.count_bytes)
+    read = time.perf_counter()
+    for mem_map_name in dict.fromkeys(meta.mem_map_name for meta in metas):
+        shmem_mgr.free_mem_map(mem_map_name)
+    freed = time.perf_counter()
+    return written - start, read - written, freed - read
+
+
+def _run(num_outputs: int, size: int, packed: bool, invocations: int,
+         repeat: int) -> dict:
+    shmem_mgr = SharedMemoryManager()
+    counts: collections.Counter = collections.Counter()
+    _count_calls(shmem_mgr.file_accessor, counts)
+    contents = [os.urandom(size) for _ in range(num_outputs)]
+    best = [float('inf')] * 3
+    for _ in range(repeat):
+        totals = [0.0] * 3
+        for _ in range(invocations):
+            for i, duration in enumerate(_invoke(shmem_mgr, contents, packed)):
+                totals[i] += duration
+        best = [min(b, t / invocations) for b, t in zip(best, totals)]
+    return {'created': counts['create_mem_map'] / (invocations * repeat),
+            'write_ms': best[0] * 1000, 'read_ms': best[1] * 1000,
+            'free_ms': best[2] * 1000}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--outputs', type=lambda s: [int(v) for v in s.split(',')],
+                        default=[2, 4, 8],
+                        help='outputs per invocation, comma separated')
+    parser.add_argument('--size', type=int, default=2 ** 20,
+                        help='bytes per output')
+    parser.add_argument('--invocations', type=int, default=100,
+                        help='per round')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='rounds, the best is reported')
+    args = parser.parse_args()
+
+    rows = []
+    created_dirs = _create_shared_memory_directories()
+    try:
+        for num_outputs in args.outputs:
+            for packed in (False, True):
+                result = _run(num_outputs, args.size, packed,
+                              args.invocations, args.repeat)
+                rows.append((num_outputs, 'packed' if packed else 'one each',
+                             result['created'], result['write_ms'],
+                             result['read_ms'], result['free_ms']))
+    finally:
+        for path in created_dirs:
+            os.rmdir(path)
+
+    print_table(f'Outputs of {args.size / 2 ** 20:g} MB, ms per invocation, '
+                f'best of {args.repeat}',
+                ('outputs', 'memory maps', 'created', 'write', 'read', 'free'),
+                rows)
+
+
+if __name__ == '__main__':
+    main()
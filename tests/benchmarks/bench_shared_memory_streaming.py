@@ -0,0 +1,113 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+"""Peak memory and time of writing large blob outputs into shared memory,
+encoded as bytes first or streamed into the memory map as they are read.
+
+    bytearray   a bytearray of --size bytes, built before the output is set
+    file        a file of --size bytes opened for reading
+
+Encoded, the output goes through the blob binding (which copies it into
+bytes, or reads the file whole) and SharedMemoryManager.put_bytes, as it did
+before streaming. Streamed, it goes through SharedMemoryManager.put_stream.
+Times are the best of --repeat rounds, peak heap (the copies made on the way
+into shared memory) is traced with tracemalloc in another round.
+
+    python -m tests.benchmarks.bench_shared_memory_streaming --size 500000000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from azure_functions_worker import protos
+from azure_functions_worker.bindings import meta
+from azure_functions_worker.bindings.datumdef import Datum
+from azure_functions_worker.bindings.shared_memory_data_transfer import \
+    SharedMemoryManager
+from azure_functions_worker.constants import \
+    FUNCTIONS_WORKER_SHARED_MEMORY_DATA_TRANSFER_ENABLED
+from tests.benchmarks.bench_load import _create_shared_memory_directories
+from tests.benchmarks.benchutils import print_table
+
+
+def _encoded_output(shmem_mgr: SharedMemoryManager, binding, obj) \
+        -> protos.RpcSharedMemory:
+    datum = meta._encode_datum(binding, obj, bytes)
+    return Datum.to_rpc_shared_memory(datum, shmem_mgr)
+
+
+def _streamed_output(shmem_mgr: SharedMemoryManager, binding, obj) \
+        -> protos.RpcSharedMemory:
+    return meta._encode_outgoing_param_binding(
+        binding, obj, pytype=bytes, out_name='output', shmem_mgr=shmem_mgr,
+        is_function_data_cache_enabled=False).rpc_shared_memory
+
+
+def _output(shmem_mgr: SharedMemoryManager, binding, write, create_source):
+    source = create_source()
+    try:
+        shmem = write(shmem_mgr, binding, source)
+    finally:
+        if hasattr(source, 'close'):
+            source.close()
+    shmem_mgr.free_mem_map(shmem.name)
+
+
+def _measure(*args, repeat: int):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        _output(*args)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    _output(*args)
+    peak_heap = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best * 1000, peak_heap / 2 ** 20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=500 * 10 ** 6,
+                        help='bytes of the output')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='rounds, the best is reported')
+    args = parser.parse_args()
+
+    os.environ[FUNCTIONS_WORKER_SHARED_MEMORY_DATA_TRANSFER_ENABLED] = 'true'
+    meta.load_binding_registry()
+    binding = meta.get_binding('blob')
+    content = bytearray(os.urandom(args.size))
+
+    rows = []
+    created_dirs = _create_shared_memory_directories()
+    with tempfile.NamedTemporaryFile() as file:
+        file.write(content)
+        file.flush()
+        sources = {
+            'bytearray': lambda: content,
+            'file': lambda: open(file.name, 'rb'),
+        }
+        try:
+            shmem_mgr = SharedMemoryManager()
+            for source_type, create_source in sources.items():
+                for transfer, write in (('encoded', _encoded_output),
+                                        ('streamed', _streamed_output)):
+                    rows.append((source_type, transfer,
+                                 *_measure(shmem_mgr, binding, write,
+                                           create_source,
+                                           repeat=args.repeat)))
+        finally:
+            for path in created_dirs:
+                os.rmdir(path)
+
+    print_table(f'{args.size / 10 ** 6:g} MB blob outputs, best of '
+                f'{args.repeat}',
+                ('output', 'transfer', 'ms', 'peak heap MB'),
+                rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+"""Decode time of an Event Hub batch trigger with its trigger metadata
+converted eagerly (every entry up front) and lazily (TriggerMetadata).
+
+The decoder only reads the system properties, the remaining entries are
+never converted by the lazy mapping. The best of --repeat runs is reported.
+
+    python -m tests.benchmarks.bench_trigger_metadata --events 100
+"""
+
+import argparse
+import time
+import typing
+
+import azure.functions as func
+
+from azure_functions_worker import bindings
+from azure_functions_worker.bindings import datumdef, meta
+from tests.benchmarks.benchutils import eventhub_batch_invocation, print_table
+
+
+def _decode_eager(binding, request):
+    # What from_incoming_proto did before TriggerMetadata
+    metadata = {k: datumdef.Datum.from_typed_data(v)
+                for k, v in request.trigger_metadata.items()}
+    datum = datumdef.Datum.from_typed_data(request.input_data[0].data)
+    return binding.decode(datum, trigger_metadata=metadata)
+
+
+def _decode_lazy(binding, request):
+    metadata = datumdef.TriggerMetadata(request.trigger_metadata)
+    datum = datumdef.Datum.from_typed_data(request.input_data[0].data)
+    return binding.decode(datum, trigger_metadata=metadata)
+
+
+def _metadata_eager(binding, request):
+    # Only the trigger metadata work of the decoder, which reads the system
+    # properties of the batch
+    metadata = {k: datumdef.Datum.from_typed_data(v)
+                for k, v in request.trigger_metadata.items()}
+    return metadata.get('SystemPropertiesArray')
+
+
+def _metadata_lazy(binding, request):
+    metadata = datumdef.TriggerMetadata(request.trigger_metadata)
+    return metadata.get('SystemPropertiesArray')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=100)
+    parser.add_argument('--invocations', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    bindings.load_binding_registry()
+    binding = meta.get_binding('eventHubTrigger')
+    request = eventhub_batch_invocation(args.events)
+    events = _decode_lazy(binding, request)
+    assert len(events) == args.events \
+        and isinstance(events[0], func.EventHubEvent)
+
+    rows = []
+    decoders: typing.Tuple = (
+        ('eager', 'decode', _decode_eager),
+        ('lazy', 'decode', _decode_lazy),
+        ('eager', 'metadata only', _metadata_eager),
+        ('lazy', 'metadata only', _metadata_lazy))
+    for mode, work, decode in decoders:
+        for _ in range(min(args.invocations, 100)):
+            decode(binding, request)
+        best = float('inf')
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            for _ in range(args.invocations):
+                decode(binding, request)
+            best = min(best, time.perf_counter() - start)
+        rows.append((mode, work, args.events, len(request.trigger_metadata),
+                     best / args.invocations * 1e6))
+
+    print_table('Event Hub batch trigger decode',
+                ('metadata', 'measured', 'events', 'metadata keys',
+                 'us/invocation'),
+                rows)
+
+
+if __name__ == '__main__':
+    main()
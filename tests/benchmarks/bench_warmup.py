@@ -0,0 +1,69 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+"""Latency of the first invocation with and without a WorkerWarmupRequest.
+
+Starts a fresh worker for every round, loads a sync function and measures
+the first invocation, optionally after warming the worker up. Rounds
+alternate between both modes so that process wide caches (imports) favour
+neither.
+
+    python -m tests.benchmarks.bench_warmup --rounds 20
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from azure_functions_worker import protos
+from azure_functions_worker.constants import PYTHON_THREADPOOL_THREAD_COUNT
+from tests.benchmarks.benchutils import app_settings, http_get_binding, \
+    print_table
+from tests.utils import testutils
+
+DISPATCHER_FUNCTIONS_DIR = testutils.UNIT_TESTS_FOLDER / 'dispatcher_functions'
+FUNCTION_NAME = 'show_context'
+
+
+async def _first_invocation(warmup: bool) -> float:
+    async with testutils.start_mockhost(
+            script_root=DISPATCHER_FUNCTIONS_DIR) as host:
+        await host.init_worker()
+        if warmup:
+            r = await host.warmup_worker()
+            assert r.response.result.status == protos.StatusResult.Success
+        _, r = await host.load_function(FUNCTION_NAME)
+        assert r.response.result.status == protos.StatusResult.Success
+
+        start = time.perf_counter()
+        _, r = await host.invoke_function(FUNCTION_NAME, [http_get_binding()])
+        elapsed = time.perf_counter() - start
+        assert r.response.result.status == protos.StatusResult.Success
+        return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=10)
+    parser.add_argument('--threads', type=int, default=16)
+    args = parser.parse_args()
+
+    samples = {False: [], True: []}
+    with app_settings({PYTHON_THREADPOOL_THREAD_COUNT: str(args.threads)}):
+        for i in range(args.rounds * 2):
+            warmup = bool(i % 2)
+            samples[warmup].append(asyncio.run(_first_invocation(warmup)))
+
+    cold = statistics.median(samples[False])
+    rows = []
+    for warmup, mode in ((False, 'cold'), (True, 'WorkerWarmupRequest')):
+        median = statistics.median(samples[warmup])
+        rows.append((mode, args.rounds, median * 1e3,
+                     max(samples[warmup]) * 1e3, f'{cold / median:.2f}x'))
+
+    print_table('First invocation latency',
+                ('mode', 'rounds', 'median ms', 'max ms', 'speedup'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+"""Round trip latency of WorkerStatusRequest with and without the load
+report (PYTHON_ENABLE_WORKER_LOAD_STATUS).
+
+    python -m tests.benchmarks.bench_worker_status --requests 2000
+"""
+
+import argparse
+import asyncio
+import time
+
+from azure_functions_worker.constants import PYTHON_ENABLE_WORKER_LOAD_STATUS
+from tests.benchmarks.benchutils import app_settings, print_table
+from tests.utils import testutils
+
+DISPATCHER_FUNCTIONS_DIR = testutils.UNIT_TESTS_FOLDER / 'dispatcher_functions'
+
+
+async def _run(requests: int) -> float:
+    async with testutils.start_mockhost(
+            script_root=DISPATCHER_FUNCTIONS_DIR) as host:
+        await host.init_worker()
+        for _ in range(min(requests, 50)):
+            await host.get_worker_status()
+
+        start = time.perf_counter()
+        for _ in range(requests):
+            await host.get_worker_status()
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=1000)
+    args = parser.parse_args()
+
+    rows = []
+    for mode, enabled in (('status only', 'false'), ('with load', 'true')):
+        with app_settings({PYTHON_ENABLE_WORKER_LOAD_STATUS: enabled}):
+            elapsed = asyncio.run(_run(args.requests))
+        rows.append((mode, args.requests, elapsed / args.requests * 1e6))
+
+    print_table('WorkerStatusRequest round trip',
+                ('mode', 'requests', 'us/request'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+"""Benchmark helpers.
+
+All functions in this file should be considered private APIs,
+and can be changed without a notice.
+"""
+
+import contextlib
+import json
+import os
+import typing
+from unittest.mock import patch
+
+from azure_functions_worker import protos
+
+
+@contextlib.contextmanager
+def app_settings(settings: typing.Mapping[str, str]):
+    """Temporarily apply the given app settings to os.environ."""
+    with patch.dict(os.environ, settings):
+        yield
+
+
+def http_get_binding(name: str = 'req') -> protos.ParameterBinding:
+    return protos.ParameterBinding(
+        name=name,
+        data=protos.TypedData(http=protos.RpcHttp(method='GET')))
+
+
+def eventhub_batch_invocation(
+        events: int, invocation_id: str = 'bench',
+        function_id: str = 'bench') -> protos.InvocationRequest:
+    """An Event Hub trigger invocation of a batch (cardinality many) of
+    events, with the trigger metadata the host sends along.
+    """
+    bodies = [json.dumps({'id': i, 'payload': 'x' * 64}) for i in range(events)]
+    properties = [{'key': f'value-{i}', 'tenant': 'contoso'}
+                  for i in range(events)]
+    system_properties = [{
+        'x-opt-sequence-number': i,
+        'x-opt-offset': str(i * 100),
+        'x-opt-enqueued-time': '2023-01-01T00:00:00Z',
+        'PartitionKey': f'pk-{i % 4}',
+    } for i in range(events)]
+
+    trigger_metadata = {
+        'SystemPropertiesArray': protos.TypedData(
+            json=json.dumps(system_properties)),
+        'PropertiesArray': protos.TypedData(json=json.dumps(properties)),
+        'PartitionKeyArray': protos.TypedData(collection_string={
+            'string': [f'pk-{i % 4}' for i in range(events)]}),
+        'OffsetArray': protos.TypedData(collection_string={
+            'string': [str(i * 100) for i in range(events)]}),
+        'SequenceNumberArray': protos.TypedData(collection_sint64={
+            'sint64': list(range(events))}),
+        'EnqueuedTimeUtcArray': protos.TypedData(collection_string={
+            'string': ['2023-01-01T00:00:00Z'] * events}),
+        'PartitionContext': protos.TypedData(json=json.dumps({
+            'ConsumerGroup': '$Default', 'EventHubName': 'hub',
+            'PartitionId': '0'})),
+        'sys': protos.TypedData(json=json.dumps({
+            'MethodName': 'main', 'UtcNow': '2023-01-01T00:00:00Z',
+            'RandGuid': '00000000-0000-0000-0000-000000000000'})),
+    }
+    return protos.InvocationRequest(
+        invocation_id=invocation_id,
+        function_id=function_id,
+        input_data=[protos.ParameterBinding(
+            name='events',
+            data=protos.TypedData(collection_string={'string': bodies}))],
+        trigger_metadata=trigger_metadata)
+
+
+def print_table(title: str, header: typing.Sequence[str],
+                rows: typing.Iterable[typing.Sequence[typing.Any]]) -> None:
+    rows = [[_format_cell(c) for c in row] for row in rows]
+    widths = [max(len(str(h)), *(len(r[i]) for r in rows))
+              for i, h in enumerate(header)]
+
+    print(title)
+    print('  '.join(str(h).ljust(w) for h, w in zip(header, widths)))
+    print('  '.join('-' * w for w in widths))
+    for row in rows:
+        print('  '.join(c.ljust(w) for c, w in zip(row, widths)))
+    print()
+
+
+def _format_cell(value: typing.Any) -> str:
+    if isinstance(value, float):
+        return f'{value:,.2f}'
+    return str(value)
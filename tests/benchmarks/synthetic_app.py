@@ -0,0 +1,232 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+"""Generators for synthetic function apps used by the benchmarks."""
+
+import json
+import pathlib
+
+V1_FUNCTION_TEMPLATE = """\
+import azure.functions as func
+
+
+def main(req: func.HttpRequest) -> func.HttpResponse:
+    return func.HttpResponse(body='{name}')
+"""
+
+V1_FUNCTION_JSON = {
+    "scriptFile": "__init__.py",
+    "bindings": [
+        {"type": "httpTrigger", "direction": "in", "name": "req"},
+        {"type": "http", "direction": "out", "name": "$return"}
+    ]
+}
+
+
+def generate_v1_app(app_dir: pathlib.Path, num_functions: int,
+                    prefix: str = 'func') -> pathlib.Path:
+    """Writes a legacy (function.json based) app with num_functions HTTP
+    functions into app_dir. Function names are prefixed with prefix so that
+    several apps can be loaded into the same process without sharing their
+    module imports.
+    """
+    app_dir.mkdir(parents=True, exist_ok=True)
+    for i in range(num_functions):
+        name = f'{prefix}_{i:05d}'
+        func_dir = app_dir / name
+        func_dir.mkdir(exist_ok=True)
+        (func_dir / '__init__.py').write_text(
+            V1_FUNCTION_TEMPLATE.format(name=name))
+        (func_dir / 'function.json').write_text(json.dumps(V1_FUNCTION_JSON))
+    return app_dir
+
+
+V2_APP_TEMPLATE = """\
+import azure.functions as func
+{imports}
+app = func.FunctionApp(http_auth_level=func.AuthLevel.ANONYMOUS)
+{registrations}{functions}"""
+
+V2_BLUEPRINT_TEMPLATE = """\
+import azure.functions as func
+{imports}
+bp = func.Blueprint()
+{functions}"""
+
+V2_FUNCTION_TEMPLATE = """
+
+@{decorator}.route(route='{name}')
+def {name}(req: func.HttpRequest) -> func.HttpResponse:
+    return func.HttpResponse(body='{name}')
+"""
+
+# The blob client type and its converter, in sdk_types.py, stand in for a
+# deferred binding extension
+V2_DEFERRED_FUNCTION_TEMPLATE = """
+
+@{decorator}.route(route='{name}')
+@{decorator}.blob_input(
+    arg_name='client', path='bench/{name}', connection='AzureWebJobsStorage')
+def {name}(
+        req: func.HttpRequest,
+        client: sdk_types.BlobClient) -> func.HttpResponse:
+    return func.HttpResponse(body='{name}')
+"""
+
+V2_SDK_TYPES = """\
+from azurefunctions.extensions.base import InConverter, SdkType
+
+
+class BlobClient(SdkType):
+
+    def get_sdk_type(self):
+        return self
+
+
+class BlobClientConverter(InConverter, binding='blob'):
+
+    @classmethod
+    def check_input_type_annotation(cls, pytype: type) -> bool:
+        return issubclass(pytype, BlobClient)
+
+    @classmethod
+    def decode(cls, data, *, trigger_metadata, pytype):
+        return BlobClient(data=data.value)
+
+    @classmethod
+    def has_implicit_output(cls) -> bool:
+        return False
+"""
+
+
+def generate_v2_app(app_dir: pathlib.Path, num_functions: int,
+                    blueprints: int = 0,
+                    deferred_bindings: bool = False) -> pathlib.Path:
+    """Writes a decorator based (V2) app with num_functions HTTP functions
+    into app_dir, named func_00000 onwards.
+
+    With blueprints, the functions are spread over that many blueprint
+    modules registered by function_app.py. With deferred_bindings, every
+    function but the first also takes an input blob as an SdkType.
+    """
+    app_dir.mkdir(parents=True, exist_ok=True)
+    if deferred_bindings:
+        (app_dir / 'sdk_types.py').write_text(V2_SDK_TYPES)
+    imports = '\nimport sdk_types\n' if deferred_bindings else ''
+
+    def function(decorator: str, i: int) -> str:
+        template = V2_DEFERRED_FUNCTION_TEMPLATE \
+            if deferred_bindings and i else V2_FUNCTION_TEMPLATE
+        return template.format(decorator=decorator, name=f'func_{i:05d}')
+
+    if not blueprints:
+        (app_dir / 'function_app.py').write_text(V2_APP_TEMPLATE.format(
+            imports=imports, registrations='',
+            functions=''.join(function('app', i)
+                              for i in range(num_functions))))
+        return app_dir
+
+    for b in range(blueprints):
+        (app_dir / f'blueprint_{b:03d}.py').write_text(
+            V2_BLUEPRINT_TEMPLATE.format(
+                imports=imports,
+                functions=''.join(function('bp', i) for i in range(
+                    b, num_functions, blueprints))))
+    (app_dir / 'function_app.py').write_text(V2_APP_TEMPLATE.format(
+        imports=''.join(f'import blueprint_{b:03d}\n'
+                        for b in range(blueprints)),
+        registrations=''.join(
+            f'app.register_functions(blueprint_{b:03d}.bp)\n'
+            for b in range(blueprints)),
+        functions=''))
+    return app_dir
+
+
+def _http_function_json(*bindings: dict) -> dict:
+    return {
+        "scriptFile": "__init__.py",
+        "bindings": [
+            {"type": "httpTrigger", "direction": "in", "name": "req"},
+            *bindings,
+            {"type": "http", "direction": "out", "name": "$return"}
+        ]
+    }
+
+
+# key: function name, val: (source, function.json)
+LOAD_FUNCTIONS = {
+    'http_sync': ("""\
+import azure.functions as func
+
+
+def main(req: func.HttpRequest) -> func.HttpResponse:
+    return func.HttpResponse(body=req.params.get('name', 'sync'))
+""", _http_function_json()),
+
+    'http_async': ("""\
+import azure.functions as func
+
+
+async def main(req: func.HttpRequest) -> func.HttpResponse:
+    return func.HttpResponse(body=req.params.get('name', 'async'))
+""", _http_function_json()),
+
+    # The input blob is copied to the output blob, both in shared memory
+    # when they are large enough
+    'blob_shmem': ("""\
+import azure.functions as func
+
+
+def main(req: func.HttpRequest, file: bytes,
+         copy: func.Out[bytes]) -> func.HttpResponse:
+    copy.set(file)
+    return func.HttpResponse(body=str(len(file)))
+""", _http_function_json(
+        {"type": "blob", "direction": "in", "name": "file",
+         "dataType": "binary", "path": "bench/in"},
+        {"type": "blob", "direction": "out", "name": "copy",
+         "dataType": "binary", "path": "bench/out"})),
+
+    'eventhub_batch': ("""\
+from typing import List
+
+import azure.functions as func
+
+
+def main(events: List[func.EventHubEvent]) -> None:
+    for event in events:
+        event.get_body()
+        event.sequence_number
+""", {
+        "scriptFile": "__init__.py",
+        "bindings": [
+            {"type": "eventHubTrigger", "direction": "in", "name": "events",
+             "eventHubName": "bench", "cardinality": "many"}
+        ]
+    }),
+
+    'log_heavy': ("""\
+import logging
+
+import azure.functions as func
+
+
+def main(req: func.HttpRequest) -> func.HttpResponse:
+    lines = int(req.params.get('lines', '20'))
+    for i in range(lines):
+        logging.info('log line %d of %d', i + 1, lines)
+    return func.HttpResponse(body=str(lines))
+""", _http_function_json()),
+}
+
+
+def generate_load_app(app_dir: pathlib.Path) -> pathlib.Path:
+    """Writes the LOAD_FUNCTIONS app, driven by the load benchmark, into
+    app_dir.
+    """
+    app_dir.mkdir(parents=True, exist_ok=True)
+    for name, (source, function_json) in LOAD_FUNCTIONS.items():
+        func_dir = app_dir / name
+        func_dir.mkdir(exist_ok=True)
+        (func_dir / '__init__.py').write_text(source)
+        (func_dir / 'function.json').write_text(json.dumps(function_json))
+    return app_dir
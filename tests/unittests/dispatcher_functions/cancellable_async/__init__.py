@@ -0,0 +1,11 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+import asyncio
+
+import azure.functions as func
+
+
+async def main(req: func.HttpRequest,
+               context: func.Context) -> func.HttpResponse:
+    await asyncio.sleep(float(req.params.get('seconds', 10)))
+    return func.HttpResponse(body='done')
@@ -0,0 +1,9 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+import azure.functions as func
+
+
+def main(req: func.HttpRequest, context: func.Context) -> func.HttpResponse:
+    # Cooperatively stop as soon as the host cancels the invocation
+    cancelled = context.cancellation_event.wait(timeout=10)
+    return func.HttpResponse(body=f'cancelled: {cancelled}')
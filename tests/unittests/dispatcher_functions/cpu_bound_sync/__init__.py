@@ -0,0 +1,26 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+import hashlib
+import json
+import logging
+import os
+
+import azure.functions as func
+
+
+def main(req: func.HttpRequest, context: func.Context) -> func.HttpResponse:
+    digest = req.get_body()
+    for _ in range(int(req.params.get('rounds', 1000))):
+        digest = hashlib.sha256(digest).digest()
+    logging.info('Hashed in process %s', os.getpid())
+
+    if req.params.get('fail'):
+        raise ValueError('hashing failed')
+    if req.params.get('size'):
+        return func.HttpResponse(body=b'x' * int(req.params['size']))
+    return func.HttpResponse(body=json.dumps({
+        'pid': os.getpid(),
+        'invocation_id': context.invocation_id,
+        'body_size': len(req.get_body()),
+        'digest': digest.hex()
+    }), mimetype='application/json')
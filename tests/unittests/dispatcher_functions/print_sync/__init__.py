@@ -0,0 +1,12 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+import sys
+
+import azure.functions as func
+
+
+def main(req: func.HttpRequest) -> func.HttpResponse:
+    print('first line')
+    print('second line')
+    print('something failed', file=sys.stderr)
+    return func.HttpResponse(body='ok')
@@ -0,0 +1,102 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+import asyncio
+import unittest
+
+from azure_functions_worker.concurrency import (ConcurrencyLimiter,
+                                                InvocationQueueFullError)
+
+
+class TestConcurrencyLimiter(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def test_unlimited(self):
+        limiter = ConcurrencyLimiter(None, None, 10)
+        self.assertFalse(limiter.is_limited(None))
+        self.assertTrue(limiter.is_limited(2))
+
+    def test_get_function_limit(self):
+        limiter = ConcurrencyLimiter(None, 4, 10,
+                                     function_limits={'custom': 2})
+        self.assertEqual(limiter.get_function_limit('custom'), 2)
+        self.assertIsNone(limiter.get_function_limit('other'))
+
+    def test_global_limit(self):
+        self.loop.run_until_complete(self._global_limit())
+
+    def test_function_limit(self):
+        self.loop.run_until_complete(self._function_limit())
+
+    def test_queue_overflow(self):
+        self.loop.run_until_complete(self._queue_overflow())
+
+    def test_cancelled_waiter(self):
+        self.loop.run_until_complete(self._cancelled_waiter())
+
+    async def _global_limit(self):
+        limiter = ConcurrencyLimiter(2, None, 10)
+        self.assertEqual(await limiter.acquire('f1', None), 0.0)
+        self.assertEqual(await limiter.acquire('f2', None), 0.0)
+
+        waiter = asyncio.ensure_future(limiter.acquire('f1', None))
+        await asyncio.sleep(0)
+        self.assertFalse(waiter.done())
+        self.assertEqual(limiter.waiting, 1)
+
+        limiter.release('f2')
+        self.assertGreaterEqual(await waiter, 0.0)
+        self.assertEqual(limiter.running, 2)
+        self.assertEqual(limiter.waiting, 0)
+        self.assertEqual(limiter.waits, 1)
+
+    async def _function_limit(self):
+        limiter = ConcurrencyLimiter(None, 1, 10)
+        await limiter.acquire('hot', None)
+        hot_waiter = asyncio.ensure_future(limiter.acquire('hot', None))
+        await asyncio.sleep(0)
+
+        # A busy function does not hold back the others
+        self.assertEqual(await limiter.acquire('other', None), 0.0)
+        # A function's own limit overrides the default one
+        self.assertEqual(await limiter.acquire('custom', 2), 0.0)
+        self.assertEqual(await limiter.acquire('custom', 2), 0.0)
+        self.assertFalse(hot_waiter.done())
+
+        limiter.release('hot')
+        await hot_waiter
+        self.assertEqual(limiter.running, 4)
+
+    async def _queue_overflow(self):
+        limiter = ConcurrencyLimiter(1, None, 1)
+        await limiter.acquire('f1', None)
+        waiter = asyncio.ensure_future(limiter.acquire('f1', None))
+        await asyncio.sleep(0)
+
+        with self.assertRaises(InvocationQueueFullError):
+            await limiter.acquire('f1', None)
+        self.assertEqual(limiter.overflows, 1)
+
+        limiter.release('f1')
+        await waiter
+
+    async def _cancelled_waiter(self):
+        limiter = ConcurrencyLimiter(1, None, 10)
+        await limiter.acquire('f1', None)
+        cancelled = asyncio.ensure_future(limiter.acquire('f1', None))
+        waiter = asyncio.ensure_future(limiter.acquire('f1', None))
+        await asyncio.sleep(0)
+
+        cancelled.cancel()
+        limiter.release('f1')
+        with self.assertRaises(asyncio.CancelledError):
+            await cancelled
+
+        # The slot goes to the next waiter instead
+        await waiter
+        self.assertEqual(limiter.running, 1)
+        self.assertEqual(limiter.waiting, 0)
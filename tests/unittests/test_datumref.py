@@ -9,7 +9,8 @@ from dateutil.parser import ParserError
 from azure_functions_worker import protos
 from azure_functions_worker.bindings.datumdef import \
     parse_cookie_attr_expires, \
-    parse_cookie_attr_same_site, parse_to_rpc_http_cookie_list, Datum
+    parse_cookie_attr_same_site, parse_to_rpc_http_cookie_list, Datum, \
+    TriggerMetadata
 from azure_functions_worker.bindings.nullable_converters import \
     to_nullable_bool, to_nullable_string, to_nullable_double, \
     to_nullable_timestamp
@@ -140,3 +141,28 @@ class TestDatumRef(unittest.TestCase):
 
         self.assertIsNone(
             parse_to_rpc_http_cookie_list(datum.value.get('cookies')))
+
+    def test_trigger_metadata_converts_on_first_read(self):
+        request = protos.InvocationRequest(trigger_metadata={
+            'MessageId': protos.TypedData(string='1'),
+            'Body': protos.TypedData(json='{"a": 1}')})
+        metadata = TriggerMetadata(request.trigger_metadata)
+        self.assertEqual(len(metadata), 2)
+        self.assertEqual(set(metadata), {'MessageId', 'Body'})
+        self.assertEqual(metadata._datums, {})
+
+        datum = metadata['MessageId']
+        self.assertEqual((datum.value, datum.type), ('1', 'string'))
+        self.assertIs(metadata.get('MessageId'), datum)
+        self.assertEqual(list(metadata._datums), ['MessageId'])
+
+    def test_trigger_metadata_missing_key(self):
+        request = protos.InvocationRequest(trigger_metadata={
+            'MessageId': protos.TypedData(string='1')})
+        metadata = TriggerMetadata(request.trigger_metadata)
+        self.assertIsNone(metadata.get('Missing'))
+        self.assertNotIn('Missing', metadata)
+        with self.assertRaises(KeyError):
+            metadata['Missing']
+        # Reading a missing key does not add it to the protobuf map
+        self.assertEqual(list(request.trigger_metadata), ['MessageId'])
@@ -2,21 +2,43 @@
 # Licensed under the MIT License.
 import asyncio
 import collections as col
+import datetime
+import json
+import logging
 import os
 import sys
+import time
 import unittest
 from typing import Optional, Tuple
-from unittest.mock import patch
+from unittest.mock import Mock, patch
 
-from azure_functions_worker import protos
+from azure_functions_worker import bindings, loader, protos, stdio_capture
 from azure_functions_worker.constants import (PYTHON_THREADPOOL_THREAD_COUNT,
                                               PYTHON_THREADPOOL_THREAD_COUNT_DEFAULT,
                                               PYTHON_THREADPOOL_THREAD_COUNT_MAX_37,
                                               PYTHON_THREADPOOL_THREAD_COUNT_MIN,
                                               PYTHON_ENABLE_INIT_INDEXING,
                                               METADATA_PROPERTIES_WORKER_INDEXED,
-                                              PYTHON_ENABLE_DEBUG_LOGGING)
-from azure_functions_worker.dispatcher import Dispatcher
+                                              PYTHON_ENABLE_DEBUG_LOGGING,
+                                              PYTHON_ENABLE_GRPC_AIO,
+                                              PYTHON_ENABLE_WORKER_LOAD_STATUS,
+                                              PYTHON_INVOCATION_QUEUE_SIZE)
+from azure_functions_worker.constants import \
+    PYTHON_MAX_CONCURRENT_INVOCATIONS_PER_FUNCTION, \
+    PYTHON_MAX_CONCURRENT_INVOCATIONS_BY_FUNCTION, PYTHON_THREADPOOL_BULKHEADS
+from azure_functions_worker.constants import \
+    PYTHON_ENABLE_ADAPTIVE_THREADPOOL, PYTHON_ADAPTIVE_THREADPOOL_MIN_WORKERS, \
+    PYTHON_ADAPTIVE_THREADPOOL_MAX_WORKERS
+from azure_functions_worker.constants import PYTHON_PROCESSPOOL_FUNCTIONS, \
+    PYTHON_PROCESSPOOL_WORKER_COUNT
+from azure_functions_worker.constants import \
+    PYTHON_INVOCATION_LOG_SAMPLE_RATE, PYTHON_INVOCATION_LOG_DISABLED_FUNCTIONS
+from azure_functions_worker.constants import PYTHON_ENABLE_STDIO_CAPTURE
+from azure_functions_worker.constants import \
+    PYTHON_ENABLE_LATENCY_HISTOGRAMS, PYTHON_LATENCY_HISTOGRAMS_INTERVAL
+from azure_functions_worker.dispatcher import ContextEnabledTask, \
+    Dispatcher, _AsyncResponseQueue, get_current_invocation_id
+from azure_functions_worker.threadpool import AdaptiveThreadPoolExecutor
 from azure_functions_worker.version import VERSION
 from tests.utils import testutils
 from tests.utils.testutils import UNIT_TESTS_ROOT
@@ -313,7 +335,7 @@ class TestThreadPoolSettingsPython37(testutils.AsyncTestCase):
                 )
 
                 logs, _ = mock_logger.info.call_args
-                self.assertRegex(logs[0],
+                self.assertRegex(logs[0] % logs[1:],
                                  'Received FunctionInvocationRequest, '
                                  f'request ID: {request_id}, '
                                  f'function ID: {func_id}, '
@@ -337,7 +359,7 @@ class TestThreadPoolSettingsPython37(testutils.AsyncTestCase):
                 )
 
                 logs, _ = mock_logger.info.call_args
-                self.assertRegex(logs[0],
+                self.assertRegex(logs[0] % logs[1:],
                                  'Received FunctionInvocationRequest, '
                                  f'request ID: {request_id}, '
                                  f'function ID: {func_id}, '
@@ -361,7 +383,7 @@ class TestThreadPoolSettingsPython37(testutils.AsyncTestCase):
                 )
 
                 logs, _ = mock_logger.info.call_args
-                self.assertRegex(logs[0],
+                self.assertRegex(logs[0] % logs[1:],
                                  'Received FunctionInvocationRequest, '
                                  f'request ID: {request_id}, '
                                  f'function ID: {func_id}, '
@@ -386,7 +408,7 @@ class TestThreadPoolSettingsPython37(testutils.AsyncTestCase):
                 )
 
                 logs, _ = mock_logger.info.call_args
-                self.assertRegex(logs[0],
+                self.assertRegex(logs[0] % logs[1:],
                                  'Received FunctionInvocationRequest, '
                                  f'request ID: {request_id}, '
                                  f'function ID: {func_id}, '
@@ -411,7 +433,7 @@ class TestThreadPoolSettingsPython37(testutils.AsyncTestCase):
                 )
 
                 logs, _ = mock_logger.info.call_args
-                self.assertRegex(logs[0],
+                self.assertRegex(logs[0] % logs[1:],
                                  'Received FunctionInvocationRequest, '
                                  f'request ID: {request_id}, '
                                  f'function ID: {func_id}, '
@@ -437,7 +459,7 @@ class TestThreadPoolSettingsPython37(testutils.AsyncTestCase):
                 )
 
                 logs, _ = mock_logger.info.call_args
-                self.assertRegex(logs[0],
+                self.assertRegex(logs[0] % logs[1:],
                                  'Received FunctionInvocationRequest, '
                                  f'request ID: {request_id}, '
                                  f'function ID: {func_id}, '
@@ -980,3 +1002,1076 @@ class TestDispatcherIndexinginInit(unittest.TestCase):
         self.assertEqual(
             response.function_load_response.result.exception.message,
             "Exception: Mocked Exception")
+
+    def test_index_functions_logs_each_function_bindings(self):
+        # Every function's log lists its own bindings only, so that the log
+        # of large apps does not grow with the square of their functions
+        functions = []
+        for name in ('func_a', 'func_b'):
+            function = Mock()
+            function.get_function_name.return_value = name
+            binding = Mock(type='httpTrigger')
+            binding.name = f'{name}_req'
+            function.get_bindings.return_value = [binding]
+            functions.append(function)
+
+        with patch.object(loader, 'index_function_app',
+                          return_value=functions), \
+                patch.object(loader, 'process_indexed_function',
+                             return_value=([], {f: {} for f in functions})), \
+                patch('azure_functions_worker.dispatcher.logger') as logger:
+            self.dispatcher.index_functions('function_app.py',
+                                            str(FUNCTION_APP_DIRECTORY))
+
+        function_logs = logger.info.call_args_list[-1][0][1]
+        self.assertIn("Function Name: func_b, Function Binding: "
+                      "[('httpTrigger', 'func_b_req', '')]", function_logs)
+        self.assertNotIn("Function Name: func_b, Function Binding: "
+                         "[('httpTrigger', 'func_a_req', '')",
+                         function_logs)
+
+
+class TestDispatcherGrpcAio(testutils.AsyncTestCase):
+
+    def setUp(self):
+        self._ctrl = testutils.start_mockhost(
+            script_root=DISPATCHER_FUNCTIONS_DIR)
+        self._pre_env = dict(os.environ)
+        os.environ.update({PYTHON_ENABLE_GRPC_AIO: 'true'})
+
+    def tearDown(self):
+        os.environ.clear()
+        os.environ.update(self._pre_env)
+
+    async def test_dispatcher_grpc_aio_transport(self):
+        """Test if the dispatcher drives the event stream on its own event
+        loop when grpc.aio is enabled
+        """
+        stop = Dispatcher.stop
+        grpc_task_done_on_stop = []
+
+        def checked_stop(disp):
+            grpc_task_done_on_stop.append(grpc_task.done())
+            stop(disp)
+
+        async with self._ctrl as host:
+            worker = self._ctrl._worker
+            self.assertTrue(worker._grpc_aio_enabled)
+            self.assertIsNone(worker._grpc_thread)
+            grpc_task = worker._grpc_task
+            self.assertIsNotNone(grpc_task)
+
+            r = await host.init_worker()
+            self.assertEqual(r.response.result.status,
+                             protos.StatusResult.Success)
+
+            for function_name in ('show_context', 'show_context_async'):
+                func_id, load_r = await host.load_function(function_name)
+                self.assertEqual(load_r.response.result.status,
+                                 protos.StatusResult.Success,
+                                 msg=load_r.response.result.exception)
+
+                _, call_r = await host.invoke_function(
+                    function_name, [
+                        protos.ParameterBinding(
+                            name='req',
+                            data=protos.TypedData(
+                                http=protos.RpcHttp(method='GET')))
+                    ])
+                self.assertEqual(call_r.response.result.status,
+                                 protos.StatusResult.Success)
+                # Logs emitted on the sync thread pool reach the host too
+                self.assertTrue(any(
+                    log.message.startswith('Received FunctionInvocationRequest')
+                    for log in call_r.logs))
+
+            patcher = patch.object(Dispatcher, 'stop', autospec=True,
+                                   side_effect=checked_stop)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        # The task closed the channel before the dispatcher stopped
+        self.assertEqual(grpc_task_done_on_stop, [True])
+
+    async def test_dispatcher_grpc_aio_response_queue_from_thread(self):
+        """Test if messages put into the grpc.aio response queue from another
+        thread are handed over to the event loop
+        """
+        loop = asyncio.get_running_loop()
+        resp_queue = _AsyncResponseQueue(loop)
+
+        resp_queue.put_nowait('from-loop')
+        await loop.run_in_executor(None, resp_queue.put_nowait, 'from-thread')
+
+        self.assertEqual(await resp_queue.get(), 'from-loop')
+        self.assertEqual(await resp_queue.get(), 'from-thread')
+        self.assertEqual(resp_queue.qsize(), 0)
+
+
+class DispatcherInvocationTestCase(unittest.TestCase):
+    """Drives a Dispatcher directly on its own event loop, with a single
+    sync threadpool thread and the responses kept in a mock queue.
+    """
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.loop.set_task_factory(
+            lambda loop, coro: ContextEnabledTask(coro, loop=loop))
+        self._pre_env = dict(os.environ)
+        os.environ.update({PYTHON_THREADPOOL_THREAD_COUNT: '1'})
+        self.dispatcher = Dispatcher(self.loop, testutils.LOCALHOST, 0,
+                                     'test_worker_id', 'test_request_id',
+                                     1.0, 1000)
+        self.dispatcher._grpc_resp_queue = Mock()
+        loader.install()
+
+    def tearDown(self):
+        for invocation in self.dispatcher._inflight_invocations.values():
+            invocation.cancel_event.set()
+        self.dispatcher._stop_sync_call_tp()
+        self.loop.close()
+        os.environ.clear()
+        os.environ.update(self._pre_env)
+
+    async def _load_function(self, function_name):
+        await self.dispatcher._handle__worker_init_request(
+            protos.StreamingMessage(
+                worker_init_request=protos.WorkerInitRequest(
+                    host_version='4.28.0')))
+
+        script = UNIT_TESTS_ROOT / 'dispatcher_functions' / function_name \
+            / '__init__.py'
+        func_id = f'{function_name}-id'
+        r = await self.dispatcher._handle__function_load_request(
+            protos.StreamingMessage(
+                function_load_request=protos.FunctionLoadRequest(
+                    function_id=func_id,
+                    metadata=protos.RpcFunctionMetadata(
+                        name=function_name,
+                        directory=str(script.parent),
+                        script_file=str(script),
+                        bindings={
+                            'req': protos.BindingInfo(
+                                type='httpTrigger',
+                                direction=getattr(protos.BindingInfo, 'in')),
+                            '$return': protos.BindingInfo(
+                                type='http',
+                                direction=protos.BindingInfo.out)
+                        }))))
+        self.assertEqual(r.function_load_response.result.status,
+                         protos.StatusResult.Success,
+                         msg=r.function_load_response.result.exception)
+        return func_id
+
+    def _invoke(self, func_id, invocation_id, query=None):
+        return self.loop.create_task(
+            self.dispatcher._handle__invocation_request(
+                protos.StreamingMessage(
+                    invocation_request=protos.InvocationRequest(
+                        invocation_id=invocation_id,
+                        function_id=func_id,
+                        input_data=[protos.ParameterBinding(
+                            name='req',
+                            data=protos.TypedData(
+                                http=protos.RpcHttp(
+                                    method='GET', query=query)))]))))
+
+    async def _wait_for_inflight(self, invocation_id, running=False):
+        for _ in range(500):
+            invocation = self.dispatcher._inflight_invocations.get(
+                invocation_id)
+            if invocation is not None and (
+                    not running or (invocation.sync_future is not None
+                                    and invocation.sync_future.running())):
+                return
+            await asyncio.sleep(0.01)
+        self.fail(f'invocation {invocation_id} is not in flight')
+
+    @staticmethod
+    def _cancel_request(invocation_id):
+        return protos.StreamingMessage(
+            invocation_cancel=protos.InvocationCancel(
+                invocation_id=invocation_id))
+
+
+class TestDispatcherInvocationCancel(DispatcherInvocationTestCase):
+
+    def test_cancel_async_invocation(self):
+        self.loop.run_until_complete(self._cancel_async_invocation())
+
+    def test_cancel_running_sync_invocation(self):
+        self.loop.run_until_complete(self._cancel_running_sync_invocation())
+
+    def test_cancel_queued_sync_invocation(self):
+        self.loop.run_until_complete(self._cancel_queued_sync_invocation())
+
+    def test_worker_load_counters(self):
+        self.loop.run_until_complete(self._worker_load_counters())
+
+    def test_cancel_unknown_invocation(self):
+        response = self.loop.run_until_complete(
+            self.dispatcher._handle__invocation_cancel(
+                self._cancel_request('unknown')))
+        self.assertIsNone(response)
+
+    async def _cancel_async_invocation(self):
+        func_id = await self._load_function('cancellable_async')
+        task = self._invoke(func_id, 'async-1')
+        await self._wait_for_inflight('async-1')
+
+        await self.dispatcher._handle__invocation_cancel(
+            self._cancel_request('async-1'))
+        response = await asyncio.wait_for(task, timeout=5)
+
+        self.assertEqual(response.invocation_response.result.status,
+                         protos.StatusResult.Cancelled)
+        self.assertNotIn('async-1', self.dispatcher._inflight_invocations)
+
+    async def _cancel_running_sync_invocation(self):
+        func_id = await self._load_function('cancellable_sync')
+        task = self._invoke(func_id, 'sync-1')
+        await self._wait_for_inflight('sync-1', running=True)
+
+        await self.dispatcher._handle__invocation_cancel(
+            self._cancel_request('sync-1'))
+        response = await asyncio.wait_for(task, timeout=5)
+
+        self.assertEqual(response.invocation_response.result.status,
+                         protos.StatusResult.Cancelled)
+
+    async def _cancel_queued_sync_invocation(self):
+        func_id = await self._load_function('cancellable_sync')
+        running_task = self._invoke(func_id, 'sync-running')
+        await self._wait_for_inflight('sync-running', running=True)
+        queued_task = self._invoke(func_id, 'sync-queued')
+        await self._wait_for_inflight('sync-queued')
+        queued = self.dispatcher._inflight_invocations['sync-queued']
+
+        await self.dispatcher._handle__invocation_cancel(
+            self._cancel_request('sync-queued'))
+        response = await asyncio.wait_for(queued_task, timeout=5)
+
+        # The only pool thread is still busy, so the queued invocation
+        # must have been dropped without running
+        self.assertFalse(running_task.done())
+        self.assertTrue(queued.sync_future.cancelled())
+        self.assertEqual(response.invocation_response.result.status,
+                         protos.StatusResult.Cancelled)
+
+        await self.dispatcher._handle__invocation_cancel(
+            self._cancel_request('sync-running'))
+        await asyncio.wait_for(running_task, timeout=5)
+
+    async def _worker_load_counters(self):
+        sync_func_id = await self._load_function('cancellable_sync')
+        async_func_id = await self._load_function('cancellable_async')
+        tasks = [self._invoke(sync_func_id, 'sync-running')]
+        await self._wait_for_inflight('sync-running', running=True)
+        tasks.append(self._invoke(sync_func_id, 'sync-queued'))
+        await self._wait_for_inflight('sync-queued')
+        tasks.append(self._invoke(async_func_id, 'async-1'))
+        await self._wait_for_inflight('async-1')
+
+        load = self.dispatcher.get_worker_load()
+        self.assertEqual(load['sync_threadpool_busy_threads'], 1)
+        self.assertEqual(load['sync_threadpool_queue_depth'], 1)
+        self.assertEqual(load['sync_threadpool_max_workers'], 1)
+        self.assertEqual(load['async_invocations_running'], 1)
+
+        for invocation_id in ('sync-queued', 'sync-running', 'async-1'):
+            await self.dispatcher._handle__invocation_cancel(
+                self._cancel_request(invocation_id))
+        await asyncio.wait_for(asyncio.gather(*tasks), timeout=5)
+
+        load = self.dispatcher.get_worker_load()
+        self.assertEqual(load['sync_threadpool_busy_threads'], 0)
+        self.assertEqual(load['sync_threadpool_queue_depth'], 0)
+        self.assertEqual(load['async_invocations_running'], 0)
+
+
+class TestDispatcherLoadRequestCollection(testutils.AsyncTestCase):
+
+    def setUp(self):
+        self._ctrl = testutils.start_mockhost(
+            script_root=DISPATCHER_FUNCTIONS_DIR)
+
+    async def test_dispatcher_load_request_collection(self):
+        """Test if all functions of a collection are loaded and acknowledged
+        in a single FunctionLoadResponseCollection
+        """
+        async with self._ctrl as host:
+            r = await host.init_worker()
+            self.assertEqual(
+                r.response.capabilities['SupportsLoadResponseCollection'],
+                'true')
+
+            func_ids, r = await host.load_functions(
+                ['show_context', 'show_context_async'])
+            self.assertIsInstance(r.response,
+                                  protos.FunctionLoadResponseCollection)
+            self.assertEqual(
+                [resp.function_id
+                 for resp in r.response.function_load_responses],
+                func_ids)
+            for resp in r.response.function_load_responses:
+                self.assertEqual(resp.result.status,
+                                 protos.StatusResult.Success,
+                                 msg=resp.result.exception)
+
+            _, call_r = await host.invoke_function(
+                'show_context_async', [
+                    protos.ParameterBinding(
+                        name='req',
+                        data=protos.TypedData(
+                            http=protos.RpcHttp(method='GET')))
+                ])
+            self.assertEqual(call_r.response.result.status,
+                             protos.StatusResult.Success)
+
+
+class TestDispatcherIndexingInLoadRequestCollection(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.dispatcher = testutils.create_dummy_dispatcher()
+        # Other test apps also define a function_app module, make sure the
+        # one under FUNCTION_APP_DIRECTORY is the one that gets indexed
+        sys.path.insert(0, str(FUNCTION_APP_DIRECTORY))
+        sys.modules.pop('function_app', None)
+
+    def tearDown(self):
+        sys.path.remove(str(FUNCTION_APP_DIRECTORY))
+        sys.modules.pop('function_app', None)
+        self.loop.close()
+
+    @patch.dict(os.environ, {PYTHON_ENABLE_INIT_INDEXING: 'false'})
+    def test_load_request_collection_indexes_once(self):
+        self.loop.run_until_complete(
+            self.dispatcher._handle__worker_init_request(
+                protos.StreamingMessage(
+                    worker_init_request=protos.WorkerInitRequest(
+                        host_version="2.3.4",
+                        function_app_directory=str(FUNCTION_APP_DIRECTORY)))))
+
+        load_requests = [
+            protos.FunctionLoadRequest(
+                function_id=function_id,
+                metadata=protos.RpcFunctionMetadata(
+                    directory=str(FUNCTION_APP_DIRECTORY),
+                    properties={METADATA_PROPERTIES_WORKER_INDEXED: "True"}))
+            for function_id in ('function_1', 'function_2')]
+
+        with patch.object(self.dispatcher, 'index_functions',
+                          wraps=self.dispatcher.index_functions) as mock_index:
+            response = self.loop.run_until_complete(
+                self.dispatcher._handle__function_load_request_collection(
+                    protos.StreamingMessage(
+                        function_load_request_collection=(
+                            protos.FunctionLoadRequestCollection(
+                                function_load_requests=load_requests)))))
+
+        mock_index.assert_called_once()
+        load_responses = \
+            response.function_load_response_collection.function_load_responses
+        self.assertEqual(len(load_responses), 2)
+        for load_response in load_responses:
+            self.assertEqual(load_response.result.status,
+                             protos.StatusResult.Success)
+
+    @patch.dict(os.environ, {PYTHON_ENABLE_INIT_INDEXING: 'false'})
+    @patch.object(Dispatcher, 'index_functions')
+    def test_load_request_collection_with_indexing_exception(
+            self,
+            mock_index_functions):
+        mock_index_functions.side_effect = Exception("Mocked Exception")
+
+        load_requests = [
+            protos.FunctionLoadRequest(
+                function_id=function_id,
+                metadata=protos.RpcFunctionMetadata(
+                    directory=str(FUNCTION_APP_DIRECTORY),
+                    properties={METADATA_PROPERTIES_WORKER_INDEXED: "True"}))
+            for function_id in ('function_1', 'function_2')]
+
+        response = self.loop.run_until_complete(
+            self.dispatcher._handle__function_load_request_collection(
+                protos.StreamingMessage(
+                    function_load_request_collection=(
+                        protos.FunctionLoadRequestCollection(
+                            function_load_requests=load_requests)))))
+
+        mock_index_functions.assert_called_once()
+        for load_response in \
+                response.function_load_response_collection \
+                .function_load_responses:
+            self.assertEqual(load_response.result.exception.message,
+                             "Exception: Mocked Exception")
+
+
+class TestDispatcherWarmupRequest(testutils.AsyncTestCase):
+
+    def setUp(self):
+        self._ctrl = testutils.start_mockhost(
+            script_root=DISPATCHER_FUNCTIONS_DIR)
+        self._pre_env = dict(os.environ)
+        os.environ.update({PYTHON_THREADPOOL_THREAD_COUNT: '4'})
+
+    def tearDown(self):
+        os.environ.clear()
+        os.environ.update(self._pre_env)
+
+    async def test_dispatcher_warmup_request(self):
+        """Test if the warmup request starts the sync threadpool threads and
+        reports the duration of every warmup step
+        """
+        async with self._ctrl as host:
+            await host.init_worker()
+            r = await host.warmup_worker()
+
+            self.assertIsInstance(r.response, protos.WorkerWarmupResponse)
+            self.assertEqual(r.response.result.status,
+                             protos.StatusResult.Success)
+            steps = [json.loads(log.properties)['step']
+                     for log in r.response.result.logs]
+            self.assertEqual(steps,
+                             ['sync_call_tp', 'bindings', 'shared_memory'])
+            for log in r.response.result.logs:
+                self.assertEqual(log.level, protos.RpcLog.Information)
+            self.assertEqual(len(self._ctrl._worker._sync_call_tp._threads), 4)
+
+    async def test_dispatcher_warmup_request_adaptive_threadpool(self):
+        """Test if the warmup request starts the threads an adaptive sync
+        threadpool keeps, not up to its maximum
+        """
+        os.environ.update({PYTHON_ENABLE_ADAPTIVE_THREADPOOL: 'true',
+                           PYTHON_ADAPTIVE_THREADPOOL_MIN_WORKERS: '2',
+                           PYTHON_ADAPTIVE_THREADPOOL_MAX_WORKERS: '8'})
+        async with self._ctrl as host:
+            await host.init_worker()
+            r = await host.warmup_worker()
+
+            sync_call_tp = self._ctrl._worker._sync_call_tp
+            self.assertIsInstance(sync_call_tp, AdaptiveThreadPoolExecutor)
+            self.assertIn('submitted 2 tasks',
+                          r.response.result.logs[0].message)
+            self.assertEqual(len(sync_call_tp._threads), 2)
+
+    async def test_dispatcher_warmup_request_step_failure(self):
+        """Test if a failing warmup step is reported without failing the
+        warmup
+        """
+        async with self._ctrl as host:
+            await host.init_worker()
+            with patch.object(self._ctrl._worker, '_warmup_bindings',
+                              side_effect=Exception('Mocked Exception')):
+                r = await host.warmup_worker()
+
+            self.assertEqual(r.response.result.status,
+                             protos.StatusResult.Success)
+            levels = {json.loads(log.properties)['step']: log.level
+                      for log in r.response.result.logs}
+            self.assertEqual(levels['bindings'], protos.RpcLog.Warning)
+            self.assertEqual(levels['shared_memory'],
+                             protos.RpcLog.Information)
+
+    async def test_dispatcher_warmup_bindings_from_registry(self):
+        """Test if the warmup exercises every binding of the loaded registry
+        and logs the failures of the synthetic payload at debug level
+        """
+        async with self._ctrl as host:
+            await host.init_worker()
+            registry = bindings.meta.BINDING_REGISTRY
+            converter = Mock()
+            converter.decode.side_effect = ValueError('Mocked Exception')
+            converter.encode.side_effect = ValueError('Mocked Exception')
+            with patch.dict(registry._bindings, {'newTrigger': converter}), \
+                    patch('azure_functions_worker.bindings.meta.logger') \
+                    as mock_logger:
+                bind_names = bindings.warmup_binding_registry(
+                    self._ctrl._worker._shmem_mgr)
+
+            self.assertIn('newTrigger', bind_names)
+            self.assertIn('httpTrigger', bind_names)
+            self.assertTrue(all(isinstance(name, str) for name in bind_names))
+            self.assertTrue(any(
+                call[0][1] == 'newTrigger'
+                for call in mock_logger.debug.call_args_list))
+
+    async def test_dispatcher_warmup_threads_survive_reload(self):
+        """Test if the warmed up sync threadpool is kept on specialization when
+        its size does not change
+        """
+        async with self._ctrl as host:
+            await host.init_worker()
+            await host.warmup_worker()
+            sync_call_tp = self._ctrl._worker._sync_call_tp
+
+            await host.reload_environment(environment={
+                PYTHON_THREADPOOL_THREAD_COUNT: '4'
+            })
+            self.assertIs(self._ctrl._worker._sync_call_tp, sync_call_tp)
+
+            await host.reload_environment(environment={
+                PYTHON_THREADPOOL_THREAD_COUNT: '2'
+            })
+            self.assertIsNot(self._ctrl._worker._sync_call_tp, sync_call_tp)
+
+
+class TestDispatcherWorkerLoadStatus(testutils.AsyncTestCase):
+
+    def setUp(self):
+        self._ctrl = testutils.start_mockhost(
+            script_root=DISPATCHER_FUNCTIONS_DIR)
+        self._pre_env = dict(os.environ)
+
+    def tearDown(self):
+        os.environ.clear()
+        os.environ.update(self._pre_env)
+
+    async def test_dispatcher_worker_status_without_load(self):
+        """Test if the worker status response comes without a load report by
+        default
+        """
+        async with self._ctrl as host:
+            await host.init_worker()
+            r = await host.get_worker_status()
+
+            self.assertIsInstance(r.response, protos.WorkerStatusResponse)
+            self.assertFalse([log for log in r.logs
+                              if log.message == 'WorkerStatus'])
+            self.assertIsNone(self._ctrl._worker._event_loop_lag_handle)
+
+    async def test_dispatcher_worker_status_with_load(self):
+        """Test if the worker load counters are reported as a metric log
+        with the worker status response
+        """
+        os.environ.update({PYTHON_ENABLE_WORKER_LOAD_STATUS: 'true'})
+        async with self._ctrl as host:
+            await host.init_worker()
+            await host.get_worker_status()
+            r = await host.get_worker_status()
+
+            self.assertIsInstance(r.response, protos.WorkerStatusResponse)
+            status_logs = [log for log in r.logs
+                           if log.message == 'WorkerStatus']
+            self.assertEqual(len(status_logs), 1)
+            self.assertEqual(status_logs[0].log_category,
+                             protos.RpcLog.RpcLogCategory.CustomMetric)
+            load = json.loads(status_logs[0].properties)
+            self.assertEqual(load['async_invocations_running'], 0)
+            self.assertEqual(load['sync_threadpool_busy_threads'], 0)
+            self.assertEqual(load['shared_memory_bytes'], 0)
+            self.assertGreaterEqual(load['event_loop_lag_ms'], 0)
+            self.assertIn('response_queue_depth', load)
+            self.assertIsNotNone(self._ctrl._worker._event_loop_lag_handle)
+
+
+class TestDispatcherWorkerTerminate(DispatcherInvocationTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.dispatcher._grpc_resp_queue.qsize.return_value = 0
+        self._forever = self.dispatcher._dispatch_forever_fut = \
+            self.loop.create_future()
+
+    def test_terminate_drains_invocations(self):
+        self.loop.run_until_complete(self._terminate_drains_invocations())
+
+    def test_terminate_abandons_invocations(self):
+        self.loop.run_until_complete(self._terminate_abandons_invocations())
+
+    def test_terminate_rejects_invocations(self):
+        self.loop.run_until_complete(self._terminate_rejects_invocations())
+
+    async def _terminate_drains_invocations(self):
+        func_id = await self._load_function('cancellable_async')
+        task = self._invoke(func_id, 'async-1', query={'seconds': '0.1'})
+        await self._wait_for_inflight('async-1')
+
+        with patch('azure_functions_worker.dispatcher.logger') as mock_logger:
+            await self.dispatcher._handle__worker_terminate(
+                self._terminate_request(5))
+
+        self.assertTrue(task.done())
+        self.assertEqual(task.result().invocation_response.result.status,
+                         protos.StatusResult.Success)
+        self.assertEqual(mock_logger.info.call_args[0][2:5], (1, 0, ''))
+        self.assertIsNone(self.dispatcher._sync_call_tp)
+        self.assertTrue(self._forever.done())
+
+    async def _terminate_abandons_invocations(self):
+        func_id = await self._load_function('cancellable_async')
+        task = self._invoke(func_id, 'async-1')
+        await self._wait_for_inflight('async-1')
+        shmem_mgr = self.dispatcher._shmem_mgr
+        self.assertIsNotNone(shmem_mgr.put_bytes(b'leaked'))
+
+        with patch('azure_functions_worker.dispatcher.logger') as mock_logger:
+            await self.dispatcher._handle__worker_terminate(
+                self._terminate_request(0.1))
+        response = await asyncio.wait_for(task, timeout=5)
+
+        self.assertEqual(response.invocation_response.result.status,
+                         protos.StatusResult.Cancelled)
+        self.assertEqual(mock_logger.info.call_args[0][2:6],
+                         (0, 1, 'async-1', 1))
+        self.assertEqual(len(shmem_mgr.allocated_mem_maps), 0)
+        self.assertTrue(self._forever.done())
+
+    async def _terminate_rejects_invocations(self):
+        func_id = await self._load_function('cancellable_async')
+        await self.dispatcher._handle__worker_terminate(
+            self._terminate_request(0))
+
+        response = await self._invoke(func_id, 'async-1',
+                                      query={'seconds': '0'})
+        self.assertEqual(response.invocation_response.result.status,
+                         protos.StatusResult.Failure)
+        self.assertIn('the worker is terminating',
+                      response.invocation_response.result.exception.message)
+
+    @staticmethod
+    def _terminate_request(grace_period):
+        terminate = protos.WorkerTerminate()
+        terminate.grace_period.FromTimedelta(
+            datetime.timedelta(seconds=grace_period))
+        return protos.StreamingMessage(worker_terminate=terminate)
+
+
+class TestDispatcherConcurrencyLimits(DispatcherInvocationTestCase):
+
+    def setUp(self):
+        super().setUp()
+        os.environ.update({
+            PYTHON_MAX_CONCURRENT_INVOCATIONS_PER_FUNCTION: '1',
+            PYTHON_INVOCATION_QUEUE_SIZE: '1'})
+        self.dispatcher._concurrency_limiter = \
+            Dispatcher._create_concurrency_limiter()
+
+    def test_invocations_over_limit_wait(self):
+        self.loop.run_until_complete(self._invocations_over_limit_wait())
+
+    def test_invocation_queue_overflow(self):
+        self.loop.run_until_complete(self._invocation_queue_overflow())
+
+    async def _invocations_over_limit_wait(self):
+        func_id = await self._load_function('cancellable_async')
+        with patch('azure_functions_worker.dispatcher.logger') as mock_logger:
+            first = self._invoke(func_id, 'async-1', query={'seconds': '0.1'})
+            await self._wait_for_inflight('async-1')
+            second = self._invoke(func_id, 'async-2', query={'seconds': '0'})
+            await self._wait_for_inflight('async-2')
+
+            load = self.dispatcher.get_worker_load()
+            self.assertEqual(load['async_invocations_running'], 1)
+            self.assertEqual(load['invocation_queue_depth'], 1)
+
+            responses = await asyncio.wait_for(
+                asyncio.gather(first, second), timeout=5)
+
+        for response in responses:
+            self.assertEqual(response.invocation_response.result.status,
+                             protos.StatusResult.Success)
+        invocation_logs = [c[0][0] % c[0][1:]
+                           for c in mock_logger.info.call_args_list
+                           if c[0][0].startswith(
+                               'Received FunctionInvocationRequest')
+                           and 'async-2' in c[0]]
+        self.assertEqual(len(invocation_logs), 1)
+        self.assertIn('queue wait time: ', invocation_logs[0])
+        self.assertEqual(self.dispatcher.get_worker_load()[
+            'invocation_queue_waits'], 1)
+
+    async def _invocation_queue_overflow(self):
+        func_id = await self._load_function('cancellable_async')
+        running = self._invoke(func_id, 'async-1', query={'seconds': '0.1'})
+        await self._wait_for_inflight('async-1')
+        queued = self._invoke(func_id, 'async-2', query={'seconds': '0'})
+        await self._wait_for_inflight('async-2')
+
+        response = await self._invoke(func_id, 'async-3')
+        self.assertEqual(response.invocation_response.result.status,
+                         protos.StatusResult.Failure)
+        self.assertIn('the invocation queue is full',
+                      response.invocation_response.result.exception.message)
+        self.assertEqual(self.dispatcher.get_worker_load()[
+            'invocation_queue_overflows'], 1)
+
+        await asyncio.wait_for(asyncio.gather(running, queued), timeout=5)
+
+
+class TestDispatcherFunctionConcurrencyLimits(DispatcherInvocationTestCase):
+
+    def setUp(self):
+        super().setUp()
+        os.environ.update({
+            PYTHON_MAX_CONCURRENT_INVOCATIONS_BY_FUNCTION:
+                'cancellable_async=1;invalid;show_context=0;other=2'})
+        self.dispatcher._concurrency_limiter = \
+            Dispatcher._create_concurrency_limiter()
+
+    def test_get_function_concurrency_limits(self):
+        self.assertEqual(Dispatcher._get_function_concurrency_limits(), {
+            'cancellable_async': 1, 'other': 2})
+
+    def test_function_invocations_over_limit_wait(self):
+        self.loop.run_until_complete(
+            self._function_invocations_over_limit_wait())
+
+    async def _function_invocations_over_limit_wait(self):
+        func_id = await self._load_function('cancellable_async')
+        first = self._invoke(func_id, 'async-1', query={'seconds': '0.1'})
+        await self._wait_for_inflight('async-1')
+        second = self._invoke(func_id, 'async-2', query={'seconds': '0'})
+        await self._wait_for_inflight('async-2')
+
+        load = self.dispatcher.get_worker_load()
+        self.assertEqual(load['async_invocations_running'], 1)
+        self.assertEqual(load['invocation_queue_depth'], 1)
+
+        responses = await asyncio.wait_for(
+            asyncio.gather(first, second), timeout=5)
+        for response in responses:
+            self.assertEqual(response.invocation_response.result.status,
+                             protos.StatusResult.Success)
+
+
+class TestDispatcherBulkheads(DispatcherInvocationTestCase):
+
+    def setUp(self):
+        super().setUp()
+        os.environ.update({
+            PYTHON_THREADPOOL_BULKHEADS: 'slow:1=cancellable_sync'})
+        self.dispatcher._create_bulkhead_tps()
+
+    def tearDown(self):
+        for invocation in self.dispatcher._inflight_invocations.values():
+            invocation.cancel_event.set()
+        self.dispatcher._stop_bulkhead_tps()
+        super().tearDown()
+
+    def test_slow_function_does_not_block_shared_threadpool(self):
+        self.loop.run_until_complete(self._slow_function_isolated())
+
+    def test_get_bulkheads(self):
+        os.environ.update({
+            PYTHON_THREADPOOL_BULKHEADS: 'sql:2=get_orders, get_users;'
+                                         'invalid;zero:0=f1;reports:1=f2'})
+        self.assertEqual(Dispatcher._get_bulkheads(), {
+            'sql': (2, ['get_orders', 'get_users']),
+            'reports': (1, ['f2'])})
+
+    async def _slow_function_isolated(self):
+        slow_func_id = await self._load_function('cancellable_sync')
+        fast_func_id = await self._load_function('show_context')
+
+        slow = self._invoke(slow_func_id, 'slow-1')
+        await self._wait_for_inflight('slow-1', running=True)
+        load = self.dispatcher.get_worker_load()
+        self.assertEqual(load['bulkheads']['slow']['busy_threads'], 1)
+        self.assertEqual(load['sync_threadpool_busy_threads'], 0)
+
+        # The only thread of the shared thread pool is still available
+        response = await asyncio.wait_for(
+            self._invoke(fast_func_id, 'fast-1'), timeout=5)
+        self.assertEqual(response.invocation_response.result.status,
+                         protos.StatusResult.Success)
+        self.assertFalse(slow.done())
+
+        await self.dispatcher._handle__invocation_cancel(
+            self._cancel_request('slow-1'))
+        await asyncio.wait_for(slow, timeout=5)
+        load = self.dispatcher.get_worker_load()
+        self.assertEqual(load['bulkheads']['slow']['busy_threads'], 0)
+
+
+class TestDispatcherAdaptiveThreadPool(DispatcherInvocationTestCase):
+
+    def setUp(self):
+        super().setUp()
+        os.environ.update({
+            PYTHON_ENABLE_ADAPTIVE_THREADPOOL: 'true',
+            PYTHON_ADAPTIVE_THREADPOOL_MIN_WORKERS: '2',
+            PYTHON_ADAPTIVE_THREADPOOL_MAX_WORKERS: '8'})
+        self.dispatcher._stop_sync_call_tp()
+        self.dispatcher._sync_call_tp = \
+            self.dispatcher._create_shared_sync_call_tp()
+
+    def test_adaptive_sync_threadpool(self):
+        self.loop.run_until_complete(self._adaptive_sync_threadpool())
+
+    def test_adaptive_sync_threadpool_invalid_bounds(self):
+        os.environ.update({
+            PYTHON_ADAPTIVE_THREADPOOL_MIN_WORKERS: '4',
+            PYTHON_ADAPTIVE_THREADPOOL_MAX_WORKERS: '2'})
+        self.assertEqual(Dispatcher._get_adaptive_sync_tp_bounds(), (4, 4))
+
+        os.environ.update({
+            PYTHON_ADAPTIVE_THREADPOOL_MIN_WORKERS: '0',
+            PYTHON_ADAPTIVE_THREADPOOL_MAX_WORKERS: 'many'})
+        self.assertEqual(Dispatcher._get_adaptive_sync_tp_bounds(), (1, 32))
+
+    async def _adaptive_sync_threadpool(self):
+        sync_tp = self.dispatcher._sync_call_tp
+        self.assertIsInstance(sync_tp, AdaptiveThreadPoolExecutor)
+        self.assertEqual((sync_tp.min_workers, sync_tp.max_workers), (2, 8))
+        self.assertEqual(self.dispatcher.get_sync_tp_workers_set(), 2)
+
+        func_id = await self._load_function('show_context')
+        response = await asyncio.wait_for(
+            self._invoke(func_id, 'adaptive-1'), timeout=5)
+        self.assertEqual(response.invocation_response.result.status,
+                         protos.StatusResult.Success)
+        self.assertEqual(
+            self.dispatcher.get_worker_load()['sync_threadpool_max_workers'],
+            2)
+
+
+class TestDispatcherProcessPool(DispatcherInvocationTestCase):
+
+    def setUp(self):
+        super().setUp()
+        os.environ.update({
+            PYTHON_PROCESSPOOL_FUNCTIONS: 'cpu_bound_sync, other',
+            PYTHON_PROCESSPOOL_WORKER_COUNT: '1'})
+        self.dispatcher._create_process_pool()
+
+        self.logs = []
+        self.log_handler = logging.Handler()
+        self.log_handler.emit = lambda record: self.logs.append(
+            (record.getMessage(), get_current_invocation_id()))
+        self.root_log_level = logging.getLogger().level
+        logging.getLogger().setLevel(logging.INFO)
+        logging.getLogger().addHandler(self.log_handler)
+
+    def tearDown(self):
+        logging.getLogger().removeHandler(self.log_handler)
+        logging.getLogger().setLevel(self.root_log_level)
+        self.dispatcher._stop_process_pool()
+        super().tearDown()
+
+    def test_process_pool_invocation(self):
+        self.loop.run_until_complete(self._process_pool_invocation())
+
+    def test_process_pool_large_response(self):
+        self.loop.run_until_complete(self._process_pool_large_response())
+
+    def test_process_pool_failure(self):
+        self.loop.run_until_complete(self._process_pool_failure())
+
+    async def _process_pool_invocation(self):
+        self.assertEqual(self.dispatcher._process_pool_functions,
+                         {'cpu_bound_sync', 'other'})
+        func_id = await self._load_function('cpu_bound_sync')
+        response = await asyncio.wait_for(
+            self._invoke(func_id, 'process-1'), timeout=30)
+        self.assertEqual(response.invocation_response.result.status,
+                         protos.StatusResult.Success,
+                         msg=response.invocation_response.result.exception)
+
+        result = json.loads(
+            response.invocation_response.return_value.http.body.bytes)
+        self.assertNotEqual(result['pid'], os.getpid())
+        self.assertEqual(result['invocation_id'], 'process-1')
+        # The log of the function is proxied with its invocation ID
+        self.assertIn((f'Hashed in process {result["pid"]}', 'process-1'),
+                      self.logs)
+        self.assertEqual(
+            self.dispatcher._sync_invocations_running.get(None, 0), 0)
+
+    async def _process_pool_large_response(self):
+        func_id = await self._load_function('cpu_bound_sync')
+        size = 2 * 1024 * 1024
+        response = await asyncio.wait_for(
+            self._invoke(func_id, 'process-1', query={'size': str(size)}),
+            timeout=30)
+        self.assertEqual(response.invocation_response.result.status,
+                         protos.StatusResult.Success,
+                         msg=response.invocation_response.result.exception)
+        self.assertEqual(
+            len(response.invocation_response.return_value.http.body.bytes),
+            size)
+
+    async def _process_pool_failure(self):
+        func_id = await self._load_function('cpu_bound_sync')
+        response = await asyncio.wait_for(
+            self._invoke(func_id, 'process-1', query={'fail': '1'}),
+            timeout=30)
+        result = response.invocation_response.result
+        self.assertEqual(result.status, protos.StatusResult.Failure)
+        self.assertIn('ValueError: hashing failed', result.exception.message)
+        self.assertTrue(any(message.startswith('Hashed in process')
+                            and invocation_id == 'process-1'
+                            for message, invocation_id in self.logs))
+
+
+class TestDispatcherInvocationLogSampling(DispatcherInvocationTestCase):
+
+    def test_invocation_log_sample_rate(self):
+        os.environ.update({PYTHON_INVOCATION_LOG_SAMPLE_RATE: '0.25'})
+        self.assertEqual(self._logged_invocations(8), 2)
+
+    def test_invocation_log_disabled_function(self):
+        os.environ.update({
+            PYTHON_INVOCATION_LOG_DISABLED_FUNCTIONS: 'other, cpu_bound_sync'
+        })
+        self.assertEqual(self._logged_invocations(2), 0)
+
+    def test_invocation_log_invalid_sample_rate(self):
+        os.environ.update({PYTHON_INVOCATION_LOG_SAMPLE_RATE: '2'})
+        with patch('azure_functions_worker.dispatcher.logger') as mock_logger:
+            sampler = Dispatcher._create_invocation_log_sampler()
+        self.assertEqual(sampler.sample_rate, 1.0)
+        mock_logger.warning.assert_called_once_with(
+            '%s must be set to a value between 0 and 1. '
+            'Reverting to default value', PYTHON_INVOCATION_LOG_SAMPLE_RATE)
+
+    def _logged_invocations(self, invocations: int) -> int:
+        self.dispatcher._invocation_log_sampler = \
+            Dispatcher._create_invocation_log_sampler()
+        return self.loop.run_until_complete(
+            self._invoke_and_count_logs(invocations))
+
+    async def _invoke_and_count_logs(self, invocations: int) -> int:
+        func_id = await self._load_function('cpu_bound_sync')
+        with patch('azure_functions_worker.dispatcher.logger') as mock_logger:
+            for i in range(invocations):
+                response = await asyncio.wait_for(
+                    self._invoke(func_id, f'sync-{i}', query={'rounds': '1'}),
+                    timeout=5)
+                self.assertEqual(response.invocation_response.result.status,
+                                 protos.StatusResult.Success)
+        return sum(c[0][0].startswith('Received FunctionInvocationRequest')
+                   for c in mock_logger.info.call_args_list)
+
+
+class TestDispatcherStdioCapture(DispatcherInvocationTestCase):
+
+    def setUp(self):
+        super().setUp()
+        os.environ.update({PYTHON_ENABLE_STDIO_CAPTURE: 'true'})
+        self.dispatcher._update_stdio_capture()
+
+    def tearDown(self):
+        self.dispatcher._stop_stdio_capture()
+        super().tearDown()
+
+    def test_output_sent_as_invocation_logs(self):
+        self.loop.run_until_complete(self._output_sent_as_invocation_logs())
+
+    async def _output_sent_as_invocation_logs(self):
+        self.assertTrue(stdio_capture.is_installed())
+        func_id = await self._load_function('print_sync')
+        response = await asyncio.wait_for(
+            self._invoke(func_id, 'print-1'), timeout=5)
+        self.assertEqual(response.invocation_response.result.status,
+                         protos.StatusResult.Success)
+
+        logs = [c[0][0].rpc_log
+                for c in self.dispatcher._grpc_resp_queue.put_nowait.call_args_list
+                if c[0][0].HasField('rpc_log')
+                and c[0][0].rpc_log.invocation_id == 'print-1']
+        self.assertEqual(
+            [(log.category, log.level, log.message) for log in logs],
+            [('stdout', protos.RpcLog.Information, 'first line\nsecond line'),
+             ('stderr', protos.RpcLog.Error, 'something failed')])
+        for log in logs:
+            self.assertEqual(
+                log.log_category,
+                protos.RpcLog.RpcLogCategory.Value('User'))
+
+    def test_capture_stopped_by_environment(self):
+        os.environ.pop(PYTHON_ENABLE_STDIO_CAPTURE)
+        self.dispatcher._update_stdio_capture()
+        self.assertFalse(stdio_capture.is_installed())
+        self.assertIsNone(self.dispatcher._stdio_flush_handle)
+
+
+class TestDispatcherLatencyHistograms(DispatcherInvocationTestCase):
+
+    def setUp(self):
+        super().setUp()
+        os.environ.update({PYTHON_ENABLE_LATENCY_HISTOGRAMS: 'true',
+                           PYTHON_LATENCY_HISTOGRAMS_INTERVAL: '30'})
+        self.dispatcher._update_latency_histograms()
+
+    def tearDown(self):
+        self.dispatcher._stop_latency_histograms()
+        super().tearDown()
+
+    def test_sync_invocation_phases(self):
+        self.loop.run_until_complete(self._sync_invocation_phases())
+
+    def test_async_invocation_phases(self):
+        self.loop.run_until_complete(self._async_invocation_phases())
+
+    def test_histograms_emitted(self):
+        self.loop.run_until_complete(self._histograms_emitted())
+
+    def test_histograms_disabled(self):
+        os.environ.pop(PYTHON_ENABLE_LATENCY_HISTOGRAMS)
+        self.dispatcher._update_latency_histograms()
+        self.assertIsNone(self.dispatcher._latency_emit_handle)
+        self.assertEqual(self.dispatcher.get_latency_histograms(), {})
+
+    async def _invoke_and_send(self, func_id, invocation_id, query=None):
+        request = protos.StreamingMessage(
+            invocation_request=protos.InvocationRequest(
+                invocation_id=invocation_id,
+                function_id=func_id,
+                input_data=[protos.ParameterBinding(
+                    name='req',
+                    data=protos.TypedData(
+                        http=protos.RpcHttp(method='GET', query=query)))]))
+        await self.dispatcher._dispatch_grpc_request(request,
+                                                     time.perf_counter())
+        response = \
+            self.dispatcher._grpc_resp_queue.put_nowait.call_args[0][0]
+        self.assertEqual(response.invocation_response.result.status,
+                         protos.StatusResult.Success)
+        # What the gRPC transport does as it sends the response
+        self.dispatcher._record_send(response)
+
+    async def _sync_invocation_phases(self):
+        func_id = await self._load_function('cpu_bound_sync')
+        await self._invoke_and_send(func_id, 'sync-1', query={'rounds': '1'})
+
+        phases = self.dispatcher.get_latency_histograms()['cpu_bound_sync']
+        self.assertEqual(
+            sorted(phases),
+            sorted(['receive', 'decode', 'threadpool_wait', 'user_code',
+                    'encode', 'send']))
+        for histogram in phases.values():
+            self.assertEqual(histogram['count'], 1)
+        self.assertEqual(self.dispatcher._pending_sends, {})
+
+    async def _async_invocation_phases(self):
+        func_id = await self._load_function('cancellable_async')
+        await self._invoke_and_send(func_id, 'async-1',
+                                    query={'seconds': '0.05'})
+
+        phases = self.dispatcher.get_latency_histograms()['cancellable_async']
+        self.assertNotIn('threadpool_wait', phases)
+        self.assertGreaterEqual(phases['user_code']['sum_ms'], 50)
+
+    async def _histograms_emitted(self):
+        func_id = await self._load_function('cpu_bound_sync')
+        await self._invoke_and_send(func_id, 'sync-1', query={'rounds': '1'})
+        self.dispatcher._grpc_resp_queue.reset_mock()
+
+        self.dispatcher._emit_latency_histograms(30)
+        log = self.dispatcher._grpc_resp_queue.put_nowait.call_args[0][0]
+        self.assertEqual(log.rpc_log.message, 'InvocationLatency')
+        self.assertEqual(log.rpc_log.log_category,
+                         protos.RpcLog.RpcLogCategory.CustomMetric)
+        properties = json.loads(log.rpc_log.properties)
+        self.assertEqual(properties['interval_seconds'], 30)
+        self.assertEqual(
+            properties['functions']['cpu_bound_sync']['user_code']['count'],
+            1)
+
+        # Every emitted log covers the invocations since the previous one
+        self.assertEqual(self.dispatcher.get_latency_histograms(), {})
+        self.assertIsNotNone(self.dispatcher._latency_emit_handle)
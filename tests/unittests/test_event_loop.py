@@ -0,0 +1,87 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+import asyncio
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+from azure_functions_worker import event_loop, protos
+from azure_functions_worker.constants import PYTHON_ENABLE_UVLOOP
+from tests.utils import testutils
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+
+class TestEventLoop(unittest.TestCase):
+
+    @patch.dict(os.environ, {}, clear=True)
+    def test_default_loop_without_setting(self):
+        self.assertIsNone(event_loop.get_loop_factory())
+
+    @patch.dict(os.environ, {PYTHON_ENABLE_UVLOOP: 'false'})
+    def test_default_loop_with_setting_disabled(self):
+        self.assertIsNone(event_loop.get_loop_factory())
+
+    @patch.dict(os.environ, {PYTHON_ENABLE_UVLOOP: 'true'})
+    @patch.dict(sys.modules, {'uvloop': None})
+    def test_default_loop_without_uvloop(self):
+        with self.assertLogs('azure_functions_worker', 'WARNING') as logs:
+            self.assertIsNone(event_loop.get_loop_factory())
+        self.assertIn('uvloop cannot be imported', logs.output[0])
+
+    def test_run_on_loop_of_factory(self):
+        loops = []
+
+        def loop_factory():
+            loops.append(asyncio.new_event_loop())
+            return loops[-1]
+
+        async def running_loop():
+            return asyncio.get_running_loop()
+
+        self.assertIs(event_loop.run(running_loop(), loop_factory),
+                      loops[0])
+        self.assertTrue(loops[0].is_closed())
+        self.assertIsInstance(asyncio.get_event_loop_policy(),
+                              asyncio.DefaultEventLoopPolicy)
+
+    def test_run_without_factory(self):
+        async def answer():
+            return 42
+
+        self.assertEqual(event_loop.run(answer()), 42)
+
+
+@unittest.skipIf(uvloop is None, 'uvloop is not installed')
+class TestUvloopEventLoop(unittest.TestCase):
+
+    @patch.dict(os.environ, {PYTHON_ENABLE_UVLOOP: 'true'})
+    def test_uvloop_with_setting(self):
+        self.assertIs(event_loop.get_loop_factory(), uvloop.new_event_loop)
+
+    def test_async_function_invocation(self):
+        async def invoke():
+            self.assertIsInstance(asyncio.get_running_loop(), uvloop.Loop)
+            async with testutils.start_mockhost() as host:
+                await host.init_worker()
+                await host.load_function('async_logging')
+                return await host.invoke_function('async_logging', [
+                    protos.ParameterBinding(
+                        name='req',
+                        data=protos.TypedData(
+                            http=protos.RpcHttp(method='GET')))])
+
+        invoke_id, r = event_loop.run(asyncio.wait_for(invoke(), 30),
+                                      uvloop.new_event_loop)
+
+        self.assertEqual(r.response.result.status,
+                         protos.StatusResult.Success)
+        self.assertEqual(r.response.return_value.string, 'OK-async')
+        user_logs = [line for line in r.logs if
+                     line.category == 'my function']
+        self.assertEqual([log.invocation_id for log in user_logs],
+                         [invoke_id, invoke_id])
@@ -96,3 +96,69 @@ class TestFileAccessor(testutils.SharedMemoryTestCase):
         self.assertTrue(delete_status)
         d_mem_map = self.file_accessor.open_mem_map(mem_map_name, mem_map_size)
         self.assertIsNone(d_mem_map)
+
+    @unittest.skipIf(os.name == 'nt',
+                     'Windows cannot rename memory maps')
+    def test_rename_mem_map(self):
+        """
+        Verify that a renamed memory map keeps its content and mapping, can
+        be opened by its new name only, and cannot take the name of an
+        existing memory map.
+        """
+        self.assertTrue(self.file_accessor.is_rename_supported())
+        mem_map_size = 1024
+        mem_map_name = self.get_new_mem_map_name()
+        new_mem_map_name = self.get_new_mem_map_name()
+        mem_map = self.file_accessor.create_mem_map(mem_map_name, mem_map_size)
+        mem_map[1:5] = b'data'
+        rename_status = self.file_accessor.rename_mem_map(mem_map_name,
+                                                          new_mem_map_name)
+        self.assertTrue(rename_status)
+        self.assertIsNone(
+            self.file_accessor.open_mem_map(mem_map_name, mem_map_size))
+        o_mem_map = self.file_accessor.open_mem_map(new_mem_map_name,
+                                                    mem_map_size)
+        self.assertEqual(b'data', o_mem_map[1:5])
+        o_mem_map.close()
+        other_mem_map_name = self.get_new_mem_map_name()
+        other_mem_map = self.file_accessor.create_mem_map(other_mem_map_name,
+                                                          mem_map_size)
+        with self.assertRaisesRegex(SharedMemoryException, 'already exists'):
+            self.file_accessor.rename_mem_map(new_mem_map_name,
+                                              other_mem_map_name)
+        self.assertFalse(
+            self.file_accessor.rename_mem_map(mem_map_name, new_mem_map_name))
+        self.assertTrue(self.file_accessor.delete_mem_map(other_mem_map_name,
+                                                          other_mem_map))
+        self.assertTrue(self.file_accessor.delete_mem_map(new_mem_map_name,
+                                                          mem_map))
+
+    @unittest.skipIf(not sys.platform.startswith('linux'),
+                     'Only Linux can resize memory maps')
+    def test_resize_mem_map(self):
+        """
+        Verify that a resized memory map keeps its content and that it can be
+        opened with its new size.
+        """
+        self.assertTrue(self.file_accessor.is_resize_supported())
+        mem_map_size = 1024
+        new_mem_map_size = 4 * 1024 * 1024
+        mem_map_name = self.get_new_mem_map_name()
+        mem_map = self.file_accessor.create_mem_map(mem_map_name, mem_map_size)
+        mem_map[1:5] = b'data'
+        self.assertTrue(self.file_accessor.resize_mem_map(
+            mem_map_name, mem_map, new_mem_map_size))
+        self.assertEqual(new_mem_map_size, len(mem_map))
+        mem_map[new_mem_map_size - 4:] = b'tail'
+        o_mem_map = self.file_accessor.open_mem_map(mem_map_name, 0)
+        self.assertEqual(new_mem_map_size, len(o_mem_map))
+        self.assertEqual(b'data', o_mem_map[1:5])
+        self.assertEqual(b'tail', o_mem_map[new_mem_map_size - 4:])
+        o_mem_map.close()
+        with memoryview(mem_map):
+            self.assertFalse(self.file_accessor.resize_mem_map(
+                mem_map_name, mem_map, 2 * new_mem_map_size))
+        with self.assertRaisesRegex(SharedMemoryException, 'Invalid size'):
+            self.file_accessor.resize_mem_map(mem_map_name, mem_map, 0)
+        self.assertTrue(self.file_accessor.delete_mem_map(mem_map_name,
+                                                          mem_map))
@@ -1,36 +1,79 @@
-# Copyright (c) Microsoft Corporation. All rights reserved.
-# Licensed under the MIT License.
-
-import unittest
-
-from azure.functions import Function
-from azure.functions.decorators.blob import BlobInput
-from azure.functions.decorators.http import HttpTrigger
-
-from azure_functions_worker import functions
-from azure_functions_worker.functions import FunctionLoadError
-
-
-class TestFunctionsRegistry(unittest.TestCase):
-
-    def setUp(self) -> None:
-        def dummy():
-            return "test"
-
-        self.dummy = dummy
-        self.func = Function(self.dummy, "test.py")
-        self.function_registry = functions.Registry()
-
-    def test_add_indexed_function_invalid_direction(self):
-        trigger1 = HttpTrigger(name="req1", route="test")
-        binding = BlobInput(name="$return", path="testpath",
-                            connection="testconnection")
-        self.func.add_trigger(trigger=trigger1)
-        self.func.add_binding(binding=binding)
-
-        with self.assertRaises(FunctionLoadError) as ex:
-            self.function_registry.add_indexed_function(function=self.func)
-
-        self.assertEqual(str(ex.exception),
-                         'cannot load the dummy function: \"$return\" '
-                         'binding must have direction set to \"out\"')
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import unittest
+
+import azure.functions as func
+from azure.functions import Function
+from azure.functions.decorators.blob import BlobInput, BlobOutput
+from azure.functions.decorators.http import HttpTrigger, HttpOutput
+
+from azure_functions_worker import bindings, functions, protos
+from azure_functions_worker.bindings.shared_memory_data_transfer import \
+    SharedMemoryManager
+from azure_functions_worker.functions import FunctionLoadError
+
+
+class TestFunctionsRegistry(unittest.TestCase):
+
+    def setUp(self) -> None:
+        def dummy():
+            return "test"
+
+        self.dummy = dummy
+        self.func = Function(self.dummy, "test.py")
+        self.function_registry = functions.Registry()
+
+    def test_add_indexed_function_invalid_direction(self):
+        trigger1 = HttpTrigger(name="req1", route="test")
+        binding = BlobInput(name="$return", path="testpath",
+                            connection="testconnection")
+        self.func.add_trigger(trigger=trigger1)
+        self.func.add_binding(binding=binding)
+
+        with self.assertRaises(FunctionLoadError) as ex:
+            self.function_registry.add_indexed_function(function=self.func)
+
+        self.assertEqual(str(ex.exception),
+                         'cannot load the dummy function: \"$return\" '
+                         'binding must have direction set to \"out\"')
+
+    def test_add_indexed_function_invocation_plan(self):
+        def http_to_blob(req: func.HttpRequest,
+                         outblob: func.Out[str]) -> func.HttpResponse:
+            return func.HttpResponse('ok')
+
+        function = Function(http_to_blob, "test.py")
+        function.add_trigger(trigger=HttpTrigger(name="req", route="test"))
+        function.add_binding(binding=HttpOutput(name="$return"))
+        function.add_binding(binding=BlobOutput(
+            name="outblob", path="testpath", connection="testconnection"))
+
+        bindings.load_binding_registry()
+        function_info = self.function_registry.add_indexed_function(
+            function=function)
+        plan = function_info.invocation_plan
+
+        decoder, is_trigger = plan.inputs['req']
+        self.assertTrue(is_trigger)
+        req = decoder(
+            protos.ParameterBinding(
+                name='req',
+                data=protos.TypedData(http=protos.RpcHttp(
+                    method='GET', url='http://localhost/api/test'))),
+            trigger_metadata=None, shmem_mgr=None)
+        self.assertEqual(req.method, 'GET')
+
+        self.assertEqual([name for name, _ in plan.outputs], ['outblob'])
+        _, encoder = plan.outputs[0]
+        self.assertEqual(
+            encoder('data', shmem_mgr=SharedMemoryManager(),
+                    is_function_data_cache_enabled=False),
+            protos.ParameterBinding(name='outblob',
+                                    data=protos.TypedData(string='data')))
+
+        self.assertEqual(plan.return_encoder(func.HttpResponse('ok'))
+                         .http.body.bytes, b'ok')
+        self.assertIsNone(plan.http_v2_param_name)
+        self.assertEqual(plan.success_result.status,
+                         protos.StatusResult.Success)
@@ -0,0 +1,76 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+import threading
+import unittest
+
+from azure_functions_worker import latency
+from azure_functions_worker.latency import LatencyHistogram, LatencyRecorder
+
+
+class TestLatencyHistogram(unittest.TestCase):
+
+    def test_record(self):
+        histogram = LatencyHistogram()
+        for seconds in (0.000005, 0.0003, 0.0005, 0.004, 30):
+            histogram.record(seconds)
+
+        self.assertEqual(histogram.to_dict(), {
+            'count': 5,
+            'sum_ms': histogram.total * 1000,
+            'max_ms': 30000,
+            'buckets': {'0.01': 1, '0.5': 2, '5': 1, '+Inf': 1}
+        })
+
+    def test_reset(self):
+        histogram = LatencyHistogram()
+        counts = histogram.counts
+        histogram.record(0.001)
+        histogram.reset()
+
+        self.assertIs(histogram.counts, counts)
+        self.assertEqual(histogram.to_dict(), {
+            'count': 0, 'sum_ms': 0, 'max_ms': 0, 'buckets': {}})
+
+
+class TestLatencyRecorder(unittest.TestCase):
+
+    def test_snapshot(self):
+        recorder = LatencyRecorder()
+        recorder.record('http_trigger', latency.DECODE, 0.0002)
+        recorder.record('http_trigger', latency.USER_CODE, 0.002)
+        recorder.record('timer_trigger', latency.USER_CODE, 2)
+
+        snapshot = recorder.snapshot(reset=True)
+        self.assertEqual(sorted(snapshot), ['http_trigger', 'timer_trigger'])
+        self.assertEqual(sorted(snapshot['http_trigger']),
+                         ['decode', 'user_code'])
+        self.assertEqual(snapshot['timer_trigger']['user_code']['buckets'],
+                         {'2500': 1})
+        self.assertEqual(recorder.snapshot(), {})
+
+    def test_function_latency(self):
+        recorder = LatencyRecorder()
+        function_latency = recorder.get('http_trigger')
+        self.assertIs(recorder.get('http_trigger'), function_latency)
+        histograms = list(function_latency.histograms)
+
+        function_latency.record(latency.SEND, 0.0002)
+        recorder.record('http_trigger', latency.SEND, 0.0002)
+        self.assertEqual(function_latency.histograms, histograms)
+        self.assertEqual(
+            recorder.snapshot()['http_trigger']['send']['count'], 2)
+
+    def test_record_from_threads(self):
+        recorder = LatencyRecorder()
+
+        def record():
+            for _ in range(1000):
+                recorder.record('http_trigger', latency.USER_CODE, 0.001)
+
+        threads = [threading.Thread(target=record) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(
+            recorder.snapshot()['http_trigger']['user_code']['count'], 4000)
@@ -3,15 +3,22 @@
 
 import json
 import hashlib
+import os
 import time
 from unittest import skipIf
+from unittest.mock import patch
 import sys
 
+from azure_functions_worker.bindings.shared_memory_data_transfer \
+    import SharedMemoryManager
 from azure_functions_worker.bindings.shared_memory_data_transfer \
     import SharedMemoryMap
 from azure_functions_worker.bindings.shared_memory_data_transfer \
     import SharedMemoryConstants as consts
 from azure_functions_worker import protos
+from azure_functions_worker.constants import PYTHON_SHARED_MEMORY_INPUT_TYPE, \
+    PYTHON_SHARED_MEMORY_PACK_OUTPUTS
+from azure_functions_worker.dispatcher import Dispatcher
 from tests.utils import testutils
 
 
@@ -46,6 +53,17 @@ class TestMockBlobSharedMemoryFunctions(testutils.SharedMemoryTestCase,
         func_name = 'get_blob_as_bytes_stream_return_http_response'
         await self._test_binary_blob_read_function(func_name)
 
+    async def test_binary_blob_read_as_memoryview_stream_function(self):
+        """
+        Read a blob with binary input that was transferred between the host and
+        worker over shared memory, and viewed in place by the worker.
+        The function's input data type will be InputStream.
+        """
+        func_name = 'get_blob_as_bytes_stream_return_http_response'
+        with patch.dict(os.environ,
+                        {PYTHON_SHARED_MEMORY_INPUT_TYPE: 'memoryview'}):
+            await self._test_binary_blob_read_function(func_name)
+
     async def test_binary_blob_write_function(self):
         """
         Write a blob with binary output that was transferred between the worker
@@ -513,6 +531,158 @@ class TestMockBlobSharedMemoryFunctions(testutils.SharedMemoryTestCase,
             self._verify_function_output(shmem_2, func_created_content_size_2,
                                          func_created_content_md5_2)
 
+    @patch.dict(os.environ, {PYTHON_SHARED_MEMORY_PACK_OUTPUTS: 'true'})
+    async def test_multiple_input_output_blobs_packed(self):
+        """
+        Read two blobs packed in one shared memory map at different offsets,
+        and write two blobs which the worker packs into one shared memory map.
+        """
+        func_name = 'put_get_multiple_blobs_as_bytes_return_http_response'
+        async with testutils.start_mockhost(script_root=self.blob_funcs_dir) \
+                as host:
+            await host.init_worker("4.17.1")
+            await host.load_function(func_name)
+
+            # Write both inputs into the same shared memory map
+            mem_map_name = self.get_new_mem_map_name()
+            input_contents = [
+                self.get_random_bytes(
+                    consts.MIN_BYTES_FOR_SHARED_MEM_TRANSFER + 10),
+                self.get_random_bytes(
+                    consts.MIN_BYTES_FOR_SHARED_MEM_TRANSFER + 20)]
+            input_mem_map_size = consts.CONTENT_HEADER_TOTAL_BYTES + \
+                sum(len(content) for content in input_contents)
+            input_mem_map = self.file_accessor.create_mem_map(
+                mem_map_name, input_mem_map_size)
+            input_shared_mem_map = SharedMemoryMap(
+                self.file_accessor, mem_map_name, input_mem_map)
+            input_shared_mem_map.put_packed_bytes(input_contents)
+            input_values = [
+                protos.RpcSharedMemory(name=mem_map_name, offset=0,
+                                       count=len(input_contents[0]),
+                                       type=protos.RpcDataType.bytes),
+                protos.RpcSharedMemory(name=mem_map_name,
+                                       offset=len(input_contents[0]),
+                                       count=len(input_contents[1]),
+                                       type=protos.RpcDataType.bytes)]
+
+            output_content_sizes = [
+                consts.MIN_BYTES_FOR_SHARED_MEM_TRANSFER + 11,
+                consts.MIN_BYTES_FOR_SHARED_MEM_TRANSFER + 22]
+            http_params = {
+                'output_content_size_1': str(output_content_sizes[0]),
+                'output_content_size_2': str(output_content_sizes[1])}
+
+            _, response_msg = await host.invoke_function(
+                func_name, [
+                    protos.ParameterBinding(
+                        name='req',
+                        data=protos.TypedData(
+                            http=protos.RpcHttp(
+                                method='GET',
+                                query=http_params))),
+                    protos.ParameterBinding(
+                        name='inputfile1',
+                        rpc_shared_memory=input_values[0]),
+                    protos.ParameterBinding(
+                        name='inputfile2',
+                        rpc_shared_memory=input_values[1])
+                ])
+
+            input_shared_mem_map.dispose()
+
+            self.assertEqual(protos.StatusResult.Success,
+                             response_msg.response.result.status)
+            json_response = json.loads(
+                response_msg.response.return_value.http.body.bytes)
+            self.assertEqual(hashlib.md5(input_contents[0]).hexdigest(),
+                             json_response['input_content_md5_1'])
+            self.assertEqual(hashlib.md5(input_contents[1]).hexdigest(),
+                             json_response['input_content_md5_2'])
+
+            # Both outputs are in the same shared memory map, one after the
+            # other
+            output_data = response_msg.response.output_data
+            self.assertEqual(2, len(output_data))
+            shmems = [output.rpc_shared_memory for output in output_data]
+            output_mem_map_name = shmems[0].name
+            self.assertEqual(output_mem_map_name, shmems[1].name)
+            self.assertEqual([0, output_content_sizes[0]],
+                             [shmem.offset for shmem in shmems])
+            self.assertEqual(output_content_sizes,
+                             [shmem.count for shmem in shmems])
+
+            output_mem_map = self.file_accessor.open_mem_map(
+                output_mem_map_name, 0)
+            output_shared_mem_map = SharedMemoryMap(
+                self.file_accessor, output_mem_map_name, output_mem_map)
+            for i, shmem in enumerate(shmems, 1):
+                output_content = output_shared_mem_map.get_bytes(
+                    content_offset=shmem.offset, bytes_to_read=shmem.count)
+                self.assertEqual(json_response[f'output_content_md5_{i}'],
+                                 hashlib.md5(output_content).hexdigest())
+            output_shared_mem_map.dispose(is_delete_file=False)
+
+            # The host closes the memory map of each output
+            response_msg = await host.close_shared_memory_resources(
+                [shmem.name for shmem in shmems])
+            self.assertEqual(
+                {output_mem_map_name: True},
+                dict(response_msg.response.close_map_results))
+
+    @patch.dict(os.environ, {PYTHON_SHARED_MEMORY_PACK_OUTPUTS: 'true'})
+    async def test_multiple_output_blobs_unpacked_over_rpc(self):
+        """
+        Write two blobs which the worker packs into one shared memory map,
+        which cannot be written, and verify that they are sent over RPC
+        instead.
+        """
+        func_name = 'put_get_multiple_blobs_as_bytes_return_http_response'
+        async with testutils.start_mockhost(script_root=self.blob_funcs_dir) \
+                as host:
+            await host.init_worker("4.17.1")
+            await host.load_function(func_name)
+
+            input_contents = [bytes(self.get_random_bytes(10)),
+                              bytes(self.get_random_bytes(20))]
+            output_content_sizes = [
+                consts.MIN_BYTES_FOR_SHARED_MEM_TRANSFER + 11,
+                consts.MIN_BYTES_FOR_SHARED_MEM_TRANSFER + 22]
+            http_params = {
+                'output_content_size_1': str(output_content_sizes[0]),
+                'output_content_size_2': str(output_content_sizes[1])}
+
+            with patch.object(SharedMemoryManager, '_put_packed_bytes',
+                              return_value=False):
+                _, response_msg = await host.invoke_function(
+                    func_name, [
+                        protos.ParameterBinding(
+                            name='req',
+                            data=protos.TypedData(
+                                http=protos.RpcHttp(
+                                    method='GET',
+                                    query=http_params))),
+                        protos.ParameterBinding(
+                            name='inputfile1',
+                            data=protos.TypedData(bytes=input_contents[0])),
+                        protos.ParameterBinding(
+                            name='inputfile2',
+                            data=protos.TypedData(bytes=input_contents[1]))
+                    ])
+
+            self.assertEqual(protos.StatusResult.Success,
+                             response_msg.response.result.status)
+            json_response = json.loads(
+                response_msg.response.return_value.http.body.bytes)
+            output_data = response_msg.response.output_data
+            self.assertEqual(2, len(output_data))
+            for i, output in enumerate(output_data, 1):
+                self.assertEqual('data', output.WhichOneof('rpc_data'))
+                self.assertEqual(output_content_sizes[i - 1],
+                                 len(output.data.bytes))
+                self.assertEqual(json_response[f'output_content_md5_{i}'],
+                                 hashlib.md5(output.data.bytes).hexdigest())
+
     async def _test_binary_blob_read_function(self, func_name):
         """
         Verify that the function executed successfully when the worker received
@@ -566,6 +736,9 @@ class TestMockBlobSharedMemoryFunctions(testutils.SharedMemoryTestCase,
             # Verify if the function executed successfully
             self.assertEqual(protos.StatusResult.Success,
                              response_msg.response.result.status)
+            # and if it closed the inputs it read in place
+            self.assertEqual({},
+                             Dispatcher.current._shmem_mgr.input_mem_maps)
 
             response_bytes = response_msg.response.return_value.http.body.bytes
             json_response = json.loads(response_bytes)
@@ -1,5 +1,7 @@
 # Copyright (c) Microsoft Corporation. All rights reserved.
 # Licensed under the MIT License.
+import asyncio
+
 from azure_functions_worker import protos
 from tests.utils import testutils
 
@@ -85,3 +87,31 @@ class TestMockHost(testutils.AsyncTestCase):
             _, r = await host.load_function('return_out')
             self.assertEqual(r.response.result.status,
                              protos.StatusResult.Success)
+
+    async def test_call_async_function_concurrently(self):
+        async with testutils.start_mockhost(concurrent=True) as host:
+
+            await host.init_worker("4.17.1")
+            await host.load_function('async_logging')
+
+            results = await asyncio.gather(*(host.invoke_function(
+                'async_logging', [
+                    protos.ParameterBinding(
+                        name='req',
+                        data=protos.TypedData(
+                            http=protos.RpcHttp(
+                                method='GET')))
+                ]) for _ in range(5)))
+
+            for invoke_id, r in results:
+                self.assertEqual(r.response.invocation_id, invoke_id)
+                self.assertEqual(r.response.result.status,
+                                 protos.StatusResult.Success)
+                self.assertEqual(r.response.return_value.string, 'OK-async')
+
+                # Logs are matched to their invocation
+                user_logs = [line for line in r.logs if
+                             line.category == 'my function']
+                self.assertEqual(len(user_logs), 2)
+                self.assertTrue(all(line.invocation_id == invoke_id
+                                    for line in user_logs))
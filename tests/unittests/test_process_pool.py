@@ -0,0 +1,143 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+import concurrent.futures
+import unittest
+from multiprocessing import resource_tracker
+from unittest.mock import patch
+
+import azure.functions as func
+
+from azure_functions_worker.bindings.shared_memory_data_transfer import \
+    SharedMemoryConstants as consts
+from azure_functions_worker.bindings.shared_memory_data_transfer import \
+    SharedMemoryInputStream
+from azure_functions_worker.process_pool import (ProcessCallResult, _attach,
+                                                 _complete, _pack, _unpack,
+                                                 _SharedBytes, shared_memory)
+
+
+class TestProcessPoolPacking(unittest.TestCase):
+
+    def test_small_bytes_are_pickled(self):
+        segments = []
+        self.assertEqual(_pack(b'abc', segments), b'abc')
+        self.assertEqual(segments, [])
+
+    @unittest.skipIf(shared_memory is None,
+                     'multiprocessing.shared_memory is not available')
+    def test_large_bytes_use_shared_memory(self):
+        value = b'x' * consts.MIN_BYTES_FOR_SHARED_MEM_TRANSFER
+        segments = []
+        packed = _pack(value, segments)
+        self.assertIsInstance(packed, _SharedBytes)
+        self.assertEqual(len(segments), 1)
+        self.assertEqual(_unpack(packed, unlink=True), value)
+
+    def test_small_memoryview_is_copied(self):
+        self.assertEqual(_pack(memoryview(b'abc'), None), b'abc')
+
+    @unittest.skipIf(shared_memory is None,
+                     'multiprocessing.shared_memory is not available')
+    def test_large_memoryview_uses_shared_memory(self):
+        value = b'x' * consts.MIN_BYTES_FOR_SHARED_MEM_TRANSFER
+        segments = []
+        packed = _pack(memoryview(value), segments)
+        self.assertIsInstance(packed, _SharedBytes)
+        self.assertEqual(_unpack(packed, unlink=True), value)
+
+    def test_shared_memory_input_stream_is_copied(self):
+        stream = SharedMemoryInputStream(memoryview(b'abc'))
+        packed = _pack(stream, None)
+        self.assertEqual(packed.read(), b'abc')
+
+    @unittest.skipIf(shared_memory is None,
+                     'multiprocessing.shared_memory is not available')
+    def test_http_request(self):
+        body = b'y' * consts.MIN_BYTES_FOR_SHARED_MEM_TRANSFER
+        req = func.HttpRequest('POST', 'http://localhost/api/f',
+                               headers={'x-test': '1'}, params={'a': 'b'},
+                               route_params={'id': '2'}, body=body)
+        segments = []
+        unpacked = _unpack(_pack(req, segments), unlink=True)
+        self.assertEqual(len(segments), 1)
+        self.assertEqual(unpacked.method, 'POST')
+        self.assertEqual(unpacked.headers['x-test'], '1')
+        self.assertEqual(dict(unpacked.params), {'a': 'b'})
+        self.assertEqual(dict(unpacked.route_params), {'id': '2'})
+        self.assertEqual(unpacked.get_body(), body)
+
+    def test_http_response(self):
+        resp = func.HttpResponse('ok', status_code=201,
+                                 headers={'x-test': '1'},
+                                 mimetype='text/plain')
+        unpacked = _unpack(_pack(resp, None))
+        self.assertEqual(unpacked.get_body(), b'ok')
+        self.assertEqual(unpacked.status_code, 201)
+        self.assertEqual(unpacked.headers['x-test'], '1')
+        self.assertEqual(unpacked.mimetype, 'text/plain')
+
+
+@unittest.skipIf(shared_memory is None,
+                 'multiprocessing.shared_memory is not available')
+class TestProcessPoolSegments(unittest.TestCase):
+
+    def _assert_unlinked(self, packed: _SharedBytes):
+        with self.assertRaises(FileNotFoundError):
+            _attach(packed.name)
+
+    def test_attached_segment_is_not_tracked(self):
+        value = b'x' * consts.MIN_BYTES_FOR_SHARED_MEM_TRANSFER
+        segments = []
+        packed = _pack(value, segments)
+        try:
+            with patch.object(resource_tracker, 'register') as register:
+                self.assertEqual(_unpack(packed), value)
+            register.assert_not_called()
+        finally:
+            for shm in segments:
+                shm.close()
+                shm.unlink()
+
+    def test_result_is_unpacked_on_completion(self):
+        value = b'x' * consts.MIN_BYTES_FOR_SHARED_MEM_TRANSFER
+        # Packed as by a worker process
+        packed = _pack(value, None)
+        packed_output = _pack(func.HttpResponse(value), None)
+        call_future = concurrent.futures.Future()
+        future = concurrent.futures.Future()
+        call_future.add_done_callback(lambda f: _complete(future, f))
+
+        call_future.set_result(
+            ProcessCallResult(packed, {'out': packed_output}, []))
+        result = future.result(timeout=0)
+        self.assertEqual(result.value, value)
+        self.assertEqual(result.outputs['out'].get_body(), value)
+        self._assert_unlinked(packed)
+        self._assert_unlinked(packed_output.body)
+
+    def test_result_of_cancelled_future_is_unlinked(self):
+        packed = _pack(b'x' * consts.MIN_BYTES_FOR_SHARED_MEM_TRANSFER, None)
+        call_future = concurrent.futures.Future()
+        call_future.set_running_or_notify_cancel()
+        future = concurrent.futures.Future()
+        self.assertTrue(future.cancel())
+
+        call_future.set_result(ProcessCallResult(packed, {}, []))
+        _complete(future, call_future)
+        self.assertTrue(future.cancelled())
+        self._assert_unlinked(packed)
+
+    def test_exception_is_passed_on(self):
+        call_future = concurrent.futures.Future()
+        future = concurrent.futures.Future()
+        call_future.set_exception(ValueError('failed'))
+        _complete(future, call_future)
+        with self.assertRaisesRegex(ValueError, 'failed'):
+            future.result(timeout=0)
+
+    def test_cancelled_call_cancels_future(self):
+        call_future = concurrent.futures.Future()
+        future = concurrent.futures.Future()
+        call_future.cancel()
+        _complete(future, call_future)
+        self.assertTrue(future.cancelled())
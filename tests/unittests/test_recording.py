@@ -0,0 +1,130 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from azure_functions_worker import protos
+from azure_functions_worker.constants import PYTHON_GRPC_RECORDING_FILE
+from azure_functions_worker.recording import MessageRecorder, read_recording
+from tests.utils import testutils
+from tests.utils.replay import replay
+
+HTTP_FUNCS_DIR = testutils.UNIT_TESTS_FOLDER / 'http_functions'
+
+
+def _http_binding(body: bytes) -> protos.ParameterBinding:
+    return protos.ParameterBinding(
+        name='req',
+        data=protos.TypedData(http=protos.RpcHttp(
+            method='GET', body=protos.TypedData(bytes=body))))
+
+
+class TestMessageRecorder(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def _record(self, file_name, messages):
+        path = os.path.join(self._tmp_dir.name, file_name)
+        recorder = MessageRecorder(path)
+        for message in messages:
+            recorder.record(message)
+        recorder.close()
+        # Messages received after the worker stopped are dropped
+        recorder.record(messages[0])
+        return path
+
+    def test_round_trip(self):
+        messages = [
+            protos.StreamingMessage(
+                worker_init_request=protos.WorkerInitRequest(
+                    host_version='4.28.0')),
+            protos.StreamingMessage(
+                invocation_request=protos.InvocationRequest(
+                    invocation_id='inv-1', function_id='func-1',
+                    input_data=[_http_binding(b'x' * 1024)]))]
+        for file_name in ('traffic.bin', 'traffic.bin.gz'):
+            path = self._record(file_name, messages)
+            recorded = list(read_recording(path))
+
+            self.assertEqual([r.message for r in recorded], messages)
+            self.assertLessEqual(recorded[0].offset, recorded[1].offset)
+
+    def test_compressed(self):
+        messages = [protos.StreamingMessage(
+            invocation_request=protos.InvocationRequest(
+                invocation_id=f'inv-{i}', function_id='func-1',
+                input_data=[_http_binding(b'x' * 1024)]))
+            for i in range(10)]
+        plain = self._record('traffic.bin', messages)
+        compressed = self._record('traffic.bin.gz', messages)
+        self.assertLess(os.path.getsize(compressed), os.path.getsize(plain))
+
+    def test_invalid_recording(self):
+        path = os.path.join(self._tmp_dir.name, 'traffic.bin')
+        with open(path, 'wb') as f:
+            f.write(b'not a recording')
+        with self.assertRaisesRegex(ValueError, 'not a recording'):
+            list(read_recording(path))
+
+        path = self._record('truncated.bin', [protos.StreamingMessage(
+            worker_init_request=protos.WorkerInitRequest())])
+        with open(path, 'ab') as f:
+            f.write(b'\x00' * 4)
+        with self.assertRaisesRegex(ValueError, 'truncated'):
+            list(read_recording(path))
+
+
+class TestRecordAndReplay(testutils.AsyncTestCase):
+
+    async def test_record_and_replay(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'traffic.bin')
+            with patch.dict(os.environ, {PYTHON_GRPC_RECORDING_FILE: path}):
+                async with testutils.start_mockhost(
+                        script_root=HTTP_FUNCS_DIR) as host:
+                    await host.init_worker()
+                    await host.load_function('return_str')
+                    for _ in range(3):
+                        _, r = await host.invoke_function(
+                            'return_str', [_http_binding(b'')])
+                        self.assertEqual(r.response.result.status,
+                                         protos.StatusResult.Success)
+
+            self.assertEqual(
+                [r.message.WhichOneof('content')
+                 for r in read_recording(path)],
+                ['worker_init_request', 'function_load_request',
+                 'invocation_request', 'invocation_request',
+                 'invocation_request'])
+
+            result = await replay(path, speed=None)
+            self.assertEqual(result.invocations, 3)
+            self.assertEqual(result.failures, 0)
+            self.assertEqual(len(result.latencies), 3)
+            self.assertGreater(result.throughput, 0)
+
+    async def test_recording_started_on_environment_reload(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'traffic.bin')
+            with patch.dict(os.environ):
+                async with testutils.start_mockhost(
+                        script_root=HTTP_FUNCS_DIR) as host:
+                    await host.init_worker()
+                    await host.reload_environment(
+                        environment={PYTHON_GRPC_RECORDING_FILE: path})
+                    await host.load_function('return_str')
+                    _, r = await host.invoke_function(
+                        'return_str', [_http_binding(b'')])
+                    self.assertEqual(r.response.result.status,
+                                     protos.StatusResult.Success)
+
+            self.assertEqual(
+                [r.message.WhichOneof('content')
+                 for r in read_recording(path)],
+                ['function_load_request', 'invocation_request'])
@@ -0,0 +1,117 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import os
+import sys
+from unittest import skipIf
+from unittest.mock import patch
+
+from tests.utils import testutils
+from azure_functions_worker.bindings.shared_memory_data_transfer \
+    import SharedMemoryArena
+from azure_functions_worker.bindings.shared_memory_data_transfer \
+    import SharedMemoryMap
+from azure_functions_worker.bindings.shared_memory_data_transfer \
+    import SharedMemoryConstants as consts
+
+MB = 1024 * 1024
+
+
+@skipIf(sys.platform == 'darwin' or os.name == 'nt',
+        'Memory maps can only be renamed on Linux, MacOS M1 machines do not '
+        'correctly test the shared memory filesystems')
+class TestSharedMemoryArena(testutils.SharedMemoryTestCase):
+    """
+    Tests for SharedMemoryArena.
+    """
+    def setUp(self):
+        super().setUp()
+        self.arena = SharedMemoryArena(self.file_accessor, 8 * MB + 100, 60)
+
+    def tearDown(self):
+        self.arena.clear()
+        super().tearDown()
+
+    def _create(self, capacity: int) -> SharedMemoryMap:
+        mem_map_name = self.get_new_mem_map_name()
+        mem_map = self.file_accessor.create_mem_map(
+            mem_map_name, consts.CONTENT_HEADER_TOTAL_BYTES + capacity)
+        return SharedMemoryMap(self.file_accessor, mem_map_name, mem_map)
+
+    def test_get_capacity(self):
+        self.assertEqual(MB, self.arena.get_capacity(1))
+        self.assertEqual(MB, self.arena.get_capacity(MB))
+        self.assertEqual(2 * MB, self.arena.get_capacity(MB + 1))
+        self.assertEqual(8 * MB, self.arena.get_capacity(5 * MB))
+
+    def test_acquire_from_empty_arena(self):
+        self.assertIsNone(self.arena.acquire(self.get_new_mem_map_name(), MB))
+
+    def test_acquire_released_mem_map(self):
+        """
+        Verify that a released memory map is reused, under the new name, for
+        content of its size class only.
+        """
+        shared_mem_map = self._create(2 * MB)
+        old_mem_map_name = shared_mem_map.mem_map_name
+        self.assertTrue(self.arena.release(shared_mem_map))
+        self.assertEqual(len(shared_mem_map.mem_map), self.arena.size)
+
+        self.assertIsNone(self.arena.acquire(self.get_new_mem_map_name(), MB))
+        mem_map_name = self.get_new_mem_map_name()
+        acquired = self.arena.acquire(mem_map_name, MB + 10)
+        self.assertIs(shared_mem_map, acquired)
+        self.assertEqual(mem_map_name, acquired.mem_map_name)
+        self.assertEqual(0, self.arena.size)
+        self.assertIsNone(
+            self.file_accessor.open_mem_map(old_mem_map_name, 0))
+
+        content = self.get_random_bytes(MB + 10)
+        self.assertEqual(MB + 10, acquired.put_bytes(content))
+        o_mem_map = self.file_accessor.open_mem_map(mem_map_name, 0)
+        o_shared_mem_map = SharedMemoryMap(self.file_accessor, mem_map_name,
+                                           o_mem_map)
+        self.assertEqual(content, o_shared_mem_map.get_bytes(
+            content_offset=0, bytes_to_read=MB + 10))
+        o_shared_mem_map.dispose(is_delete_file=False)
+        self.assertTrue(acquired.dispose())
+
+    def test_release_over_max_size(self):
+        """
+        Verify that memory maps which do not fit in the arena, or do not have
+        the capacity of a size class, are not put into it.
+        """
+        kept = self._create(8 * MB)
+        self.assertTrue(self.arena.release(kept))
+        for shared_mem_map in (self._create(MB), self._create(MB + 10)):
+            self.assertFalse(self.arena.release(shared_mem_map))
+            self.assertTrue(shared_mem_map.dispose())
+        self.assertEqual(len(kept.mem_map), self.arena.size)
+
+    def test_trim_idle_mem_maps(self):
+        """
+        Verify that the memory maps which have not been reused for the idle
+        timeout are deleted, and only these.
+        """
+        with patch('time.monotonic', return_value=100):
+            old = self._create(MB)
+            self.assertTrue(self.arena.release(old))
+        with patch('time.monotonic', return_value=150):
+            recent = self._create(MB)
+            self.assertTrue(self.arena.release(recent))
+        with patch('time.monotonic', return_value=170):
+            self.assertEqual(1, self.arena.trim())
+        self.assertEqual(len(recent.mem_map), self.arena.size)
+        self.assertTrue(old.mem_map.closed)
+        self.assertIsNone(self.file_accessor.open_mem_map(old.mem_map_name, 0))
+        self.assertFalse(recent.mem_map.closed)
+
+    def test_clear(self):
+        shared_mem_maps = [self._create(MB), self._create(2 * MB)]
+        for shared_mem_map in shared_mem_maps:
+            self.assertTrue(self.arena.release(shared_mem_map))
+        self.assertEqual(2, self.arena.clear())
+        self.assertEqual(0, self.arena.size)
+        for shared_mem_map in shared_mem_maps:
+            self.assertIsNone(self.file_accessor.open_mem_map(
+                shared_mem_map.mem_map_name, 0))
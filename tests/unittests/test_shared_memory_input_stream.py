@@ -0,0 +1,56 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import io
+import os
+import unittest
+
+from azure_functions_worker.bindings.shared_memory_data_transfer \
+    import SharedMemoryInputStream
+
+
+class TestSharedMemoryInputStream(unittest.TestCase):
+    """
+    Tests for SharedMemoryInputStream.
+    """
+    def setUp(self):
+        self.content = bytes(range(256)) * 4
+        self.stream = SharedMemoryInputStream(memoryview(self.content))
+
+    def test_read(self):
+        self.assertEqual(self.content[:100], self.stream.read(100))
+        self.assertEqual(100, self.stream.tell())
+        self.assertEqual(self.content[100:], self.stream.read())
+        self.assertEqual(b'', self.stream.read(10))
+
+    def test_seek(self):
+        self.assertEqual(10, self.stream.seek(10))
+        self.assertEqual(20, self.stream.seek(10, os.SEEK_CUR))
+        self.assertEqual(self.content[20:30], self.stream.read(10))
+        self.stream.seek(-10, os.SEEK_END)
+        self.assertEqual(self.content[-10:], self.stream.read())
+        with self.assertRaises(ValueError):
+            self.stream.seek(-1)
+
+    def test_readinto(self):
+        buffer = bytearray(300)
+        self.assertEqual(300, self.stream.readinto(buffer))
+        self.assertEqual(self.content[:300], buffer)
+        self.stream.seek(-100, os.SEEK_END)
+        self.assertEqual(100, self.stream.readinto(buffer))
+        self.assertEqual(self.content[-100:], buffer[:100])
+
+    def test_buffered_reader(self):
+        reader = io.BufferedReader(self.stream, buffer_size=64)
+        self.assertEqual(self.content[:10], reader.read(10))
+        self.assertEqual(self.content[10:], reader.read())
+
+    def test_getbuffer(self):
+        self.assertEqual(self.content, self.stream.getbuffer())
+
+    def test_closed(self):
+        self.stream.close()
+        with self.assertRaises(ValueError):
+            self.stream.read()
+        with self.assertRaises(ValueError):
+            self.stream.seek(0)
@@ -1,7 +1,9 @@
 # Copyright (c) Microsoft Corporation. All rights reserved.
 # Licensed under the MIT License.
 
+import io
 import math
+import mmap
 import os
 import json
 import sys
@@ -9,13 +11,33 @@ from unittest import skipIf
 from unittest.mock import patch
 from azure_functions_worker.utils.common import is_envvar_true
 from azure.functions import meta as bind_meta
+from azure.functions.blob import BlobConverter
 from tests.utils import testutils
 from azure_functions_worker.bindings.shared_memory_data_transfer \
     import SharedMemoryManager
 from azure_functions_worker.bindings.shared_memory_data_transfer \
     import SharedMemoryConstants as consts
+from azure_functions_worker.bindings.shared_memory_data_transfer \
+    import SharedMemoryInputStream
 from azure_functions_worker.constants \
-    import FUNCTIONS_WORKER_SHARED_MEMORY_DATA_TRANSFER_ENABLED
+    import FUNCTIONS_WORKER_SHARED_MEMORY_DATA_TRANSFER_ENABLED, \
+    PYTHON_SHARED_MEMORY_INPUT_TYPE, PYTHON_SHARED_MEMORY_ARENA_SIZE
+from azure_functions_worker import protos
+from azure_functions_worker.bindings import datumdef, generic, meta
+from azure_functions_worker.bindings.datumdef import Datum
+
+
+class _StringStream:
+    """
+    Seekable file-like object whose content is read as strings, without being
+    an io.TextIOBase.
+    """
+    def __init__(self, content: str):
+        stream = io.StringIO(content)
+        self.read = stream.read
+        self.seek = stream.seek
+        self.seekable = stream.seekable
+        self.tell = stream.tell
 
 
 @skipIf(sys.platform == 'darwin', 'MacOS M1 machines do not correctly test the'
@@ -136,6 +158,23 @@ class TestSharedMemoryManager(testutils.SharedMemoryTestCase):
         is_supported = manager.is_supported(datum)
         self.assertFalse(is_supported)
 
+    def test_json_and_collection_inputs_unsupported(self):
+        """
+        Verify that json and collection inputs in shared memory are not read,
+        as the host only writes bytes and string content into shared memory.
+        """
+        manager = SharedMemoryManager()
+        content = b'["foo"]'
+        shared_mem_meta = manager.put_bytes(content)
+        for data_type in (protos.RpcDataType.json,
+                          protos.RpcDataType.collection_bytes,
+                          protos.RpcDataType.collection_string):
+            shmem = protos.RpcSharedMemory(
+                name=shared_mem_meta.mem_map_name, offset=0,
+                count=len(content), type=data_type)
+            self.assertIsNone(Datum.from_rpc_shared_memory(shmem, manager))
+        self.assertEqual(1, manager.free_all_mem_maps())
+
     def test_collection_string_unsupported(self):
         """
         Verify that the given input is unsupported by SharedMemoryManager.
@@ -279,6 +318,215 @@ class TestSharedMemoryManager(testutils.SharedMemoryTestCase):
         free_success = manager.free_mem_map(mem_map_name)
         self.assertTrue(free_success)
 
+    def test_get_at_offsets(self):
+        """
+        Verify that contents packed into one memory map are read at their
+        offset, mapping only the window of the memory map they are in.
+        """
+        manager = SharedMemoryManager()
+        contents = [self.get_random_bytes(2 * mmap.ALLOCATIONGRANULARITY + 5),
+                    self.get_random_bytes(1000),
+                    self.get_random_string(100).encode('utf-8')]
+        with manager.pack_outputs():
+            metas = [manager.put_bytes(content) for content in contents]
+        mem_map_name = metas[0].mem_map_name
+        self.assertEqual([0, len(contents[0]), len(contents[0]) + 1000],
+                         [meta.offset for meta in metas])
+        self.assertEqual(contents[0], manager.get_bytes(
+            mem_map_name, metas[0].offset, metas[0].count_bytes))
+        self.assertEqual(contents[1], manager.get_bytes(
+            mem_map_name, metas[1].offset, metas[1].count_bytes))
+        self.assertEqual(contents[2].decode('utf-8'), manager.get_string(
+            mem_map_name, metas[2].offset, metas[2].count_bytes))
+        self.assertIsNone(manager.get_bytes(mem_map_name, -1, 10))
+
+        with patch.dict(os.environ,
+                        {PYTHON_SHARED_MEMORY_INPUT_TYPE: 'memoryview'}):
+            view = manager.get_input_bytes(
+                mem_map_name, metas[1].offset, metas[1].count_bytes)
+        self.assertEqual(contents[1], view)
+        shared_mem_map, _ = manager.input_mem_maps[mem_map_name][0]
+        self.assertEqual(2 * mmap.ALLOCATIONGRANULARITY,
+                         shared_mem_map.mem_map_offset)
+        self.assertLess(len(shared_mem_map.mem_map),
+                        2 * mmap.ALLOCATIONGRANULARITY)
+        self.assertTrue(manager.close_input_mem_map(mem_map_name))
+        self.assertTrue(manager.free_mem_map(mem_map_name))
+
+    def test_pack_outputs(self):
+        """
+        Verify that the contents put within pack_outputs are written into a
+        single memory map once it exits, and none if it exits with an
+        exception.
+        """
+        manager = SharedMemoryManager()
+        content_size = consts.MIN_BYTES_FOR_SHARED_MEM_TRANSFER + 10
+        with manager.pack_outputs():
+            first_meta = manager.put_bytes(self.get_random_bytes(content_size))
+            second_meta = manager.put_string('packed')
+            self.assertEqual({}, manager.allocated_mem_maps)
+        self.assertEqual(first_meta.mem_map_name, second_meta.mem_map_name)
+        self.assertEqual((0, content_size), (first_meta.offset,
+                                             first_meta.count_bytes))
+        self.assertEqual((content_size, 6), (second_meta.offset,
+                                             second_meta.count_bytes))
+        self.assertEqual([first_meta.mem_map_name],
+                         list(manager.allocated_mem_maps))
+        self.assertEqual(consts.CONTENT_HEADER_TOTAL_BYTES + content_size + 6,
+                         manager.allocated_mem_maps_size)
+
+        with self.assertRaises(ValueError):
+            with manager.pack_outputs():
+                manager.put_bytes(self.get_random_bytes(content_size))
+                raise ValueError('encoding failed')
+        self.assertEqual(1, len(manager.allocated_mem_maps))
+        unpacked_meta = manager.put_bytes(self.get_random_bytes(content_size))
+        self.assertNotEqual(first_meta.mem_map_name,
+                            unpacked_meta.mem_map_name)
+        self.assertEqual(2, manager.free_all_mem_maps())
+
+    def test_pack_outputs_failure(self):
+        """
+        Verify that the Datum objects of the outputs packed within
+        pack_outputs, as bytes or from the buffer of a bytearray, are kept
+        when the memory map cannot be written, instead of raising, and only
+        then.
+        """
+        manager = SharedMemoryManager()
+        content_size = consts.MIN_BYTES_FOR_SHARED_MEM_TRANSFER + 10
+        contents = {'output1': bytes(self.get_random_bytes(content_size)),
+                    'output2': self.get_random_bytes(content_size)}
+
+        def encode_outputs():
+            return [meta._encode_outgoing_param_binding(
+                generic.GenericBinding, content, pytype=bytes,
+                out_name=out_name, shmem_mgr=manager,
+                is_function_data_cache_enabled=False)
+                for out_name, content in contents.items()]
+
+        with manager.pack_outputs() as packed_datums:
+            bindings = encode_outputs()
+            self.assertEqual(list(contents), list(packed_datums))
+        self.assertEqual({}, packed_datums)
+        self.assertEqual(1, manager.free_all_mem_maps())
+
+        with patch.object(manager, '_allocate', return_value=None):
+            with manager.pack_outputs() as packed_datums:
+                bindings = encode_outputs()
+        self.assertEqual(list(contents), list(packed_datums))
+        for binding in bindings:
+            data = datumdef.datum_as_proto(packed_datums[binding.name])
+            self.assertEqual(contents[binding.name], data.bytes)
+        self.assertEqual({}, manager.allocated_mem_maps)
+
+    def test_get_input_bytes_by_default(self):
+        """
+        Verify that bytes inputs are copied out of shared memory by default.
+        """
+        manager = SharedMemoryManager()
+        content = self.get_random_bytes(
+            consts.MIN_BYTES_FOR_SHARED_MEM_TRANSFER + 10)
+        shared_mem_meta = manager.put_bytes(content)
+        read_content = manager.get_input_bytes(
+            shared_mem_meta.mem_map_name, offset=0,
+            count=shared_mem_meta.count_bytes)
+        self.assertIsInstance(read_content, bytes)
+        self.assertEqual(content, read_content)
+        self.assertEqual(0, len(manager.input_mem_maps))
+        free_success = manager.free_mem_map(shared_mem_meta.mem_map_name)
+        self.assertTrue(free_success)
+
+    def test_get_input_bytes_as_memoryview(self):
+        """
+        Verify that bytes inputs are viewed in place in shared memory with
+        PYTHON_SHARED_MEMORY_INPUT_TYPE=memoryview, until their memory map is
+        closed.
+        """
+        manager = SharedMemoryManager()
+        content = self.get_random_bytes(
+            consts.MIN_BYTES_FOR_SHARED_MEM_TRANSFER + 10)
+        shared_mem_meta = manager.put_bytes(content)
+        mem_map_name = shared_mem_meta.mem_map_name
+        with patch.dict(os.environ,
+                        {PYTHON_SHARED_MEMORY_INPUT_TYPE: 'memoryview'}):
+            view = manager.get_input_bytes(
+                mem_map_name, offset=0, count=shared_mem_meta.count_bytes)
+        self.assertIsInstance(view, memoryview)
+        self.assertTrue(view.readonly)
+        self.assertEqual(content, view)
+        self.assertIn(mem_map_name, manager.input_mem_maps)
+
+        self.assertTrue(manager.close_input_mem_map(mem_map_name))
+        self.assertEqual(0, len(manager.input_mem_maps))
+        with self.assertRaises(ValueError):
+            view.tobytes()
+        self.assertFalse(manager.close_input_mem_map(mem_map_name))
+        free_success = manager.free_mem_map(mem_map_name)
+        self.assertTrue(free_success)
+
+    def test_get_input_bytes_as_stream(self):
+        """
+        Verify that bytes inputs are read in place in shared memory through a
+        file-like object with PYTHON_SHARED_MEMORY_INPUT_TYPE=stream.
+        """
+        manager = SharedMemoryManager()
+        content = self.get_random_bytes(
+            consts.MIN_BYTES_FOR_SHARED_MEM_TRANSFER + 10)
+        shared_mem_meta = manager.put_bytes(content)
+        mem_map_name = shared_mem_meta.mem_map_name
+        with patch.dict(os.environ,
+                        {PYTHON_SHARED_MEMORY_INPUT_TYPE: 'stream'}):
+            stream = manager.get_input_bytes(
+                mem_map_name, offset=0, count=shared_mem_meta.count_bytes)
+        self.assertIsInstance(stream, SharedMemoryInputStream)
+        self.assertEqual(content[:10], stream.read(10))
+        stream.seek(-10, os.SEEK_END)
+        self.assertEqual(content[-10:], stream.read())
+        self.assertTrue(manager.close_input_mem_map(mem_map_name))
+        free_success = manager.free_mem_map(mem_map_name)
+        self.assertTrue(free_success)
+
+    def test_close_input_mem_map_with_views_kept(self):
+        """
+        Verify that the memory map of an input is not closed while the
+        function holds views of its own of the input, and that it can still
+        be read then.
+        """
+        manager = SharedMemoryManager()
+        content = self.get_random_bytes(
+            consts.MIN_BYTES_FOR_SHARED_MEM_TRANSFER + 10)
+        shared_mem_meta = manager.put_bytes(content)
+        mem_map_name = shared_mem_meta.mem_map_name
+        with patch.dict(os.environ,
+                        {PYTHON_SHARED_MEMORY_INPUT_TYPE: 'memoryview'}):
+            view = manager.get_input_bytes(
+                mem_map_name, offset=0, count=shared_mem_meta.count_bytes)
+        kept_view = view[:10]
+        self.assertFalse(manager.close_input_mem_map(mem_map_name))
+        self.assertEqual(0, len(manager.input_mem_maps))
+        self.assertEqual(content[:10], kept_view)
+        kept_view.release()
+        free_success = manager.free_mem_map(mem_map_name)
+        self.assertTrue(free_success)
+
+    def test_get_input_bytes_with_invalid_input_type(self):
+        """
+        Verify that bytes inputs are copied out of shared memory when
+        PYTHON_SHARED_MEMORY_INPUT_TYPE is not a known input type.
+        """
+        manager = SharedMemoryManager()
+        content = self.get_random_bytes(
+            consts.MIN_BYTES_FOR_SHARED_MEM_TRANSFER + 10)
+        shared_mem_meta = manager.put_bytes(content)
+        with patch.dict(os.environ,
+                        {PYTHON_SHARED_MEMORY_INPUT_TYPE: 'mmap'}):
+            read_content = manager.get_input_bytes(
+                shared_mem_meta.mem_map_name, offset=0,
+                count=shared_mem_meta.count_bytes)
+        self.assertEqual(content, read_content)
+        free_success = manager.free_mem_map(shared_mem_meta.mem_map_name)
+        self.assertTrue(free_success)
+
     def test_put_string(self):
         """
         Verify that the given input was successfully put into shared memory.
@@ -304,6 +552,172 @@ class TestSharedMemoryManager(testutils.SharedMemoryTestCase):
         shared_mem_meta = manager.put_string(None)
         self.assertIsNone(shared_mem_meta)
 
+    def test_put_stream(self):
+        """
+        Verify that the content of a buffer-protocol object, of a seekable
+        file-like object and of an iterator of chunks is put into shared
+        memory and read back, and that memory maps are created to hold the
+        content whose length is known up front.
+        """
+        manager = SharedMemoryManager()
+        content_size = 2 * consts.MIN_BYTES_FOR_SHARED_MEM_TRANSFER + 10
+        content = self.get_random_bytes(content_size)
+        sources = {
+            'buffer': bytearray(content),
+            'file': io.BytesIO(content),
+            'chunks': (content[i:i + 1000]
+                       for i in range(0, content_size, 1000)),
+        }
+        for source_type, source in sources.items():
+            with self.subTest(source_type):
+                # The chunks cannot be read again, so their transfer is not
+                # supported, though put_stream writes them
+                if source_type == 'chunks':
+                    self.assertIsNone(manager.get_stream_length(source))
+                else:
+                    self.assertEqual(content_size,
+                                     manager.get_stream_length(source))
+                self.assertEqual(
+                    source_type != 'chunks',
+                    manager.is_supported(Datum(type='bytes', value=source)))
+                shared_mem_meta = manager.put_stream(source)
+                self.assertIsNotNone(shared_mem_meta)
+                self.assertTrue(
+                    self.is_valid_uuid(shared_mem_meta.mem_map_name))
+                self.assertEqual(content_size, shared_mem_meta.count_bytes)
+                self.assertEqual(content, manager.get_bytes(
+                    shared_mem_meta.mem_map_name, 0, content_size))
+                if source_type != 'chunks' or \
+                        not manager.file_accessor.is_resize_supported():
+                    shared_mem_map = manager.allocated_mem_maps[
+                        shared_mem_meta.mem_map_name]
+                    self.assertEqual(
+                        consts.CONTENT_HEADER_TOTAL_BYTES + content_size,
+                        len(shared_mem_map.mem_map))
+                free_success = manager.free_mem_map(
+                    shared_mem_meta.mem_map_name)
+                self.assertTrue(free_success)
+
+    def test_small_stream_unsupported(self):
+        """
+        Verify that a file-like object with less content left to read than is
+        transferred over shared memory is not supported.
+        """
+        manager = SharedMemoryManager()
+        content_size = 2 * consts.MIN_BYTES_FOR_SHARED_MEM_TRANSFER
+        source = io.BytesIO(self.get_random_bytes(content_size))
+        source.seek(content_size - 10)
+        self.assertEqual(10, manager.get_stream_length(source))
+        self.assertFalse(
+            manager.is_supported(Datum(type='bytes', value=source)))
+        self.assertEqual(content_size - 10, source.tell())
+
+    def test_put_stream_failure(self):
+        """
+        Verify that when reading a stream fails after it was partly read, the
+        memory map is deleted, None is returned and the stream is rewound to
+        where it was.
+        """
+        manager = SharedMemoryManager()
+        content_size = 2 * consts.MIN_BYTES_FOR_SHARED_MEM_TRANSFER
+
+        class FailingStream(io.BytesIO):
+            def readinto(self, buffer):
+                super().readinto(buffer[:10])
+                raise ValueError('stream failed')
+
+        source = FailingStream(self.get_random_bytes(content_size))
+        source.seek(5)
+        self.assertIsNone(manager.put_stream(source))
+        self.assertEqual(5, source.tell())
+        self.assertEqual(0, len(manager.allocated_mem_maps))
+        self.assertEqual(0, manager.allocated_mem_maps_size)
+
+    def test_put_non_ascii_string(self):
+        """
+        Verify that a string whose UTF-8 encoding is longer than it is put
+        into shared memory and read back.
+        """
+        manager = SharedMemoryManager()
+        content = '\u00e9' * (consts.STREAM_CHUNK_SIZE + 10)
+        expected_size = len(content.encode('utf-8'))
+        shared_mem_meta = manager.put_string(content)
+        self.assertIsNotNone(shared_mem_meta)
+        self.assertEqual(expected_size, shared_mem_meta.count_bytes)
+        self.assertEqual(content, manager.get_string(
+            shared_mem_meta.mem_map_name, 0, expected_size))
+        free_success = manager.free_mem_map(shared_mem_meta.mem_map_name)
+        self.assertTrue(free_success)
+
+    def test_stream_output(self):
+        """
+        Verify that a seekable file-like object given to the blob binding is
+        written into shared memory as an output, and that an iterator of
+        chunks, which could not be read again, is left to the generic
+        binding, which does not support it.
+        """
+        manager = SharedMemoryManager()
+        content_size = consts.MIN_BYTES_FOR_SHARED_MEM_TRANSFER + 10
+        content = self.get_random_bytes(content_size)
+
+        with patch.object(meta, 'BINDING_REGISTRY',
+                          {'blob': BlobConverter}):
+            binding = self._encode_output(manager, BlobConverter,
+                                          io.BytesIO(content))
+        shmem = binding.rpc_shared_memory
+        self.assertEqual(protos.RpcDataType.bytes, shmem.type)
+        self.assertEqual(content_size, shmem.count)
+        self.assertEqual(content, manager.get_bytes(shmem.name, 0,
+                                                    shmem.count))
+        self.assertTrue(manager.free_mem_map(shmem.name))
+        with self.assertRaises(TypeError):
+            self._encode_output(manager, generic.GenericBinding,
+                                iter([content[:10], content[10:]]))
+        self.assertEqual(0, len(manager.allocated_mem_maps))
+
+    def test_stream_output_falls_back_to_binding(self):
+        """
+        Verify that outputs which cannot be streamed into shared memory are
+        rewound and encoded by the binding instead, which are then written
+        into shared memory as usual: the content of a file-like object is
+        larger than expected and the memory map cannot be grown, or its
+        content is read as strings.
+        """
+        manager = SharedMemoryManager()
+        content_size = consts.MIN_BYTES_FOR_SHARED_MEM_TRANSFER + 10
+        content = self.get_random_bytes(content_size)
+
+        with patch.object(meta, 'BINDING_REGISTRY',
+                          {'blob': BlobConverter}), \
+                patch.object(manager, 'get_stream_length',
+                             return_value=content_size - 10), \
+                patch.object(manager.file_accessor, 'resize_mem_map',
+                             return_value=False):
+            binding = self._encode_output(manager, BlobConverter,
+                                          io.BytesIO(content))
+        # The bytes the binding encoded are written into shared memory
+        shmem = binding.rpc_shared_memory
+        self.assertEqual(content_size, shmem.count)
+        self.assertEqual(content, manager.get_bytes(shmem.name, 0,
+                                                    shmem.count))
+        self.assertEqual([shmem.name], list(manager.allocated_mem_maps))
+        self.assertTrue(manager.free_mem_map(shmem.name))
+
+        source = _StringStream('x' * content_size)
+        with patch.object(meta, 'BINDING_REGISTRY',
+                          {'blob': BlobConverter}):
+            binding = self._encode_output(manager, BlobConverter, source)
+        shmem = binding.rpc_shared_memory
+        self.assertEqual(protos.RpcDataType.string, shmem.type)
+        self.assertEqual('x' * content_size, manager.get_string(
+            shmem.name, 0, shmem.count))
+        self.assertTrue(manager.free_mem_map(shmem.name))
+
+    def _encode_output(self, manager, binding, obj):
+        return meta._encode_outgoing_param_binding(
+            binding, obj, pytype=bytes, out_name='output', shmem_mgr=manager,
+            is_function_data_cache_enabled=False)
+
     def test_get_string(self):
         """
         Verify that the output object was successfully gotten from shared
@@ -345,6 +759,27 @@ class TestSharedMemoryManager(testutils.SharedMemoryTestCase):
         self.assertFalse(is_mem_map_found)
         self.assertEqual(0, len(manager.allocated_mem_maps.keys()))
 
+    def test_allocated_mem_maps_size(self):
+        """
+        Verify that the SharedMemoryManager keeps track of the total size of
+        the shared memory maps it has allocated, including their header, and
+        releases it once they are freed.
+        """
+        manager = SharedMemoryManager()
+        content_size = consts.MIN_BYTES_FOR_SHARED_MEM_TRANSFER + 10
+        mem_map_names = []
+        for _ in range(2):
+            content = self.get_random_bytes(content_size)
+            shared_mem_meta = manager.put_bytes(content)
+            self.assertIsNotNone(shared_mem_meta)
+            mem_map_names.append(shared_mem_meta.mem_map_name)
+        mem_map_size = consts.CONTENT_HEADER_TOTAL_BYTES + content_size
+        self.assertEqual(2 * mem_map_size, manager.allocated_mem_maps_size)
+        self.assertTrue(manager.free_mem_map(mem_map_names[0]))
+        self.assertEqual(mem_map_size, manager.allocated_mem_maps_size)
+        self.assertTrue(manager.free_mem_map(mem_map_names[1], False))
+        self.assertEqual(0, manager.allocated_mem_maps_size)
+
     def test_do_not_free_resources_on_dispose(self):
         """
         Verify that when the allocated shared memory maps are freed,
@@ -367,6 +802,56 @@ class TestSharedMemoryManager(testutils.SharedMemoryTestCase):
         self.assertFalse(is_mem_map_found)
         self.assertEqual(0, len(manager.allocated_mem_maps.keys()))
 
+    def test_arena_disabled_by_default(self):
+        """
+        Verify that without PYTHON_SHARED_MEMORY_ARENA_SIZE, the memory maps
+        of outputs are deleted once freed.
+        """
+        manager = SharedMemoryManager()
+        self.assertIsNone(manager.arena)
+        content = self.get_random_bytes(consts.MIN_BYTES_FOR_SHARED_MEM_TRANSFER)
+        shared_mem_meta = manager.put_bytes(content)
+        self.assertIsNotNone(shared_mem_meta)
+        self.assertTrue(manager.free_mem_map(shared_mem_meta.mem_map_name))
+        self.assertIsNone(manager.file_accessor.open_mem_map(
+            shared_mem_meta.mem_map_name, 0))
+
+    @skipIf(os.name == 'nt', 'Windows cannot rename memory maps')
+    def test_put_bytes_reuses_mem_maps_of_arena(self):
+        """
+        Verify that with PYTHON_SHARED_MEMORY_ARENA_SIZE, the memory map of a
+        freed output is reused, under a new name, for the next output of the
+        same size class, and deleted once all memory maps are freed.
+        """
+        content_size = consts.MIN_BYTES_FOR_SHARED_MEM_TRANSFER + 10
+        with patch.dict(os.environ,
+                        {PYTHON_SHARED_MEMORY_ARENA_SIZE: str(8 * 2 ** 20)}):
+            manager = SharedMemoryManager()
+        first_meta = manager.put_bytes(self.get_random_bytes(content_size))
+        mem_map = manager.allocated_mem_maps[first_meta.mem_map_name].mem_map
+        mem_map_size = consts.CONTENT_HEADER_TOTAL_BYTES + \
+            manager.arena.get_capacity(content_size)
+        self.assertEqual(mem_map_size, manager.allocated_mem_maps_size)
+        self.assertTrue(manager.free_mem_map(first_meta.mem_map_name))
+        self.assertEqual(0, manager.allocated_mem_maps_size)
+        self.assertEqual(mem_map_size, manager.arena.size)
+
+        content = self.get_random_bytes(content_size - 5)
+        second_meta = manager.put_bytes(content)
+        self.assertNotEqual(first_meta.mem_map_name,
+                            second_meta.mem_map_name)
+        self.assertIs(
+            mem_map,
+            manager.allocated_mem_maps[second_meta.mem_map_name].mem_map)
+        self.assertEqual(0, manager.arena.size)
+        self.assertEqual(content, manager.get_bytes(
+            second_meta.mem_map_name, 0, second_meta.count_bytes))
+
+        self.assertEqual(1, manager.free_all_mem_maps())
+        self.assertEqual(0, manager.arena.size)
+        self.assertIsNone(manager.file_accessor.open_mem_map(
+            second_meta.mem_map_name, 0))
+
     def test_invalid_put_allocated_mem_maps(self):
         """
         Verify that after an invalid put operation, no shared memory maps were
@@ -1,10 +1,13 @@
 # Copyright (c) Microsoft Corporation. All rights reserved.
 # Licensed under the MIT License.
 
+import io
+import mmap
 import os
 import sys
 import unittest
 from unittest import skipIf
+from unittest.mock import patch
 
 from tests.utils import testutils
 from azure_functions_worker.bindings.shared_memory_data_transfer \
@@ -90,6 +93,30 @@ class TestSharedMemoryMap(testutils.SharedMemoryTestCase):
             dispose_status = shared_mem_map.dispose()
             self.assertTrue(dispose_status)
 
+    def test_get_view(self):
+        """
+        Create a SharedMemoryMap, write bytes to it and then view them in
+        place. Verify that the bytes written and viewed match, and that the
+        SharedMemoryMap can be disposed once the view is released.
+        """
+        content_size = 2 * 1024 * 1024
+        mem_map_name = self.get_new_mem_map_name()
+        mem_map_size = content_size + consts.CONTENT_HEADER_TOTAL_BYTES
+        mem_map = self.file_accessor.create_mem_map(mem_map_name,
+                                                    mem_map_size)
+        shared_mem_map = SharedMemoryMap(self.file_accessor, mem_map_name,
+                                         mem_map)
+        content = self.get_random_bytes(content_size)
+        shared_mem_map.put_bytes(content)
+        view = shared_mem_map.get_view(bytes_to_read=content_size)
+        self.assertEqual(content_size, len(view))
+        self.assertEqual(content, view)
+        with self.assertRaises(BufferError):
+            shared_mem_map.dispose(is_delete_file=False)
+        view.release()
+        dispose_status = shared_mem_map.dispose()
+        self.assertTrue(dispose_status)
+
     def test_put_bytes_more_than_capacity(self):
         """
         Attempt to put more bytes into the created SharedMemoryMap than the
@@ -135,3 +162,99 @@ class TestSharedMemoryMap(testutils.SharedMemoryTestCase):
         delete_status = \
             self.file_accessor.delete_mem_map(mem_map_name, mem_map_op)
         self.assertTrue(delete_status)
+
+    def test_put_packed_bytes(self):
+        """
+        Write several contents into a SharedMemoryMap and read each back at
+        its offset, also through a window of the memory map.
+        """
+        contents = [self.get_random_bytes(2 * 1024 * 1024),
+                    self.get_random_bytes(1024)]
+        mem_map_name = self.get_new_mem_map_name()
+        mem_map_size = consts.CONTENT_HEADER_TOTAL_BYTES + 2 * 1024 * 1024 + \
+            1024
+        mem_map = self.file_accessor.create_mem_map(mem_map_name, mem_map_size)
+        shared_mem_map = SharedMemoryMap(self.file_accessor, mem_map_name,
+                                         mem_map)
+        self.assertEqual(mem_map_size - consts.CONTENT_HEADER_TOTAL_BYTES,
+                         shared_mem_map.put_packed_bytes(contents))
+        self.assertEqual(contents[0], shared_mem_map.get_bytes(
+            content_offset=0, bytes_to_read=len(contents[0])))
+        self.assertEqual(contents[1], shared_mem_map.get_bytes(
+            content_offset=len(contents[0])))
+        window_offset = 2 * 1024 * 1024 - mmap.ALLOCATIONGRANULARITY
+        window = self.file_accessor.open_mem_map(
+            mem_map_name, mem_map_size - window_offset, offset=window_offset)
+        window_shared_mem_map = SharedMemoryMap(
+            self.file_accessor, mem_map_name, window, window_offset)
+        with window_shared_mem_map.get_view(
+                content_offset=len(contents[0])) as view:
+            self.assertEqual(contents[1], view)
+        with self.assertRaisesRegex(SharedMemoryException, 'before the mapped'):
+            window_shared_mem_map.get_bytes(content_offset=0)
+        window_shared_mem_map.dispose(is_delete_file=False)
+        dispose_status = shared_mem_map.dispose()
+        self.assertTrue(dispose_status)
+
+    @skipIf(not sys.platform.startswith('linux'),
+            'Only Linux can resize memory maps')
+    def test_put_stream(self):
+        """
+        Write the content of a file-like object, of a file-like object which
+        cannot be read into and of an iterator of chunks into
+        SharedMemoryMaps smaller than the content, which are grown, and read
+        it back.
+        """
+        content_size = 3 * consts.STREAM_CHUNK_SIZE + 10
+        content = self.get_random_bytes(content_size)
+
+        class ReadOnlyStream:
+            def __init__(self, stream):
+                self.read = stream.read
+
+        sources = {
+            'file': lambda: io.BytesIO(content),
+            'read': lambda: ReadOnlyStream(io.BytesIO(content)),
+            'chunks': lambda: (bytearray(content[i:i + 1000])
+                               for i in range(0, content_size, 1000)),
+        }
+        for source_type, create_source in sources.items():
+            with self.subTest(source_type):
+                mem_map_name = self.get_new_mem_map_name()
+                mem_map_size = consts.CONTENT_HEADER_TOTAL_BYTES + 1024
+                mem_map = self.file_accessor.create_mem_map(mem_map_name,
+                                                            mem_map_size)
+                shared_mem_map = SharedMemoryMap(self.file_accessor,
+                                                 mem_map_name, mem_map)
+                num_bytes_written = shared_mem_map.put_stream(create_source())
+                self.assertEqual(content_size, num_bytes_written)
+                self.assertGreaterEqual(len(shared_mem_map.mem_map),
+                                        consts.CONTENT_HEADER_TOTAL_BYTES
+                                        + content_size)
+                self.assertEqual(content, shared_mem_map.get_bytes(
+                    bytes_to_read=content_size))
+                dispose_status = shared_mem_map.dispose()
+                self.assertTrue(dispose_status)
+
+    def test_put_stream_without_growing(self):
+        """
+        Write content which fills a SharedMemoryMap exactly and verify that
+        it is not grown, then content which does not fit into a
+        SharedMemoryMap which cannot be grown.
+        """
+        content_size = 1024
+        content = self.get_random_bytes(content_size)
+        mem_map_name = self.get_new_mem_map_name()
+        mem_map_size = consts.CONTENT_HEADER_TOTAL_BYTES + content_size
+        mem_map = self.file_accessor.create_mem_map(mem_map_name, mem_map_size)
+        shared_mem_map = SharedMemoryMap(self.file_accessor, mem_map_name,
+                                         mem_map)
+        self.assertEqual(content_size,
+                         shared_mem_map.put_stream(io.BytesIO(content)))
+        self.assertEqual(mem_map_size, len(shared_mem_map.mem_map))
+        self.assertEqual(content, shared_mem_map.get_bytes())
+        with patch.object(self.file_accessor, 'resize_mem_map',
+                          return_value=False):
+            self.assertIsNone(shared_mem_map.put_stream([content, b'more']))
+        dispose_status = shared_mem_map.dispose()
+        self.assertTrue(dispose_status)
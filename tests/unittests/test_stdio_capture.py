@@ -0,0 +1,75 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+import io
+import sys
+import unittest
+from unittest.mock import patch
+
+from azure_functions_worker import stdio_capture
+from azure_functions_worker.stdio_capture import InvocationOutputStream
+
+
+class TestInvocationOutputStream(unittest.TestCase):
+
+    def setUp(self):
+        self.sent = []
+        self.invocation_id = None
+        self.stream = InvocationOutputStream(
+            'stdout', io.StringIO(),
+            lambda *args: self.sent.append(args),
+            lambda: self.invocation_id)
+
+    def test_output_grouped_by_invocation(self):
+        self.invocation_id = 'inv-1'
+        print('one', file=self.stream)
+        self.invocation_id = 'inv-2'
+        print('two', file=self.stream)
+        self.invocation_id = 'inv-1'
+        print('three', file=self.stream)
+        self.assertEqual(self.sent, [])
+
+        self.stream.flush_invocation('inv-1')
+        self.assertEqual(self.sent, [('inv-1', 'stdout', 'one\nthree')])
+        self.stream.flush_invocation('inv-1')
+        self.assertEqual(len(self.sent), 1)
+
+        self.stream.flush()
+        self.assertEqual(self.sent[1:], [('inv-2', 'stdout', 'two')])
+
+    def test_flush_by_size(self):
+        with patch.object(stdio_capture, 'FLUSH_SIZE', 10):
+            self.stream.write('12345')
+            self.assertEqual(self.sent, [])
+            self.stream.write('67890')
+        self.assertEqual(self.sent, [(None, 'stdout', '1234567890')])
+        self.assertEqual(self.stream._buffered, 0)
+
+    def test_flush_by_time(self):
+        self.stream._last_flush -= stdio_capture.FLUSH_INTERVAL
+        self.stream.write('late\n')
+        self.assertEqual(self.sent, [(None, 'stdout', 'late')])
+
+    def test_write_bytes(self):
+        with self.assertRaises(TypeError):
+            self.stream.write(b'bytes')
+
+
+class TestStdioCapture(unittest.TestCase):
+
+    def test_install_uninstall(self):
+        sent = []
+        stdout, stderr = sys.stdout, sys.stderr
+        stdio_capture.install(lambda *args: sent.append(args),
+                              lambda: 'inv-1')
+        try:
+            self.assertTrue(stdio_capture.is_installed())
+            print('captured')
+            print('error', file=sys.stderr)
+        finally:
+            stdio_capture.uninstall()
+
+        self.assertIs(sys.stdout, stdout)
+        self.assertIs(sys.stderr, stderr)
+        self.assertFalse(stdio_capture.is_installed())
+        self.assertEqual(sent, [('inv-1', 'stdout', 'captured'),
+                                ('inv-1', 'stderr', 'error')])
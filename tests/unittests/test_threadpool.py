@@ -0,0 +1,148 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+import threading
+import time
+import unittest
+
+from azure_functions_worker.threadpool import AdaptiveThreadPoolExecutor, \
+    FixedThreadPoolExecutor
+
+
+def _busy_loop(seconds):
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        pass
+
+
+def _wait_for(predicate, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError('condition not met in time')
+        time.sleep(0.001)
+
+
+class TestAdaptiveThreadPoolExecutor(unittest.TestCase):
+
+    def test_invalid_bounds(self):
+        with self.assertRaises(ValueError):
+            AdaptiveThreadPoolExecutor(0, 4)
+        with self.assertRaises(ValueError):
+            AdaptiveThreadPoolExecutor(4, 2)
+
+    def test_results_and_exceptions(self):
+        executor = AdaptiveThreadPoolExecutor(1, 4)
+        try:
+            self.assertEqual(executor.submit(pow, 2, 10).result(timeout=5),
+                             1024)
+            with self.assertRaises(ZeroDivisionError):
+                executor.submit(lambda: 1 / 0).result(timeout=5)
+            self.assertEqual(len(executor._threads), 1)
+        finally:
+            executor.shutdown()
+
+    def test_starts_a_thread_per_queued_task(self):
+        # A thread which took a task off the queue is busy, even before it
+        # is accounted as such
+        for _ in range(20):
+            executor = AdaptiveThreadPoolExecutor(4, 4)
+            try:
+                for _ in range(4):
+                    executor.submit(time.sleep, 0.01)
+                self.assertEqual(len(executor._threads), 4)
+            finally:
+                executor.shutdown()
+
+    def test_grows_while_work_waits(self):
+        executor = AdaptiveThreadPoolExecutor(1, 4, interval=0.05,
+                                              wait_threshold=0.001)
+        try:
+            futures = [executor.submit(time.sleep, 0.02) for _ in range(100)]
+            for f in futures:
+                f.result(timeout=10)
+            # Sleeping functions keep completing faster with more threads
+            self.assertEqual(executor._max_workers, 4)
+            self.assertLessEqual(len(executor._threads), 4)
+        finally:
+            executor.shutdown()
+
+    def test_rolls_back_growth_without_throughput_gain(self):
+        executor = AdaptiveThreadPoolExecutor(1, 8, interval=0.05,
+                                              wait_threshold=0.001)
+        try:
+            futures = [executor.submit(_busy_loop, 0.005)
+                       for _ in range(200)]
+            for f in futures:
+                f.result(timeout=10)
+            # Busy loops hold the GIL, extra threads do not help them
+            self.assertLess(executor._max_workers, 8)
+            self.assertGreater(executor.resizes, 1)
+        finally:
+            executor.shutdown()
+
+    def test_idle_threads_exit(self):
+        executor = AdaptiveThreadPoolExecutor(1, 4, interval=0.05,
+                                              wait_threshold=0.001,
+                                              idle_timeout=0.2)
+        try:
+            futures = [executor.submit(time.sleep, 0.02) for _ in range(100)]
+            for f in futures:
+                f.result(timeout=10)
+            self.assertGreater(executor._max_workers, 1)
+
+            for _ in range(100):
+                if len(executor._threads) == 1:
+                    break
+                time.sleep(0.05)
+            self.assertEqual(len(executor._threads), 1)
+            self.assertEqual(executor._max_workers, 1)
+
+            # The remaining thread still runs work
+            self.assertEqual(executor.submit(pow, 3, 2).result(timeout=5), 9)
+        finally:
+            executor.shutdown()
+
+    def test_shutdown_cancels_queued_work(self):
+        executor = AdaptiveThreadPoolExecutor(1, 1)
+        event = threading.Event()
+        running = executor.submit(event.wait, 5)
+        queued = executor.submit(pow, 2, 2)
+
+        executor.shutdown(wait=False, cancel_futures=True)
+        self.assertTrue(queued.cancelled())
+        event.set()
+        self.assertTrue(running.result(timeout=5))
+        with self.assertRaises(RuntimeError):
+            executor.submit(pow, 2, 2)
+
+    def test_queue_depth(self):
+        executor = AdaptiveThreadPoolExecutor(1, 1)
+        event = threading.Event()
+        futures = [executor.submit(event.wait, 5) for _ in range(3)]
+        _wait_for(lambda: executor.queue_depth == 2)
+
+        # The shutdown sentinels are not queued work
+        executor.shutdown(wait=False)
+        self.assertEqual(executor.queue_depth, 2)
+        event.set()
+        for f in futures:
+            self.assertTrue(f.result(timeout=5))
+        self.assertEqual(executor.queue_depth, 0)
+
+
+class TestFixedThreadPoolExecutor(unittest.TestCase):
+
+    def test_sizes_and_queue_depth(self):
+        executor = FixedThreadPoolExecutor(max_workers=1)
+        event = threading.Event()
+        try:
+            self.assertEqual(executor.min_workers, 1)
+            self.assertEqual(executor.max_workers, 1)
+            futures = [executor.submit(event.wait, 5) for _ in range(3)]
+            _wait_for(lambda: executor.queue_depth == 2)
+            event.set()
+            for f in futures:
+                self.assertTrue(f.result(timeout=5))
+            self.assertEqual(executor.queue_depth, 0)
+        finally:
+            executor.shutdown()
@@ -0,0 +1,146 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+"""Replays a recording of the messages a host sent to a worker (see
+azure_functions_worker/recording.py) against a Dispatcher in this process.
+
+The replaying host is a _ConcurrentMockWebHost, so invocations are not sent
+one at a time: they are sent at the pace they were recorded at (scaled by
+speed), or as fast as possible, and their responses are matched by
+invocation id. Any other request waits for its response before the replay
+goes on, as the requests following it usually depend on it.
+WorkerTerminate is not replayed.
+
+All functions in this file should be considered private APIs,
+and can be changed without a notice.
+"""
+
+import asyncio
+import time
+import typing
+
+from azure_functions_worker import protos
+from azure_functions_worker.recording import read_recording
+from tests.utils import testutils
+
+# Responses to the requests the replay waits for
+_RESPONSES = {
+    'worker_init_request': 'worker_init_response',
+    'functions_metadata_request': 'function_metadata_response',
+    'function_load_request': 'function_load_response',
+    'function_load_request_collection': 'function_load_response_collection',
+    'function_environment_reload_request':
+        'function_environment_reload_response',
+    'worker_status_request': 'worker_status_response',
+    'worker_warmup_request': 'worker_warmup_response',
+    'close_shared_memory_resources_request':
+        'close_shared_memory_resources_response',
+}
+
+
+class ReplayResult(typing.NamedTuple):
+    invocations: int
+    failures: int
+    # Seconds from the first to the last replayed message's response
+    duration: float
+    # Seconds from sending every invocation to receiving its response
+    latencies: typing.List[float]
+
+    @property
+    def throughput(self) -> float:
+        return self.invocations / self.duration if self.duration else 0.0
+
+    def percentile(self, percent: float) -> float:
+        if not self.latencies:
+            return 0.0
+        latencies = sorted(self.latencies)
+        index = min(int(len(latencies) * percent / 100), len(latencies) - 1)
+        return latencies[index]
+
+
+def _rewrite_paths(message: protos.StreamingMessage,
+                   path_map: typing.Mapping[str, str]) -> None:
+    def rewrite(path: str) -> str:
+        for old, new in path_map.items():
+            if path.startswith(old):
+                return new + path[len(old):]
+        return path
+
+    def rewrite_load_request(request: protos.FunctionLoadRequest) -> None:
+        request.metadata.directory = rewrite(request.metadata.directory)
+        request.metadata.script_file = rewrite(request.metadata.script_file)
+
+    content = message.WhichOneof('content')
+    if content in ('worker_init_request', 'functions_metadata_request',
+                   'function_environment_reload_request'):
+        request = getattr(message, content)
+        request.function_app_directory = rewrite(
+            request.function_app_directory)
+    elif content == 'function_load_request':
+        rewrite_load_request(message.function_load_request)
+    elif content == 'function_load_request_collection':
+        for request in message.function_load_request_collection \
+                .function_load_requests:
+            rewrite_load_request(request)
+
+
+async def replay(path: str, *, speed: typing.Optional[float] = 1.0,
+                 path_map: typing.Optional[typing.Mapping[str, str]] = None,
+                 max_inflight: typing.Optional[int] = None,
+                 timeout: float = 60.0) -> ReplayResult:
+    """Replays the recording at path against a new Dispatcher.
+
+    speed scales the recorded pace, e.g. 2 replays twice as fast; None
+    replays as fast as possible. path_map replaces prefixes of the function
+    app paths in the recording, so that it can be replayed on another
+    machine. max_inflight limits the invocations waiting for a response.
+    """
+    async with testutils._MockWebHostController(
+            None, testutils._ConcurrentMockWebHost) as host:
+        return await _replay_messages(host, path, speed, path_map or {},
+                                      max_inflight, timeout)
+
+
+async def _replay_messages(host, path, speed, path_map, max_inflight,
+                           timeout) -> ReplayResult:
+    inflight = asyncio.Semaphore(max_inflight) if max_inflight else None
+    invocations: typing.List[asyncio.Future] = []
+
+    async def invoke(message, sent_at):
+        try:
+            response, received_at = await asyncio.wait_for(
+                host.request(message, wait_for='invocation_response'),
+                timeout)
+        finally:
+            if inflight is not None:
+                inflight.release()
+        return response, received_at - sent_at
+
+    start = time.perf_counter()
+    for offset, message in read_recording(path):
+        content = message.WhichOneof('content')
+        if content == 'worker_terminate':
+            continue
+        _rewrite_paths(message, path_map)
+
+        if speed:
+            delay = start + offset / speed - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+        if content == 'invocation_request':
+            if inflight is not None:
+                await inflight.acquire()
+            invocations.append(asyncio.get_running_loop().create_task(
+                invoke(message, time.perf_counter())))
+        else:
+            await asyncio.wait_for(
+                host.request(message, wait_for=_RESPONSES.get(content)),
+                timeout)
+
+    results = await asyncio.gather(*invocations)
+    duration = time.perf_counter() - start
+    failures = sum(response.result.status != protos.StatusResult.Success
+                   for response, _ in results)
+    return ReplayResult(invocations=len(results), failures=failures,
+                        duration=duration,
+                        latencies=[latency for _, latency in results])
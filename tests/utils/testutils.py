@@ -8,6 +8,7 @@ and can be changed without a notice.
 
 import argparse
 import asyncio
+import collections
 import concurrent.futures
 import configparser
 import functools
@@ -26,6 +27,7 @@ import string
 import subprocess
 import sys
 import tempfile
+import threading
 import time
 import typing
 import unittest
@@ -185,6 +187,7 @@ class WebHostTestCase(unittest.TestCase, metaclass=WebHostTestCaseMeta):
     """
     host_stdout_logger = logging.getLogger('webhosttests')
     env_variables = {}
+    webhost = None
 
     @classmethod
     def get_script_dir(cls):
@@ -256,8 +259,11 @@ class WebHostTestCase(unittest.TestCase, metaclass=WebHostTestCaseMeta):
 
     @classmethod
     def tearDownClass(cls):
-        cls.webhost.close()
-        cls.webhost = None
+        # Also called when the WebHost failed to start, the function app
+        # set up for it is still torn down
+        if cls.webhost is not None:
+            cls.webhost.close()
+            cls.webhost = None
 
         if cls.host_stdout is not None:
             if is_envvar_true(ARCHIVE_WEBHOST_LOGS):
@@ -555,6 +561,28 @@ class _MockWebHost:
         return r
 
     async def load_function(self, name):
+        func, load_request = self._build_function_load_request(name)
+
+        r = await self.communicate(
+            protos.StreamingMessage(function_load_request=load_request),
+            wait_for='function_load_response')
+
+        return func.id, r
+
+    async def load_functions(self, names: typing.List[str]):
+        load_requests = [self._build_function_load_request(name)[1]
+                         for name in names]
+
+        r = await self.communicate(
+            protos.StreamingMessage(
+                function_load_request_collection=(
+                    protos.FunctionLoadRequestCollection(
+                        function_load_requests=load_requests))),
+            wait_for='function_load_response_collection')
+
+        return [req.function_id for req in load_requests], r
+
+    def _build_function_load_request(self, name):
         if name not in self._available_functions:
             raise RuntimeError(f'cannot load function {name}')
 
@@ -581,18 +609,13 @@ class _MockWebHost:
                 data_type=data_type,
                 direction=direction)
 
-        r = await self.communicate(
-            protos.StreamingMessage(
-                function_load_request=protos.FunctionLoadRequest(
-                    function_id=func.id,
-                    metadata=protos.RpcFunctionMetadata(
-                        name=func.name,
-                        directory=os.path.dirname(func.script),
-                        script_file=func.script,
-                        bindings=bindings))),
-            wait_for='function_load_response')
-
-        return func.id, r
+        return func, protos.FunctionLoadRequest(
+            function_id=func.id,
+            metadata=protos.RpcFunctionMetadata(
+                name=func.name,
+                directory=os.path.dirname(func.script),
+                script_file=func.script,
+                bindings=bindings))
 
     async def invoke_function(
             self,
@@ -670,6 +693,17 @@ class _MockWebHost:
 
         return r
 
+    async def warmup_worker(self, worker_directory: str = ''):
+        r = await self.communicate(
+            protos.StreamingMessage(
+                worker_warmup_request=protos.WorkerWarmupRequest(
+                    worker_directory=worker_directory)
+            ),
+            wait_for='worker_warmup_response'
+        )
+
+        return r
+
     async def send(self, message):
         self._in_queue.put_nowait((message, None))
 
@@ -713,16 +747,137 @@ class _MockWebHost:
             self._available_functions[fn.name] = fn
 
 
+class _ConcurrentMockWebHostServicer(protos.FunctionRpcServicer):
+
+    def __init__(self, host):
+        self._host = host
+
+    def EventStream(self, client_response_iterator, context):
+        host = self._host
+        client_response = next(client_response_iterator)
+        rtype = client_response.WhichOneof('content')
+        if rtype != 'start_stream' \
+                or client_response.start_stream.worker_id != host.worker_id:
+            host._loop.call_soon_threadsafe(
+                host._connected_fut.set_exception,
+                AssertionError(
+                    f'unexpected {rtype!r} initial message from the worker'))
+            return
+        host._loop.call_soon_threadsafe(host._connected_fut.set_result, True)
+
+        # Responses are read while requests keep being sent
+        threading.Thread(target=self._read_responses,
+                         args=(client_response_iterator,),
+                         daemon=True).start()
+        while True:
+            message, _ = host._in_queue.get()
+            if message is _MockWebHostServicer._STOP:
+                return
+
+            yield message
+
+    def _read_responses(self, client_response_iterator):
+        try:
+            for client_response in client_response_iterator:
+                self._host._loop.call_soon_threadsafe(
+                    self._host._on_response, client_response,
+                    time.perf_counter())
+        except grpc.RpcError:
+            # The stream was closed
+            pass
+
+
+class _ConcurrentMockWebHost(_MockWebHost):
+    """A _MockWebHost which does not wait for the response to a request
+    before sending the next one, so that invocations can run concurrently.
+
+    Invocation responses are matched to their requests by invocation id,
+    the other responses by their type in the order the requests were sent.
+    """
+
+    def __init__(self, loop, scripts_dir):
+        self._loop = loop
+        self._scripts_dir = scripts_dir
+
+        self._available_functions = {}
+        if scripts_dir is not None:
+            self._read_available_functions()
+
+        self._connected_fut = loop.create_future()
+        self._in_queue = queue.Queue()
+        self._threadpool = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self._server = grpc.server(self._threadpool)
+        self._servicer = _ConcurrentMockWebHostServicer(self)
+
+        protos.add_FunctionRpcServicer_to_server(self._servicer, self._server)
+        self._port = self._server.add_insecure_port(f'{LOCALHOST}:0')
+        self._worker_id = self.make_id()
+        self._request_id = self.make_id()
+
+        # key: response type, val: futures of the requests waiting for one
+        self._control_futures: typing.Dict[
+            str, typing.Deque[asyncio.Future]] = \
+            collections.defaultdict(collections.deque)
+        # key: invocation id, val: future of the response and the logs
+        self._invocation_futures: typing.Dict[
+            str, typing.Tuple[asyncio.Future, list]] = {}
+
+    def request(self, message, *, wait_for) -> asyncio.Future:
+        """Sends message and returns a future of the wait_for response
+        along with when it was received, by time.perf_counter().
+        """
+        future = self._loop.create_future()
+        if message.WhichOneof('content') == 'invocation_request':
+            self._invocation_futures[
+                message.invocation_request.invocation_id] = (future, [])
+        elif wait_for is not None:
+            self._control_futures[wait_for].append(future)
+        else:
+            future.set_result((None, time.perf_counter()))
+        self._in_queue.put_nowait((message, wait_for))
+        return future
+
+    async def communicate(self, message, *, wait_for):
+        future = self.request(message, wait_for=wait_for)
+        logs = []
+        if message.WhichOneof('content') == 'invocation_request':
+            _, logs = self._invocation_futures[
+                message.invocation_request.invocation_id]
+        response, _ = await future
+        return _WorkerResponseMessages(response, logs)
+
+    def _on_response(self, client_response, received_at):
+        rtype = client_response.WhichOneof('content')
+        unpacked = getattr(client_response, rtype)
+        if rtype == 'invocation_response':
+            future, _ = self._invocation_futures.pop(
+                unpacked.invocation_id, (None, None))
+        elif rtype == 'rpc_log':
+            if unpacked.invocation_id in self._invocation_futures:
+                self._invocation_futures[unpacked.invocation_id][1].append(
+                    unpacked)
+            return
+        elif self._control_futures[rtype]:
+            future = self._control_futures[rtype].popleft()
+        else:
+            # Responses nobody waits for
+            return
+        if future is not None and not future.done():
+            future.set_result((unpacked, received_at))
+
+
 class _MockWebHostController:
 
-    def __init__(self, scripts_dir: pathlib.PurePath):
+    def __init__(self, scripts_dir: typing.Optional[pathlib.PurePath],
+                 host_class: typing.Type[_MockWebHost] = _MockWebHost):
         self._host: typing.Optional[_MockWebHost] = None
-        self._scripts_dir: pathlib.PurePath = scripts_dir
+        self._scripts_dir: typing.Optional[pathlib.PurePath] = scripts_dir
+        self._host_class = host_class
         self._worker: typing.Optional[dispatcher.Dispatcher] = None
 
     async def __aenter__(self) -> _MockWebHost:
         loop = asyncio.get_running_loop()
-        self._host = _MockWebHost(loop, self._scripts_dir)
+        self._host = self._host_class(loop, self._scripts_dir)
 
         await self._host.start()
 
@@ -768,7 +923,10 @@ class _MockWebHostController:
         self._host = None
 
 
-def start_mockhost(*, script_root=FUNCS_PATH):
+def start_mockhost(*, script_root=FUNCS_PATH, concurrent=False):
+    """With concurrent, requests are sent without waiting for the response
+    to the previous one, see _ConcurrentMockWebHost.
+    """
     scripts_dir = TESTS_ROOT / script_root
     if not (scripts_dir.exists() and scripts_dir.is_dir()):
         raise RuntimeError(
@@ -777,7 +935,9 @@ def start_mockhost(*, script_root=FUNCS_PATH):
 
     sys.path.append(str(scripts_dir))
 
-    return _MockWebHostController(scripts_dir)
+    return _MockWebHostController(
+        scripts_dir,
+        _ConcurrentMockWebHost if concurrent else _MockWebHost)
 
 
 class _WebHostProxy: